@@ -0,0 +1,194 @@
+"""
+Cohorts - Customer retention, revenue and lifetime value by first-order period
+
+Works on the columnar orders table (see ColumnarShopData) with vectorized
+grouping, so millions of orders take one pass and no loop over customers:
+
+- cohort: the calendar month (or Monday-based week) of a customer's first
+  order in the fetched window; guest orders are left out
+- per cohort and period offset: customers ordering again, their orders and
+  revenue; cells past the end of the data are not observed yet
+- repeat-purchase intervals: days between consecutive orders of a customer,
+  and from first to second order
+- CLV: revenue per active customer-period times the expected number of
+  active periods over clv_periods: the observed retention curve, extended
+  geometrically by the period-over-period retention of returning customers
+
+Customers who ordered before the window start are counted from their
+first order inside it. Only numpy is imported, so this runs in processing
+pool workers.
+"""
+
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from app.shopifyql.columnar import encode_keys
+
+
+SECONDS_PER_DAY = 86400
+
+PERIODS = ("month", "week")
+
+Table = Dict[str, np.ndarray]
+
+
+def cohort_retention(
+    orders: Optional[Table],
+    period: str = "month",
+    clv_periods: int = 36
+) -> Dict[str, Any]:
+    """
+    Cohort matrices and repeat-purchase statistics for one shop's orders
+
+    Args:
+        orders: Columnar orders table (created_at, customer_id, total_price)
+        period: "month" or "week"
+        clv_periods: Horizon, in periods, the lifetime value is projected over
+
+    Returns:
+        "periods" (period start per cohort, as datetime64), "customers" per
+        cohort, and (cohort x offset) matrices "active", "orders" and
+        "revenue", with "observed" marking cells inside the data; per-order
+        "intervals" and per-customer "to_second" in days; "curve" (share
+        active by offset), "retention" (period over period, from offset 1),
+        "revenue_per_active", "expected_periods" and "clv"
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unsupported cohort period: {period}")
+    orders = orders or {}
+    customer_ids = orders.get("customer_id", np.array([], dtype=np.int64))
+    known = customer_ids > 0
+    created = orders.get("created_at", np.array([], dtype=np.int64))[known]
+    revenue = orders.get("total_price", np.zeros(len(known)))[known]
+    _, customers = encode_keys(customer_ids[known])
+
+    if not len(created):
+        return _empty(period, clv_periods)
+
+    # Period of every order, counted from the first period in the data
+    absolute = _period_index(created, period)
+    first_period = int(absolute.min())
+    periods = absolute - first_period
+    num_periods = int(periods.max()) + 1
+    num_customers = int(customers.max()) + 1
+
+    # Rows grouped by customer, in time order within each customer
+    order = _by_customer(customers, created)
+    by_customer = customers[order]
+    by_period = periods[order]
+    new_customer = np.ones(len(order), dtype=bool)
+    new_customer[1:] = by_customer[1:] != by_customer[:-1]
+
+    cohort_of = np.empty(num_customers, dtype=np.int64)
+    cohort_of[by_customer[new_customer]] = by_period[new_customer]
+    cohort = cohort_of[by_customer]
+    cells = cohort * num_periods + (by_period - cohort)
+    size = num_periods * num_periods
+
+    order_matrix = np.bincount(cells, minlength=size)
+    revenue_matrix = np.bincount(cells, weights=revenue[order], minlength=size)
+    # Distinct customers per cell: the first row of each (customer, period) run
+    new_pair = new_customer.copy()
+    new_pair[1:] |= by_period[1:] != by_period[:-1]
+    active = np.bincount(cells[new_pair], minlength=size)
+
+    shape = (num_periods, num_periods)
+    offsets = np.arange(num_periods)
+    observed = offsets[:, None] + offsets[None, :] < num_periods
+    active = active.reshape(shape)
+    revenue_matrix = revenue_matrix.reshape(shape)
+
+    # Retention curve over complete periods (the latest is usually partial):
+    # share of each cohort active k periods on, weighted by cohort size
+    sizes = np.bincount(cohort_of, minlength=num_periods)
+    complete = offsets[:, None] + offsets[None, :] < num_periods - 1
+    exposed = (sizes[:, None] * complete).sum(axis=0)
+    seen = int((exposed > 0).sum())
+    curve = (active * complete).sum(axis=0)[:seen] / exposed[:seen] if seen else np.ones(1)
+
+    # Decay among returning customers (offset 1 onwards) extends the curve
+    # past the last observed offset
+    pairs = complete[:, 2:]
+    carried = active[:, 1:-1][pairs].sum()
+    retention = min(float(active[:, 2:][pairs].sum() / carried), 1.0) if carried else 0.0
+    observed_periods = float(curve[:clv_periods].sum())
+    tail = max(clv_periods - len(curve), 0)
+    tail_periods = tail if retention >= 1.0 else retention * (1 - retention ** tail) / (1 - retention)
+    expected_periods = observed_periods + float(curve[-1]) * tail_periods
+    revenue_per_active = float(revenue_matrix.sum() / active.sum())
+
+    intervals, to_second = _repeat_intervals(new_customer, created[order])
+
+    return {
+        "period": period,
+        "periods": _period_start(first_period + offsets, period),
+        "customers": sizes,
+        "active": active,
+        "orders": order_matrix.reshape(shape),
+        "revenue": revenue_matrix,
+        "observed": observed,
+        "intervals": intervals,
+        "to_second": to_second,
+        "curve": curve,
+        "retention": retention,
+        "revenue_per_active": revenue_per_active,
+        "expected_periods": expected_periods,
+        "clv": revenue_per_active * expected_periods,
+        "clv_periods": clv_periods,
+    }
+
+
+def _period_index(created: np.ndarray, period: str) -> np.ndarray:
+    days = created // SECONDS_PER_DAY
+    if period == "week":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (days + 3) // 7
+    # Months are bucketed per distinct day, then mapped back to the orders
+    distinct, codes = encode_keys(days)
+    return distinct.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)[codes]
+
+
+def _period_start(index: np.ndarray, period: str) -> np.ndarray:
+    if period == "week":
+        return (index * 7 - 3).astype("datetime64[D]")
+    return index.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _by_customer(customers: np.ndarray, created: np.ndarray) -> np.ndarray:
+    """Row order grouping each customer's orders, oldest first"""
+    if np.any(created[1:] < created[:-1]):
+        return np.lexsort((created, customers))
+    # Rows are already by created_at: sort (customer, row) packed into one
+    # int64 and unpack the rows, which is a stable sort by customer
+    rows = len(customers)
+    return np.sort(customers * rows + np.arange(rows)) % rows
+
+
+def _repeat_intervals(new_customer: np.ndarray, times: np.ndarray):
+    """Days between each customer's consecutive orders, and to their second order"""
+    same = ~new_customer[1:]
+    gaps = (times[1:] - times[:-1]) / SECONDS_PER_DAY
+    # A customer's first gap follows the first row of their run
+    return gaps[same], gaps[same & new_customer[:-1]]
+
+
+def _empty(period: str, clv_periods: int) -> Dict[str, Any]:
+    matrix = np.zeros((0, 0))
+    return {
+        "period": period,
+        "periods": np.array([], dtype="datetime64[D]"),
+        "customers": np.array([], dtype=np.int64),
+        "active": matrix,
+        "orders": matrix,
+        "revenue": matrix,
+        "observed": matrix.astype(bool),
+        "intervals": np.array([]),
+        "to_second": np.array([]),
+        "curve": np.array([]),
+        "retention": 0.0,
+        "revenue_per_active": 0.0,
+        "expected_periods": 0.0,
+        "clv": 0.0,
+        "clv_periods": clv_periods,
+    }
@@ -0,0 +1,263 @@
+"""
+Columnar Aggregates - Vectorized counterparts of ResultProcessor's record loops
+
+Each function takes ColumnarShopData-style tables ({table: {column: array}})
+and returns the same aggregate dict as the matching ResultProcessor
+_aggregate_* method, as plain Python values. They only depend on numpy, so
+they can run in a worker process over arrays mapped from shared memory.
+
+Sales and inventory aggregates also accept daily rollups (see rollups):
+"sales" then holds one row per product and day, and a "daily" table
+replaces the orders table.
+"""
+
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from app.agent.cohorts import cohort_retention
+from app.agent.inventory_forecast import forecast_skus
+from app.agent.inventory_index import InventoryIndex
+from app.agent.sampling import estimate_sales_analysis
+
+
+Tables = Dict[str, Dict[str, np.ndarray]]
+
+
+def aggregate_inventory_projection(tables: Tables, top: int = 10, **forecast) -> Dict[str, Any]:
+    """
+    Shop totals, per-SKU forecasts and per-location shortages / transfers;
+    other keyword arguments go to forecast_skus
+    """
+    sales = tables.get("sales") or {}
+    inventory = tables.get("inventory") or {}
+    products = tables.get("products") or {}
+
+    result = forecast_skus(sales, inventory, top=top, **forecast)
+    velocity = result["velocity"]
+    stock = result["current_stock"]
+    horizon_need = velocity * forecast.get("horizon_days", 7)
+
+    titles = {}
+    if products:
+        titles = dict(zip(products["product_id"].tolist(), list(products["title"])))
+    covered = forecast.get("horizon_days", 7) + forecast.get("lead_time_days", 7.0)
+
+    skus = []
+    for row, index in enumerate(result["urgent"].tolist()):
+        product_id = int(result["product_id"][index])
+        sku = {
+            "product": titles.get(product_id, f"Product {product_id}"),
+            "product_id": product_id,
+            "daily_velocity": round(float(velocity[index]), 2),
+            "moving_average": round(float(result["moving_average"][index]), 2),
+            "current_stock": int(stock[index]),
+            "days_of_cover": _days(result["days_of_cover"][index]),
+            "reorder_point": round(float(result["reorder_point"][index]), 1),
+            "reorder_quantity": int(result["reorder_quantity"][index]),
+            "recent_daily_units": [int(units) for units in result["urgent_series"][row]],
+        }
+        if result["by_variant"]:
+            sku["variant_id"] = int(result["sku_id"][index])
+        skus.append(sku)
+
+    return {
+        "order_count": _order_totals(tables)[0],
+        "total_units": int(sales["quantity"].sum()) if sales else 0,
+        "current_stock": int(stock.sum()),
+        "window_units": int(result["units_sold"].sum()),
+        "daily_velocity": float(velocity.sum()),
+        "skus_analyzed": len(velocity),
+        "skus_to_reorder": int((result["reorder_quantity"] > 0).sum()),
+        "skus_at_risk": int((result["days_of_cover"] < covered).sum()),
+        "reorder_units": int(result["reorder_quantity"].sum()),
+        "horizon_need": float(horizon_need.sum()),
+        "horizon_shortage": float(np.maximum(horizon_need - stock, 0).sum()),
+        "urgent_skus": skus,
+        **_location_report(InventoryIndex(inventory, by_variant=result["by_variant"]),
+                           result, covered, titles, top),
+    }
+
+
+def _location_report(index: InventoryIndex, result: Dict[str, Any], covered: float,
+                     titles: Dict[int, str], top: int) -> Dict[str, Any]:
+    """Shortages per location and suggested transfers between locations"""
+    # Forecast velocity joined onto the stocked SKUs by SKU id
+    need = index.allocate(index.join(result["sku_id"], result["velocity"]), covered)
+    report = index.location_shortages(need)
+    moves = index.transfers(need)
+
+    by_shortage = np.argsort(-report["units_short"], kind="stable")[:top]
+    locations = [
+        {
+            "location_id": int(report["location_id"][i]),
+            "current_stock": int(report["stock"][i]),
+            "units_needed": round(float(report["need"][i]), 0),
+            "skus_short": int(report["skus_short"][i]),
+            "units_short": round(float(report["units_short"][i]), 0),
+        }
+        for i in by_shortage.tolist()
+    ]
+
+    transfers = []
+    for i in np.argsort(-moves["units"], kind="stable")[:top].tolist():
+        sku, source, target = int(moves["sku"][i]), int(moves["source"][i]), int(moves["target"][i])
+        product_id = int(index.product_ids[sku])
+        transfer = {
+            "product": titles.get(product_id, f"Product {product_id}"),
+            "product_id": product_id,
+            "from_location": int(index.locations[index.cell_location[source]]),
+            "to_location": int(index.locations[index.cell_location[target]]),
+            "units": int(moves["units"][i]),
+        }
+        if index.by_variant:
+            transfer["variant_id"] = int(index.sku_ids[sku])
+        transfers.append(transfer)
+
+    return {
+        "location_count": len(index.locations),
+        "locations_short": int((report["units_short"] > 0).sum()),
+        "transfer_units": int(moves["units"].sum()),
+        "location_shortages": locations,
+        "transfers": transfers,
+    }
+
+
+def _days(value: float):
+    return round(float(value), 1) if np.isfinite(value) else float("inf")
+
+
+def aggregate_sales_analysis(tables: Tables, sample: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Sales totals and top products; estimated for the window when tables hold a sample"""
+    if sample:
+        return estimate_sales_analysis(tables, sample)
+    sales = tables.get("sales") or {}
+    products = tables.get("products") or {}
+
+    order_count, total_revenue = _order_totals(tables)
+    if not order_count:
+        return {"total_orders": 0, "total_revenue": 0.0, "top_products": [], "products_analyzed": 0}
+
+    product_ids, first_seen, inverse = np.unique(
+        sales["product_id"], return_index=True, return_inverse=True
+    )
+    quantity = np.bincount(inverse, weights=sales["quantity"], minlength=len(product_ids))
+    revenue = np.bincount(inverse, weights=sales["gross"], minlength=len(product_ids))
+
+    # Rank like the record loop: by quantity, ties in order of first appearance
+    by_appearance = np.argsort(first_seen, kind="stable")
+    top = by_appearance[np.argsort(-quantity[by_appearance], kind="stable")[:5]]
+
+    titles = {}
+    if products:
+        titles = dict(zip(products["product_id"].tolist(), list(products["title"])))
+
+    aggregate = {
+        "total_orders": order_count,
+        "total_revenue": total_revenue,
+        "top_products": [
+            {
+                "product": titles.get(int(product_ids[i]), f"Product {int(product_ids[i])}"),
+                "quantity": int(quantity[i]),
+                "revenue": float(revenue[i])
+            }
+            for i in top
+        ],
+        "products_analyzed": len(product_ids),
+    }
+    if "daily" in tables:
+        aggregate["new_customers"] = int(tables["daily"]["new_customers"].sum())
+    return aggregate
+
+
+def _order_totals(tables: Tables):
+    """Order count and revenue, from daily rollups when present"""
+    daily = tables.get("daily")
+    if daily:
+        return int(daily["orders"].sum()), float(daily["revenue"].sum())
+    orders = tables.get("orders") or {}
+    if not orders:
+        return 0, 0.0
+    return len(orders["order_id"]), float(orders["total_price"].sum())
+
+
+def aggregate_customer_behavior(tables: Tables) -> Dict[str, Any]:
+    orders = tables.get("orders") or {}
+    if not orders:
+        return {"order_count": 0, "total_customers": 0, "repeat_customers": 0}
+
+    customer_ids = orders["customer_id"]
+    # Guest orders (no customer) don't count towards customers
+    _, counts = np.unique(customer_ids[customer_ids > 0], return_counts=True)
+    return {
+        "order_count": len(customer_ids),
+        "total_customers": len(counts),
+        "repeat_customers": int((counts > 1).sum()),
+    }
+
+
+def aggregate_customer_retention(tables: Tables, max_offset: int = 12, **cohorts) -> Dict[str, Any]:
+    """
+    Cohort retention, revenue and CLV for the first max_offset periods;
+    other keyword arguments go to cohort_retention
+    """
+    orders = tables.get("orders") or {}
+    result = cohort_retention(orders, **cohorts)
+    sizes = result["customers"]
+    width = max_offset + 1
+    active = result["active"][:, :width]
+    observed = result["observed"][:, :width]
+    label_length = 7 if result["period"] == "month" else 10
+
+    cohorts_out = []
+    for row, start in enumerate(result["periods"]):
+        size = int(sizes[row])
+        if not size:
+            continue
+        seen = int(observed[row].sum())
+        cohorts_out.append({
+            "cohort": str(start)[:label_length],
+            "customers": size,
+            "retention": [round(100 * int(count) / size, 1) for count in active[row, :seen]],
+            "active_customers": [int(count) for count in active[row, :seen]],
+            "orders": [int(count) for count in result["orders"][row, :seen]],
+            "revenue": [round(float(value), 2) for value in result["revenue"][row, :seen]],
+            "revenue_per_customer": round(float(result["revenue"][row].sum()) / size, 2),
+        })
+
+    return {
+        "order_count": len(orders["order_id"]) if orders else 0,
+        "total_customers": int(sizes.sum()),
+        "repeat_customers": len(result["to_second"]),
+        "cohort_period": result["period"],
+        "cohorts": cohorts_out,
+        "average_retention": [round(100 * float(share), 1) for share in result["curve"][:width]],
+        "period_retention": round(result["retention"], 4),
+        "repeat_interval_days": _distribution(result["intervals"]),
+        "days_to_second_order": _distribution(result["to_second"]),
+        "revenue_per_active_customer": round(result["revenue_per_active"], 2),
+        "expected_active_periods": round(result["expected_periods"], 2),
+        "clv_estimate": round(result["clv"], 2),
+        "clv_periods": result["clv_periods"],
+    }
+
+
+def _distribution(days: np.ndarray) -> Dict[str, Any]:
+    if not len(days):
+        return {"count": 0, "mean": None, "p25": None, "median": None, "p75": None}
+    p25, median, p75 = np.percentile(days, [25, 50, 75])
+    return {
+        "count": len(days),
+        "mean": round(float(days.mean()), 1),
+        "p25": round(float(p25), 1),
+        "median": round(float(median), 1),
+        "p75": round(float(p75), 1),
+    }
+
+
+AGGREGATORS = {
+    "inventory_projection": aggregate_inventory_projection,
+    "sales_analysis": aggregate_sales_analysis,
+    "customer_behavior": aggregate_customer_behavior,
+    "customer_retention": aggregate_customer_retention,
+}
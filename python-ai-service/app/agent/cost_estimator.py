@@ -0,0 +1,383 @@
+"""
+Query Cost Estimator - Runs between ShopifyQL generation and execution
+
+Predicts pages, API cost points, bytes and processing time for a query
+specification from the time window and what we know about the shop's size,
+then applies guardrails: narrow the window, sample it (for callers that
+opted in to approximate answers), or reject plans that would run away.
+Plans over budget that none of these fit are fetched in full, and say so.
+"""
+
+import copy
+import math
+import os
+from typing import Dict, Any, Optional
+
+from app.shopify.filters import period_to_date_range, TIME_FILTERED_RESOURCES
+from app.shopify.graphql_query import (
+    estimate_query_cost,
+    plan_page_sizes,
+    PAGE_SIZE
+)
+
+
+# Approximate serialized size of one record (bytes)
+RECORD_BYTES = {
+    "orders": 1200,
+    "line_items": 350,
+    "products": 900,
+    "inventory_levels": 150,
+    "customers": 450
+}
+
+# Approximate ResultProcessor cost per record (microseconds)
+PROCESSING_US = {
+    "orders": 2.0,
+    "line_items": 1.5,
+    "products": 0.5,
+    "inventory_levels": 0.5,
+    "customers": 0.5
+}
+
+# Intents that need the whole requested window to be meaningful
+FULL_WINDOW_INTENTS = ["customer_retention"]
+
+
+class QueryRejectedError(ValueError):
+    """Raised when a plan is too expensive to run even after narrowing"""
+
+
+class QueryCostEstimator:
+    """
+    Estimates query cost and enforces per-question budgets
+
+    Shop sizes start from configured defaults and are refined from the
+    actual record counts of each executed query.
+    """
+
+    def __init__(self):
+        self.fetch_mode = os.getenv("SHOPIFY_FETCH_MODE", "rest").lower()
+        self.max_pages = int(os.getenv("QUERY_MAX_PAGES", "40"))
+        self.max_cost_points = int(os.getenv("QUERY_MAX_COST_POINTS", "20000"))
+        self.max_bytes = int(os.getenv("QUERY_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.reject_pages = int(os.getenv("QUERY_REJECT_PAGES", "4000"))
+        self.min_window_days = int(os.getenv("QUERY_MIN_WINDOW_DAYS", "7"))
+        self.history_days = int(os.getenv("SHOP_HISTORY_DAYS", "730"))
+
+        self.default_profile = {
+            "orders_per_day": float(os.getenv("SHOP_DEFAULT_ORDERS_PER_DAY", "20")),
+            "line_items_per_order": 2.0,
+            "products": int(os.getenv("SHOP_DEFAULT_PRODUCTS", "200")),
+            "customers": int(os.getenv("SHOP_DEFAULT_CUSTOMERS", "1000")),
+            "locations": 1,
+            # Defaults are a guess; only known sizes justify reshaping a query
+            "known": False
+        }
+        self.profiles: Dict[str, Dict[str, float]] = {}
+
+    def estimate(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str
+    ) -> Dict[str, Any]:
+        """
+        Predict the cost of executing a query specification
+
+        Returns:
+            {
+                "window_days": int,
+                "records": Dict[str, int],
+                "pages": int,          # round trips
+                "cost_points": int,    # GraphQL points, or REST requests
+                "bytes": int,
+                "processing_ms": float
+            }
+        """
+        profile = self.profile(store_id)
+        window_days = self._window_days(query_spec)
+
+        records = {}
+        for call in query_spec.get("api_calls", []):
+            resource = call.get("resource")
+            if resource == "orders":
+                # Plans served from daily rollups only fetch the days not synced yet
+                order_days = query_spec["rollups"]["sync_days"] if query_spec.get("rollups") else window_days
+                records["orders"] = int(math.ceil(profile["orders_per_day"] * order_days))
+            elif resource == "customers":
+                records["customers"] = int(profile["customers"])
+            elif resource == "products":
+                records["products"] = int(profile["products"])
+            elif resource == "inventory_levels":
+                records["inventory_levels"] = int(profile["products"] * profile["locations"])
+
+        line_items = int(records.get("orders", 0) * profile["line_items_per_order"])
+
+        pages, cost_points = self._pages_and_cost(query_spec.get("api_calls", []), records)
+        size = sum(RECORD_BYTES[r] * n for r, n in records.items()) + RECORD_BYTES["line_items"] * line_items
+        processing_us = sum(PROCESSING_US[r] * n for r, n in records.items()) + \
+            PROCESSING_US["line_items"] * line_items
+
+        return {
+            "window_days": window_days,
+            "records": records,
+            "pages": pages,
+            "cost_points": cost_points,
+            "bytes": int(size),
+            "processing_ms": round(processing_us / 1000, 2)
+        }
+
+    def apply_guardrails(
+        self,
+        query_spec: Dict[str, Any],
+        estimate: Dict[str, Any],
+        store_id: str,
+        intent: Dict[str, Any],
+        approximate: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Enforce the per-question budget, adjusting query_spec in place
+
+        With approximate set, plans whose totals can be estimated are
+        sampled over their whole window instead of narrowed or rejected.
+        A plan over budget that can't be narrowed proceeds unchanged (the
+        reason says by how much it is over).
+
+        Returns:
+            {
+                "action": "proceed|narrow_window|sample",
+                "reason": str,
+                "estimate": Dict  # estimate after adjustment
+            }
+
+        Raises:
+            QueryRejectedError when the plan is far beyond budget and can't
+            be narrowed or sampled into it
+        """
+        if self._within_budget(estimate):
+            return {"action": "proceed", "reason": "Within budget", "estimate": estimate}
+        
+        if not self.profile(store_id)["known"]:
+            if estimate["pages"] > self.reject_pages:
+                raise QueryRejectedError(self._rejection_message(estimate))
+            return {
+                "action": "proceed",
+                "reason": "Shop size unknown; estimate based on defaults",
+                "estimate": estimate
+            }
+
+        over = self._budget_ratio(estimate)
+
+        # Approximate answers keep the asked-for window and sample it
+        if approximate and query_spec.get("approximable"):
+            self._sample(query_spec, store_id, over)
+            query_spec["approximate"] = True
+            return {
+                "action": "sample",
+                "reason": f"Estimate is {over:.1f}x over budget; answering approximately from sampled time slices",
+                "estimate": estimate
+            }
+
+        # 1. Narrow the time window if the question tolerates it
+        if intent.get("intent") not in FULL_WINDOW_INTENTS and "orders" in estimate["records"]:
+            narrowed_days = self._narrowed_window(
+                query_spec.get("api_calls", []), estimate, store_id
+            )
+            if narrowed_days and narrowed_days < estimate["window_days"]:
+                original = self._window_filters(query_spec)
+                self._set_window(query_spec, narrowed_days)
+                narrowed = self.estimate(query_spec, store_id)
+                if self._within_budget(narrowed):
+                    return {
+                        "action": "narrow_window",
+                        "reason": (
+                            f"Narrowed window from {estimate['window_days']} to "
+                            f"{narrowed_days} days to stay within budget"
+                        ),
+                        "estimate": narrowed
+                    }
+                self._restore_window(query_spec, original)
+
+        # 2. Far beyond budget: refuse rather than page through the shop
+        if estimate["pages"] > self.reject_pages:
+            raise QueryRejectedError(self._rejection_message(estimate))
+
+        return {
+            "action": "proceed",
+            "reason": f"Estimate is {over:.1f}x over budget; fetching the whole window",
+            "estimate": estimate
+        }
+
+    def as_applied(self, guardrail: Dict[str, Any], raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The guardrail as execution applied it: a sampled plan the executor
+        answered another way (from rollups, or exactly after a failed
+        sample) is reported as proceeding, not as sampled
+        """
+        if guardrail["action"] == "sample" and raw_data.get("fetch_mode") != "sampled":
+            return {
+                "action": "proceed",
+                "reason": "Answered from the whole window instead of a sample",
+                "estimate": guardrail["estimate"]
+            }
+        return guardrail
+
+    def _sample(self, query_spec: Dict[str, Any], store_id: str, over: float) -> float:
+        """Set query_spec["sampling"]: the rate that fits the budget, in page-sized time slices"""
+        rate = round(1.0 / over, 4)
+        slice_days = PAGE_SIZE / max(self.profile(store_id)["orders_per_day"], 0.001)
+        query_spec["sampling"] = {
+            "rate": rate,
+            "slice_seconds": max(int(slice_days * 86400), 60)
+        }
+        return rate
+
+    def record_actual(
+        self,
+        store_id: str,
+        query_spec: Dict[str, Any],
+        raw_data: Dict[str, Any]
+    ):
+        """Refine the shop profile from the records a query actually returned"""
+        data = raw_data.get("data") or {}
+        if not data:
+            return
+
+        profile = self.profile(store_id)
+        window_days = self._window_days(query_spec)
+        # Resources the executor stopped reading at its page cap
+        truncated = raw_data.get("truncated") or []
+        
+        orders = data.get("orders")
+        if orders:
+            per_day = len(orders) / max(window_days, 1)
+            # A truncated fetch is only a lower bound
+            if "orders" in truncated:
+                per_day = max(per_day, profile["orders_per_day"])
+            profile["orders_per_day"] = per_day
+            items = sum(len(o.get("line_items", [])) for o in orders)
+            profile["line_items_per_order"] = items / len(orders)
+
+        products = data.get("products")
+        if products and "products" not in truncated:
+            profile["products"] = len(products)
+
+        customers = data.get("customers")
+        if customers and "customers" not in truncated:
+            profile["customers"] = len(customers)
+
+        inventory = data.get("inventory_levels")
+        if inventory:
+            locations = {level.get("location_id") for level in inventory}
+            profile["locations"] = max(1, len(locations))
+
+        profile["known"] = True
+
+    def profile(self, store_id: str) -> Dict[str, float]:
+        """Known (or default) size profile for a store"""
+        if store_id not in self.profiles:
+            self.profiles[store_id] = dict(self.default_profile)
+        return self.profiles[store_id]
+
+    def set_profile(self, store_id: str, **sizes):
+        """Seed a store's size profile (e.g. from shop.json counts)"""
+        self.profile(store_id).update(sizes, known=True)
+
+    def _rejection_message(self, estimate: Dict[str, Any]) -> str:
+        return (
+            f"This question would need about {estimate['pages']} pages of Shopify data "
+            f"(limit {self.reject_pages}). Try a shorter time period or specific products."
+        )
+
+    def _pages_and_cost(self, api_calls, records: Dict[str, int]):
+        """Round trips and rate-limit cost to fetch every record"""
+        if self.fetch_mode != "graphql":
+            # REST: one 250-record page per request, one bucket unit per request
+            pages = sum(max(1, math.ceil(n / PAGE_SIZE)) for n in records.values())
+            return pages, pages
+
+        # GraphQL: the first query reads a page of every resource, with page
+        # sizes capped by the single-query cost limit; each resource with
+        # more records is then paged on its own (inventory levels aren't)
+        page_sizes = plan_page_sizes(api_calls)
+        calls = {call.get("resource"): call for call in api_calls}
+        pages, cost = 1, estimate_query_cost(api_calls)
+        for resource, count in records.items():
+            remaining = count - page_sizes.get(resource, PAGE_SIZE)
+            if resource == "inventory_levels" or remaining <= 0:
+                continue
+            alone = [calls[resource]]
+            more = math.ceil(remaining / plan_page_sizes(alone)[resource])
+            pages += more
+            cost += more * estimate_query_cost(alone)
+        return pages, cost
+
+    def _window_days(self, query_spec: Dict[str, Any]) -> int:
+        period = (query_spec.get("filters") or {}).get("time_period")
+        start, end = period_to_date_range(period)
+        if start is None:
+            return self.history_days
+        return max(1, (end - start).days)
+
+    def _within_budget(self, estimate: Dict[str, Any]) -> bool:
+        return self._budget_ratio(estimate) <= 1.0
+
+    def _budget_ratio(self, estimate: Dict[str, Any]) -> float:
+        ratios = [
+            estimate["pages"] / self.max_pages,
+            estimate["bytes"] / self.max_bytes
+        ]
+        if self.fetch_mode == "graphql":
+            ratios.append(estimate["cost_points"] / self.max_cost_points)
+        return max(ratios)
+
+    def _narrowed_window(
+        self,
+        api_calls,
+        estimate: Dict[str, Any],
+        store_id: str
+    ) -> Optional[int]:
+        """Largest window (days) whose order pages fit the page budget"""
+        if self.fetch_mode == "graphql":
+            # Orders past the first, batched page are paged on their own
+            alone = [call for call in api_calls if call.get("resource") == "orders"]
+            query_cost = max(estimate_query_cost(alone), 1)
+            order_pages = min(
+                self.max_pages - 1,
+                (self.max_cost_points - estimate_query_cost(api_calls)) // query_cost
+            )
+            orders_per_page = plan_page_sizes(alone)["orders"]
+        else:
+            orders = estimate["records"]["orders"]
+            order_pages = self.max_pages - (estimate["pages"] - math.ceil(orders / PAGE_SIZE))
+            orders_per_page = PAGE_SIZE
+        if order_pages <= 0:
+            return None
+
+        orders_per_day = self.profile(store_id)["orders_per_day"]
+        days = int(order_pages * orders_per_page / max(orders_per_day, 0.001))
+        if days < self.min_window_days:
+            return None
+        return days
+
+    def _set_window(self, query_spec: Dict[str, Any], days: int):
+        """Limit the plan, and the time-filtered calls that fetch it, to the last days"""
+        period = f"last {days} days"
+        query_spec.setdefault("filters", {})["time_period"] = period
+        for call in query_spec.get("api_calls", []):
+            if call.get("resource") in TIME_FILTERED_RESOURCES:
+                call.setdefault("filters", {})["time_filter"] = period
+
+    def _window_filters(self, query_spec: Dict[str, Any]):
+        """Copy of the filters _set_window changes, for _restore_window"""
+        return copy.deepcopy((
+            query_spec.get("filters"),
+            [call.get("filters") for call in query_spec.get("api_calls", [])]
+        ))
+
+    def _restore_window(self, query_spec: Dict[str, Any], original):
+        filters, call_filters = original
+        for target, saved in [(query_spec, filters)] + list(zip(query_spec.get("api_calls", []), call_filters)):
+            if saved is None:
+                target.pop("filters", None)
+            else:
+                target["filters"] = saved
@@ -3,12 +3,22 @@ Explainer - Step 6 of agent workflow
 Converts technical data into business-friendly natural language
 """
 
+import logging
 import json
 from typing import Dict, Any
 from app.llm.client import LLMClient
 from app.llm.prompts import EXPLAINER_SYSTEM, EXPLAINER_PROMPT
 
 
+logger = logging.getLogger(__name__)
+
+CONFIDENCE_LEVELS = ["low", "medium", "high"]
+
+# Relative 95% margins of a sampled answer that still allow high / medium confidence
+SAMPLING_ERROR_HIGH = 0.02
+SAMPLING_ERROR_MEDIUM = 0.10
+
+
 class Explainer:
     """
     Generates natural language explanations from analytical results
@@ -63,12 +73,60 @@ class Explainer:
             result.setdefault("confidence", "medium")
             result.setdefault("confidence_reason", "Standard analysis")
             
-            return result
-            
         except Exception as e:
-            print(f"Explanation generation error: {e}")
+            logger.warning("Explanation generation error, using template: %s", e)
             # Fallback to template-based explanation
-            return self._fallback_explanation(intent, data_summary, calculations)
+            result = self._fallback_explanation(intent, data_summary, calculations)
+        
+        return self._apply_sketch_error(self._apply_sampling_error(result, calculations), calculations)
+
+    def summarize(
+        self,
+        intent: Dict[str, Any],
+        data_summary: Dict[str, Any],
+        calculations: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Template explanation without an LLM call (e.g. per store of a portfolio)"""
+        result = self._fallback_explanation(intent, data_summary, calculations)
+        result["confidence_reason"] = "Template-based summary"
+        return self._apply_sketch_error(self._apply_sampling_error(result, calculations), calculations)
+
+    def _apply_sampling_error(self, result: Dict[str, Any], calculations: Dict[str, Any]) -> Dict[str, Any]:
+        """Cap confidence by the sampling error of an approximate answer"""
+        sampling = calculations.get("sampling")
+        if not sampling:
+            return result
+        error = sampling.get("relative_error")
+        if error is None or error > SAMPLING_ERROR_MEDIUM:
+            cap = "low"
+        elif error > SAMPLING_ERROR_HIGH:
+            cap = "medium"
+        else:
+            cap = "high"
+        # The LLM's level may be any string ("High", "moderate") or none at all
+        confidence = str(result.get("confidence") or "").strip().lower()
+        if confidence not in CONFIDENCE_LEVELS:
+            confidence = "medium"
+        result["confidence"] = min(confidence, cap, key=CONFIDENCE_LEVELS.index)
+        margin = f"±{error:.1%}" if error is not None else "an unknown margin"
+        result["confidence_reason"] = (
+            f"{result.get('confidence_reason', '')}; estimated from a {sampling['rate']:.1%} sample "
+            f"of orders ({sampling['slices_sampled']} of {sampling['slices']} time slices), "
+            f"{margin} at 95% confidence"
+        ).lstrip("; ")
+        return result
+
+    def _apply_sketch_error(self, result: Dict[str, Any], calculations: Dict[str, Any]) -> Dict[str, Any]:
+        """Note that counts came from bounded-memory sketches, with their error"""
+        sketch = calculations.get("sketch")
+        if not sketch:
+            return result
+        error = sketch.get("distinct_relative_error")
+        note = f"distinct counts ±{error:.1%} (1 std. error)" if error else "exact distinct counts"
+        result["confidence_reason"] = (
+            f"{result.get('confidence_reason', '')}; counted with streaming sketches, {note}"
+        ).lstrip("; ")
+        return result
 
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse LLM JSON response"""
@@ -97,14 +155,33 @@ class Explainer:
             daily_rate = data_summary.get("daily_sales_rate", 0)
             projected_need = calculations.get("projected_units_needed", 0)
             shortage = calculations.get("shortage", 0)
+            reorder_units = calculations.get("reorder_units", shortage)
+            urgent = [sku for sku in data_summary.get("most_urgent_skus", []) if sku.get("reorder_quantity")]
             
-            if shortage > 0:
+            if reorder_units > 0:
                 answer = (
                     f"Based on your recent sales data, you sell approximately "
                     f"{daily_rate} units per day. To meet demand for the upcoming period, "
                     f"you'll need about {projected_need} units. You should reorder "
-                    f"at least {shortage} units to avoid stockouts."
+                    f"about {reorder_units} units across {calculations.get('skus_to_reorder', 1)} "
+                    f"products to avoid stockouts."
                 )
+                if urgent:
+                    answer += " Most urgent: " + ", ".join(
+                        f"{sku['product']} ({sku['reorder_quantity']} units, "
+                        f"{sku['days_of_cover']} days of cover left)"
+                        for sku in urgent[:3]
+                    ) + "."
+                transfers = data_summary.get("suggested_transfers", [])
+                if transfers:
+                    answer += (
+                        f" About {calculations.get('transfer_units', 0)} units can be moved between "
+                        f"locations first, e.g. " + ", ".join(
+                            f"{t['units']} x {t['product']} from location {t['from_location']} "
+                            f"to {t['to_location']}"
+                            for t in transfers[:2]
+                        ) + "."
+                    )
             else:
                 answer = (
                     f"Based on your sales rate of {daily_rate} units per day, "
@@ -118,14 +195,18 @@ class Explainer:
             total_revenue = data_summary.get("total_revenue", 0)
             top_products = data_summary.get("top_products", [])
             
+            basis = f"{total_orders} orders totaling ${total_revenue}"
+            if data_summary.get("estimated"):
+                margin = data_summary.get("margin_of_error", {})
+                basis = (
+                    f"an estimated {total_orders} (±{margin.get('total_orders')}) orders totaling "
+                    f"${total_revenue} (±${margin.get('total_revenue')})"
+                )
             if top_products:
                 top_names = ", ".join([p["product"] for p in top_products[:3]])
-                answer = (
-                    f"Based on {total_orders} orders totaling ${total_revenue}, "
-                    f"your top selling products are: {top_names}."
-                )
+                answer = f"Based on {basis}, your top selling products are: {top_names}."
             else:
-                answer = f"Analyzed {total_orders} orders totaling ${total_revenue}."
+                answer = f"Analyzed {basis}."
             
             confidence = "high" if total_orders > 10 else "medium"
             
@@ -139,6 +220,29 @@ class Explainer:
             )
             confidence = "medium"
             
+        elif intent_type == "customer_retention":
+            period = data_summary.get("cohort_period", "month")
+            retained = calculations.get("retention_after_one_period")
+            cohorts = data_summary.get("cohorts", [])
+            
+            answer = (
+                f"Across {len(cohorts)} {period}ly cohorts of first-time customers, "
+                f"{data_summary.get('repeat_rate', 0)}% ordered again"
+            )
+            if retained is not None:
+                answer += f", and {retained}% come back in the {period} after their first order"
+            answer += "."
+            if calculations.get("median_days_between_orders") is not None:
+                answer += (
+                    f" Repeat customers reorder every {calculations['median_days_between_orders']} "
+                    f"days (median)."
+                )
+            answer += (
+                f" Estimated customer lifetime value is ${calculations.get('clv_estimate', 0)} "
+                f"over {calculations.get('clv_horizon_months', 36)} months."
+            )
+            confidence = "medium" if len(cohorts) > 2 else "low"
+            
         else:
             answer = "I've analyzed your data and found the requested information."
             confidence = "low"
@@ -3,10 +3,19 @@ Intent Classifier - Step 1 of agent workflow
 Classifies user questions into analytics categories
 """
 
+import asyncio
+import logging
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List
 from app.llm.client import LLMClient
-from app.llm.prompts import INTENT_CLASSIFIER_SYSTEM, INTENT_CLASSIFIER_PROMPT
+from app.llm.prompts import (
+    INTENT_CLASSIFIER_SYSTEM,
+    INTENT_CLASSIFIER_PROMPT,
+    INTENT_CLASSIFIER_BATCH_PROMPT
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 class IntentClassifier:
@@ -55,31 +64,83 @@ class IntentClassifier:
             return self._validate_intent(result)
             
         except Exception as e:
-            print(f"Intent classification error: {e}")
-            # Return a reasonable default based on question keywords instead of always "low"
-            question_lower = question.lower()
-            
-            # Simple keyword-based fallback
-            if any(word in question_lower for word in ['top', 'best', 'selling', 'popular']):
-                intent = "top_products"
-                confidence = "medium"
-            elif any(word in question_lower for word in ['reorder', 'need', 'inventory', 'stock']):
-                intent = "inventory_projection"
-                confidence = "medium"
-            elif any(word in question_lower for word in ['customer', 'repeat', 'loyal']):
-                intent = "customer_behavior"
-                confidence = "medium"
-            else:
-                intent = "general_query"
-                confidence = "low"
-            
-            return {
-                "intent": intent,
-                "time_period": "recent",
-                "products": "all",
-                "metrics": ["general"],
-                "confidence": confidence
-            }
+            logger.warning("Intent classification error, using keyword fallback: %s", e)
+            return self._keyword_fallback(question)
+
+    async def classify_batch(self, questions: List[str], per_call: int = 10) -> List[Dict[str, Any]]:
+        """
+        Classify several questions, up to per_call of them per LLM call
+        
+        Calls run concurrently. Output tokens are generated serially, so
+        bigger calls save prompt tokens and calls but answer later.
+        
+        Returns one classify() result per question, in order.
+        """
+        per_call = max(1, per_call)
+        chunks = [questions[start:start + per_call] for start in range(0, len(questions), per_call)]
+        results = await asyncio.gather(*[self._classify_together(chunk) for chunk in chunks])
+        return [result for chunk in results for result in chunk]
+
+    async def _classify_together(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """
+        One LLM call for several questions. A response that doesn't line up
+        with the questions is retried one question at a time; an LLM failure
+        falls back to keywords.
+        """
+        if len(questions) == 1:
+            return [await self.classify(questions[0])]
+        
+        prompt = INTENT_CLASSIFIER_BATCH_PROMPT.format(
+            questions="\n".join(f'{number}. "{question}"' for number, question in enumerate(questions, 1))
+        )
+        try:
+            response = await self.llm.generate(
+                prompt=prompt,
+                system_prompt=INTENT_CLASSIFIER_SYSTEM,
+                temperature=0.1
+            )
+        except Exception as e:
+            logger.warning("Batch intent classification error, using keyword fallback: %s", e)
+            return [self._keyword_fallback(question) for question in questions]
+        
+        try:
+            results = self._parse_json_response(response)
+            if not isinstance(results, list) or len(results) != len(questions):
+                raise ValueError(f"expected {len(questions)} classifications")
+            return [self._validate_intent(result) for result in results]
+        except Exception as e:
+            logger.warning("Batch intent response unusable, classifying one by one: %s", e)
+            return list(await asyncio.gather(*[self.classify(question) for question in questions]))
+
+    def _keyword_fallback(self, question: str) -> Dict[str, Any]:
+        """Classify from keywords - a reasonable default instead of always "low" confidence"""
+        question_lower = question.lower()
+        
+        # Simple keyword-based fallback
+        if any(word in question_lower for word in ['top', 'best', 'selling', 'popular']):
+            intent = "top_products"
+            confidence = "medium"
+        elif any(word in question_lower for word in ['reorder', 'need', 'inventory', 'stock']):
+            intent = "inventory_projection"
+            confidence = "medium"
+        elif any(word in question_lower for word in ['retention', 'cohort', 'churn', 'lifetime', 'clv']):
+            intent = "customer_retention"
+            confidence = "medium"
+        elif any(word in question_lower for word in ['customer', 'repeat', 'loyal']):
+            intent = "customer_behavior"
+            confidence = "medium"
+        else:
+            intent = "general_query"
+            confidence = "low"
+        
+        return {
+            "intent": intent,
+            # Cohorts need months of history to say anything
+            "time_period": "last 12 months" if intent == "customer_retention" else "recent",
+            "products": "all",
+            "metrics": ["general"],
+            "confidence": confidence
+        }
 
     def _parse_json_response(self, response: str) -> Dict[str, Any]:
         """Parse LLM JSON response, handling markdown code blocks"""
@@ -92,8 +153,7 @@ class IntentClassifier:
             
             return json.loads(response)
         except json.JSONDecodeError as e:
-            print(f"JSON parse error: {e}")
-            print(f"Response was: {response}")
+            logger.warning("JSON parse error: %s", e, extra={"response": response[:500]})
             raise ValueError("Failed to parse LLM response as JSON")
 
     def _validate_intent(self, result: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,175 @@
+"""
+Inventory Forecast - Per-SKU sales velocity, days of cover and reorder quantities
+
+Works on columnar sales / inventory tables (see ColumnarShopData) and covers
+the whole catalog in one vectorized pass over the line items:
+
+- daily units per SKU over the history window (days with no sales count as 0)
+- smoothed velocity: exponential smoothing of the daily series, seeded with
+  the window mean; computed in closed form, so no SKU x day matrix is built
+- a trailing moving average, for comparison
+- days of cover = stock (summed over locations) / velocity
+- reorder quantity = cover for horizon + lead time plus safety stock
+  (z * daily std * sqrt(days covered)), minus stock
+
+A SKU is a variant when both tables carry variant_id, otherwise a product.
+Only numpy is imported, so this runs in processing pool workers.
+"""
+
+import time
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from app.agent.inventory_index import encode_keys, sku_keys
+
+
+SECONDS_PER_DAY = 86400
+
+Table = Dict[str, np.ndarray]
+
+
+def forecast_skus(
+    sales: Optional[Table],
+    inventory: Optional[Table],
+    history_days: int,
+    horizon_days: int,
+    lead_time_days: float = 7.0,
+    smoothing: float = 0.1,
+    moving_average_days: int = 7,
+    service_z: float = 1.65,
+    top: int = 10,
+    series_days: int = 14,
+    end: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Forecast every SKU seen in sales or inventory
+
+    Args:
+        history_days: Days of sales history the velocity is estimated from
+        horizon_days: Days ahead the stock has to last
+        lead_time_days: Days between placing and receiving a reorder
+        smoothing: Exponential smoothing factor (weight of the latest day)
+        service_z: Safety stock z-score (1.65 ~ 95% of lead times without a stockout)
+        top: How many of the most urgent SKUs get a recent daily series
+        end: Epoch seconds the window ends at; defaults to the latest sale
+
+    Returns:
+        Per-SKU arrays (sku_id, product_id, units_sold, velocity, moving_average,
+        daily_std, current_stock, days_of_cover, reorder_point, reorder_quantity),
+        plus "urgent" (indices of the most urgent SKUs), "urgent_series"
+        (their last series_days of daily units), "by_variant" and "window"
+    """
+    sales = sales or {}
+    inventory = inventory or {}
+    history_days = max(int(history_days), 1)
+    by_variant = "variant_id" in sales and ("variant_id" in inventory or not inventory)
+
+    sold_keys = sku_keys(sales, by_variant)
+    stock_keys = sku_keys(inventory, by_variant)
+    sku_ids, sale_codes, stock_codes = _encode(sold_keys, stock_keys)
+    num_skus = len(sku_ids)
+
+    product_ids = np.empty(num_skus, dtype=np.int64)
+    product_ids[sale_codes] = sales.get("product_id", np.array([], dtype=np.int64))
+    product_ids[stock_codes] = inventory.get("product_id", np.array([], dtype=np.int64))
+    stock = np.bincount(stock_codes, weights=inventory.get("available"), minlength=num_skus).astype(np.float64)
+
+    # Day index of each sale within the window (sales are sorted by created_at)
+    created = sales.get("created_at", np.array([], dtype=np.int64))
+    if np.any(created[1:] < created[:-1]):
+        order = np.argsort(created, kind="stable")
+        created, sale_codes = created[order], sale_codes[order]
+        sales = dict(sales, quantity=sales["quantity"][order])
+    if end is None:
+        end = int(created.max()) if len(created) else int(time.time())
+    start_day = end // SECONDS_PER_DAY + 1 - history_days
+    day = created // SECONDS_PER_DAY - start_day
+    window = (day >= 0) & (day < history_days)
+    codes_w = sale_codes[window]
+    day_w = day[window]
+    quantity = sales["quantity"][window].astype(np.float64) if len(created) else np.array([])
+
+    units = np.bincount(codes_w, weights=quantity, minlength=num_skus)
+    mean = units / history_days
+
+    # Exponential smoothing over the daily series, seeded with the mean:
+    # level = (1-a)^D * mean + sum_d a * (1-a)^(D-1-d) * units_d
+    decay = 1.0 - smoothing
+    weights = smoothing * decay ** (history_days - 1 - day_w)
+    velocity = decay ** history_days * mean + np.bincount(codes_w, weights=quantity * weights, minlength=num_skus)
+
+    ma_days = min(moving_average_days, history_days)
+    recent = day_w >= history_days - ma_days
+    moving_average = np.bincount(codes_w[recent], weights=quantity[recent], minlength=num_skus) / ma_days
+
+    # Daily variance needs per-(SKU, day) totals: one bincount per day's
+    # contiguous run of sales, rather than sorting (SKU, day) pairs
+    sum_squares = np.zeros(num_skus)
+    bounds = np.searchsorted(day_w, np.arange(history_days + 1))
+    for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        if stop > start:
+            sum_squares += np.bincount(codes_w[start:stop], weights=quantity[start:stop], minlength=num_skus) ** 2
+    daily_std = np.sqrt(np.maximum(sum_squares / history_days - mean ** 2, 0.0))
+
+    covered_days = horizon_days + lead_time_days
+    safety_stock = service_z * daily_std * np.sqrt(covered_days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(velocity > 0, stock / velocity, np.inf)
+    reorder_point = velocity * lead_time_days + safety_stock
+    reorder_quantity = np.ceil(np.maximum(velocity * covered_days + safety_stock - stock, 0.0))
+
+    # Most urgent first: SKUs to reorder by days of cover, then the fastest movers
+    urgent = np.lexsort((-velocity, days_of_cover, reorder_quantity <= 0))[:top]
+    urgent = urgent[(reorder_quantity[urgent] > 0) | (velocity[urgent] > 0)]
+
+    return {
+        "sku_id": sku_ids,
+        "product_id": product_ids,
+        "units_sold": units,
+        "velocity": velocity,
+        "moving_average": moving_average,
+        "daily_std": daily_std,
+        "current_stock": stock,
+        "days_of_cover": days_of_cover,
+        "reorder_point": reorder_point,
+        "reorder_quantity": reorder_quantity,
+        "urgent": urgent,
+        "urgent_series": _daily_series(
+            codes_w, day_w, quantity, urgent, num_skus, history_days, series_days
+        ),
+        "by_variant": by_variant,
+        "window": {
+            "start": start_day * SECONDS_PER_DAY,
+            "end": (start_day + history_days) * SECONDS_PER_DAY,
+            "days": history_days
+        },
+    }
+
+
+def _encode(sold_keys: np.ndarray, stock_keys: np.ndarray):
+    """Sorted SKU ids plus the code of each sales and inventory row"""
+    sku_ids, codes = encode_keys(np.concatenate([sold_keys, stock_keys]))
+    return sku_ids, codes[:len(sold_keys)], codes[len(sold_keys):]
+
+
+def _daily_series(
+    codes: np.ndarray,
+    days: np.ndarray,
+    quantity: np.ndarray,
+    selected: np.ndarray,
+    num_skus: int,
+    history_days: int,
+    series_days: int
+) -> np.ndarray:
+    """Last series_days of daily units for the selected SKU codes, one row each"""
+    series_days = min(series_days, history_days)
+    row_of = np.full(num_skus, -1, dtype=np.int64)
+    row_of[selected] = np.arange(len(selected))
+
+    first_day = history_days - series_days
+    rows = row_of[codes]
+    keep = (rows >= 0) & (days >= first_day)
+    cells = rows[keep] * series_days + (days[keep] - first_day)
+    series = np.bincount(cells, weights=quantity[keep], minlength=len(selected) * series_days)
+    return series.reshape(len(selected), series_days)
@@ -0,0 +1,216 @@
+"""
+Inventory Index - Product-by-location stock levels, built once per fetch
+
+Inventory levels arrive flat, one row per SKU per location. InventoryIndex
+collapses them into (SKU, location) cells sorted by SKU then location, so a
+SKU's levels are one contiguous slice, and keeps key tables so that sales
+aggregates are joined by SKU id with one probe per key rather than a scan:
+
+- SKU and cell lookups go through KeyTable (see columnar): a
+  direct-address table for compact id ranges, binary search otherwise
+- location shortages: a SKU's demand is split evenly over the locations
+  stocking it (orders don't say which location fulfils them) and compared
+  with each location's stock over the days to cover
+- transfers: surplus at one location matched to shortages of the same SKU
+  elsewhere, largest first, before anything is reordered
+
+Only numpy is imported, so this runs in processing pool workers.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.shopifyql.columnar import KeyTable, encode_keys
+
+
+Table = Dict[str, np.ndarray]
+
+
+def sku_keys(table: Table, by_variant: bool) -> np.ndarray:
+    """SKU id of each row: the variant when keyed by variant, otherwise the product"""
+    if not table:
+        return np.array([], dtype=np.int64)
+    if by_variant:
+        # Rows without a variant fall back to their product
+        return np.where(table["variant_id"] >= 0, table["variant_id"], table["product_id"])
+    return table["product_id"]
+
+
+def _group_order(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Stable order by group, then by whole-number value: one int64 argsort
+    when (group, value) packs into 63 bits, otherwise a lexsort
+    """
+    if not len(groups):
+        return np.array([], dtype=np.int64)
+    low = values.min()
+    span = float(values.max() - low) + 1
+    if (float(groups.max()) + 1) * span < 2 ** 62:
+        return np.argsort(groups * np.int64(span) + (values - low).astype(np.int64), kind="stable")
+    return np.lexsort((values, groups))
+
+
+class InventoryIndex:
+    """
+    Stock per (SKU, location) cell
+
+    Args:
+        inventory: Columnar inventory table (product_id, location_id,
+            available; variant_id when known)
+        by_variant: Key SKUs by variant; defaults to whether variant_id is present
+
+    Attributes:
+        sku_ids / locations: Sorted SKU and location ids (codes index these)
+        product_ids: Product of each SKU
+        cell_sku / cell_location: SKU and location code of each cell
+        available: Units in stock in each cell
+        offsets: Cells of SKU code s are offsets[s]:offsets[s + 1]
+        stock: Units in stock per SKU, over all locations
+    """
+
+    def __init__(self, inventory: Optional[Table], by_variant: Optional[bool] = None):
+        inventory = inventory or {}
+        if by_variant is None:
+            by_variant = "variant_id" in inventory
+        self.by_variant = bool(by_variant) and "variant_id" in inventory
+
+        empty = np.array([], dtype=np.int64)
+        sku_ids, sku_codes = encode_keys(sku_keys(inventory, self.by_variant))
+        self.locations, location_codes = encode_keys(inventory.get("location_id", empty))
+        self.skus = KeyTable(sku_ids)
+        self.sku_ids = sku_ids
+
+        self.product_ids = np.empty(len(sku_ids), dtype=np.int64)
+        self.product_ids[sku_codes] = inventory.get("product_id", empty)
+
+        # Several variants of a product share a cell when keyed by product
+        num_locations = max(len(self.locations), 1)
+        cell_ids, cell_codes = encode_keys(sku_codes * num_locations + location_codes)
+        self.cells = KeyTable(cell_ids)
+        self.cell_sku = cell_ids // num_locations
+        self.cell_location = cell_ids % num_locations
+        self.available = np.bincount(
+            cell_codes, weights=inventory.get("available", empty), minlength=len(cell_ids)
+        )
+        self.offsets = np.searchsorted(self.cell_sku, np.arange(len(sku_ids) + 1))
+        self.stock = np.bincount(self.cell_sku, weights=self.available, minlength=len(sku_ids))
+
+    @property
+    def num_skus(self) -> int:
+        return len(self.sku_ids)
+
+    def lookup(self, sku_ids: np.ndarray) -> np.ndarray:
+        """SKU code of each id, -1 for SKUs without inventory"""
+        return self.skus.lookup(sku_ids)
+
+    def levels(self, sku_id: int) -> Dict[int, int]:
+        """Units available at each location stocking one SKU"""
+        code = int(self.lookup(np.array([sku_id]))[0])
+        if code < 0:
+            return {}
+        cells = slice(self.offsets[code], self.offsets[code + 1])
+        return dict(zip(
+            self.locations[self.cell_location[cells]].tolist(),
+            self.available[cells].astype(np.int64).tolist()
+        ))
+
+    def available_at(self, sku_ids: np.ndarray, location_id: int) -> np.ndarray:
+        """Units of each SKU at one location (0 where not stocked)"""
+        location = np.searchsorted(self.locations, location_id)
+        codes = self.lookup(sku_ids)
+        if location >= len(self.locations) or self.locations[location] != location_id:
+            return np.zeros(len(codes))
+        cells = self.cells.lookup(np.where(codes >= 0, codes * len(self.locations) + location, -1))
+        return np.where(cells >= 0, self.available[np.maximum(cells, 0)], 0.0)
+
+    def join(self, sku_ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Hash join per-SKU values (e.g. a sales aggregate) onto the index:
+        probes the SKU table once per key; keys without inventory are dropped
+        and repeated keys are summed
+        """
+        codes = self.lookup(sku_ids)
+        matched = codes >= 0
+        return np.bincount(codes[matched], weights=np.asarray(values, dtype=np.float64)[matched],
+                           minlength=self.num_skus)
+
+    def allocate(self, daily_demand: np.ndarray, days: float) -> np.ndarray:
+        """
+        Units each cell needs to cover `days` of demand, given daily demand
+        per SKU code, split evenly over the SKU's locations
+        """
+        locations_per_sku = np.maximum(np.diff(self.offsets), 1)
+        return (daily_demand / locations_per_sku)[self.cell_sku] * days
+
+    def location_shortages(self, need: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per location: stock, units needed, and SKUs / units short (need from allocate)"""
+        shortage = np.maximum(need - self.available, 0.0)
+        count = len(self.locations)
+        return {
+            "location_id": self.locations,
+            "stock": np.bincount(self.cell_location, weights=self.available, minlength=count),
+            "need": np.bincount(self.cell_location, weights=need, minlength=count),
+            "skus_short": np.bincount(self.cell_location[shortage > 0], minlength=count),
+            "units_short": np.bincount(self.cell_location, weights=shortage, minlength=count),
+        }
+
+    def transfers(self, need: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Move whole units from cells with surplus to cells of the same SKU
+        that are short, largest surplus and shortage first
+
+        Within a SKU, surpluses and shortages are laid end to end; each
+        overlap of a surplus interval with a shortage interval is one
+        transfer, so all SKUs are matched at once without a per-SKU loop.
+
+        Returns:
+            Arrays sku (code), source and target (cell indices), units
+        """
+        surplus = np.floor(self.available - need)
+        shortage = np.ceil(need - self.available)
+        sources = np.flatnonzero(surplus > 0)
+        targets = np.flatnonzero(shortage > 0)
+
+        # Only SKUs with both a surplus and a shortage somewhere
+        has_source = np.bincount(self.cell_sku[sources], minlength=self.num_skus) > 0
+        has_target = np.bincount(self.cell_sku[targets], minlength=self.num_skus) > 0
+        sources = sources[has_target[self.cell_sku[sources]]]
+        targets = targets[has_source[self.cell_sku[targets]]]
+        if not len(sources):
+            return {name: np.array([], dtype=np.int64) for name in ("sku", "source", "target", "units")}
+
+        sources = sources[_group_order(self.cell_sku[sources], -surplus[sources])]
+        targets = targets[_group_order(self.cell_sku[targets], -shortage[targets])]
+        source_end = np.cumsum(surplus[sources])
+        target_end = np.cumsum(shortage[targets])
+        source_sku = self.cell_sku[sources]
+        target_sku = self.cell_sku[targets]
+
+        # Where each SKU's run starts in the running totals, and how much can move
+        offered = np.bincount(source_sku, weights=surplus[sources], minlength=self.num_skus)
+        wanted = np.bincount(target_sku, weights=shortage[targets], minlength=self.num_skus)
+        source_base = np.cumsum(offered) - offered
+        target_base = np.cumsum(wanted) - wanted
+        movable = np.minimum(offered, wanted)
+
+        # Interval ends of both sides, per SKU and capped at what can move
+        skus = np.concatenate([source_sku, target_sku])
+        points = np.minimum(np.concatenate([
+            source_end - source_base[source_sku],
+            target_end - target_base[target_sku]
+        ]), movable[skus])
+        order = _group_order(skus, points)
+        skus, points = skus[order], points[order]
+        starts = np.zeros(len(points))
+        same_sku = skus[1:] == skus[:-1]
+        starts[1:][same_sku] = points[:-1][same_sku]
+        keep = points > starts
+        skus, starts, units = skus[keep], starts[keep], (points - starts)[keep]
+
+        return {
+            "sku": skus,
+            "source": sources[np.searchsorted(source_end, source_base[skus] + starts, side="right")],
+            "target": targets[np.searchsorted(target_end, target_base[skus] + starts, side="right")],
+            "units": units.astype(np.int64),
+        }
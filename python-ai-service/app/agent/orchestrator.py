@@ -3,17 +3,42 @@ Agent Orchestrator - Main controller for the agentic workflow
 Coordinates all steps: Intent → Planning → Generation → Execution → Processing → Explanation
 """
 
+import asyncio
+import copy
+import logging
 import json
-from typing import Dict, Any, List
-from datetime import datetime
+import os
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator
 
 from app.llm.client import LLMClient
 from app.agent.intent_classifier import IntentClassifier
 from app.agent.query_planner import QueryPlanner
 from app.agent.shopifyql_generator import ShopifyQLGenerator
 from app.agent.query_executor import QueryExecutor
+from app.agent.cost_estimator import QueryCostEstimator, QueryRejectedError
 from app.agent.result_processor import ResultProcessor
 from app.agent.explainer import Explainer
+from app.agent.precompute import PrecomputeScheduler
+from app.llm.budget import get_ledger
+from app.telemetry.log import bind_request, bind_store, current_request_id
+from app.telemetry.timing import RequestTimings, start_request
+from app.telemetry.tracing import start_span
+
+
+logger = logging.getLogger(__name__)
+
+# Portfolio requests are accounted (LLM usage, budget tier) under this name
+PORTFOLIO = "portfolio"
+
+# Metric stores are ranked by in a portfolio answer, per intent (largest first)
+PORTFOLIO_RANKING = {
+    "inventory_projection": ("summary", "skus_at_risk"),
+    "sales_analysis": ("summary", "total_revenue"),
+    "top_products": ("summary", "total_revenue"),
+    "customer_behavior": ("summary", "repeat_rate"),
+    "customer_retention": ("calculations", "clv_estimate"),
+}
 
 
 class AgentOrchestrator:
@@ -35,10 +60,46 @@ class AgentOrchestrator:
         self.query_planner = QueryPlanner(llm_client)
         self.shopifyql_generator = ShopifyQLGenerator(llm_client)
         self.query_executor = QueryExecutor()
+        self.cost_estimator = QueryCostEstimator()
         self.result_processor = ResultProcessor()
         self.explainer = Explainer(llm_client)
         
-        self.reasoning_steps = []
+        # Overall time budget per request; LLM step deadlines are carved from it
+        self.request_budget = float(os.getenv("REQUEST_BUDGET_MS", "60000")) / 1000
+        # Default for requests that don't say whether an estimate will do
+        self.approximate_answers = os.getenv("APPROXIMATE_ANSWERS", "off").lower() == "on"
+        # Batches: questions per intent classification call
+        self.batch_classify_size = int(os.getenv("ANALYZE_BATCH_CLASSIFY_SIZE", "2"))
+        # Portfolios: stores fetched and processed at once
+        self.portfolio_concurrency = int(os.getenv("PORTFOLIO_CONCURRENCY", "32"))
+        # Answers to common questions, warmed off-peak (PRECOMPUTE=on)
+        self.precompute = PrecomputeScheduler(self)
+
+    def warm_up(self, mock_data: bool = False) -> Dict[str, float]:
+        """
+        Do the one-off start-up work ahead of the first request
+        
+        Configures the LLM SDKs, opens the shared cache, starts the processing
+        pool's workers and, for mock deployments, generates the mock shop.
+        
+        Returns:
+            Milliseconds spent per phase
+        """
+        phases = [
+            ("llm", getattr(self.llm, "warm_up", None)),
+            ("processing_pool", self.result_processor.pool.warm_up),
+        ]
+        if mock_data:
+            phases.append(("mock_data", lambda: self.query_executor.mock_provider))
+        
+        timings = {}
+        for name, warm_up in phases:
+            if warm_up is None:
+                continue
+            start = time.perf_counter()
+            warm_up()
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+        return timings
 
     async def process(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -49,7 +110,10 @@ class AgentOrchestrator:
                 "store_id": str,
                 "question": str,
                 "access_token": Optional[str],
-                "use_mock": bool
+                "use_mock": bool,
+                "approximate": Optional[bool],  # estimate from samples when over budget
+                "aggregation": Optional[str],  # "exact" or "sketch" (bounded memory)
+                "precompute": bool  # set by the precompute scheduler's own runs
             }
             
         Returns:
@@ -61,103 +125,707 @@ class AgentOrchestrator:
                 "metadata": Dict
             }
         """
-        self.reasoning_steps = []
-        start_time = datetime.now()
+        # Per request: concurrent requests share this orchestrator
+        reasoning: List[str] = []
+        status = "error"
         
         question = request["question"]
         store_id = request["store_id"]
         use_mock = request.get("use_mock", False)
         
+        timings = start_request(
+            provider=getattr(self.llm, "provider", ""),
+            store_id=store_id,
+            budget=self.request_budget
+        )
+        ledger = get_ledger()
+        timings.tier = ledger.tier(store_id)
+        if timings.tier == "economy":
+            reasoning.append("Store is over its daily LLM token budget; using the economy model")
+        elif timings.tier == "local":
+            reasoning.append("Store is over its daily LLM token limit; answering without the LLM")
+
+        # main.py binds the request ID from the HTTP layer; direct callers get a fresh one
+        request_id = current_request_id()
+        if request_id == "-":
+            request_id = bind_request()
+        bind_store(store_id)
+        root_span = start_span("agent.analyze", store_id=store_id, use_mock=use_mock)
+        
         try:
+            # Common questions may have been answered ahead of time (for this token)
+            if not request.get("precompute"):
+                result = self.precompute.lookup(request)
+                if result is not None:
+                    self.precompute.observe(request)
+                    status = "warm"
+                    timings.intent = result["metadata"].get("intent")
+                    result["metadata"].update({
+                        "execution_time": f"{timings.elapsed():.2f}s",
+                        "timings": timings.to_dict(),
+                        "llm_usage": timings.usage(),
+                        "request_id": request_id
+                    })
+                    return result
+            
             # Step 1: Intent Classification
-            print("🎯 Step 1: Classifying intent...")
-            intent_result = await self.intent_classifier.classify(question)
-            self._add_reasoning(f"Classified as: {intent_result['intent']}")
+            logger.debug("Step 1: classifying intent", extra={"step": "intent"})
+            with timings.step("intent"):
+                intent_result = await self.intent_classifier.classify(question)
+            timings.intent = intent_result["intent"]
+            reasoning.append(f"Classified as: {intent_result['intent']}")
             
             # Check if question is too ambiguous
             if intent_result.get("confidence") == "low":
-                return self._handle_ambiguous_question(question, intent_result)
+                status = "ambiguous"
+                result = self._handle_ambiguous_question(question, intent_result)
+                result["metadata"]["llm_usage"] = timings.usage()
+                return result
             
             # Step 2: Query Planning
-            print("📋 Step 2: Planning query...")
-            plan = await self.query_planner.plan(intent_result, question)
-            self._add_reasoning(
+            logger.debug("Step 2: planning query", extra={"step": "plan"})
+            with timings.step("plan"):
+                plan = await self.query_planner.plan(intent_result, question)
+            reasoning.append(
                 f"Need data from: {', '.join(plan['resources_needed'])}"
             )
             
             # Step 3: ShopifyQL Generation
-            print("⚙️  Step 3: Generating ShopifyQL...")
-            query_spec = await self.shopifyql_generator.generate(plan, intent_result)
-            self._add_reasoning(f"Generated query plan")
+            logger.debug("Step 3: generating ShopifyQL", extra={"step": "generate"})
+            with timings.step("generate"):
+                query_spec = await self.shopifyql_generator.generate(plan, intent_result)
+            reasoning.append(f"Generated query plan")
+            
+            if not self.shopifyql_generator.validate_query(query_spec):
+                raise ValueError("Generated query plan has no fetchable resources")
+            
+            # Estimate cost and enforce budgets before touching Shopify
+            is_mock = use_mock or not request.get("access_token")
+            profile_key = f"mock:{store_id}" if is_mock else store_id
+            # Long windows read daily rollups; only unsynced days cost a fetch
+            self.query_executor.plan_rollups(query_spec, store_id, is_mock)
+            try:
+                with timings.step("cost_estimate"):
+                    estimate = self.cost_estimator.estimate(query_spec, profile_key)
+                    guardrail = self.cost_estimator.apply_guardrails(
+                        query_spec, estimate, profile_key, intent_result,
+                        approximate=request.get("approximate", self.approximate_answers)
+                    )
+            except QueryRejectedError as e:
+                status = "rejected"
+                result = self._handle_rejected_query(str(e), estimate, reasoning)
+                result["metadata"]["llm_usage"] = timings.usage()
+                return result
             
             # Step 4: Query Execution
-            print("🔍 Step 4: Executing queries...")
-            raw_data = await self.query_executor.execute(
-                query_spec=query_spec,
-                store_id=store_id,
-                access_token=request.get("access_token"),
-                use_mock=use_mock
-            )
-            self._add_reasoning(
+            logger.debug("Step 4: executing queries", extra={"step": "execute"})
+            with timings.step("execute"):
+                raw_data = await self.query_executor.execute(
+                    query_spec=query_spec,
+                    store_id=store_id,
+                    access_token=request.get("access_token"),
+                    use_mock=use_mock
+                )
+            # Only what execution actually applied is reported
+            guardrail = self.cost_estimator.as_applied(guardrail, raw_data)
+            if guardrail["action"] != "proceed":
+                reasoning.append(guardrail["reason"])
+            reasoning.append(
                 f"Retrieved {raw_data.get('record_count', 0)} data points"
             )
             
             # Step 5: Result Processing
-            print("📊 Step 5: Processing results...")
-            processed = await self.result_processor.process(
-                raw_data=raw_data,
-                intent=intent_result,
-                plan=plan
-            )
-            self._add_reasoning(f"Calculated metrics and insights")
+            logger.debug("Step 5: processing results", extra={"step": "process"})
+            with timings.step("process"):
+                processed = await self.result_processor.process(
+                    raw_data=raw_data,
+                    intent=intent_result,
+                    plan=plan,
+                    aggregation=request.get("aggregation")
+                )
+            reasoning.append(f"Calculated metrics and insights")
+            
+            self.cost_estimator.record_actual(profile_key, query_spec, raw_data)
             
             # Step 6: Natural Language Explanation
-            print("💬 Step 6: Generating explanation...")
-            explanation = await self.explainer.explain(
-                question=question,
-                intent=intent_result,
-                data_summary=processed["summary"],
-                calculations=processed["calculations"]
+            logger.debug("Step 6: generating explanation", extra={"step": "explain"})
+            with timings.step("explain"):
+                explanation = await self.explainer.explain(
+                    question=question,
+                    intent=intent_result,
+                    data_summary=processed["summary"],
+                    calculations=processed["calculations"]
+                )
+            
+            result = self._answer(explanation, intent_result, query_spec, raw_data, guardrail, reasoning)
+            result["metadata"] = {
+                "execution_time": f"{timings.elapsed():.2f}s",
+                **result["metadata"]
+            }
+            result["metadata"]["cost_estimate"]["actual"] = self._actual_cost(
+                raw_data, timings.steps["execute"], timings.steps["process"]
             )
+            result["metadata"]["timings"] = timings.to_dict()
+            result["metadata"]["llm_usage"] = timings.usage()
+            result["metadata"]["request_id"] = request_id
+            status = "ok"
+            # Shopify accepted the token for every resource: worth warming with
+            if not request.get("precompute") and not raw_data.get("failed"):
+                self.precompute.observe(request)
+            return result
             
-            # Calculate execution time
-            execution_time = (datetime.now() - start_time).total_seconds()
-            
-            # Build final response
-            return {
-                "answer": explanation["answer"],
-                "confidence": explanation["confidence"],
-                "shopify_query": query_spec.get("shopifyql", "N/A"),
-                "reasoning": self.reasoning_steps,
-                "metadata": {
-                    "execution_time": f"{execution_time:.2f}s",
-                    "data_points_analyzed": raw_data.get("record_count", 0),
-                    "intent": intent_result["intent"],
-                    "confidence_reason": explanation.get("confidence_reason", "")
+        except Exception as e:
+            logger.exception("Agent orchestration error")
+            # Return graceful error
+            result = self._error_result(e, reasoning)
+            result["metadata"].update({
+                "execution_time": "N/A",
+                "timings": timings.to_dict(),
+                "llm_usage": timings.usage(),
+                "request_id": request_id
+            })
+            return result
+        
+        finally:
+            timings.finish(status)
+            ledger.record_request(store_id, timings.llm_calls)
+            root_span.set_attributes({"intent": timings.intent or "unknown", "status": status})
+            if status == "error":
+                root_span.status = "error"
+            root_span.end()
+            logger.info(
+                "Request completed",
+                extra={
+                    "intent": timings.intent or "unknown",
+                    "status": status,
+                    "total_ms": round(timings.elapsed() * 1000, 1)
                 }
+            )
+
+    async def process_batch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer several questions about one store, sharing the work
+        
+        The questions are classified several per LLM call and planned
+        concurrently; plans needing the same data share one fetch (see
+        QueryExecutor.execute_batch), questions asking the same thing of the
+        same data are processed once, and the explanations run concurrently.
+        
+        Args:
+            request: as for process(), with "questions": List[str] in place
+                of "question"
+            
+        Returns:
+            {
+                "results": List[Dict],  # one process()-shaped answer per question
+                "metadata": Dict
             }
+        """
+        status = "error"
+        
+        questions = request["questions"]
+        store_id = request["store_id"]
+        use_mock = request.get("use_mock", False)
+        
+        timings = start_request(
+            provider=getattr(self.llm, "provider", ""),
+            store_id=store_id,
+            budget=self.request_budget
+        )
+        ledger = get_ledger()
+        timings.tier = ledger.tier(store_id)
+        timings.intent = "batch"
+        
+        request_id = current_request_id()
+        if request_id == "-":
+            request_id = bind_request()
+        bind_store(store_id)
+        root_span = start_span("agent.analyze_batch", store_id=store_id, use_mock=use_mock, questions=len(questions))
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+        reasoning: List[List[str]] = [[] for _ in questions]
+        shared: List[Dict[str, Any]] = []
+        try:
+            logger.debug("Step 1: classifying %d questions", len(questions), extra={"step": "intent"})
+            with timings.step("intent"):
+                intents = await self.intent_classifier.classify_batch(questions, self.batch_classify_size)
+            pending = []
+            for i, intent_result in enumerate(intents):
+                reasoning[i].append(f"Classified as: {intent_result['intent']}")
+                if intent_result.get("confidence") == "low":
+                    results[i] = self._handle_ambiguous_question(questions[i], intent_result)
+                else:
+                    pending.append(i)
+            
+            logger.debug("Steps 2-3: planning", extra={"step": "plan"})
+            with timings.step("plan"):
+                plans = dict(zip(pending, await asyncio.gather(*[
+                    self.query_planner.plan(intents[i], questions[i]) for i in pending
+                ])))
+            with timings.step("generate"):
+                query_specs = dict(zip(pending, await asyncio.gather(*[
+                    self.shopifyql_generator.generate(plans[i], intents[i]) for i in pending
+                ])))
+            
+            is_mock = use_mock or not request.get("access_token")
+            profile_key = f"mock:{store_id}" if is_mock else store_id
+            guardrails = {}
+            with timings.step("cost_estimate"):
+                for i in pending:
+                    query_spec = query_specs[i]
+                    reasoning[i].append(f"Need data from: {', '.join(plans[i]['resources_needed'])}")
+                    reasoning[i].append("Generated query plan")
+                    if not self.shopifyql_generator.validate_query(query_spec):
+                        results[i] = self._error_result(
+                            ValueError("Generated query plan has no fetchable resources"), reasoning[i]
+                        )
+                        continue
+                    self.query_executor.plan_rollups(query_spec, store_id, is_mock)
+                    estimate = self.cost_estimator.estimate(query_spec, profile_key)
+                    try:
+                        guardrails[i] = self.cost_estimator.apply_guardrails(
+                            query_spec, estimate, profile_key, intents[i],
+                            approximate=request.get("approximate", self.approximate_answers)
+                        )
+                    except QueryRejectedError as e:
+                        results[i] = self._handle_rejected_query(str(e), estimate, reasoning[i])
+                        continue
+            ready = list(guardrails)
+            
+            logger.debug("Step 4: executing %d plans together", len(ready), extra={"step": "execute"})
+            with timings.step("execute"):
+                fetched, shared = await self.query_executor.execute_batch(
+                    [query_specs[i] for i in ready],
+                    store_id=store_id,
+                    access_token=request.get("access_token"),
+                    use_mock=use_mock
+                )
+            raw_data = dict(zip(ready, fetched))
+            for i in ready:
+                guardrails[i] = self.cost_estimator.as_applied(guardrails[i], raw_data[i])
+                if guardrails[i]["action"] != "proceed":
+                    reasoning[i].append(guardrails[i]["reason"])
+                reasoning[i].append(f"Retrieved {raw_data[i].get('record_count', 0)} data points")
+            
+            logger.debug("Step 5: processing results", extra={"step": "process"})
+            with timings.step("process"):
+                processed = dict(zip(ready, await asyncio.gather(
+                    *self._process_shared(ready, raw_data, intents, plans, request.get("aggregation")),
+                    return_exceptions=True
+                )))
+            # Per plan, shared fetches included: the union spec of a shared
+            # fetch carries no plan period, so it can't tell the window size
+            for i in ready:
+                self.cost_estimator.record_actual(profile_key, query_specs[i], raw_data[i])
+            
+            answered = [i for i in ready if not isinstance(processed[i], Exception)]
+            logger.debug("Step 6: generating explanations", extra={"step": "explain"})
+            with timings.step("explain"):
+                explanations = dict(zip(answered, await asyncio.gather(*[
+                    self.explainer.explain(
+                        question=questions[i],
+                        intent=intents[i],
+                        data_summary=processed[i]["summary"],
+                        calculations=processed[i]["calculations"]
+                    )
+                    for i in answered
+                ], return_exceptions=True)))
+            
+            for i in ready:
+                error = processed[i] if i not in explanations else explanations[i]
+                if isinstance(error, Exception):
+                    logger.error("Batch question failed: %s", error, extra={"question": questions[i]})
+                    results[i] = self._error_result(error, reasoning[i])
+                    continue
+                reasoning[i].append("Calculated metrics and insights")
+                results[i] = self._answer(
+                    explanations[i], intents[i], query_specs[i], raw_data[i], guardrails[i], reasoning[i]
+                )
+            status = "ok"
             
         except Exception as e:
-            print(f"❌ Agent orchestration error: {str(e)}")
-            # Return graceful error
-            return {
-                "answer": (
-                    f"I encountered an issue processing your question: {str(e)}. "
-                    "Please try rephrasing your question or contact support."
-                ),
-                "confidence": "low",
-                "shopify_query": None,
-                "reasoning": self.reasoning_steps + [f"Error: {str(e)}"],
-                "metadata": {
-                    "error": str(e),
-                    "execution_time": "N/A"
+            logger.exception("Agent batch orchestration error")
+            results = [result or self._error_result(e, reasoning[i]) for i, result in enumerate(results)]
+        
+        finally:
+            timings.finish(status)
+            ledger.record_request(store_id, timings.llm_calls)
+            root_span.set_attributes({"status": status})
+            if status == "error":
+                root_span.status = "error"
+            root_span.end()
+            logger.info(
+                "Batch completed",
+                extra={
+                    "questions": len(questions),
+                    "status": status,
+                    "total_ms": round(timings.elapsed() * 1000, 1)
                 }
+            )
+        
+        metadata = {
+            "execution_time": f"{timings.elapsed():.2f}s",
+            "questions": len(questions),
+            "timings": timings.to_dict(),
+            "llm_usage": timings.usage(),
+            "request_id": request_id
+        }
+        if shared:
+            metadata["shared_fetches"] = [
+                {
+                    "questions": fetch["plans"],
+                    "resources": fetch["result"].get("resources", []),
+                    "data_points": fetch["result"].get("record_count", 0),
+                    "shopify_round_trips": fetch["result"].get("round_trips", 0)
+                }
+                for fetch in shared
+            ]
+        return {"results": results, "metadata": metadata}
+
+    async def process_portfolio(self, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer one question for many stores, streaming answers as they finish
+        
+        The question is classified, planned and turned into a query plan
+        once. Every store then gets its own copy of the plan, its own cost
+        guardrails (against its size profile), fetch and processing, with
+        at most PORTFOLIO_CONCURRENCY stores in flight; each store's Shopify
+        requests also wait for that shop's rate limit (see ShopRateLimiter).
+        Store answers are template explanations - an LLM call per store
+        would cost more than the rest of the portfolio.
+        
+        Args:
+            request: as for process(), with "stores": [{"store_id",
+                "access_token"}] in place of "store_id" / "access_token"
+            
+        Yields:
+            {"event": "plan", ...} once the plan is ready (or "clarify" if
+            the question is too ambiguous), {"event": "store", ...} per
+            store in completion order, then {"event": "done", "ranking",
+            "metadata"}
+        """
+        status = "error"
+        error: Optional[Exception] = None
+        
+        question = request["question"]
+        stores = request["stores"]
+        
+        timings = start_request(
+            provider=getattr(self.llm, "provider", ""),
+            store_id=PORTFOLIO,
+            budget=self.request_budget
+        )
+        ledger = get_ledger()
+        timings.tier = ledger.tier(PORTFOLIO)
+        
+        request_id = current_request_id()
+        if request_id == "-":
+            request_id = bind_request()
+        root_span = start_span("agent.analyze_portfolio", stores=len(stores), use_mock=request.get("use_mock", False))
+        
+        intent_result: Dict[str, Any] = {}
+        answers: List[Dict[str, Any]] = []
+        tasks: List[asyncio.Future] = []
+        try:
+            logger.debug("Step 1: classifying intent", extra={"step": "intent"})
+            with timings.step("intent"):
+                intent_result = await self.intent_classifier.classify(question)
+            timings.intent = intent_result["intent"]
+            
+            if intent_result.get("confidence") == "low":
+                status = "ambiguous"
+                yield {"event": "clarify", **self._handle_ambiguous_question(question, intent_result)}
+            else:
+                logger.debug("Steps 2-3: planning once for %d stores", len(stores), extra={"step": "plan"})
+                with timings.step("plan"):
+                    plan = await self.query_planner.plan(intent_result, question)
+                with timings.step("generate"):
+                    query_spec = await self.shopifyql_generator.generate(plan, intent_result)
+                if not self.shopifyql_generator.validate_query(query_spec):
+                    raise ValueError("Generated query plan has no fetchable resources")
+                yield {
+                    "event": "plan",
+                    "intent": intent_result["intent"],
+                    "shopify_query": query_spec.get("shopifyql", "N/A"),
+                    "resources": plan["resources_needed"],
+                    "stores": len(stores)
+                }
+                
+                logger.debug("Steps 4-6: answering %d stores", len(stores), extra={"step": "execute"})
+                semaphore = asyncio.Semaphore(max(1, self.portfolio_concurrency))
+                tasks = [
+                    asyncio.ensure_future(
+                        self._answer_store(store, intent_result, plan, query_spec, request, semaphore, timings)
+                    )
+                    for store in stores
+                ]
+                for finished in asyncio.as_completed(tasks):
+                    answer = await finished
+                    answers.append(answer)
+                    yield {"event": "store", **answer}
+                status = "ok"
+            
+        except Exception as e:
+            logger.exception("Agent portfolio orchestration error")
+            error = e
+        
+        finally:
+            # Stops the remaining stores if the client went away mid-stream
+            for task in tasks:
+                task.cancel()
+            timings.finish(status)
+            ledger.record_request(PORTFOLIO, timings.llm_calls)
+            root_span.set_attributes({"status": status})
+            if status == "error":
+                root_span.status = "error"
+            root_span.end()
+            logger.info(
+                "Portfolio completed",
+                extra={
+                    "stores": len(stores),
+                    "answered": len(answers),
+                    "status": status,
+                    "total_ms": round(timings.elapsed() * 1000, 1)
+                }
+            )
+        
+        counts = {"ok": 0, "rejected": 0, "error": 0}
+        for answer in answers:
+            counts[answer["status"]] += 1
+        done = {
+            "event": "done",
+            "ranking": self._rank_stores(intent_result.get("intent", ""), answers),
+            "metadata": {
+                "execution_time": f"{timings.elapsed():.2f}s",
+                "stores": len(stores),
+                **counts,
+                "timings": timings.to_dict(),
+                "llm_usage": timings.usage(),
+                "request_id": request_id
             }
+        }
+        if error is not None:
+            done["error"] = str(error)
+        yield done
 
-    def _add_reasoning(self, step: str):
-        """Add a reasoning step to the trail"""
-        self.reasoning_steps.append(step)
+    async def _answer_store(
+        self,
+        store: Dict[str, Any],
+        intent_result: Dict[str, Any],
+        plan: Dict[str, Any],
+        template: Dict[str, Any],
+        request: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        timings: RequestTimings
+    ) -> Dict[str, Any]:
+        """One store of a portfolio: guardrails, fetch, processing, template answer"""
+        store_id = store["store_id"]
+        access_token = store.get("access_token")
+        use_mock = request.get("use_mock", False)
+        is_mock = use_mock or not access_token
+        profile_key = f"mock:{store_id}" if is_mock else store_id
+        bind_store(store_id)
         
+        queued = time.perf_counter()
+        async with semaphore:
+            start = time.perf_counter()
+            # Guardrails may narrow the window: each store needs its own plan
+            query_spec = copy.deepcopy(template)
+            estimate = None
+            try:
+                self.query_executor.plan_rollups(query_spec, store_id, is_mock)
+                estimate = self.cost_estimator.estimate(query_spec, profile_key)
+                guardrail = self.cost_estimator.apply_guardrails(
+                    query_spec, estimate, profile_key, intent_result,
+                    approximate=request.get("approximate", self.approximate_answers)
+                )
+                with timings.step("execute"):
+                    raw_data = await self.query_executor.execute(
+                        query_spec=query_spec,
+                        store_id=store_id,
+                        access_token=access_token,
+                        use_mock=use_mock
+                    )
+                guardrail = self.cost_estimator.as_applied(guardrail, raw_data)
+                with timings.step("process"):
+                    processed = await self.result_processor.process(
+                        raw_data=raw_data,
+                        intent=intent_result,
+                        plan=plan,
+                        aggregation=request.get("aggregation")
+                    )
+                self.cost_estimator.record_actual(profile_key, query_spec, raw_data)
+            except QueryRejectedError as e:
+                return {
+                    "store_id": store_id,
+                    "status": "rejected",
+                    "answer": str(e),
+                    "confidence": "low",
+                    "metadata": {"cost_estimate": {"guardrail": "reject", "estimated": estimate}}
+                }
+            except Exception as e:
+                logger.warning("Portfolio store failed: %s", e, extra={"store_id": store_id})
+                return {
+                    "store_id": store_id,
+                    "status": "error",
+                    "answer": f"Could not analyze this store: {str(e)}",
+                    "confidence": "low",
+                    "metadata": {"error": str(e)}
+                }
+        
+        explanation = self.explainer.summarize(intent_result, processed["summary"], processed["calculations"])
+        return {
+            "store_id": store_id,
+            "status": "ok",
+            "answer": explanation["answer"],
+            "confidence": explanation["confidence"],
+            "summary": processed["summary"],
+            "calculations": processed["calculations"],
+            "metadata": {
+                "data_points_analyzed": raw_data.get("record_count", 0),
+                "fetch_mode": raw_data.get("fetch_mode"),
+                "shopify_round_trips": raw_data.get("round_trips", 0),
+                "guardrail": guardrail["action"],
+                "queued_ms": round((start - queued) * 1000, 1),
+                "ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+        }
+
+    def _rank_stores(self, intent: str, answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Answered stores by the intent's headline metric, largest first"""
+        section, metric = PORTFOLIO_RANKING.get(intent, (None, None))
+        if metric is None:
+            return {"metric": None, "stores": []}
+        ranked = [
+            {"store_id": answer["store_id"], "value": answer[section].get(metric)}
+            for answer in answers
+            if answer["status"] == "ok" and isinstance(answer[section].get(metric), (int, float))
+        ]
+        ranked.sort(key=lambda entry: entry["value"], reverse=True)
+        return {"metric": metric, "stores": ranked}
+
+    def _process_shared(
+        self,
+        indexes: List[int],
+        raw_data: Dict[int, Dict[str, Any]],
+        intents: List[Dict[str, Any]],
+        plans: Dict[int, Dict[str, Any]],
+        aggregation: Optional[str]
+    ) -> List["asyncio.Future"]:
+        """
+        One ResultProcessor run per distinct question: questions on shared
+        data asking the same thing (intent, period, products, metrics) over
+        the same window get the same result
+        """
+        runs: Dict[Any, asyncio.Future] = {}
+        futures = []
+        for i in indexes:
+            key = i
+            if raw_data[i].get("fetch_mode") == "shared":
+                # Everything the classifier extracted but how sure it was
+                asked = {name: value for name, value in intents[i].items() if name != "confidence"}
+                key = (json.dumps(asked, sort_keys=True, default=str), raw_data[i].get("window_days"))
+            if key not in runs:
+                runs[key] = asyncio.ensure_future(self.result_processor.process(
+                    raw_data=raw_data[i],
+                    intent=intents[i],
+                    plan=plans[i],
+                    aggregation=aggregation
+                ))
+            futures.append(runs[key])
+        return futures
+
+    def _answer(
+        self,
+        explanation: Dict[str, Any],
+        intent_result: Dict[str, Any],
+        query_spec: Dict[str, Any],
+        raw_data: Dict[str, Any],
+        guardrail: Dict[str, Any],
+        reasoning: List[str]
+    ) -> Dict[str, Any]:
+        """Response for an answered question, with its per-question metadata"""
+        metadata = {
+            "data_points_analyzed": raw_data.get("record_count", 0),
+            "intent": intent_result["intent"],
+            "confidence_reason": explanation.get("confidence_reason", "")
+        }
+        if "fetch_mode" in raw_data:
+            metadata["fetch_mode"] = raw_data["fetch_mode"]
+            metadata["shopify_round_trips"] = raw_data.get("round_trips", 0)
+        if raw_data.get("query_cost"):
+            metadata["query_cost"] = raw_data["query_cost"]
+        if raw_data.get("truncated"):
+            # Page cap reached: say the answer covers part of the data
+            metadata["truncated"] = raw_data["truncated"]
+            reasoning = reasoning + [
+                f"Stopped reading {', '.join(raw_data['truncated'])} at the page limit; "
+                "the answer covers only the records read"
+            ]
+        metadata["cost_estimate"] = {
+            "guardrail": guardrail["action"],
+            "estimated": guardrail["estimate"]
+        }
+        return {
+            "answer": explanation["answer"],
+            "confidence": explanation["confidence"],
+            "shopify_query": query_spec.get("shopifyql", "N/A"),
+            "reasoning": reasoning,
+            "metadata": metadata
+        }
+
+    def _error_result(self, error: Exception, reasoning: List[str]) -> Dict[str, Any]:
+        """Graceful response for a question that failed"""
+        return {
+            "answer": (
+                f"I encountered an issue processing your question: {str(error)}. "
+                "Please try rephrasing your question or contact support."
+            ),
+            "confidence": "low",
+            "shopify_query": None,
+            "reasoning": reasoning + [f"Error: {str(error)}"],
+            "metadata": {"error": str(error)}
+        }
+
+    def _actual_cost(
+        self,
+        raw_data: Dict[str, Any],
+        fetch_time: float,
+        process_time: float
+    ) -> Dict[str, Any]:
+        """Measured counterparts of the cost estimate, for calibration"""
+        transfer = raw_data.get("transfer") or {}
+        query_cost = raw_data.get("query_cost") or {}
+        return {
+            "records": {
+                resource: len(records)
+                for resource, records in (raw_data.get("data") or {}).items()
+            },
+            "pages": transfer.get("requests", 0),
+            "cost_points": query_cost.get("actual"),
+            "bytes": transfer.get("bytes") if transfer else None,
+            "fetch_ms": round(fetch_time * 1000, 2),
+            "processing_ms": round(process_time * 1000, 2)
+        }
+
+    def _handle_rejected_query(
+        self,
+        reason: str,
+        estimate: Dict[str, Any],
+        reasoning: List[str]
+    ) -> Dict[str, Any]:
+        """Handle plans the cost guardrails refused to run"""
+        return {
+            "answer": reason,
+            "confidence": "low",
+            "shopify_query": None,
+            "reasoning": reasoning + ["Query rejected by cost guardrails"],
+            "metadata": {
+                "rejected": True,
+                "cost_estimate": {"guardrail": "reject", "estimated": estimate}
+            }
+        }
+
     def _handle_ambiguous_question(
         self, 
         question: str, 
@@ -0,0 +1,286 @@
+"""
+Precompute - Warm answers to common questions ahead of the dashboard
+
+Merchants open their dashboards at predictable times and ask the same
+questions. The scheduler counts the questions each store asks and, every
+PRECOMPUTE_INTERVAL_S inside the off-peak window, runs the configured
+questions and each store's most frequent ones through the orchestrator,
+storing the answers in the shared cache. An /analyze for a warmed question
+is answered from there instead of running the agent.
+
+Warming is background traffic: at most PRECOMPUTE_CONCURRENCY questions run
+at once, their Shopify requests wait in the same per-shop rate limiter as
+interactive ones, and stores past their daily LLM token budget are skipped
+so warming never pushes a store into the economy tier.
+
+    PRECOMPUTE=on                     # off (default) = no warming, no lookups
+    PRECOMPUTE_WINDOW=02:00-06:00     # UTC, may wrap midnight; empty = any time
+    PRECOMPUTE_QUESTIONS=What were my top selling products in the last 30 days?|...
+    PRECOMPUTE_TTL=21600              # seconds a warmed answer is served
+
+Each worker warms the questions it has seen; answers another worker warmed
+within the last interval are left alone.
+
+Warmed answers are keyed by the (hashed) access token they were computed
+with, so only a caller presenting that token reads them; a caller without
+one gets answers over mock data, as the agent would give it. A store's
+token is kept for warming only after the agent answered with it.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.cache.shared_cache import SharedCache, get_shared_cache
+from app.llm.budget import get_ledger
+from app.telemetry.metrics import get_registry
+
+
+logger = logging.getLogger(__name__)
+
+ANSWER_LOOKUPS = get_registry().counter(
+    "precompute_answer_lookups_total",
+    "/analyze questions answered from a precomputed answer (warm) or by the agent (cold)",
+    ("outcome",)
+)
+
+# Request options that change the answer, and so are part of its key
+OPTIONS = ("use_mock", "approximate", "aggregation")
+
+
+def normalize_question(question: str) -> str:
+    """Case, spacing and trailing punctuation don't change the answer"""
+    return " ".join(question.lower().split()).rstrip("?.! ")
+
+
+def credentials(request: Dict[str, Any]) -> str:
+    """Whose data the answer is over: a token's (hashed) shop data, or mock data"""
+    token = request.get("access_token")
+    if request.get("use_mock") or not token:
+        return "mock"
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def answer_key(request: Dict[str, Any]) -> str:
+    options = [request.get(option) for option in OPTIONS]
+    digest = hashlib.sha256(json.dumps([
+        request["store_id"], credentials(request), normalize_question(request["question"]), options
+    ]).encode()).hexdigest()
+    return f"answer:{digest}"
+
+
+def parse_window(window: str) -> Optional[Tuple[int, int]]:
+    """'02:00-06:00' -> (120, 360) minutes after midnight; '' -> None (any time)"""
+    if not window.strip():
+        return None
+    start, end = window.split("-")
+    minutes = []
+    for clock in (start, end):
+        hours, _, mins = clock.strip().partition(":")
+        minutes.append(int(hours) * 60 + int(mins or 0))
+    return minutes[0], minutes[1]
+
+
+def _answered(result: Dict[str, Any]) -> bool:
+    """Only real answers are worth serving again"""
+    metadata = result.get("metadata", {})
+    return not any(metadata.get(key) for key in ("error", "rejected", "requires_clarification"))
+
+
+class PrecomputeScheduler:
+    """
+    Background warming of per-store answers, and their lookup on /analyze
+
+    Args:
+        orchestrator: AgentOrchestrator that answers the warmed questions
+        cache: SharedCache to store answers in; defaults to the process-wide one
+    """
+
+    # Stores remembered (least recently seen dropped first), and distinct
+    # questions per store (least asked dropped first)
+    max_stores = 10000
+    max_questions = 50
+
+    def __init__(self, orchestrator, cache: Optional[SharedCache] = None):
+        self.orchestrator = orchestrator
+        self.cache = cache or get_shared_cache()
+        self.enabled = os.getenv("PRECOMPUTE", "off").lower() == "on"
+        self.window = parse_window(os.getenv("PRECOMPUTE_WINDOW", "02:00-06:00"))
+        self.interval = float(os.getenv("PRECOMPUTE_INTERVAL_S", "900"))
+        self.ttl = float(os.getenv("PRECOMPUTE_TTL", "21600"))
+        self.questions = [
+            question.strip()
+            for question in os.getenv("PRECOMPUTE_QUESTIONS", "").split("|")
+            if question.strip()
+        ]
+        self.top_questions = int(os.getenv("PRECOMPUTE_TOP_QUESTIONS", "10"))
+        self.min_asks = int(os.getenv("PRECOMPUTE_MIN_ASKS", "2"))
+        self.concurrency = int(os.getenv("PRECOMPUTE_CONCURRENCY", "4"))
+        self.max_per_run = int(os.getenv("PRECOMPUTE_MAX_QUESTIONS", "200"))
+
+        # store -> {"request": credentials to warm with, "questions": {key: {...}}}
+        self._stores: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "runs": 0, "warmed": 0, "fresh": 0, "skipped_budget": 0, "failed": 0,
+            "warm_hits": 0, "cold_misses": 0,
+        }
+
+    def observe(self, request: Dict[str, Any]):
+        """
+        Count an answered interactive question toward its store's most
+        frequent. Call only once the question was answered (by the agent
+        with data Shopify returned for the token, or from a warmed answer):
+        the request's token becomes the one the store is warmed with.
+        """
+        if not self.enabled:
+            return
+        store_id = request["store_id"]
+        store = self._stores.setdefault(
+            store_id, {"request": {"store_id": store_id, "access_token": None}, "questions": {}}
+        )
+        self._stores.move_to_end(store_id)
+        if len(self._stores) > self.max_stores:
+            self._stores.popitem(last=False)
+        # Warming reuses the store's latest accepted token (kept in memory only);
+        # mock questions leave it alone
+        if credentials(request) != "mock":
+            store["request"]["access_token"] = request["access_token"]
+        key = answer_key(request)
+        seen = store["questions"].get(key)
+        if seen is None:
+            if len(store["questions"]) >= self.max_questions:
+                least = min(store["questions"], key=lambda k: store["questions"][k]["count"])
+                del store["questions"][least]
+            seen = store["questions"][key] = {
+                "question": request["question"],
+                "options": {option: request[option] for option in OPTIONS if request.get(option) is not None},
+                "count": 0,
+            }
+        seen["count"] += 1
+
+    def lookup(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The warmed answer to an interactive question, or None. The key
+        includes the caller's token, so a missing or different token misses.
+        """
+        if not self.enabled:
+            return None
+        entry = self.cache.get(answer_key(request))
+        if entry is None:
+            self.stats["cold_misses"] += 1
+            ANSWER_LOOKUPS.inc(outcome="cold")
+            return None
+        self.stats["warm_hits"] += 1
+        ANSWER_LOOKUPS.inc(outcome="warm")
+        # A copy: the in-memory cache hands out its stored object
+        result = copy.deepcopy(entry["result"])
+        age = time.time() - entry["at"]
+        result["reasoning"] = result["reasoning"] + [f"Answered from a result precomputed {age / 60:.0f} min ago"]
+        result["metadata"]["precomputed"] = {
+            "at": datetime.fromtimestamp(entry["at"], timezone.utc).isoformat(timespec="seconds"),
+            "age_s": round(age, 1),
+        }
+        return result
+
+    def in_window(self, now: Optional[datetime] = None) -> bool:
+        if self.window is None:
+            return True
+        now = now or datetime.now(timezone.utc)
+        minute = now.hour * 60 + now.minute
+        start, end = self.window
+        if start <= end:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+    def due(self) -> List[Dict[str, Any]]:
+        """
+        Requests to warm: configured questions and each store's most asked
+        ones, taking one store at a time so concurrent warming spreads over
+        shops instead of queueing on one shop's rate limit
+        """
+        per_store = []
+        for store_id, store in self._stores.items():
+            frequent = sorted(store["questions"].values(), key=lambda q: -q["count"])
+            picked = [
+                {"question": q["question"], **q["options"]}
+                for q in frequent[:self.top_questions]
+                if q["count"] >= self.min_asks
+            ]
+            picked += [{"question": question} for question in self.questions]
+            requests = {}
+            for question in picked:
+                request = {**store["request"], **question}
+                requests.setdefault(answer_key(request), request)
+            per_store.append(list(requests.values()))
+        interleaved = [
+            requests[turn]
+            for turn in range(max(map(len, per_store), default=0))
+            for requests in per_store
+            if turn < len(requests)
+        ]
+        return interleaved[:self.max_per_run]
+
+    async def run_once(self) -> Dict[str, int]:
+        """Warm every due question once; counts of what happened to them"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        outcomes = await asyncio.gather(*[self._warm(request, semaphore) for request in self.due()])
+        self.stats["runs"] += 1
+        counts = {outcome: outcomes.count(outcome) for outcome in set(outcomes)}
+        logger.info("Precompute run finished", extra={"outcomes": counts})
+        return counts
+
+    async def _warm(self, request: Dict[str, Any], semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            key = answer_key(request)
+            entry = self.cache.get(key)
+            if entry is not None and time.time() - entry["at"] < self.interval:
+                outcome = "fresh"
+            elif get_ledger().tier(request["store_id"]) != "standard":
+                outcome = "skipped_budget"
+            else:
+                started = time.time()
+                result = await self.orchestrator.process({**request, "precompute": True})
+                if _answered(result):
+                    self.cache.set(key, {"result": result, "at": started}, ttl=self.ttl)
+                    outcome = "warmed"
+                else:
+                    outcome = "failed"
+            self.stats[outcome] += 1
+            return outcome
+
+    async def _loop(self):
+        while True:
+            if self.in_window():
+                try:
+                    await self.run_once()
+                except Exception:
+                    logger.exception("Precompute run failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start warming in the background (PRECOMPUTE=on only)"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def report(self) -> Dict[str, Any]:
+        """Scheduler stats and the warm-hit ratio of /analyze lookups, for /health"""
+        lookups = self.stats["warm_hits"] + self.stats["cold_misses"]
+        return {
+            "enabled": self.enabled,
+            "stores": len(self._stores),
+            **self.stats,
+            "warm_hit_ratio": round(self.stats["warm_hits"] / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,195 @@
+"""
+Processing Pool - Run large ResultProcessor aggregations off the event loop
+
+Payloads at or above PROCESSING_OFFLOAD_MIN_RECORDS are converted to column
+arrays on a worker thread, then aggregated with the vectorized functions in
+columnar_aggregates:
+
+    PROCESSING_EXECUTOR=thread    # numpy work on a thread pool (releases the GIL)
+    PROCESSING_EXECUTOR=process   # a process pool; columns are handed over
+                                  # through shared memory, not pickled records
+    PROCESSING_EXECUTOR=inline    # previous behaviour: record loops on the loop
+
+Smaller payloads always run inline, where pool hand-off would cost more than
+the work itself.
+
+In sketch mode, records are instead columnarized a chunk at a time and folded
+into the fixed-size summaries of sketches, so neither the columns nor any
+per-customer / per-product state grow with the payload.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.agent.columnar_aggregates import AGGREGATORS
+from app.agent.sketches import SKETCHES
+from app.shopifyql.columnar import ColumnarShopData
+
+
+class ProcessingPool:
+    """Offloads aggregation of large payloads to a thread or process pool"""
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        min_records: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        self.mode = (mode or os.getenv("PROCESSING_EXECUTOR", "thread")).lower()
+        self.min_records = min_records if min_records is not None else \
+            int(os.getenv("PROCESSING_OFFLOAD_MIN_RECORDS", "20000"))
+        self.workers = workers or int(os.getenv("PROCESSING_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def accepts(self, name: str, data: Dict[str, Any]) -> bool:
+        """Whether this handler's payload is big enough to offload"""
+        if self.mode == "inline" or name not in AGGREGATORS:
+            return False
+        return sum(len(records) for records in data.values() if isinstance(records, list)) >= self.min_records
+
+    async def aggregate(
+        self,
+        name: str,
+        data: Dict[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        tables: Optional[Dict[str, Dict[str, np.ndarray]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Columnarize records off the loop, then run the named aggregator (with
+        params) in the pool; tables already columnar (e.g. daily rollups) are
+        added to the converted records
+        """
+        params = params or {}
+        if self.mode == "inline":
+            return AGGREGATORS[name]({**_to_tables(data), **(tables or {})}, **params)
+        loop = asyncio.get_running_loop()
+        tables = {**await loop.run_in_executor(self._thread_pool(), _to_tables, data), **(tables or {})}
+
+        if self.mode == "process":
+            manifest, blocks = _export(tables)
+            try:
+                return await loop.run_in_executor(self._process_pool(), _aggregate_shared, name, manifest, params)
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+
+        return await loop.run_in_executor(self._thread_pool(), partial(AGGREGATORS[name], tables, **params))
+
+    async def sketch(self, name: str, data: Dict[str, Any], chunk_records: int) -> Dict[str, Any]:
+        """Stream records through the named sketch aggregator, chunk_records orders at a time"""
+        run = partial(_sketch, name, data, chunk_records)
+        if self.mode == "inline":
+            return run()
+        return await asyncio.get_running_loop().run_in_executor(self._thread_pool(), run)
+
+    def warm_up(self):
+        """Start the workers now rather than on the first large payload"""
+        if self.mode == "inline":
+            return
+        pools = [self._thread_pool()]
+        if self.mode == "process":
+            # Spawned workers import numpy and this module before their first task
+            pools.append(self._process_pool())
+        for pool in pools:
+            for future in [pool.submit(_ready) for _ in range(self.workers)]:
+                future.result()
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.workers, thread_name_prefix="processing")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # spawn: the service runs logging/tracing threads that fork would copy mid-state
+            self._processes = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._processes
+
+    def shutdown(self):
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+def _ready() -> bool:
+    return True
+
+
+def _to_tables(data: Dict[str, Any]) -> Dict[str, Dict[str, np.ndarray]]:
+    return ColumnarShopData.from_raw(data).tables
+
+
+def _sketch(name: str, data: Dict[str, Any], chunk_records: int) -> Dict[str, Any]:
+    orders = data.get("orders", [])
+    chunks = (
+        ColumnarShopData.from_raw({"orders": orders[start:start + chunk_records]}).tables
+        for start in range(0, len(orders), chunk_records)
+    )
+    if name != "sales_analysis":
+        return SKETCHES[name](chunks)
+    products = _to_tables({"products": data.get("products", [])}).get("products")
+    titles = dict(zip(products["product_id"].tolist(), products["title"].tolist())) if products else {}
+    return SKETCHES[name](chunks, titles)
+
+
+def _export(tables) -> Tuple[Dict[str, Dict[str, tuple]], List[SharedMemory]]:
+    """Copy numeric columns into shared memory; small object columns travel inline"""
+    manifest: Dict[str, Dict[str, tuple]] = {}
+    blocks: List[SharedMemory] = []
+    try:
+        for table, columns in tables.items():
+            manifest[table] = {}
+            for column, values in columns.items():
+                if values.dtype == object:
+                    manifest[table][column] = ("inline", values.tolist())
+                    continue
+                block = SharedMemory(create=True, size=max(values.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(values.shape, values.dtype, buffer=block.buf)[...] = values
+                manifest[table][column] = ("shared", block.name, values.shape, values.dtype.str)
+    except Exception:
+        for block in blocks:
+            block.close()
+            block.unlink()
+        raise
+    return manifest, blocks
+
+
+def _aggregate_shared(
+    name: str,
+    manifest: Dict[str, Dict[str, tuple]],
+    params: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Worker side: map the parent's shared columns and aggregate them"""
+    blocks: List[SharedMemory] = []
+    tables: Dict[str, Dict[str, np.ndarray]] = {}
+    try:
+        for table, columns in manifest.items():
+            tables[table] = {}
+            for column, spec in columns.items():
+                if spec[0] == "inline":
+                    tables[table][column] = np.array(spec[1], dtype=object)
+                    continue
+                _, block_name, shape, dtype = spec
+                # The parent owns the block and unlinks it once the result is back
+                block = SharedMemory(name=block_name)
+                blocks.append(block)
+                tables[table][column] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        return AGGREGATORS[name](tables, **params)
+    finally:
+        # Views must be gone before the mappings can close
+        tables.clear()
+        for block in blocks:
+            block.close()
@@ -3,10 +3,43 @@ Query Executor - Step 4 of agent workflow
 Executes queries against Shopify API or mock data
 """
 
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
 from app.shopify.api_client import ShopifyAPIClient
-from app.shopify.mock_data import MockDataProvider
+from app.shopify.filters import period_to_date_range, TIME_FILTERED_RESOURCES
+from app.shopify.mock_data import MockDataProvider, get_mock_provider
+from app.shopifyql.columnar import ColumnarShopData
+from app.shopifyql.engine import execute_shopifyql, get_shop_cache
+from app.shopifyql.rollups import SECONDS_PER_DAY, get_rollup_store
+from app.agent.sampling import plan_sample, slice_ranges
+
+
+logger = logging.getLogger(__name__)
+
+
+# Everything the local ShopifyQL engine can query, fetched once per store
+# (every order, not only the open ones REST lists by default)
+LOCAL_CACHE_SPEC = {
+    "api_calls": [
+        {"resource": "orders", "fields": [], "filters": {"status": "any"}},
+        {"resource": "products", "fields": [], "filters": {}},
+        {"resource": "inventory_levels", "fields": [], "filters": {}},
+        {"resource": "customers", "fields": [], "filters": {}}
+    ],
+    "filters": {}
+}
+
+# Plan / call filters a shared batch fetch can serve (product names are
+# answered from the fetched data, not filtered upstream)
+SHAREABLE_PLAN_FILTERS = ("time_period", "products")
+SHAREABLE_CALL_FILTERS = ("time_filter",)
 
 
 class QueryExecutor:
@@ -14,9 +47,33 @@ class QueryExecutor:
     Executes query specifications against Shopify API or mock data
     """
     
-    def __init__(self):
-        self.shopify_client = ShopifyAPIClient()
-        self.mock_provider = MockDataProvider()
+    def __init__(self, shopify_client: Optional[ShopifyAPIClient] = None):
+        self.shopify_client = shopify_client or ShopifyAPIClient()
+        self._mock_provider: Optional[MockDataProvider] = None
+        # "rest" pages each resource with its own calls; "graphql" batches the
+        # plan into one query (falling back to REST when it can't page a
+        # nested connection)
+        self.fetch_mode = os.getenv("SHOPIFY_FETCH_MODE", "rest").lower()
+        # "server" runs executable ShopifyQL upstream, "local" runs it against
+        # cached columnar shop data, "off" always fetches raw data
+        self.shopifyql_mode = os.getenv("SHOPIFYQL_EXECUTION", "off").lower()
+        self.shop_cache = get_shop_cache()
+        # Windows of at least ROLLUP_MIN_DAYS are answered from daily rollups
+        self.rollups_enabled = os.getenv("DAILY_ROLLUPS", "on").lower() == "on"
+        self.rollup_min_days = int(os.getenv("ROLLUP_MIN_DAYS", "90"))
+        self.history_days = int(os.getenv("SHOP_HISTORY_DAYS", "730"))
+        self.rollup_store = get_rollup_store()
+
+    @property
+    def mock_provider(self) -> MockDataProvider:
+        # Generated on the first mock request (or warm-up), not at start-up
+        if self._mock_provider is None:
+            self._mock_provider = get_mock_provider()
+        return self._mock_provider
+
+    @mock_provider.setter
+    def mock_provider(self, provider: MockDataProvider):
+        self._mock_provider = provider
 
     async def execute(
         self,
@@ -32,17 +89,380 @@ class QueryExecutor:
             {
                 "data": {...},
                 "record_count": int,
-                "resources": {...}
+                "resources": {...},
+                "window_days": int (days of history the plan's period
+                    covers; absent when it covers all history)
             }
         """
+        result = await self._execute(query_spec, store_id, access_token, use_mock)
+        return self._with_window(result, query_spec)
+
+    async def _execute(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: Optional[str],
+        use_mock: bool
+    ) -> Dict[str, Any]:
+        if self.shopifyql_mode == "local" and query_spec.get("shopifyql_executable"):
+            try:
+                return await self._execute_local_shopifyql(
+                    query_spec, store_id, access_token, use_mock
+                )
+            except Exception as e:
+                logger.warning("Local ShopifyQL execution failed, falling back to raw data: %s", e)
+        
+        if query_spec.get("rollups"):
+            try:
+                return await self._execute_rollups(query_spec, store_id, access_token, use_mock)
+            except Exception as e:
+                logger.warning("Rollup read failed, falling back to raw data: %s", e)
+        
+        if query_spec.get("sampling") and query_spec.get("approximate"):
+            try:
+                return await self._execute_sampled(query_spec, store_id, access_token, use_mock)
+            except Exception as e:
+                logger.warning("Sampled fetch failed, falling back to raw data: %s", e)
         
         if use_mock or not access_token:
-            print("📦 Using mock data")
+            logger.debug("Using mock data")
             return await self._execute_mock(query_spec)
         else:
-            print("🌐 Querying Shopify API")
+            logger.debug("Querying Shopify API")
             return await self._execute_shopify(query_spec, store_id, access_token)
 
+    async def execute_batch(
+        self,
+        query_specs: List[Dict[str, Any]],
+        store_id: str,
+        access_token: Optional[str] = None,
+        use_mock: bool = False
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Execute several plans for one store, fetching shared resources once
+        
+        Plans with a path of their own (local ShopifyQL, rollups, samples,
+        filters a shared fetch can't express) run through execute(). The
+        rest are grouped (see _share_groups) and each group is fetched with
+        one plan: the union of its resources and fields.
+        
+        Returns:
+            (one execute()-shaped result per plan,
+             [{"query_spec", "result", "plans"} per shared fetch])
+        """
+        is_mock = use_mock or not access_token
+        results: List[Optional[Dict[str, Any]]] = [None] * len(query_specs)
+        shareable = [i for i, spec in enumerate(query_specs) if self._shareable(spec, is_mock)]
+        alone = [i for i in range(len(query_specs)) if i not in shareable]
+        # Rollup plans read the same store: in turn, so only the first one syncs
+        rollups = [i for i in alone if query_specs[i].get("rollups")]
+        shared: List[Dict[str, Any]] = []
+
+        async def run(indexes: List[int]):
+            for i in indexes:
+                results[i] = await self.execute(query_specs[i], store_id, access_token, use_mock)
+
+        async def fetch_shared(indexes: List[int]):
+            spec = self._union_spec([query_specs[i] for i in indexes])
+            if is_mock:
+                result = await self._execute_mock(spec)
+            else:
+                result = await self._execute_shopify(spec, store_id, access_token)
+            for i in indexes:
+                data = {call["resource"]: result["data"].get(call["resource"], [])
+                        for call in query_specs[i].get("api_calls", [])}
+                results[i] = self._with_window({
+                    "data": data,
+                    "record_count": sum(len(records) for records in data.values()),
+                    "resources": list(data.keys()),
+                    "is_mock": is_mock,
+                    "fetch_mode": "shared",
+                    # Made once for the whole group
+                    "round_trips": 0,
+                    # The group's incomplete resources this plan reads
+                    "truncated": [resource for resource in result.get("truncated", []) if resource in data],
+                    "failed": [resource for resource in result.get("failed", []) if resource in data]
+                }, query_specs[i])
+            shared.append({"query_spec": spec, "result": result, "plans": len(indexes)})
+
+        groups = self._share_groups([(i, query_specs[i]) for i in shareable], is_mock)
+        await asyncio.gather(
+            run(rollups),
+            *[run([i]) for i in alone if i not in rollups],
+            *[fetch_shared(group) for group in groups]
+        )
+        logger.debug("Batch of %d plans: %d fetched in %d shared groups",
+                     len(query_specs), len(shareable), len(groups))
+        return results, shared
+
+    def _with_window(self, result: Dict[str, Any], query_spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the days of history the plan's period (as narrowed by the guardrails) covers"""
+        start, end = period_to_date_range((query_spec.get("filters") or {}).get("time_period"))
+        if start is not None:
+            result["window_days"] = max(1, (end - start).days)
+        return result
+
+    def _shareable(self, query_spec: Dict[str, Any], is_mock: bool) -> bool:
+        """Whether a plan would be answered from plain resource fetches"""
+        if query_spec.get("shopifyql_executable") and (
+            self.shopifyql_mode == "local" or (self.shopifyql_mode == "server" and not is_mock)
+        ):
+            return False
+        if query_spec.get("rollups") or (query_spec.get("sampling") and query_spec.get("approximate")):
+            return False
+        if any(key not in SHAREABLE_PLAN_FILTERS for key in query_spec.get("filters") or {}):
+            return False
+        return all(
+            key in SHAREABLE_CALL_FILTERS
+            for call in query_spec.get("api_calls", []) for key in call.get("filters") or {}
+        )
+
+    def _share_groups(self, plans: List[Tuple[int, Dict[str, Any]]], is_mock: bool) -> List[List[int]]:
+        """
+        Group plans that can be fetched together without changing their data
+        
+        Shared records are not filtered per plan, so windows are never
+        widened: plans join a group when every time-filtered resource they
+        have in common covers the same range. A GraphQL plan query splits
+        its cost budget over its connections, so there only identical
+        queries are shared.
+        """
+        now = datetime.now()
+        graphql = not is_mock and self.fetch_mode == "graphql"
+        groups: List[Tuple[Dict[Any, Any], List[int]]] = []
+        for index, spec in plans:
+            windows = {}
+            for call in spec.get("api_calls", []):
+                window = None
+                if call["resource"] in TIME_FILTERED_RESOURCES:
+                    window = period_to_date_range(_call_period(call, spec), now)
+                if graphql:
+                    window = (window, tuple(call.get("fields") or []))
+                windows[call["resource"]] = window
+            if graphql:
+                windows["products_filter"] = (spec.get("filters") or {}).get("products")
+
+            for group_windows, members in groups:
+                same = group_windows == windows if graphql else all(
+                    group_windows[resource] == window
+                    for resource, window in windows.items() if resource in group_windows
+                )
+                if same:
+                    group_windows.update(windows)
+                    members.append(index)
+                    break
+            else:
+                groups.append((windows, [index]))
+        return [members for _, members in groups]
+
+    def _union_spec(self, query_specs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """One plan fetching every resource of a group, with all the fields any plan wants"""
+        calls: Dict[str, Dict[str, Any]] = {}
+        for spec in query_specs:
+            for call in spec.get("api_calls", []):
+                resource = call["resource"]
+                merged = calls.get(resource)
+                if merged is None:
+                    filters = {}
+                    if resource in TIME_FILTERED_RESOURCES and _call_period(call, spec):
+                        filters["time_filter"] = _call_period(call, spec)
+                    calls[resource] = {**call, "fields": list(call.get("fields") or []), "filters": filters}
+                elif not merged["fields"] or not call.get("fields"):
+                    # An empty field list means everything
+                    merged["fields"] = []
+                else:
+                    merged["fields"] += [field for field in call["fields"] if field not in merged["fields"]]
+        products = {(spec.get("filters") or {}).get("products") for spec in query_specs} - {None}
+        return {
+            "api_calls": list(calls.values()),
+            # Only GraphQL groups (identical plans) can carry a product filter
+            "filters": {"products": products.pop()} if len(products) == 1 else {}
+        }
+
+    def plan_rollups(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        is_mock: bool
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Mark a long-range plan to be answered from daily rollups
+
+        Sets query_spec["rollups"] (and returns it) when the intent can be
+        answered from rollups and the window is long enough; "sync_days" is
+        how much of the window still has to be fetched as raw orders.
+        """
+        if not (self.rollups_enabled and query_spec.get("rollup_eligible")):
+            return None
+        since, until = self._window(query_spec)
+        if (until - since) / SECONDS_PER_DAY < self.rollup_min_days:
+            return None
+
+        rollups = self.rollup_store.get(self._store_key(store_id, is_mock))
+        missing = rollups.missing(since, until)
+        query_spec["rollups"] = {
+            "sync_days": sum(stop - start for start, stop in missing) / SECONDS_PER_DAY
+        }
+        return query_spec["rollups"]
+
+    async def _execute_rollups(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: Optional[str],
+        use_mock: bool
+    ) -> Dict[str, Any]:
+        """
+        Sync orders the rollups are missing, then read the window's rollup rows
+        
+        A range is marked synced only once all of its orders were fetched.
+        """
+        is_mock = use_mock or not access_token
+        since, until = self._window(query_spec)
+        rollups = self.rollup_store.get(self._store_key(store_id, is_mock))
+        transfer = {"requests": 0, "bytes": 0}
+
+        synced = 0
+        for start, stop in rollups.missing(since, until):
+            tables = await self._fetch_order_tables(store_id, access_token, is_mock, start, stop, transfer)
+            synced += rollups.ingest(tables.get("orders"), tables.get("sales"), start, stop)
+        tables = rollups.window(since, until)
+
+        result = await self._execute_without_orders(query_spec, store_id, access_token, is_mock, transfer)
+
+        rollup_rows = sum(len(table["created_at"]) for table in tables.values())
+        logger.debug("Read %d rollup rows after syncing %d orders", rollup_rows, synced)
+        return {
+            **result,
+            "tables": tables,
+            "record_count": result["record_count"] + rollup_rows,
+            "rollup_rows": rollup_rows,
+            "synced_orders": synced,
+            "fetch_mode": "rollups",
+            "round_trips": result.get("round_trips", 0) + transfer["requests"],
+            "transfer": transfer
+        }
+
+    async def _execute_sampled(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: Optional[str],
+        use_mock: bool
+    ) -> Dict[str, Any]:
+        """
+        Fetch orders for a random sample of time slices only (approximate mode)
+        
+        Each sampled slice is read in full, however many pages it takes: the
+        estimate expands slice totals by N / n, so a slice cut short would
+        bias it low. A slice that can't be read in full raises instead.
+        """
+        is_mock = use_mock or not access_token
+        since, until = self._window(query_spec)
+        sampling = query_spec["sampling"]
+        sample = plan_sample(since, until, sampling["slice_seconds"], sampling["rate"], seed=sampling.get("seed"))
+        transfer = {"requests": 0, "bytes": 0}
+
+        # Ranges are half-open, so a boundary order belongs to one slice only
+        batches = await asyncio.gather(*[
+            self._fetch_order_tables(store_id, access_token, is_mock, start, stop - 1, transfer)
+            for start, stop in slice_ranges(sample)
+        ])
+        tables = {
+            table: {
+                column: np.concatenate([batch[table][column] for batch in batches if table in batch])
+                for column in columns
+            }
+            for table, columns in batches[0].items()
+        } if batches else {}
+
+        result = await self._execute_without_orders(query_spec, store_id, access_token, is_mock, transfer)
+        sampled_orders = len(tables.get("orders", {}).get("order_id", []))
+        logger.debug("Sampled %d of %d time slices (%d orders)",
+                     len(sample["sampled"]), sample["slices"], sampled_orders)
+        return {
+            **result,
+            "tables": tables,
+            "sample": sample,
+            "record_count": result["record_count"] + sampled_orders,
+            "fetch_mode": "sampled",
+            "round_trips": result.get("round_trips", 0) + transfer["requests"],
+            "transfer": transfer
+        }
+
+    async def _execute_without_orders(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: Optional[str],
+        is_mock: bool,
+        transfer: Dict[str, int]
+    ) -> Dict[str, Any]:
+        """Everything in the plan but orders (products, inventory), fetched as usual"""
+        others = dict(query_spec, api_calls=[
+            call for call in query_spec.get("api_calls", []) if call["resource"] != "orders"
+        ])
+        if not others["api_calls"]:
+            return {"data": {}, "record_count": 0, "resources": [], "is_mock": is_mock}
+        if is_mock:
+            return await self._execute_mock(others)
+        result = await self._execute_shopify(others, store_id, access_token)
+        for key in transfer:
+            transfer[key] += result.get("transfer", {}).get(key, 0)
+        return result
+
+    async def _fetch_order_tables(
+        self,
+        store_id: str,
+        access_token: Optional[str],
+        is_mock: bool,
+        since: int,
+        until: int,
+        stats: Dict[str, int]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Columnar orders and line items created in [since, until] (epoch seconds)
+        
+        Every page of the range is read; raises ValueError if the fetch was
+        cut short or failed, so callers never take part of a range for all of it.
+        """
+        if is_mock:
+            # Mock shops are already columnar: slice the cached tables
+            shop_data = self.shop_cache.get_or_build(f"mock:{store_id}", self.mock_provider.to_columnar)
+            window = (datetime.fromtimestamp(since), datetime.fromtimestamp(until))
+            return {
+                table: {
+                    column: values[shop_data.time_slice(table, *window)]
+                    for column, values in shop_data.tables[table].items()
+                }
+                for table in ("orders", "sales") if shop_data.has(table)
+            }
+
+        # REST list calls take an explicit created_at range, and list only
+        # open orders unless asked for every status
+        window = {
+            "created_at_min": datetime.fromtimestamp(since, timezone.utc).isoformat(timespec="seconds"),
+            "created_at_max": datetime.fromtimestamp(until, timezone.utc).isoformat(timespec="seconds"),
+            "status": "any"
+        }
+        spec = {"api_calls": [{"resource": "orders", "fields": [], "filters": window}]}
+        raw = await self._execute_rest(spec, store_id, access_token, stats)
+        if raw["truncated"] or raw["failed"]:
+            raise ValueError(
+                f"Orders from {window['created_at_min']} to {window['created_at_max']} not fully fetched"
+            )
+        return ColumnarShopData.from_raw(raw["data"]).tables
+
+    def _window(self, query_spec: Dict[str, Any]) -> Tuple[int, int]:
+        """Epoch seconds the plan's period covers; no period means the shop's history"""
+        start, end = period_to_date_range((query_spec.get("filters") or {}).get("time_period"))
+        until = int(end.timestamp()) if end else int(time.time())
+        since = int(start.timestamp()) if start else until - self.history_days * SECONDS_PER_DAY
+        return since, until
+
+    def _store_key(self, store_id: str, is_mock: bool) -> str:
+        return f"mock:{store_id}" if is_mock else store_id
+
     async def _execute_mock(self, query_spec: Dict[str, Any]) -> Dict[str, Any]:
         """Execute using mock data"""
         api_calls = query_spec.get("api_calls", [])
@@ -53,16 +473,18 @@ class QueryExecutor:
         
         for call in api_calls:
             resource = call["resource"]
+            # Same narrowing the API would apply: plan filters plus the call's own
+            call_filters = {**filters, **call.get("filters", {})}
             
             # Get mock data for this resource
             if resource == "orders":
-                mock_data = self.mock_provider.get_orders(filters)
+                mock_data = self.mock_provider.get_orders(call_filters)
             elif resource == "products":
-                mock_data = self.mock_provider.get_products(filters)
+                mock_data = self.mock_provider.get_products(call_filters)
             elif resource == "inventory_levels":
-                mock_data = self.mock_provider.get_inventory(filters)
+                mock_data = self.mock_provider.get_inventory(call_filters)
             elif resource == "customers":
-                mock_data = self.mock_provider.get_customers(filters)
+                mock_data = self.mock_provider.get_customers(call_filters)
             else:
                 mock_data = []
             
@@ -83,34 +505,198 @@ class QueryExecutor:
         access_token: str
     ) -> Dict[str, Any]:
         """Execute using real Shopify API"""
+        # Requests and bytes actually transferred, across fallbacks
+        stats = {"requests": 0, "bytes": 0}
+        result = None
+        
+        if self.shopifyql_mode == "server" and query_spec.get("shopifyql_executable"):
+            try:
+                result = await self._execute_shopifyql(query_spec, store_id, access_token, stats)
+            except Exception as e:
+                logger.warning("ShopifyQL execution failed, falling back to raw data: %s", e)
+        
+        if result is None and self.fetch_mode == "graphql":
+            try:
+                result = await self._execute_graphql(query_spec, store_id, access_token, stats)
+            except Exception as e:
+                logger.warning("GraphQL plan query failed, falling back to REST: %s", e)
+        
+        if result is None:
+            result = await self._execute_rest(query_spec, store_id, access_token, stats)
+        
+        result["transfer"] = stats
+        return result
+
+    async def _execute_local_shopifyql(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: Optional[str],
+        use_mock: bool
+    ) -> Dict[str, Any]:
+        """
+        Answer the generated ShopifyQL from cached columnar shop data
+        
+        A real shop is read in full (every REST page of every resource)
+        before it is cached; a fill that hit the page cap or failed on a
+        resource raises instead, so the question is answered from raw data.
+        """
+        is_mock = use_mock or not access_token
+        cache_key = f"mock:{store_id}" if is_mock else store_id
+        
+        shop_data = self.shop_cache.get(cache_key)
+        round_trips = 0
+        transfer = {"requests": 0, "bytes": 0}
+        
+        if is_mock:
+            # Mock shops are already columnar - no records to convert
+            shop_data = self.shop_cache.get_or_build(cache_key, self.mock_provider.to_columnar)
+        elif shop_data is None:
+            # REST, whatever fetch_mode: GraphQL can't page inventory levels
+            raw = await self._execute_rest(LOCAL_CACHE_SPEC, store_id, access_token, transfer)
+            incomplete = raw["truncated"] + raw["failed"]
+            if incomplete:
+                raise ValueError(f"Shop data incomplete ({', '.join(incomplete)}); not caching it")
+            round_trips = raw["round_trips"]
+            shop_data = self.shop_cache.put(cache_key, raw["data"])
+        
+        table = execute_shopifyql(query_spec["shopifyql"], shop_data)
+        
+        return {
+            "data": {},
+            "shopifyql_result": table,
+            "record_count": table["stats"]["rows_matched"],
+            "resources": [],
+            "is_mock": is_mock,
+            "fetch_mode": "local_shopifyql",
+            "round_trips": round_trips,
+            "transfer": transfer
+        }
+
+    async def _execute_shopifyql(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: str,
+        stats: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """Run the generated ShopifyQL server-side; only result rows come back"""
+        table = await self.shopify_client.fetch_shopifyql(
+            store_id=store_id,
+            access_token=access_token,
+            shopifyql=query_spec["shopifyql"],
+            stats=stats
+        )
+        
+        return {
+            "data": {},
+            "shopifyql_result": table,
+            "record_count": len(table["rows"]),
+            "resources": [],
+            "is_mock": False,
+            "fetch_mode": "shopifyql",
+            "round_trips": 1,
+            "query_cost": table["cost"]
+        }
+
+    async def _execute_graphql(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: str,
+        stats: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch all plan resources with a batched GraphQL query (then paged)
+        
+        Raises ValueError when a resource was cut short, so the caller falls
+        back to REST instead of answering from part of the data.
+        """
+        result = await self.shopify_client.fetch_plan(
+            store_id=store_id,
+            access_token=access_token,
+            api_calls=query_spec.get("api_calls", []),
+            filters=query_spec.get("filters", {}),
+            stats=stats
+        )
+        if result["truncated"]:
+            raise ValueError(f"GraphQL plan query truncated {', '.join(result['truncated'])}")
+        
+        data = result["data"]
+        
+        return {
+            "data": data,
+            "record_count": sum(len(records) for records in data.values()),
+            "resources": list(data.keys()),
+            "is_mock": False,
+            "fetch_mode": "graphql",
+            "round_trips": result["pages"],
+            "query_cost": result["cost"]
+        }
+
+    async def _execute_rest(
+        self,
+        query_spec: Dict[str, Any],
+        store_id: str,
+        access_token: str,
+        stats: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch each plan resource with its own (paged) REST calls, resources
+        concurrently
+        
+        "truncated" lists the resources cut short at the client's page cap,
+        "failed" those whose fetch raised (returned empty).
+        """
         api_calls = query_spec.get("api_calls", [])
         
-        data = {}
-        total_records = 0
+        failed = []
         
-        for call in api_calls:
-            resource = call["resource"]
-            filters = call.get("filters", {})
-            
-            # Make API call
+        async def fetch(call: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+            counters: Dict[str, int] = {}
             try:
-                result = await self.shopify_client.fetch(
+                records = await self.shopify_client.fetch(
                     store_id=store_id,
                     access_token=access_token,
-                    resource=resource,
-                    filters=filters
+                    resource=call["resource"],
+                    filters=call.get("filters", {}),
+                    stats=counters
                 )
-                
-                data[resource] = result
-                total_records += len(result) if isinstance(result, list) else 1
-                
             except Exception as e:
-                print(f"Error fetching {resource}: {e}")
-                data[resource] = []
+                logger.warning("Error fetching %s: %s", call["resource"], e)
+                failed.append(call["resource"])
+                records = []
+            return records, counters
+        
+        fetched = await asyncio.gather(*[fetch(call) for call in api_calls])
+        
+        data = {}
+        total_records = 0
+        round_trips = 0
+        truncated = []
+        for call, (records, counters) in zip(api_calls, fetched):
+            data[call["resource"]] = records
+            total_records += len(records) if isinstance(records, list) else 1
+            round_trips += counters.get("requests", 0)
+            if counters.get("truncated"):
+                truncated.append(call["resource"])
+            if stats is not None:
+                for key, value in counters.items():
+                    stats[key] = stats.get(key, 0) + value
         
         return {
             "data": data,
             "record_count": total_records,
             "resources": list(data.keys()),
-            "is_mock": False
+            "is_mock": False,
+            "fetch_mode": "rest",
+            "round_trips": round_trips,
+            "truncated": truncated,
+            "failed": failed
         }
+
+
+
+def _call_period(call: Dict[str, Any], query_spec: Dict[str, Any]) -> Optional[str]:
+    """The period a call is fetched for: its own, else the plan's (as rest_params reads it)"""
+    return (call.get("filters") or {}).get("time_filter") or (query_spec.get("filters") or {}).get("time_period")
@@ -3,10 +3,15 @@ Query Planner - Step 2 of agent workflow
 Determines what Shopify data is needed to answer the question
 """
 
+import logging
 import json
 from typing import Dict, Any
 from app.llm.client import LLMClient
 from app.llm.prompts import QUERY_GENERATOR_SYSTEM, QUERY_GENERATOR_PROMPT
+from app.shopify.filters import period_to_date_range
+
+
+logger = logging.getLogger(__name__)
 
 
 class QueryPlanner:
@@ -51,7 +56,7 @@ class QueryPlanner:
             return self._validate_plan(plan, intent)
             
         except Exception as e:
-            print(f"Query planning error: {e}")
+            logger.warning("Query planning error, using fallback plan: %s", e)
             # Return minimal safe plan
             return self._fallback_plan(intent)
 
@@ -71,7 +76,7 @@ class QueryPlanner:
         """Validate and ensure plan has required fields"""
         
         # Ensure required fields
-        plan.setdefault("shopifyql", "SELECT * FROM orders")
+        plan.setdefault("shopifyql", f"FROM sales SHOW total_sales, orders{self._since(intent)}")
         plan.setdefault("resources_needed", ["orders"])
         plan.setdefault("fields_required", {})
         plan.setdefault("post_processing", "Aggregate and analyze data")
@@ -81,11 +86,12 @@ class QueryPlanner:
     def _fallback_plan(self, intent: Dict[str, Any]) -> Dict[str, Any]:
         """Provide a fallback plan based on intent"""
         intent_type = intent.get("intent", "general_query")
+        since = self._since(intent)
         
         # Simple mapping of intents to data needs
         plans = {
             "inventory_projection": {
-                "shopifyql": "SELECT * FROM orders JOIN inventory_levels",
+                "shopifyql": f"FROM sales SHOW net_quantity GROUP BY product_title{since}",
                 "resources_needed": ["orders", "products", "inventory_levels"],
                 "fields_required": {
                     "orders": ["created_at", "line_items", "quantity"],
@@ -94,15 +100,26 @@ class QueryPlanner:
                 "post_processing": "Calculate daily sales rate and project future needs"
             },
             "sales_analysis": {
-                "shopifyql": "SELECT * FROM orders",
+                "shopifyql": f"FROM sales SHOW total_sales, orders{since}",
                 "resources_needed": ["orders"],
                 "fields_required": {
                     "orders": ["created_at", "total_price", "line_items"]
                 },
                 "post_processing": "Aggregate sales by time period"
             },
+            "customer_retention": {
+                "shopifyql": f"FROM sales SHOW orders, total_sales GROUP BY month{since}",
+                "resources_needed": ["orders"],
+                "fields_required": {
+                    "orders": ["created_at", "customer_id", "total_price"]
+                },
+                "post_processing": "Group customers into first-order cohorts and track retention"
+            },
             "top_products": {
-                "shopifyql": "SELECT product_id, SUM(quantity) FROM orders GROUP BY product_id",
+                "shopifyql": (
+                    "FROM sales SHOW net_quantity, total_sales GROUP BY product_title"
+                    f"{since} ORDER BY net_quantity DESC LIMIT 5"
+                ),
                 "resources_needed": ["orders", "products"],
                 "fields_required": {
                     "orders": ["line_items", "created_at"],
@@ -113,3 +130,18 @@ class QueryPlanner:
         }
         
         return plans.get(intent_type, plans["sales_analysis"])
+
+    def _since(self, intent: Dict[str, Any]) -> str:
+        """
+        SINCE clause for the window the executor fetches for the intent's
+        period (see period_to_date_range); empty when it fetches all history
+        """
+        created_min, created_max = period_to_date_range(intent.get("time_period"))
+        if created_min is None:
+            return ""
+        days = (created_max - created_min).days
+        since = f" SINCE -{days}d" if days else " SINCE today"
+        # A calendar-day window ("yesterday") stops at midnight
+        if days and created_max == created_max.replace(hour=0, minute=0, second=0, microsecond=0):
+            return since + " UNTIL yesterday"
+        return since
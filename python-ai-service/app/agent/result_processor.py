@@ -3,25 +3,59 @@ Result Processor - Step 5 of agent workflow
 Processes raw data into analytics and insights
 """
 
-from typing import Dict, Any, List
+import math
+import os
+import time
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from app.agent.columnar_aggregates import (
+    AGGREGATORS,
+    aggregate_inventory_projection,
+    aggregate_customer_retention
+)
+from app.agent.processing_pool import ProcessingPool
+from app.agent.sketches import SKETCHES
+from app.shopify.filters import period_to_days
+from app.shopifyql.columnar import ColumnarShopData
+from app.telemetry.timing import record_processor
+
 
 class ResultProcessor:
     """
     Processes raw Shopify data into meaningful metrics and insights
+    
+    Record-based handlers are split into an _aggregate_* pass over the data
+    and a _format_* step, so large payloads can swap the aggregate pass for
+    its vectorized counterpart in a worker (see ProcessingPool), or - in
+    sketch mode - a bounded-memory streaming pass (see sketches).
     """
     
+    def __init__(self, pool: Optional[ProcessingPool] = None):
+        self.pool = pool or ProcessingPool()
+        # Inventory forecasting: supplier lead time and exponential smoothing factor
+        self.lead_time_days = float(os.getenv("INVENTORY_LEAD_TIME_DAYS", "7"))
+        self.smoothing = float(os.getenv("INVENTORY_SMOOTHING", "0.1"))
+        # Cohorts: horizon the customer lifetime value is projected over
+        self.clv_horizon_months = int(os.getenv("CLV_HORIZON_MONTHS", "36"))
+        # exact, or sketch: bounded-memory estimates for distinct customers / top products
+        self.aggregation = os.getenv("AGGREGATION_MODE", "exact").lower()
+        self.sketch_chunk_records = int(os.getenv("SKETCH_CHUNK_RECORDS", "50000"))
+    
     async def process(
         self,
         raw_data: Dict[str, Any],
         intent: Dict[str, Any],
-        plan: Dict[str, Any]
+        plan: Dict[str, Any],
+        aggregation: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process raw data based on intent
         
+        Args:
+            aggregation: "exact" or "sketch"; defaults to AGGREGATION_MODE
+        
         Returns:
             {
                 "summary": Dict[str, Any],
@@ -30,18 +64,69 @@ class ResultProcessor:
             }
         """
         
-        data = raw_data.get("data", {})
-        intent_type = intent.get("intent", "")
+        # ShopifyQL already aggregated server-side - summarize the result table
+        if "shopifyql_result" in raw_data:
+            handler, data = self._process_shopifyql_table, raw_data["shopifyql_result"]
+        else:
+            handler, data = self._route(intent.get("intent", "")), raw_data.get("data", {})
         
-        # Route to appropriate processor
+        # Days actually fetched: the cost guardrails may have narrowed the
+        # window, and future periods ("next week") fetch the default history
+        if raw_data.get("window_days"):
+            intent = dict(intent, history_days=raw_data["window_days"])
+        
+        name = handler.__name__.replace("_process_", "")
+        start = time.perf_counter()
+        try:
+            # Orders already came as columns: daily rollups for long windows,
+            # or sampled time slices whose totals are scaled to the window
+            if "tables" in raw_data and name in AGGREGATORS:
+                params = self._aggregate_params(name, intent)
+                if raw_data.get("sample"):
+                    params["sample"] = raw_data["sample"]
+                aggregate = await self.pool.aggregate(name, data, params, tables=raw_data["tables"])
+                return getattr(self, f"_format_{name}")(aggregate, intent)
+            # Sketch mode streams the records instead of holding per-key state
+            if (aggregation or self.aggregation).lower() == "sketch" and name in SKETCHES:
+                aggregate = await self.pool.sketch(name, data, self.sketch_chunk_records)
+                return getattr(self, f"_format_{name}")(aggregate, intent)
+            # Big payloads are aggregated in the processing pool, off the event loop
+            if self.pool.accepts(name, data):
+                aggregate = await self.pool.aggregate(name, data, self._aggregate_params(name, intent))
+                return getattr(self, f"_format_{name}")(aggregate, intent)
+            return handler(data, intent)
+        finally:
+            record_processor(name, time.perf_counter() - start)
+
+    def _route(self, intent_type: str):
+        """Pick the processor for an intent"""
         if intent_type in ["inventory_projection", "reorder_recommendations"]:
-            return self._process_inventory_projection(data, intent)
+            return self._process_inventory_projection
         elif intent_type in ["sales_analysis", "top_products"]:
-            return self._process_sales_analysis(data, intent)
-        elif intent_type in ["customer_behavior", "customer_retention"]:
-            return self._process_customer_behavior(data, intent)
+            return self._process_sales_analysis
+        elif intent_type == "customer_behavior":
+            return self._process_customer_behavior
+        elif intent_type == "customer_retention":
+            return self._process_customer_retention
         else:
-            return self._process_general(data, intent)
+            return self._process_general
+
+    def _aggregate_params(self, name: str, intent: Dict) -> Dict[str, Any]:
+        """Intent-dependent arguments for a handler's aggregate pass"""
+        history_days = intent.get("history_days") or period_to_days(intent.get("time_period"))
+        if name == "customer_retention":
+            # Weekly cohorts when the window is too short for monthly ones
+            if history_days <= 90:
+                return {"period": "week", "clv_periods": round(self.clv_horizon_months * 52 / 12)}
+            return {"period": "month", "clv_periods": self.clv_horizon_months}
+        if name != "inventory_projection":
+            return {}
+        return {
+            "history_days": history_days,
+            "horizon_days": self._get_projection_days(intent.get("time_period", "")),
+            "lead_time_days": self.lead_time_days,
+            "smoothing": self.smoothing,
+        }
 
     def _process_inventory_projection(
         self, 
@@ -49,42 +134,54 @@ class ResultProcessor:
         intent: Dict
     ) -> Dict[str, Any]:
         """Process inventory projection data"""
-        orders = data.get("orders", [])
-        inventory = data.get("inventory_levels", [])
-        
-        # Calculate sales velocity
-        if orders:
-            total_units = sum(
-                item.get("quantity", 0) 
-                for order in orders 
-                for item in order.get("line_items", [])
-            )
-            days = self._get_days_from_period(intent.get("time_period", "30 days"))
-            daily_rate = total_units / max(days, 1)
+        params = self._aggregate_params("inventory_projection", intent)
+        return self._format_inventory_projection(self._aggregate_inventory_projection(data, **params), intent)
+
+    def _aggregate_inventory_projection(self, data: Dict[str, Any], **forecast) -> Dict[str, Any]:
+        # Per-SKU forecasting is vectorized over columns, whatever the payload size
+        return aggregate_inventory_projection(ColumnarShopData.from_raw(data).tables, **forecast)
+
+    def _format_inventory_projection(self, aggregate: Dict[str, Any], intent: Dict) -> Dict[str, Any]:
+        # Smoothed velocity, summed over SKUs
+        if aggregate["order_count"]:
+            total_units = aggregate["total_units"]
+            daily_rate = aggregate["daily_velocity"]
         else:
             total_units = 0
             daily_rate = 0
         
         # Current inventory
-        current_stock = sum(inv.get("available", 0) for inv in inventory)
+        current_stock = aggregate["current_stock"]
         
-        # Projection
+        # Projection; a shortage is counted per SKU, so one product's surplus
+        # doesn't hide another's stockout
         projection_days = self._get_projection_days(intent.get("time_period", ""))
-        projected_need = daily_rate * projection_days
-        shortage = max(0, projected_need - current_stock)
+        projected_need = aggregate["horizon_need"]
+        shortage = aggregate["horizon_shortage"]
         
         return {
             "summary": {
                 "total_units_sold": total_units,
                 "daily_sales_rate": round(daily_rate, 2),
                 "current_stock": current_stock,
-                "days_of_inventory": round(current_stock / daily_rate, 1) if daily_rate > 0 else float('inf')
+                "days_of_inventory": round(current_stock / daily_rate, 1) if daily_rate > 0 else float('inf'),
+                "skus_analyzed": aggregate["skus_analyzed"],
+                "skus_at_risk": aggregate["skus_at_risk"],
+                "most_urgent_skus": aggregate["urgent_skus"],
+                "locations": aggregate["location_count"],
+                "location_shortages": aggregate["location_shortages"][:5],
+                "suggested_transfers": aggregate["transfers"][:5]
             },
             "calculations": {
                 "projection_period_days": projection_days,
+                "lead_time_days": self.lead_time_days,
                 "projected_units_needed": round(projected_need, 0),
                 "shortage": round(shortage, 0),
-                "recommendation": "reorder" if shortage > 0 else "sufficient_stock"
+                "skus_to_reorder": aggregate["skus_to_reorder"],
+                "reorder_units": aggregate["reorder_units"],
+                "locations_short": aggregate["locations_short"],
+                "transfer_units": aggregate["transfer_units"],
+                "recommendation": "reorder" if aggregate["skus_to_reorder"] > 0 else "sufficient_stock"
             },
             "insights": []
         }
@@ -95,11 +192,14 @@ class ResultProcessor:
         intent: Dict
     ) -> Dict[str, Any]:
         """Process sales analysis data"""
+        return self._format_sales_analysis(self._aggregate_sales_analysis(data), intent)
+
+    def _aggregate_sales_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
         orders = data.get("orders", [])
         products = data.get("products", [])
         
         if not orders:
-            return self._empty_result()
+            return {"total_orders": 0, "total_revenue": 0, "top_products": [], "products_analyzed": 0}
         
         # Aggregate sales by product
         product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0})
@@ -123,31 +223,55 @@ class ResultProcessor:
         # Get product names
         product_map = {p.get("id"): p.get("title", "Unknown") for p in products}
         
-        top_list = [
-            {
-                "product": product_map.get(pid, f"Product {pid}"),
-                "quantity": data["quantity"],
-                "revenue": data["revenue"]
-            }
-            for pid, data in top_products
-        ]
+        return {
+            "total_orders": len(orders),
+            "total_revenue": sum(order.get("total_price", 0) for order in orders),
+            "top_products": [
+                {
+                    "product": product_map.get(pid, f"Product {pid}"),
+                    "quantity": data["quantity"],
+                    "revenue": data["revenue"]
+                }
+                for pid, data in top_products
+            ],
+            "products_analyzed": len(product_sales)
+        }
+
+    def _format_sales_analysis(self, aggregate: Dict[str, Any], intent: Dict) -> Dict[str, Any]:
+        total_orders = aggregate["total_orders"]
+        if not total_orders:
+            return self._empty_result()
         
-        # Summary
-        total_orders = len(orders)
-        total_revenue = sum(order.get("total_price", 0) for order in orders)
+        total_revenue = aggregate["total_revenue"]
         
-        return {
+        result = {
             "summary": {
                 "total_orders": total_orders,
                 "total_revenue": round(total_revenue, 2),
-                "top_products": top_list
+                "top_products": aggregate["top_products"]
             },
             "calculations": {
                 "average_order_value": round(total_revenue / total_orders, 2) if total_orders > 0 else 0,
-                "products_analyzed": len(product_sales)
+                "products_analyzed": aggregate["products_analyzed"],
+                # Only daily rollups track first orders
+                **({"new_customers": aggregate["new_customers"]} if "new_customers" in aggregate else {})
             },
             "insights": []
         }
+        if "sampling" in aggregate:
+            # Estimated from sampled time slices: report the 95% margins too
+            margins = {key: round(value, 2) if math.isfinite(value) else None
+                       for key, value in aggregate["margins"].items()}
+            result["summary"]["estimated"] = True
+            result["summary"]["margin_of_error"] = {
+                "total_orders": math.ceil(margins["total_orders"]) if margins["total_orders"] is not None else None,
+                "total_revenue": margins["total_revenue"]
+            }
+            result["calculations"]["average_order_value_margin"] = margins["average_order_value"]
+            result["calculations"]["sampling"] = aggregate["sampling"]
+        if "sketch" in aggregate:
+            result["calculations"]["sketch"] = aggregate["sketch"]
+        return result
 
     def _process_customer_behavior(
         self, 
@@ -155,7 +279,9 @@ class ResultProcessor:
         intent: Dict
     ) -> Dict[str, Any]:
         """Process customer behavior data"""
-        customers = data.get("customers", [])
+        return self._format_customer_behavior(self._aggregate_customer_behavior(data), intent)
+
+    def _aggregate_customer_behavior(self, data: Dict[str, Any]) -> Dict[str, Any]:
         orders = data.get("orders", [])
         
         # Count repeat customers
@@ -165,10 +291,17 @@ class ResultProcessor:
             if customer_id:
                 customer_order_counts[customer_id] += 1
         
-        repeat_customers = sum(1 for count in customer_order_counts.values() if count > 1)
-        total_customers = len(customer_order_counts)
-        
         return {
+            "order_count": len(orders),
+            "total_customers": len(customer_order_counts),
+            "repeat_customers": sum(1 for count in customer_order_counts.values() if count > 1)
+        }
+
+    def _format_customer_behavior(self, aggregate: Dict[str, Any], intent: Dict) -> Dict[str, Any]:
+        repeat_customers = aggregate["repeat_customers"]
+        total_customers = aggregate["total_customers"]
+        
+        result = {
             "summary": {
                 "total_customers": total_customers,
                 "repeat_customers": repeat_customers,
@@ -176,11 +309,116 @@ class ResultProcessor:
             },
             "calculations": {
                 "average_orders_per_customer": round(
-                    len(orders) / total_customers, 2
+                    aggregate["order_count"] / total_customers, 2
                 ) if total_customers > 0 else 0
             },
             "insights": []
         }
+        if "sketch" in aggregate:
+            # Customer counts came from HyperLogLog / a distinct sample
+            result["summary"]["estimated"] = True
+            result["calculations"]["sketch"] = aggregate["sketch"]
+        return result
+
+    def _process_customer_retention(
+        self,
+        data: Dict[str, Any],
+        intent: Dict
+    ) -> Dict[str, Any]:
+        """Process cohort retention data"""
+        params = self._aggregate_params("customer_retention", intent)
+        return self._format_customer_retention(self._aggregate_customer_retention(data, **params), intent)
+
+    def _aggregate_customer_retention(self, data: Dict[str, Any], **cohorts) -> Dict[str, Any]:
+        # Cohort grouping is vectorized over columns, whatever the payload size
+        return aggregate_customer_retention(ColumnarShopData.from_raw(data).tables, **cohorts)
+
+    def _format_customer_retention(self, aggregate: Dict[str, Any], intent: Dict) -> Dict[str, Any]:
+        total_customers = aggregate["total_customers"]
+        if not total_customers:
+            return self._empty_result()
+        
+        repeat_customers = aggregate["repeat_customers"]
+        retention = aggregate["average_retention"]
+        
+        return {
+            "summary": {
+                "total_customers": total_customers,
+                "repeat_customers": repeat_customers,
+                "repeat_rate": round(repeat_customers / total_customers * 100, 1),
+                "cohort_period": aggregate["cohort_period"],
+                "cohorts": aggregate["cohorts"][-12:],
+                "average_retention": retention
+            },
+            "calculations": {
+                "retention_after_one_period": retention[1] if len(retention) > 1 else None,
+                "period_retention_rate": aggregate["period_retention"],
+                "median_days_between_orders": aggregate["repeat_interval_days"]["median"],
+                "median_days_to_second_order": aggregate["days_to_second_order"]["median"],
+                "repeat_interval_days": aggregate["repeat_interval_days"],
+                "revenue_per_active_customer": aggregate["revenue_per_active_customer"],
+                "expected_active_periods": aggregate["expected_active_periods"],
+                "clv_estimate": aggregate["clv_estimate"],
+                "clv_horizon_months": self.clv_horizon_months
+            },
+            "insights": []
+        }
+
+    def _process_shopifyql_table(
+        self,
+        table: Dict[str, Any],
+        intent: Dict
+    ) -> Dict[str, Any]:
+        """Summarize a tabular ShopifyQL result (rows keyed by column name)"""
+        rows = table.get("rows", [])
+        
+        if not rows:
+            return self._empty_result()
+        
+        columns = [column["name"] for column in table.get("columns", [])]
+        
+        summary = {"rows_returned": len(rows), "columns": columns}
+        calculations = {}
+        
+        revenue_col = next(
+            (c for c in ("total_sales", "net_sales", "gross_sales") if c in columns), None
+        )
+        quantity_col = next(
+            (c for c in ("net_quantity", "ordered_item_quantity", "quantity") if c in columns), None
+        )
+        
+        if revenue_col:
+            summary["total_revenue"] = round(sum(r.get(revenue_col) or 0 for r in rows), 2)
+        if "orders" in columns:
+            summary["total_orders"] = int(sum(r.get("orders") or 0 for r in rows))
+            if revenue_col and summary["total_orders"] > 0:
+                calculations["average_order_value"] = round(
+                    summary["total_revenue"] / summary["total_orders"], 2
+                )
+        
+        if "product_title" in columns:
+            ranked = sorted(
+                rows,
+                key=lambda r: r.get(quantity_col or revenue_col) or 0,
+                reverse=True
+            )
+            summary["top_products"] = [
+                {
+                    "product": r.get("product_title"),
+                    "quantity": r.get(quantity_col, 0) if quantity_col else 0,
+                    "revenue": r.get(revenue_col, 0) if revenue_col else 0
+                }
+                for r in ranked[:5]
+            ]
+            calculations["products_analyzed"] = len(rows)
+        else:
+            summary["rows"] = rows[:20]
+        
+        return {
+            "summary": summary,
+            "calculations": calculations,
+            "insights": []
+        }
 
     def _process_general(self, data: Dict[str, Any], intent: Dict) -> Dict[str, Any]:
         """Fallback processor for general queries"""
@@ -200,22 +438,8 @@ class ResultProcessor:
             "insights": []
         }
 
-    def _get_days_from_period(self, period_str: str) -> int:
-        """Extract number of days from period string"""
-        period_lower = period_str.lower()
-        if "week" in period_lower:
-            weeks = int(''.join(filter(str.isdigit, period_str)) or 1)
-            return weeks * 7
-        elif "month" in period_lower:
-            months = int(''.join(filter(str.isdigit, period_str)) or 1)
-            return months * 30
-        elif "day" in period_lower:
-            return int(''.join(filter(str.isdigit, period_str)) or 30)
-        else:
-            return 30  # default
-
     def _get_projection_days(self, period_str: str) -> int:
         """Get projection period in days"""
         if "next" in period_str.lower():
-            return self._get_days_from_period(period_str.replace("next", ""))
+            return period_to_days(period_str.lower().replace("next", ""))
         return 7  # default to 1 week
@@ -0,0 +1,185 @@
+"""
+Sampling - Approximate answers from a random sample of time slices
+
+When an exact answer would mean downloading millions of orders and the
+caller opted in to approximate answers, QueryExecutor fetches a simple
+random sample of time slices instead of the whole window. Slices are sized
+to hold about one page of orders; a busier slice is still read in full (more
+pages, never a truncated slice).
+
+Each slice is a cluster of orders, so totals are estimated by expanding the
+sampled slice totals by N / n, with a 95% margin from the variance between
+sampled slices (finite population corrected, Student t for the few dozen
+slices a budget usually allows). Ratios such as average order
+value use the linearized ratio estimator. Only numpy is imported, so this
+runs in processing pool workers.
+"""
+
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+# Normal quantile for 95% confidence intervals
+Z_95 = 1.96
+
+Table = Dict[str, np.ndarray]
+
+
+def plan_sample(
+    since: int,
+    until: int,
+    slice_seconds: float,
+    rate: float,
+    min_slices: int = 30,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Pick the time slices of [since, until] to fetch
+
+    Returns:
+        {"since", "slice_seconds", "slices" (N), "sampled" (sorted slice numbers)}
+    """
+    slice_seconds = max(int(slice_seconds), 1)
+    num_slices = max(1, math.ceil((until - since) / slice_seconds))
+    sampled = min(num_slices, max(math.ceil(num_slices * rate), min_slices))
+    chosen = np.random.default_rng(seed).choice(num_slices, size=sampled, replace=False)
+    return {
+        "since": since,
+        "slice_seconds": slice_seconds,
+        "slices": num_slices,
+        "sampled": np.sort(chosen).tolist(),
+    }
+
+
+def slice_ranges(sample: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """Epoch-second ranges to fetch; adjacent sampled slices become one range"""
+    ranges: List[Tuple[int, int]] = []
+    width = sample["slice_seconds"]
+    for index in sample["sampled"]:
+        start = sample["since"] + index * width
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], start + width)
+        else:
+            ranges.append((start, start + width))
+    return ranges
+
+
+def t_95(df: int) -> float:
+    """Student t quantile for 95% intervals (Cornish-Fisher expansion around Z_95)"""
+    z = Z_95
+    return z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+
+
+def expand_total(totals: np.ndarray, num_slices: int) -> Tuple[float, float]:
+    """Population total and its 95% margin from per-sampled-slice totals"""
+    sampled = len(totals)
+    if not sampled:
+        return 0.0, 0.0
+    estimate = num_slices * float(totals.mean())
+    if sampled >= num_slices:
+        return estimate, 0.0
+    if sampled < 2:
+        return estimate, math.inf
+    variance = num_slices ** 2 * (1 - sampled / num_slices) * float(totals.var(ddof=1)) / sampled
+    return estimate, t_95(sampled - 1) * math.sqrt(variance)
+
+
+def ratio_estimate(numerator: np.ndarray, denominator: np.ndarray, num_slices: int) -> Tuple[float, float]:
+    """Ratio of two totals (e.g. revenue per order) and its 95% margin"""
+    sampled = len(numerator)
+    if not sampled or not denominator.sum():
+        return 0.0, 0.0
+    ratio = float(numerator.sum() / denominator.sum())
+    if sampled >= num_slices:
+        return ratio, 0.0
+    if sampled < 2:
+        return ratio, math.inf
+    residuals = numerator - ratio * denominator
+    variance = (1 - sampled / num_slices) * float(residuals.var(ddof=1)) / (sampled * float(denominator.mean()) ** 2)
+    return ratio, t_95(sampled - 1) * math.sqrt(variance)
+
+
+def estimate_sales_analysis(tables: Dict[str, Table], sample: Dict[str, Any], top: int = 5) -> Dict[str, Any]:
+    """
+    sales_analysis aggregate of the whole window, estimated from sampled
+    slices: the same keys as aggregate_sales_analysis, plus "margins" and
+    per-product "quantity_margin" / "revenue_margin" (95%), and "sampling"
+    """
+    orders = tables.get("orders") or {}
+    sales = tables.get("sales") or {}
+    products = tables.get("products") or {}
+    sampled = np.asarray(sample["sampled"], dtype=np.int64)
+    num_slices, slots = sample["slices"], len(sampled)
+    empty = np.array([], dtype=np.int64)
+
+    def slot_of(created: np.ndarray) -> np.ndarray:
+        # Position of each row's slice among the sampled slices
+        return np.searchsorted(sampled, (created - sample["since"]) // sample["slice_seconds"])
+
+    order_slot = slot_of(orders.get("created_at", empty))
+    order_counts = np.bincount(order_slot, minlength=slots).astype(np.float64)
+    revenue = np.bincount(order_slot, weights=orders.get("total_price"), minlength=slots)
+    total_orders, orders_margin = expand_total(order_counts, num_slices)
+    total_revenue, revenue_margin = expand_total(revenue, num_slices)
+    _, average_margin = ratio_estimate(revenue, order_counts, num_slices)
+
+    # Same ranking as the exact aggregate: by quantity, ties by first appearance
+    product_ids, first_seen, inverse = np.unique(
+        sales.get("product_id", empty), return_index=True, return_inverse=True
+    )
+    quantity = np.bincount(inverse, weights=sales.get("quantity"), minlength=len(product_ids))
+    by_appearance = np.argsort(first_seen, kind="stable")
+    ranked = by_appearance[np.argsort(-quantity[by_appearance], kind="stable")[:top]]
+
+    # Per-slice totals of the top products only
+    rank_of = np.full(len(product_ids), -1, dtype=np.int64)
+    rank_of[ranked] = np.arange(len(ranked))
+    rows = rank_of[inverse]
+    keep = rows >= 0
+    cells = rows[keep] * slots + slot_of(sales.get("created_at", empty))[keep]
+    size = len(ranked) * slots
+    slice_units = np.bincount(cells, weights=sales["quantity"][keep], minlength=size).reshape(-1, slots) \
+        if len(ranked) else np.zeros((0, slots))
+    slice_gross = np.bincount(cells, weights=sales["gross"][keep], minlength=size).reshape(-1, slots) \
+        if len(ranked) else np.zeros((0, slots))
+
+    titles = {}
+    if products:
+        titles = dict(zip(products["product_id"].tolist(), list(products["title"])))
+
+    top_products = []
+    for rank, index in enumerate(ranked.tolist()):
+        units, units_margin = expand_total(slice_units[rank], num_slices)
+        gross, gross_margin = expand_total(slice_gross[rank], num_slices)
+        product_id = int(product_ids[index])
+        top_products.append({
+            "product": titles.get(product_id, f"Product {product_id}"),
+            "quantity": int(round(units)),
+            "revenue": gross,
+            "quantity_margin": int(math.ceil(units_margin)) if math.isfinite(units_margin) else None,
+            "revenue_margin": round(gross_margin, 2) if math.isfinite(gross_margin) else None,
+        })
+
+    return {
+        "total_orders": int(round(total_orders)),
+        "total_revenue": total_revenue,
+        "top_products": top_products,
+        # Products seen in the sample - a lower bound for the window
+        "products_analyzed": len(product_ids),
+        "margins": {
+            "total_orders": orders_margin,
+            "total_revenue": revenue_margin,
+            "average_order_value": average_margin,
+        },
+        "sampling": {
+            "rate": round(slots / num_slices, 4),
+            "slices_sampled": slots,
+            "slices": num_slices,
+            "orders_sampled": len(order_slot),
+            # Widest relative 95% margin of the headline totals
+            "relative_error": round(max(orders_margin / total_orders, revenue_margin / total_revenue), 4)
+            if total_orders and total_revenue else None,
+        },
+    }
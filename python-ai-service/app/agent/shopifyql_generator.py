@@ -3,10 +3,37 @@ ShopifyQL Generator - Step 3 of agent workflow
 Generates ShopifyQL queries from the plan
 """
 
+import logging
+import re
 from typing import Dict, Any
 from app.llm.client import LLMClient
 
 
+logger = logging.getLogger(__name__)
+
+
+# Datasets ShopifyQL can be queried FROM
+SHOPIFYQL_TABLES = ["sales", "orders", "products", "customers", "inventory"]
+
+# Intents whose answer is fully expressible as a ShopifyQL aggregation
+# (inventory projections need live inventory levels, repeat-customer
+# rates need per-customer order counts)
+SHOPIFYQL_INTENTS = ["sales_analysis", "top_products"]
+
+# Intents answerable from daily rollups (per-day and per-product-day totals)
+# rather than line items, once the window is long (see QueryExecutor)
+ROLLUP_INTENTS = ["sales_analysis", "top_products", "inventory_projection", "reorder_recommendations"]
+
+# Intents whose totals can be estimated from a sample of time slices
+APPROXIMATE_INTENTS = ["sales_analysis", "top_products"]
+
+# Resources QueryExecutor knows how to fetch
+SUPPORTED_RESOURCES = ["orders", "products", "inventory_levels", "customers"]
+
+# Keywords that only appear in SQL, never in ShopifyQL
+SQL_ONLY_KEYWORDS = ["SELECT", "JOIN", "INSERT", "UPDATE", "DELETE", "DROP", "UNION"]
+
+
 class ShopifyQLGenerator:
     """
     Generates ShopifyQL queries and converts them to API-compatible query specifications
@@ -26,6 +53,10 @@ class ShopifyQLGenerator:
         Returns:
             {
                 "shopifyql": str,
+                "shopifyql_valid": bool,
+                "shopifyql_executable": bool,
+                "rollup_eligible": bool,
+                "approximable": bool,
                 "api_calls": List[Dict],
                 "filters": Dict,
                 "aggregations": List[str]
@@ -45,8 +76,16 @@ class ShopifyQLGenerator:
         # Extract any filters from intent
         filters = self._extract_filters(intent)
         
+        shopifyql_valid = self.validate_shopifyql(shopifyql)
+        
         return {
             "shopifyql": shopifyql,
+            "shopifyql_valid": shopifyql_valid,
+            "shopifyql_executable": (
+                shopifyql_valid and intent.get("intent") in SHOPIFYQL_INTENTS
+            ),
+            "rollup_eligible": intent.get("intent") in ROLLUP_INTENTS,
+            "approximable": intent.get("intent") in APPROXIMATE_INTENTS,
             "api_calls": api_calls,
             "filters": filters,
             "aggregations": self._determine_aggregations(intent),
@@ -63,6 +102,10 @@ class ShopifyQLGenerator:
         api_calls = []
         
         for resource in resources:
+            if resource not in SUPPORTED_RESOURCES:
+                logger.info("Skipping unsupported resource in plan: %s", resource)
+                continue
+            
             call = {
                 "resource": resource,
                 "method": "list",  # GET list of resources
@@ -103,6 +146,7 @@ class ShopifyQLGenerator:
             "sales_analysis": ["sum", "count", "average"],
             "top_products": ["sum", "count", "rank"],
             "customer_behavior": ["count", "frequency"],
+            "customer_retention": ["cohort", "retention", "lifetime_value"],
             "reorder_recommendations": ["average", "projection"]
         }
         
@@ -119,7 +163,33 @@ class ShopifyQLGenerator:
         
         # Check each API call is well-formed
         for call in query_spec["api_calls"]:
-            if "resource" not in call:
+            if call.get("resource") not in SUPPORTED_RESOURCES:
+                return False
+            if not isinstance(call.get("filters", {}), dict):
                 return False
         
         return True
+
+    def validate_shopifyql(self, shopifyql: str) -> bool:
+        """
+        Check that a ShopifyQL string is well-formed enough to send upstream:
+        FROM <dataset> SHOW <columns> ..., read-only, single statement
+        """
+        if not shopifyql:
+            return False
+        
+        query = " ".join(shopifyql.split())
+        upper = query.upper()
+        
+        if ";" in query:
+            return False
+        
+        for keyword in SQL_ONLY_KEYWORDS:
+            if re.search(rf"\b{keyword}\b", upper):
+                return False
+        
+        match = re.match(r"^FROM\s+(\w+)\s+SHOW\s+\S", query, re.IGNORECASE)
+        if not match:
+            return False
+        
+        return match.group(1).lower() in SHOPIFYQL_TABLES
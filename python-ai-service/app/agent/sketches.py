@@ -0,0 +1,293 @@
+"""
+Sketches - Bounded-memory aggregates for very large payloads
+
+The exact aggregates keep state per key (every customer, every product),
+which grows with the shop. In sketch mode, records are streamed through in
+chunks and folded into fixed-size summaries instead:
+
+- HyperLogLog: distinct customers (and products); relative standard error
+  1.04 / sqrt(2^precision), 0.8% at the default 16 KB
+- Space-Saving: top products by units; k counters, each count overestimates
+  the true one by at most its recorded error, itself <= total units / k
+- Count-Min: revenue of the reported products; overestimates by at most
+  e / width * total revenue, with probability 1 - e^-depth
+- Bottom-k distinct sample: the k customers with the smallest hashes and
+  their exact order counts, so the share of repeat customers is estimated
+  from a uniform sample of customers (binomial error sqrt(p(1-p)/k))
+
+Updates are vectorized per chunk, and memory stays fixed however many
+orders stream through (see ProcessingPool.sketch). Only numpy is imported.
+"""
+
+import math
+from typing import Dict, Any, Iterable, Tuple
+
+import numpy as np
+
+
+Table = Dict[str, np.ndarray]
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash64(keys: np.ndarray, seed: int = 0) -> np.ndarray:
+    """splitmix64 finalizer over int64 keys (wrapping uint64 arithmetic)"""
+    with np.errstate(over="ignore"):
+        x = np.asarray(keys, dtype=np.int64).view(np.uint64) + _GOLDEN * np.uint64(seed + 1)
+        x = (x ^ (x >> np.uint64(30))) * _MIX_1
+        x = (x ^ (x >> np.uint64(27))) * _MIX_2
+        return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Bits needed for each uint64 (0 for 0), exact: halves fit a float64"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """Distinct count of int64 keys in 2^precision one-byte registers"""
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def nbytes(self) -> int:
+        return self.registers.nbytes
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, keys: np.ndarray):
+        if not len(keys):
+            return
+        hashes = hash64(keys)
+        width = 64 - self.precision
+        buckets = (hashes >> np.uint64(width)).astype(np.int64)
+        rest = hashes & np.uint64((1 << width) - 1)
+        ranks = (width - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def count(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and zeros:
+            # Small range: linear counting over empty registers
+            return m * math.log(m / zeros)
+        return estimate
+
+
+class CountMinSketch:
+    """Per-key sums of int64 keys in a depth x width table; never underestimates"""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.table = np.zeros((depth, width))
+        self.total = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    @property
+    def epsilon(self) -> float:
+        """Overestimate bound, as a share of the total"""
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        """Probability a query exceeds the bound"""
+        return math.exp(-len(self.table))
+
+    def add(self, keys: np.ndarray, weights: np.ndarray):
+        self.total += float(np.sum(weights))
+        for row in range(len(self.table)):
+            cells = (hash64(keys, seed=row) % np.uint64(self.width)).astype(np.int64)
+            self.table[row] += np.bincount(cells, weights=weights, minlength=self.width)
+
+    def query(self, keys: np.ndarray) -> np.ndarray:
+        estimates = [
+            self.table[row][(hash64(keys, seed=row) % np.uint64(self.width)).astype(np.int64)]
+            for row in range(len(self.table))
+        ]
+        return np.min(estimates, axis=0)
+
+
+class SpaceSaving:
+    """
+    Heavy hitters among int64 keys with k counters
+
+    Chunks are merged as weighted Space-Saving updates: keys not monitored
+    enter at the current minimum counter (recorded as their error), and
+    the k largest counters are kept.
+    """
+
+    def __init__(self, k: int = 1000):
+        self.k = k
+        self.keys = np.array([], dtype=np.int64)
+        self.counts = np.array([], dtype=np.float64)
+        self.errors = np.array([], dtype=np.float64)
+        self.total = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.counts.nbytes + self.errors.nbytes
+
+    def add(self, keys: np.ndarray, weights: np.ndarray):
+        if not len(keys):
+            return
+        self.total += float(np.sum(weights))
+        chunk_keys, codes = np.unique(keys, return_inverse=True)
+        sums = np.bincount(codes.reshape(-1), weights=weights, minlength=len(chunk_keys))
+
+        # self.keys is sorted: monitored keys add to their counters
+        positions = np.minimum(np.searchsorted(self.keys, chunk_keys), max(len(self.keys) - 1, 0))
+        monitored = self.keys[positions] == chunk_keys if len(self.keys) else np.zeros(len(chunk_keys), bool)
+        counts = self.counts.copy()
+        np.add.at(counts, positions[monitored], sums[monitored])
+
+        floor = float(self.counts.min()) if len(self.keys) >= self.k else 0.0
+        keys = np.concatenate([self.keys, chunk_keys[~monitored]])
+        counts = np.concatenate([counts, sums[~monitored] + floor])
+        errors = np.concatenate([self.errors, np.full(int((~monitored).sum()), floor)])
+        if len(keys) > self.k:
+            keep = np.argpartition(-counts, self.k - 1)[:self.k]
+            keys, counts, errors = keys[keep], counts[keep], errors[keep]
+        order = np.argsort(keys)
+        self.keys, self.counts, self.errors = keys[order], counts[order], errors[order]
+
+    def top(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Keys, counts (upper bounds) and errors of the n largest counters"""
+        order = np.argsort(-self.counts, kind="stable")[:n]
+        return self.keys[order], self.counts[order], self.errors[order]
+
+
+class BottomK:
+    """Uniform sample of distinct int64 keys (the k smallest hashes), with exact counts"""
+
+    def __init__(self, k: int = 4096):
+        self.k = k
+        self.hashes = np.array([], dtype=np.uint64)
+        self.counts = np.array([], dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return self.hashes.nbytes + self.counts.nbytes
+
+    def add(self, keys: np.ndarray):
+        hashes = hash64(keys)
+        if len(self.hashes) >= self.k:
+            # Only keys hashing below the current k-th smallest can get in
+            hashes = hashes[hashes <= self.hashes[-1]]
+        merged, codes = np.unique(np.concatenate([self.hashes, hashes]), return_inverse=True)
+        codes = codes.reshape(-1)
+        counts = np.bincount(codes[len(self.hashes):], minlength=len(merged))
+        counts[codes[:len(self.hashes)]] += self.counts
+        self.hashes, self.counts = merged[:self.k], counts[:self.k]
+
+    def share(self, minimum: int) -> Tuple[float, float]:
+        """Share of distinct keys seen at least `minimum` times, and its standard error"""
+        if not len(self.counts):
+            return 0.0, 0.0
+        share = float((self.counts >= minimum).mean())
+        # Exact once every distinct key fits in the sample
+        if len(self.counts) < self.k:
+            return share, 0.0
+        return share, math.sqrt(share * (1 - share) / len(self.counts))
+
+
+def stream_sales_analysis(
+    chunks: Iterable[Dict[str, Table]],
+    titles: Dict[int, str],
+    top: int = 5,
+    counters: int = 1000,
+    width: int = 32768,
+    precision: int = 12
+) -> Dict[str, Any]:
+    """sales_analysis aggregate from chunks of orders / line items, in bounded memory"""
+    heavy = SpaceSaving(counters)
+    revenue = CountMinSketch(width)
+    products = HyperLogLog(precision)
+    order_count, total_revenue = 0, 0.0
+    for tables in chunks:
+        orders = tables.get("orders") or {}
+        sales = tables.get("sales") or {}
+        if orders:
+            order_count += len(orders["order_id"])
+            total_revenue += float(orders["total_price"].sum())
+        if sales:
+            heavy.add(sales["product_id"], sales["quantity"].astype(np.float64))
+            revenue.add(sales["product_id"], sales["gross"])
+            products.add(sales["product_id"])
+
+    product_ids, units, errors = heavy.top(top)
+    product_revenue = revenue.query(product_ids)
+    sketches = [heavy, revenue, products]
+    return {
+        "total_orders": order_count,
+        "total_revenue": total_revenue,
+        "top_products": [
+            {
+                "product": titles.get(product_id, f"Product {product_id}"),
+                "quantity": int(units[i]),
+                "revenue": float(product_revenue[i]),
+                # Counts are upper bounds; the true count is at least count - error
+                "quantity_error": int(errors[i]),
+            }
+            for i, product_id in enumerate(product_ids.tolist())
+        ],
+        "products_analyzed": int(round(products.count())),
+        "sketch": {
+            "memory_bytes": sum(sketch.nbytes for sketch in sketches),
+            "top_units_max_overcount": round(heavy.total / counters, 1),
+            "revenue_max_overcount": round(revenue.epsilon * revenue.total, 2),
+            "revenue_bound_probability": round(1 - revenue.delta, 4),
+            "distinct_relative_error": round(products.relative_error, 4),
+        },
+    }
+
+
+def stream_customer_behavior(
+    chunks: Iterable[Dict[str, Table]],
+    precision: int = 14,
+    sample_size: int = 4096
+) -> Dict[str, Any]:
+    """customer_behavior aggregate from chunks of orders, in bounded memory"""
+    customers = HyperLogLog(precision)
+    sample = BottomK(sample_size)
+    order_count = 0
+    for tables in chunks:
+        orders = tables.get("orders") or {}
+        if not orders:
+            continue
+        order_count += len(orders["order_id"])
+        # Guest orders (no customer) don't count towards customers
+        known = orders["customer_id"][orders["customer_id"] > 0]
+        customers.add(known)
+        sample.add(known)
+
+    total = customers.count() if len(sample.counts) >= sample.k else float(len(sample.counts))
+    repeat_share, repeat_error = sample.share(2)
+    return {
+        "order_count": order_count,
+        "total_customers": int(round(total)),
+        "repeat_customers": int(round(total * repeat_share)),
+        "sketch": {
+            "memory_bytes": customers.nbytes + sample.nbytes,
+            "distinct_relative_error": round(customers.relative_error, 4) if len(sample.counts) >= sample.k else 0.0,
+            "repeat_share_error": round(repeat_error, 4),
+        },
+    }
+
+
+SKETCHES = {
+    "sales_analysis": stream_sales_analysis,
+    "customer_behavior": stream_customer_behavior,
+}
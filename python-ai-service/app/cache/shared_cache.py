@@ -0,0 +1,428 @@
+"""
+Shared Cache - Key/value cache shared by every uvicorn worker on a host
+
+In-process caches are cold and duplicated per worker. SharedCache is the
+interface the service caches against; backends:
+
+    SHARED_CACHE_BACKEND=sqlite   # one SQLite file in WAL mode, shared by all
+                                  # workers on the host (default)
+    SHARED_CACHE_BACKEND=memory   # this process only (tests, single worker)
+    SHARED_CACHE_BACKEND=off      # nothing is stored
+
+A networked backend (e.g. Redis) only has to implement _load, _store,
+_delete, _acquire and _release. Entries have a TTL, the cache is capped at
+SHARED_CACHE_MAX_MB (least recently used entries go first), and
+get_or_compute runs the computation at most once per key across all
+workers: the first caller takes a short lease and the others wait for its
+value.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.telemetry.metrics import get_registry
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = get_registry().counter(
+    "shared_cache_requests_total",
+    "Shared cache lookups: hit, miss (computed here) or coalesced (computed elsewhere)",
+    ("namespace", "outcome")
+)
+
+_MISSING = object()
+
+
+class SharedCache:
+    """
+    Base cache: TTL'd pickled values plus get-or-compute with a cross-worker lease
+
+    Args:
+        default_ttl: Seconds an entry lives when set() is not given a ttl
+        lease_ttl: Seconds a computing worker holds a key before others may take over
+        poll_interval: Seconds between checks while another worker computes
+    """
+
+    def __init__(self, default_ttl: float = 3600.0, lease_ttl: float = 30.0, poll_interval: float = 0.02):
+        self.default_ttl = default_ttl
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Coroutines of this worker waiting on the same key share one future
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        payload = self._load(key, time.time())
+        return default if payload is None else pickle.loads(payload)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store(key, payload, time.time() + (ttl if ttl is not None else self.default_ttl))
+
+    def delete(self, key: str):
+        self._delete(key)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        namespace: str = "default"
+    ) -> Any:
+        """
+        Cached value for key, or the result of compute() stored under it
+
+        Only one caller across all workers runs compute() for a missing key;
+        the rest wait for its value. If the owner fails or its lease runs
+        out, the next waiter computes instead. Exceptions are not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            CACHE_REQUESTS.inc(namespace=namespace, outcome="hit")
+            return value
+
+        while key in self._inflight:
+            inflight = self._inflight[key]
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The computing coroutine was cancelled, not us: take over
+                if inflight.cancelled():
+                    continue
+                raise
+            CACHE_REQUESTS.inc(namespace=namespace, outcome="coalesced")
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value, outcome = await self._compute_once(key, compute, ttl)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't leave the exception unretrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        CACHE_REQUESTS.inc(namespace=namespace, outcome=outcome)
+        future.set_result(value)
+        return value
+
+    async def _compute_once(self, key: str, compute, ttl) -> Tuple[Any, str]:
+        while True:
+            if self._acquire(key, self.owner, time.time() + self.lease_ttl):
+                try:
+                    # The previous owner may have finished between our miss and the lease
+                    value = self.get(key, _MISSING)
+                    if value is not _MISSING:
+                        return value, "coalesced"
+                    value = await compute()
+                    self.set(key, value, ttl)
+                    return value, "miss"
+                finally:
+                    self._release(key, self.owner)
+
+            await asyncio.sleep(self.poll_interval)
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value, "coalesced"
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+    # Backend primitives
+
+    def _load(self, key: str, now: float) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _store(self, key: str, payload: bytes, expires_at: float):
+        raise NotImplementedError
+
+    def _delete(self, key: str):
+        raise NotImplementedError
+
+    def _acquire(self, key: str, owner: str, lease_until: float) -> bool:
+        """Take the compute lease for key unless a live lease is held by someone else"""
+        raise NotImplementedError
+
+    def _release(self, key: str, owner: str):
+        raise NotImplementedError
+
+
+class SQLiteCache(SharedCache):
+    """
+    SharedCache in a SQLite file (WAL), shared by every process that opens it
+
+    Reads never block on writers. Each thread gets its own connection;
+    statements are single-row and take well under a millisecond, so they
+    run inline on the event loop.
+    """
+
+    # Hits refresh an entry's LRU position at most this often, keeping reads write-free
+    TOUCH_INTERVAL = 30.0
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, lease_until REAL)")
+            # Running byte total, so writes don't have to sum the table
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('bytes', 0)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, key: str, now: float) -> Optional[bytes]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        if now - row[2] > self.TOUCH_INTERVAL:
+            try:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.OperationalError:
+                # Busy writers; the LRU position can wait for the next hit
+                pass
+        return row[0]
+
+    def _store(self, key: str, payload: bytes, expires_at: float):
+        if len(payload) > self.max_bytes:
+            logger.warning("Not caching %s: %d bytes is over the cache size limit", key, len(payload))
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), expires_at, now)
+            )
+            total = self._add_bytes(conn, len(payload) - (row[0] if row else 0))
+            if total > self.max_bytes:
+                self._evict(conn, total, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection, total: int, now: float):
+        """Drop expired entries, then least recently used ones, down to 90% of the cap"""
+        target = int(self.max_bytes * 0.9)
+        freed = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE expires_at <= ?", (now,)).fetchone()[0]
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = self._add_bytes(conn, -freed)
+
+        while total > target:
+            rows = conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= target:
+                    break
+            conn.execute("UPDATE meta SET value = ? WHERE name = 'bytes'", (total,))
+
+    def _add_bytes(self, conn: sqlite3.Connection, delta: int) -> int:
+        conn.execute("UPDATE meta SET value = value + ? WHERE name = 'bytes'", (delta,))
+        return conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _delete(self, key: str):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._add_bytes(conn, -row[0])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _acquire(self, key: str, owner: str, lease_until: float) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Take over leases whose owner died or overran
+            conn.execute("DELETE FROM leases WHERE key = ? AND lease_until <= ?", (key, time.time()))
+            acquired = conn.execute(
+                "INSERT OR IGNORE INTO leases VALUES (?, ?, ?)", (key, owner, lease_until)
+            ).rowcount == 1
+            conn.execute("COMMIT")
+            return acquired
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _release(self, key: str, owner: str):
+        self._conn().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM entries WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        size = conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class MemoryCache(SharedCache):
+    """SharedCache in this process's memory: LRU with a byte cap"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _load(self, key: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _store(self, key: str, payload: bytes, expires_at: float):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (payload, expires_at)
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._pop(key)
+
+    def _acquire(self, key: str, owner: str, lease_until: float) -> bool:
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[0] != owner and lease[1] > time.time():
+                return False
+            self._leases[key] = (owner, lease_until)
+            return True
+
+    def _release(self, key: str, owner: str):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == owner:
+                del self._leases[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class NullCache(SharedCache):
+    """SHARED_CACHE_BACKEND=off: every lookup misses and nothing is kept"""
+
+    def _load(self, key: str, now: float) -> Optional[bytes]:
+        return None
+
+    def _store(self, key: str, payload: bytes, expires_at: float):
+        pass
+
+    def _delete(self, key: str):
+        pass
+
+    def _acquire(self, key: str, owner: str, lease_until: float) -> bool:
+        return True
+
+    def _release(self, key: str, owner: str):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "off"}
+
+
+def build_shared_cache() -> SharedCache:
+    """Cache backend from SHARED_CACHE_BACKEND / _PATH / _MAX_MB / _TTL"""
+    backend = os.getenv("SHARED_CACHE_BACKEND", "sqlite").lower()
+    max_bytes = int(float(os.getenv("SHARED_CACHE_MAX_MB", "256")) * 1024 * 1024)
+    ttl = float(os.getenv("SHARED_CACHE_TTL", "3600"))
+
+    if backend == "off":
+        return NullCache(default_ttl=ttl)
+    if backend == "memory":
+        return MemoryCache(max_bytes=max_bytes, default_ttl=ttl)
+    if backend != "sqlite":
+        raise ValueError(f"Unsupported SHARED_CACHE_BACKEND: {backend}")
+
+    path = os.getenv("SHARED_CACHE_PATH", "./data/shared_cache.db")
+    try:
+        return SQLiteCache(path, max_bytes=max_bytes, default_ttl=ttl)
+    except sqlite3.Error as e:
+        logger.warning("Shared cache at %s unavailable, using an in-process cache: %s", path, e)
+        return MemoryCache(max_bytes=max_bytes, default_ttl=ttl)
+
+
+# Singleton instance
+_shared_cache = None
+
+
+def get_shared_cache() -> SharedCache:
+    """Get singleton shared cache"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = build_shared_cache()
+    return _shared_cache
@@ -0,0 +1,141 @@
+"""
+Token Budget - Per-store LLM usage ledger and budget tiers
+
+Every finished request adds its LLM calls to the ledger under its store.
+Before a request runs, the store's usage for the current UTC day picks a
+tier:
+
+    standard   under LLM_STORE_TOKEN_BUDGET - the configured model
+    economy    over the budget - LLM_ECONOMY_MODEL (cheaper, faster)
+    local      over LLM_STORE_TOKEN_LIMIT - no LLM calls; keyword intent,
+               fallback plan and template explanation
+
+A budget of 0 (the default) disables tiering; usage is still recorded.
+"""
+
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+
+TIERS = ("standard", "economy", "local")
+
+# Economy model per provider when LLM_ECONOMY_MODEL is not set
+ECONOMY_MODELS = {
+    "openai": "gpt-4o-mini",
+    "gemini": "gemini-1.5-flash",
+}
+
+
+class BudgetExceededError(Exception):
+    """Raised instead of calling the LLM when a store is in the local tier"""
+
+
+def economy_model(provider: str, default: str) -> str:
+    return os.getenv("LLM_ECONOMY_MODEL") or ECONOMY_MODELS.get(provider, default)
+
+
+def _usage() -> Dict[str, float]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+
+def _add(usage: Dict[str, float], call: Dict[str, Any]):
+    usage["calls"] += 1
+    usage["prompt_tokens"] += call.get("prompt_tokens", 0)
+    usage["completion_tokens"] += call.get("completion_tokens", 0)
+    usage["cost_usd"] += call.get("cost_usd", 0.0)
+
+
+class TokenLedger:
+    """Thread-safe LLM usage totals per store, per day and per agent step"""
+
+    def __init__(self, daily_budget: int = 0, daily_limit: int = 0):
+        self.daily_budget = daily_budget
+        # Hard limit defaults to twice the budget, leaving room for the economy tier
+        self.daily_limit = daily_limit or daily_budget * 2
+        self._lock = threading.Lock()
+        # store -> {"day": date, "today": usage, "total": usage, "steps": {step: usage}}
+        self._stores: Dict[str, Dict[str, Any]] = {}
+
+    def record_request(self, store_id: str, llm_calls: List[Dict[str, Any]]):
+        """Add one request's LLM calls to its store"""
+        if not llm_calls:
+            return
+        today = _today()
+        with self._lock:
+            store = self._stores.get(store_id)
+            if store is None:
+                store = self._stores[store_id] = {
+                    "day": today,
+                    "today": _usage(),
+                    "total": _usage(),
+                    "steps": defaultdict(_usage)
+                }
+            if store["day"] != today:
+                store["day"], store["today"] = today, _usage()
+            for call in llm_calls:
+                _add(store["today"], call)
+                _add(store["total"], call)
+                _add(store["steps"][call.get("step") or "none"], call)
+
+    def tokens_today(self, store_id: str) -> int:
+        with self._lock:
+            store = self._stores.get(store_id)
+            if store is None or store["day"] != _today():
+                return 0
+            return int(store["today"]["prompt_tokens"] + store["today"]["completion_tokens"])
+
+    def tier(self, store_id: str) -> str:
+        if not self.daily_budget:
+            return "standard"
+        used = self.tokens_today(store_id)
+        if used >= self.daily_limit:
+            return "local"
+        if used >= self.daily_budget:
+            return "economy"
+        return "standard"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Usage per store (today, all time, by step) for the /usage endpoint"""
+        with self._lock:
+            stores = {
+                store_id: {
+                    "day": store["day"],
+                    "today": _rounded(store["today"]),
+                    "total": _rounded(store["total"]),
+                    "by_step": {step: _rounded(usage) for step, usage in store["steps"].items()}
+                }
+                for store_id, store in self._stores.items()
+            }
+        for store_id, store in stores.items():
+            store["tier"] = self.tier(store_id)
+        return {
+            "daily_budget_tokens": self.daily_budget,
+            "daily_limit_tokens": self.daily_limit,
+            "stores": stores
+        }
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _rounded(usage: Dict[str, float]) -> Dict[str, float]:
+    return {**usage, "cost_usd": round(usage["cost_usd"], 6)}
+
+
+# Singleton instance
+_ledger = None
+
+
+def get_ledger() -> TokenLedger:
+    """Get singleton token ledger"""
+    global _ledger
+    if _ledger is None:
+        _ledger = TokenLedger(
+            daily_budget=int(os.getenv("LLM_STORE_TOKEN_BUDGET", "0")),
+            daily_limit=int(os.getenv("LLM_STORE_TOKEN_LIMIT", "0"))
+        )
+    return _ledger
@@ -1,43 +1,84 @@
 import os
-from typing import Optional
-from openai import OpenAI
+import time
+from typing import Optional, Dict, Tuple
+
+from app.llm.budget import BudgetExceededError, economy_model
+from app.telemetry.timing import record_llm_call, current_timings
+from app.telemetry.tracing import span
+
+
+# Model used when a provider is configured without one
+DEFAULT_MODELS = {
+    "openai": "gpt-4",
+    "gemini": "gemini-pro",
+}
 
 
 class LLMClient:
     """
     Unified LLM client supporting multiple providers (OpenAI, Claude, Gemini)
+    
+    Defaults to LLM_PROVIDER / LLM_MODEL; pass provider and model to build
+    additional backends (see MultiProviderLLMClient).
     """
     
-    def __init__(self):
-        self.provider = os.getenv("LLM_PROVIDER", "openai").lower()
-        self.model = os.getenv("LLM_MODEL", "gpt-4")
+    def __init__(self, provider: Optional[str] = None, model: Optional[str] = None):
+        env_provider = os.getenv("LLM_PROVIDER", "openai").lower()
+        self.provider = (provider or env_provider).lower()
+        if model:
+            self.model = model
+        elif self.provider == env_provider:
+            self.model = os.getenv("LLM_MODEL", "gpt-4")
+        else:
+            self.model = DEFAULT_MODELS.get(self.provider, "gpt-4")
         self.temperature = float(os.getenv("LLM_TEMPERATURE", "0.7"))
         self.max_tokens = int(os.getenv("LLM_MAX_TOKENS", "2000"))
         
-        # Initialize client based on provider
+        if self.provider not in ("openai", "gemini"):
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        if self.provider == "gemini" and self.model in ["gpt-4", "gpt-3.5-turbo"]:
+            # Default to gemini-pro if not specified
+            self.model = "gemini-pro"
+        
+        # The SDK is imported and configured on first use (or warm_up), so a
+        # missing key or package doesn't stop the service from starting
+        self._client = None
+        
+        # Used for stores over their daily token budget
+        self.economy_model = economy_model(self.provider, self.model)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
         if self.provider == "openai":
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OPENAI_API_KEY not set in environment")
-            self.client = OpenAI(api_key=api_key)
-        elif self.provider == "gemini":
-            try:
-                import google.generativeai as genai
-                api_key = os.getenv("GOOGLE_API_KEY")
-                if not api_key:
-                    raise ValueError("GOOGLE_API_KEY not set in environment")
-                genai.configure(api_key=api_key)
-                # Default to gemini-pro if not specified
-                if self.model in ["gpt-4", "gpt-3.5-turbo"]:
-                    self.model = "gemini-pro"
-                self.client = genai
-            except ImportError:
-                raise ValueError(
-                    "google-generativeai package not installed. "
-                    "Run: pip install google-generativeai"
-                )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+            from openai import AsyncOpenAI
+            # Retries and timeouts are handled by ResilientLLMClient
+            return AsyncOpenAI(api_key=api_key, max_retries=0)
+        
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not set in environment")
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            raise ValueError(
+                "google-generativeai package not installed. "
+                "Run: pip install google-generativeai"
+            )
+        genai.configure(api_key=api_key)
+        return genai
+
+    def warm_up(self):
+        """Import and configure the provider SDK now rather than on the first call"""
+        if self.is_available():
+            self.client
 
     async def generate(
         self, 
@@ -58,20 +99,43 @@ class LLMClient:
         """
         temp = temperature if temperature is not None else self.temperature
         
-        if self.provider == "openai":
-            return await self._generate_openai(prompt, system_prompt, temp)
-        elif self.provider == "gemini":
-            return await self._generate_gemini(prompt, system_prompt, temp)
-        else:
-            raise ValueError(f"Unsupported provider: {self.provider}")
+        timings = current_timings()
+        tier = timings.tier if timings else "standard"
+        if tier == "local":
+            raise BudgetExceededError("Store is over its daily LLM token limit")
+        model = self.economy_model if tier == "economy" else self.model
+        
+        with span(
+            "llm.generate",
+            provider=self.provider,
+            model=model,
+            step=timings.current_step if timings else "",
+            prompt_chars=len(prompt) + len(system_prompt or "")
+        ) as llm_span:
+            start = time.perf_counter()
+            try:
+                if self.provider == "openai":
+                    result, usage = await self._generate_openai(prompt, system_prompt, temp, model)
+                elif self.provider == "gemini":
+                    result, usage = await self._generate_gemini(prompt, system_prompt, temp, model)
+                else:
+                    raise ValueError(f"Unsupported provider: {self.provider}")
+            except Exception:
+                record_llm_call(self.provider, model, time.perf_counter() - start, error=True)
+                raise
+            
+            record_llm_call(self.provider, model, time.perf_counter() - start, **usage)
+            llm_span.set_attributes({"response_chars": len(result), **usage})
+        return result
 
     async def _generate_openai(
         self, 
         prompt: str, 
         system_prompt: Optional[str],
-        temperature: float
-    ) -> str:
-        """Generate using OpenAI API"""
+        temperature: float,
+        model: str
+    ) -> Tuple[str, Dict[str, int]]:
+        """Generate using OpenAI API; returns the text and its token usage"""
         messages = []
         
         if system_prompt:
@@ -80,32 +144,37 @@ class LLMClient:
         messages.append({"role": "user", "content": prompt})
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = await self.client.chat.completions.create(
+                model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=self.max_tokens
             )
             
-            return response.choices[0].message.content.strip()
+            usage = response.usage
+            return response.choices[0].message.content.strip(), {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+            }
             
         except Exception as e:
-            raise Exception(f"OpenAI API error: {str(e)}")
+            raise Exception(f"OpenAI API error: {str(e)}") from e
 
     async def _generate_gemini(
         self, 
         prompt: str, 
         system_prompt: Optional[str],
-        temperature: float
-    ) -> str:
-        """Generate using Google Gemini API"""
+        temperature: float,
+        model: str
+    ) -> Tuple[str, Dict[str, int]]:
+        """Generate using Google Gemini API; returns the text and its token usage"""
         # Combine system and user prompts for Gemini
         full_prompt = prompt
         if system_prompt:
             full_prompt = f"{system_prompt}\n\n{prompt}"
         
         try:
-            model = self.client.GenerativeModel(self.model)
+            gemini_model = self.client.GenerativeModel(model)
             
             # Configure generation
             generation_config = {
@@ -114,15 +183,19 @@ class LLMClient:
             }
             
             # Generate response
-            response = model.generate_content(
+            response = await gemini_model.generate_content_async(
                 full_prompt,
                 generation_config=generation_config
             )
             
-            return response.text.strip()
+            usage = getattr(response, "usage_metadata", None)
+            return response.text.strip(), {
+                "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+                "completion_tokens": getattr(usage, "candidates_token_count", 0) or 0
+            }
             
         except Exception as e:
-            raise Exception(f"Google Gemini API error: {str(e)}")
+            raise Exception(f"Google Gemini API error: {str(e)}") from e
 
     def is_available(self) -> bool:
         """Check if LLM client is properly configured"""
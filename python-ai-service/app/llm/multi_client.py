@@ -0,0 +1,233 @@
+"""
+Multi-Provider LLM Client - Hedged and failover completions across backends
+
+Holds several LLMClient backends (e.g. OpenAI and Gemini) at once. Each
+call goes to the first backend; if it has not answered within that
+backend's recent latency percentile for the current agent step, a hedged
+duplicate is sent to the next backend and whichever valid response comes
+first wins (the other is cancelled). Errors fail over to the next backend
+immediately.
+
+Configuration:
+    LLM_PROVIDERS=openai:gpt-4o,gemini:gemini-1.5-flash   # in priority order
+    LLM_HEDGE=on                  # off = failover only
+    LLM_HEDGE_PERCENTILE=95       # hedge once the primary is slower than this
+    LLM_HEDGE_DELAY_MS=2000       # hedge delay until enough latencies are seen
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from app.llm.budget import BudgetExceededError
+from app.llm.client import LLMClient
+from app.llm.resilience import ResilientLLMClient
+from app.llm.response_cache import CachedLLMClient
+from app.telemetry.metrics import get_registry
+from app.telemetry.timing import current_timings
+
+
+logger = logging.getLogger(__name__)
+
+HEDGE_OUTCOMES = get_registry().counter(
+    "llm_hedge_outcomes_total",
+    "Multi-provider call outcomes: primary, hedge_won, hedge_lost, failover, failed",
+    ("outcome",)
+)
+
+
+class LatencyTracker:
+    """Recent completion latencies per (backend, step), for hedge delays"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Dict[Any, deque] = defaultdict(lambda: deque(maxlen=window))
+
+    def observe(self, key, seconds: float):
+        self._samples[key].append(seconds)
+
+    def percentile(self, key, q: float) -> Optional[float]:
+        samples = self._samples.get(key)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        return float(np.percentile(samples, q))
+
+
+class MultiProviderLLMClient:
+    """
+    Drop-in replacement for LLMClient that hedges and fails over across backends
+
+    Args:
+        backends: Clients in priority order; anything with async generate()
+        hedge: Send a duplicate request when the primary is slow
+        hedge_percentile: Primary latency percentile that triggers the hedge
+        hedge_delay: Seconds to wait before hedging while latencies are unknown
+    """
+
+    def __init__(
+        self,
+        backends: List[Any],
+        hedge: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_delay: float = 2.0
+    ):
+        if not backends:
+            raise ValueError("MultiProviderLLMClient needs at least one backend")
+        self.backends = backends
+        self.hedge = hedge and len(backends) > 1
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.latencies = LatencyTracker()
+
+        # Request-level labels (and response cache keys) follow the primary backend
+        self.provider = backends[0].provider
+        self.model = backends[0].model
+        self.economy_model = getattr(backends[0], "economy_model", self.model)
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        """Generate with the first backend, hedging or failing over to the rest"""
+        timings = current_timings()
+        step = timings.current_step if timings else ""
+
+        pending: Dict[asyncio.Task, int] = {}
+        started: Dict[asyncio.Task, float] = {}
+        next_backend = 0
+        last_error: Optional[BaseException] = None
+        hedged = failed_over = False
+
+        def launch():
+            nonlocal next_backend
+            index = next_backend
+            next_backend += 1
+            task = asyncio.create_task(self._timed(index, step, prompt, system_prompt, temperature))
+            pending[task] = index
+            started[task] = time.perf_counter()
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and next_backend < len(self.backends) and len(pending) == 1:
+                    task = next(iter(pending))
+                    timeout = self._hedge_delay(pending[task], started[task], step)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Primary is slower than usual: race a duplicate on the next backend
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except BudgetExceededError:
+                        raise
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(
+                            "LLM backend %s failed: %s", self.backends[index].provider, e,
+                            extra={"step": step}
+                        )
+                        continue
+                    if not result or not result.strip():
+                        last_error = ValueError(f"Empty response from {self.backends[index].provider}")
+                        continue
+                    HEDGE_OUTCOMES.inc(outcome=self._outcome(index, hedged, failed_over))
+                    return result
+
+                if not pending and next_backend < len(self.backends):
+                    failed_over = True
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        HEDGE_OUTCOMES.inc(outcome="failed")
+        raise last_error or RuntimeError("All LLM backends failed")
+
+    async def _timed(self, index: int, step: str, prompt, system_prompt, temperature) -> str:
+        backend = self.backends[index]
+        start = time.perf_counter()
+        try:
+            result = await backend.generate(prompt, system_prompt=system_prompt, temperature=temperature)
+        except asyncio.CancelledError:
+            # A lost race still tells us the backend took at least this long
+            self.latencies.observe((index, step), time.perf_counter() - start)
+            raise
+        self.latencies.observe((index, step), time.perf_counter() - start)
+        return result
+
+    def _hedge_delay(self, index: int, started: float, step: str) -> float:
+        """Time left before the in-flight backend counts as slow"""
+        threshold = self.latencies.percentile((index, step), self.hedge_percentile)
+        if threshold is None:
+            threshold = self.hedge_delay
+        return max(0.0, threshold - (time.perf_counter() - started))
+
+    def _outcome(self, index: int, hedged: bool, failed_over: bool) -> str:
+        if failed_over:
+            return "failover"
+        if hedged:
+            return "hedge_won" if index > 0 else "hedge_lost"
+        return "primary"
+
+    def is_available(self) -> bool:
+        return any(backend.is_available() for backend in self.backends)
+
+    def warm_up(self):
+        for backend in self.backends:
+            backend.warm_up()
+
+
+def build_llm_client():
+    """
+    LLMClient for LLM_PROVIDER, or a MultiProviderLLMClient when LLM_PROVIDERS
+    lists several; cacheable completions go through the shared cache first
+    """
+    return CachedLLMClient(_build_backend())
+
+
+def _build_backend():
+    providers = [entry.strip() for entry in os.getenv("LLM_PROVIDERS", "").split(",") if entry.strip()]
+    if len(providers) < 2:
+        client = LLMClient()
+        if not client.is_available():
+            logger.warning("No API key for LLM provider %s; answering from local fallbacks", client.provider)
+        return ResilientLLMClient(client)
+
+    backends = []
+    for entry in providers:
+        provider, _, model = entry.partition(":")
+        try:
+            client = LLMClient(provider=provider, model=model or None)
+        except ValueError as e:
+            logger.warning("Skipping LLM backend %s: %s", entry, e)
+            continue
+        if not client.is_available():
+            logger.warning("Skipping LLM backend %s: no API key", entry)
+            continue
+        backends.append(ResilientLLMClient(client))
+    if not backends:
+        logger.warning("No usable LLM backend in LLM_PROVIDERS; answering from local fallbacks")
+        return ResilientLLMClient(LLMClient())
+    if len(backends) == 1:
+        return backends[0]
+
+    return MultiProviderLLMClient(
+        backends,
+        hedge=os.getenv("LLM_HEDGE", "on").lower() != "off",
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        hedge_delay=float(os.getenv("LLM_HEDGE_DELAY_MS", "2000")) / 1000
+    )
@@ -0,0 +1,49 @@
+"""
+LLM Pricing - Estimated USD cost of a completion from its token counts
+
+Prices are list prices per 1K tokens (prompt, completion) and only need to
+be roughly right: they drive per-store cost reporting, not billing. Models
+are matched by longest prefix, so dated snapshots ("gpt-4o-2024-08-06")
+use their family's price. LLM_PRICE_PROMPT_PER_1K and
+LLM_PRICE_COMPLETION_PER_1K set the price of the model (prefix) named by
+LLM_PRICE_MODEL, or, without one, of models that are not listed.
+"""
+
+import os
+from typing import Dict, Tuple
+
+
+PRICES_PER_1K: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gemini-1.5-flash": (0.000075, 0.0003),
+    "gemini-1.5-pro": (0.00125, 0.005),
+    "gemini-pro": (0.0005, 0.0015),
+}
+
+
+def model_price(model: str) -> Tuple[float, float]:
+    """(prompt, completion) USD per 1K tokens; unknown models cost 0"""
+    prices = dict(PRICES_PER_1K)
+    prompt_override = os.getenv("LLM_PRICE_PROMPT_PER_1K")
+    completion_override = os.getenv("LLM_PRICE_COMPLETION_PER_1K")
+    if prompt_override is not None or completion_override is not None:
+        override = (float(prompt_override or 0), float(completion_override or 0))
+        priced_model = os.getenv("LLM_PRICE_MODEL")
+        if priced_model:
+            prices[priced_model] = override
+        elif not any(model.startswith(name) for name in prices):
+            return override
+
+    matches = [name for name in prices if model.startswith(name)]
+    if not matches:
+        return 0.0, 0.0
+    return prices[max(matches, key=len)]
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = model_price(model)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
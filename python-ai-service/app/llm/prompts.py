@@ -35,6 +35,19 @@ Respond in this exact JSON format:
   "confidence": "low|medium|high"
 }}"""
 
+INTENT_CLASSIFIER_BATCH_PROMPT = """Classify each of these questions and extract parameters:
+
+{questions}
+
+Respond with a JSON array holding one object per question, in the same order, each in this exact format:
+{{
+  "intent": "<category>",
+  "time_period": "<period>",
+  "products": "<product names or 'all'>",
+  "metrics": ["<metric1>", "<metric2>"],
+  "confidence": "low|medium|high"
+}}"""
+
 
 QUERY_GENERATOR_SYSTEM = """You are an expert at generating Shopify analytics queries.
 
@@ -46,8 +59,15 @@ Available Shopify resources:
 - inventory_levels: Current inventory quantities by location
 - customers: Customer information and order history
 
+ShopifyQL syntax (no SELECT or JOIN):
+  FROM <sales|orders|products|customers|inventory>
+  SHOW <column>, <column>
+  [WHERE <condition>] [GROUP BY <dimension>] [SINCE -30d] [UNTIL today]
+  [ORDER BY <column> DESC] [LIMIT <n>]
+Common sales columns: total_sales, net_sales, orders, net_quantity, product_title, day, month
+
 Respond with:
-1. A ShopifyQL-style query (this will be converted to Admin API calls)
+1. A ShopifyQL query (run server-side when possible, otherwise converted to Admin API calls)
 2. Required resources and fields
 3. Any calculations needed post-processing
 """
@@ -0,0 +1,246 @@
+"""
+LLM Resilience - Deadlines, retries and circuit breakers around LLM backends
+
+ResilientLLMClient wraps one backend:
+
+- Each call gets a deadline carved out of the request's overall budget
+  (REQUEST_BUDGET_MS), split across the LLM steps still to run, and capped
+  by LLM_TIMEOUT_MS. A hung provider costs one step's share, not the request.
+- Transient errors (timeouts, connection errors, 429 and 5xx) are retried
+  up to LLM_MAX_RETRIES times with jittered exponential backoff, as long as
+  the backoff fits in the step's deadline.
+- A circuit breaker per backend opens after LLM_BREAKER_FAILURES
+  consecutive failures. While open, calls fail immediately with
+  CircuitOpenError, so the agent goes straight to its local fallbacks
+  (keyword intent, fallback plan, template explanation). After
+  LLM_BREAKER_RESET_MS one trial call is let through (half-open).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from app.llm.budget import BudgetExceededError
+from app.telemetry.metrics import get_registry
+from app.telemetry.timing import current_timings
+
+
+# Relative share of the remaining budget per LLM step, in agent order
+STEP_SHARES = {"intent": 1.0, "plan": 1.5, "explain": 2.0}
+
+# Exception class names (OpenAI and Google SDKs) worth retrying
+RETRYABLE_ERRORS = {
+    "TimeoutError", "APITimeoutError", "APIConnectionError", "RateLimitError",
+    "InternalServerError", "ServiceUnavailable", "DeadlineExceeded",
+    "ResourceExhausted", "TooManyRequests"
+}
+
+_registry = get_registry()
+LLM_RETRIES = _registry.counter(
+    "llm_retries_total",
+    "LLM calls retried after a transient error",
+    ("backend",)
+)
+BREAKER_TRANSITIONS = _registry.counter(
+    "llm_breaker_transitions_total",
+    "Circuit breaker state changes",
+    ("backend", "state")
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set("half_open")
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.trial_in_flight = False
+            if self.state != "closed":
+                self._set("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != "open":
+                    self._set("open")
+
+    def release(self):
+        """Give back a half-open trial that ended without a verdict (e.g. cancelled)"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {"state": self.state, "consecutive_failures": self.failures}
+            if self.state == "open":
+                snapshot["retry_in_s"] = round(
+                    max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1
+                )
+            return snapshot
+
+    def _set(self, state: str):
+        self.state = state
+        BREAKER_TRANSITIONS.inc(backend=self.name, state=state)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Shared breaker per backend name, configured from the environment"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_MS", "30000")) / 1000
+            )
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """State of every breaker, for /health"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def step_timeout(cap: float) -> float:
+    """Seconds the current LLM step may spend, from the request's remaining budget"""
+    timings = current_timings()
+    if timings is None or timings.deadline is None:
+        return cap
+    remaining = timings.deadline - time.perf_counter()
+    steps = list(STEP_SHARES)
+    step = timings.current_step
+    if step in STEP_SHARES:
+        upcoming = steps[steps.index(step):]
+        remaining *= STEP_SHARES[step] / sum(STEP_SHARES[name] for name in upcoming)
+    return max(0.0, min(cap, remaining))
+
+
+def is_retryable(error: BaseException) -> bool:
+    for candidate in (error, error.__cause__):
+        if candidate is None:
+            continue
+        if isinstance(candidate, asyncio.TimeoutError) or type(candidate).__name__ in RETRYABLE_ERRORS:
+            return True
+        status = getattr(candidate, "status_code", None) or getattr(candidate, "code", None)
+        if isinstance(status, int) and (status == 429 or status >= 500):
+            return True
+    return False
+
+
+class ResilientLLMClient:
+    """
+    Wrap an LLM backend with per-step deadlines, bounded retries and a breaker
+
+    Args:
+        backend: Anything with async generate() and provider/model attributes
+        timeout: Cap on a single call, in seconds
+        max_retries: Extra attempts after a transient failure
+        backoff: Base backoff in seconds; doubles per attempt, with jitter
+    """
+
+    def __init__(
+        self,
+        backend,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: float = 0.25,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.backend = backend
+        self.provider = backend.provider
+        self.model = backend.model
+        self.timeout = timeout if timeout is not None else float(os.getenv("LLM_TIMEOUT_MS", "30000")) / 1000
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.backoff = backoff
+        self.breaker = breaker or get_breaker(f"{backend.provider}:{backend.model}")
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        deadline = time.perf_counter() + step_timeout(self.timeout)
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.breaker.name} circuit is open")
+
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                result = await asyncio.wait_for(
+                    self.backend.generate(prompt, system_prompt=system_prompt, temperature=temperature),
+                    timeout=remaining
+                )
+            except BudgetExceededError:
+                self.breaker.release()
+                raise
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if (
+                    attempt >= self.max_retries
+                    or not is_retryable(e)
+                    or time.perf_counter() + delay >= deadline
+                ):
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise TimeoutError(f"{self.breaker.name} timed out") from e
+                    raise
+                attempt += 1
+                LLM_RETRIES.inc(backend=self.breaker.name)
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def is_available(self) -> bool:
+        return self.breaker.state != "open" and self.backend.is_available()
+
+    def __getattr__(self, name):
+        # economy_model and any other backend attributes
+        return getattr(self.backend, name)
@@ -0,0 +1,88 @@
+"""
+LLM Response Cache - Reuse completions across requests and workers
+
+Low-temperature completions (intent classification, query planning) are
+near-deterministic, so the same prompt to the same model is answered from
+the shared cache instead of the provider. Identical prompts arriving at
+once on different workers are sent to the provider only once.
+
+    LLM_CACHE_TTL=3600              # seconds; 0 disables the cache
+    LLM_CACHE_MAX_TEMPERATURE=0.5   # hotter calls (explanations) always go out
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional
+
+from app.cache.shared_cache import SharedCache, get_shared_cache
+from app.telemetry.timing import current_timings
+
+
+class CachedLLMClient:
+    """
+    Wrap an LLM client so cacheable completions go through the shared cache
+
+    Args:
+        backend: Anything with async generate() and provider/model attributes
+        cache: SharedCache to use; defaults to the process-wide one
+        ttl: Seconds a completion is reused
+        max_temperature: Calls above this temperature are never cached
+    """
+
+    def __init__(
+        self,
+        backend,
+        cache: Optional[SharedCache] = None,
+        ttl: Optional[float] = None,
+        max_temperature: Optional[float] = None
+    ):
+        self.backend = backend
+        self.provider = backend.provider
+        self.model = backend.model
+        self.cache = cache or get_shared_cache()
+        self.ttl = ttl if ttl is not None else float(os.getenv("LLM_CACHE_TTL", "3600"))
+        self.max_temperature = max_temperature if max_temperature is not None else \
+            float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.5"))
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        if self.ttl <= 0 or temperature is None or temperature > self.max_temperature:
+            return await self.backend.generate(prompt, system_prompt=system_prompt, temperature=temperature)
+
+        async def compute() -> str:
+            result = await self.backend.generate(prompt, system_prompt=system_prompt, temperature=temperature)
+            if not result or not result.strip():
+                # Raised rather than cached; callers fall back as for any bad response
+                raise ValueError(f"Empty response from {self.provider}")
+            return result
+
+        key = self._key(prompt, system_prompt, temperature)
+        return await self.cache.get_or_compute(key, compute, ttl=self.ttl, namespace="llm")
+
+    def _key(self, prompt: str, system_prompt: Optional[str], temperature: float) -> str:
+        timings = current_timings()
+        # Economy-tier stores are answered by a different model
+        model = self.model
+        if timings is not None and timings.tier == "economy":
+            model = getattr(self.backend, "economy_model", model)
+        digest = hashlib.sha256(
+            json.dumps([self.provider, model, system_prompt, prompt, temperature]).encode()
+        ).hexdigest()
+        return f"llm:{digest}"
+
+    def is_available(self) -> bool:
+        return self.backend.is_available()
+
+    def warm_up(self):
+        self.cache.stats()
+        warm_up = getattr(self.backend, "warm_up", None)
+        if warm_up is not None:
+            warm_up()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
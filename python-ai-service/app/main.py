@@ -1,20 +1,83 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Start of the service import, for the start-up timings in /health
+_import_started = time.perf_counter()
+
+import json
+import logging
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 import os
 from dotenv import load_dotenv
 
 from app.agent.orchestrator import AgentOrchestrator
-from app.llm.client import LLMClient
+from app.cache.shared_cache import get_shared_cache
+from app.llm.budget import get_ledger
+from app.llm.multi_client import build_llm_client
+from app.llm.resilience import breaker_states
+from app.telemetry.log import configure_logging, bind_request, bind_store
+from app.telemetry.tracing import configure_tracing, start_trace, span, traceparent
+from app.telemetry.metrics import get_registry
 
 # Load environment variables
 load_dotenv()
+configure_logging()
+configure_tracing()
+
+logger = logging.getLogger(__name__)
+
+# The agent is built by the lifespan (or the first request), not at import
+orchestrator: Optional[AgentOrchestrator] = None
+
+# Start-up timings (ms), reported by /health
+startup: Dict[str, Any] = {}
+
+
+def get_orchestrator() -> AgentOrchestrator:
+    """Build the agent and its LLM client on first use"""
+    global orchestrator
+    if orchestrator is None:
+        orchestrator = AgentOrchestrator(build_llm_client())
+    return orchestrator
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build the agent and warm it up before uvicorn starts accepting requests
+    (STARTUP_WARMUP=off skips the warm-up)
+    """
+    start = time.perf_counter()
+    agent = get_orchestrator()
+    startup["build_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    
+    if os.getenv("STARTUP_WARMUP", "on").lower() != "off":
+        start = time.perf_counter()
+        startup["warmup_phases_ms"] = agent.warm_up(
+            mock_data=os.getenv("USE_MOCK_DATA", "false").lower() == "true"
+        )
+        startup["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    
+    startup["ready_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+    logger.info("Service ready", extra={"startup": startup})
+    # Warms answers to common questions off-peak (PRECOMPUTE=on)
+    agent.precompute.start()
+    yield
+    agent.precompute.stop()
+    agent.result_processor.pool.shutdown()
+
 
 app = FastAPI(
     title="Shopify Analytics AI Service",
     description="LLM-powered agent for Shopify analytics queries",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -26,9 +89,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize LLM client and orchestrator
-llm_client = LLMClient()
-orchestrator = AgentOrchestrator(llm_client)
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """
+    Tag every log line of a request with its X-Request-ID (generated if
+    absent) and trace it, continuing the caller's W3C traceparent
+    """
+    request_id = bind_request(request.headers.get("X-Request-ID"))
+    start_trace(request.headers.get("traceparent"))
+    with span(
+        "http.request",
+        method=request.method,
+        path=request.url.path,
+        request_id=request_id
+    ) as request_span:
+        response = await call_next(request)
+        request_span.set_attribute("status_code", response.status_code)
+        response.headers["traceparent"] = traceparent()
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 
 # Request/Response models
@@ -37,6 +116,12 @@ class AnalyzeRequest(BaseModel):
     question: str = Field(..., description="Natural language question")
     access_token: Optional[str] = Field(None, description="Shopify access token")
     use_mock: bool = Field(False, description="Use mock data for testing")
+    approximate: Optional[bool] = Field(
+        None, description="Allow estimates from sampled orders when exact answers are too costly"
+    )
+    aggregation: Optional[Literal["exact", "sketch"]] = Field(
+        None, description="exact, or sketch: bounded-memory estimates of distinct customers and top products"
+    )
 
 
 class AnalyzeResponse(BaseModel):
@@ -47,16 +132,92 @@ class AnalyzeResponse(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
 
+class AnalyzeBatchRequest(BaseModel):
+    store_id: str = Field(..., description="Shopify store domain")
+    questions: List[str] = Field(
+        ..., min_length=1, max_length=int(os.getenv("ANALYZE_BATCH_MAX_QUESTIONS", "20")),
+        description="Natural language questions about the store"
+    )
+    access_token: Optional[str] = Field(None, description="Shopify access token")
+    use_mock: bool = Field(False, description="Use mock data for testing")
+    approximate: Optional[bool] = Field(
+        None, description="Allow estimates from sampled orders when exact answers are too costly"
+    )
+    aggregation: Optional[Literal["exact", "sketch"]] = Field(
+        None, description="exact, or sketch: bounded-memory estimates of distinct customers and top products"
+    )
+
+
+class AnalyzeBatchResponse(BaseModel):
+    results: List[AnalyzeResponse] = Field(..., description="One answer per question, in order")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Batch timings and shared fetch")
+
+
+class PortfolioStore(BaseModel):
+    store_id: str = Field(..., description="Shopify store domain")
+    access_token: Optional[str] = Field(None, description="Shopify access token")
+
+
+class AnalyzePortfolioRequest(BaseModel):
+    question: str = Field(..., description="Natural language question, asked of every store")
+    stores: List[PortfolioStore] = Field(
+        ..., min_length=1, max_length=int(os.getenv("PORTFOLIO_MAX_STORES", "1000")),
+        description="Stores to answer for"
+    )
+    use_mock: bool = Field(False, description="Use mock data for testing")
+    approximate: Optional[bool] = Field(
+        None, description="Allow estimates from sampled orders when exact answers are too costly"
+    )
+    aggregation: Optional[Literal["exact", "sketch"]] = Field(
+        None, description="exact, or sketch: bounded-memory estimates of distinct customers and top products"
+    )
+
+
+def _json_line(event: Dict[str, Any]) -> str:
+    """One NDJSON line; non-finite numbers (e.g. days of inventory) become null"""
+    def finite(value):
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        if isinstance(value, dict):
+            return {key: finite(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [finite(item) for item in value]
+        return value
+    return json.dumps(finite(event), default=str) + "\n"
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    breakers = breaker_states()
+    # Still answering from local fallbacks when every LLM backend is down
+    all_open = bool(breakers) and all(b["state"] == "open" for b in breakers.values())
     return {
-        "status": "ok",
+        "status": "degraded" if all_open else "ok",
         "service": "python-ai-service",
-        "llm_provider": os.getenv("LLM_PROVIDER", "openai")
+        "llm_provider": os.getenv("LLM_PROVIDER", "openai"),
+        "llm_breakers": breakers,
+        "shared_cache": get_shared_cache().stats(),
+        "precompute": orchestrator.precompute.report() if orchestrator else None,
+        "startup": startup
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Latency histograms in Prometheus text exposition format"""
+    return PlainTextResponse(
+        get_registry().render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/usage")
+async def usage():
+    """LLM tokens and estimated cost per store, today and by agent step"""
+    return get_ledger().snapshot()
+
+
 @app.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_question(request: AnalyzeRequest):
     """
@@ -71,16 +232,20 @@ async def analyze_question(request: AnalyzeRequest):
     6. Generate explanation
     """
     try:
-        print(f"📥 Received question: {request.question}")
-        print(f"🏪 Store: {request.store_id}")
-        print(f"🧪 Mock mode: {request.use_mock}")
+        bind_store(request.store_id)
+        logger.info(
+            "Received question",
+            extra={"question": request.question, "use_mock": request.use_mock}
+        )
 
         # Run the agent orchestrator
-        result = await orchestrator.process({
+        result = await get_orchestrator().process({
             "store_id": request.store_id,
             "question": request.question,
             "access_token": request.access_token,
-            "use_mock": request.use_mock
+            "use_mock": request.use_mock,
+            **({"approximate": request.approximate} if request.approximate is not None else {}),
+            **({"aggregation": request.aggregation} if request.aggregation is not None else {})
         })
 
         return AnalyzeResponse(**result)
@@ -91,23 +256,97 @@ async def analyze_question(request: AnalyzeRequest):
     
     except Exception as e:
         # Internal errors
-        print(f"❌ Error processing question: {str(e)}")
+        logger.exception("Error processing question")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process question: {str(e)}"
         )
 
 
+@app.post("/analyze/batch", response_model=AnalyzeBatchResponse)
+async def analyze_batch(request: AnalyzeBatchRequest):
+    """
+    Answer several questions about one store at once (e.g. a dashboard).
+    
+    Questions are classified together, each Shopify resource is fetched
+    once for the whole batch, and the answers are processed and explained
+    concurrently.
+    """
+    try:
+        bind_store(request.store_id)
+        logger.info(
+            "Received question batch",
+            extra={"questions": len(request.questions), "use_mock": request.use_mock}
+        )
+
+        result = await get_orchestrator().process_batch({
+            "store_id": request.store_id,
+            "questions": request.questions,
+            "access_token": request.access_token,
+            "use_mock": request.use_mock,
+            **({"approximate": request.approximate} if request.approximate is not None else {}),
+            **({"aggregation": request.aggregation} if request.aggregation is not None else {})
+        })
+
+        return AnalyzeBatchResponse(**result)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    except Exception as e:
+        logger.exception("Error processing question batch")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process questions: {str(e)}"
+        )
+
+
+@app.post("/analyze/portfolio")
+async def analyze_portfolio(request: AnalyzePortfolioRequest):
+    """
+    Answer one question for many stores (e.g. "which stores will stock out
+    next week?").
+    
+    The question is classified and planned once; stores are fetched and
+    processed a bounded number at a time, within each shop's rate limit.
+    Streams newline-delimited JSON: a "plan" event, one "store" event per
+    store as it finishes, then a "done" event ranking the stores.
+    """
+    logger.info(
+        "Received portfolio question",
+        extra={"question": request.question, "stores": len(request.stores), "use_mock": request.use_mock}
+    )
+    
+    events = get_orchestrator().process_portfolio({
+        "question": request.question,
+        "stores": [store.model_dump() for store in request.stores],
+        "use_mock": request.use_mock,
+        **({"approximate": request.approximate} if request.approximate is not None else {}),
+        **({"aggregation": request.aggregation} if request.aggregation is not None else {})
+    })
+    
+    async def stream():
+        async for event in events:
+            yield _json_line(event)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
     return {
         "message": "Shopify Analytics AI Service",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics",
+        "usage": "/usage"
     }
 
 
+startup["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
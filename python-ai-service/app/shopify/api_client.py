@@ -2,9 +2,115 @@
 Shopify API Client - Wrapper for Shopify Admin API
 """
 
+import asyncio
+import logging
+import re
 import httpx
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import os
+import time
+
+from app.shopify.filters import rest_params
+from app.shopify.rate_limit import get_rate_limiter
+from app.telemetry.timing import record_shopify_request
+from app.telemetry.tracing import span
+from app.shopify.graphql_query import (
+    PAGINATED,
+    build_plan_query,
+    estimate_query_cost,
+    next_page,
+    normalize_plan_response,
+    truncated_resources
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+SHOPIFYQL_QUERY = """
+query ShopifyQL($query: String!) {
+  shopifyqlQuery(query: $query) {
+    __typename
+    parseErrors { code message }
+    ... on TableResponse {
+      tableData {
+        columns { name dataType displayName }
+        rowData
+      }
+    }
+  }
+}
+"""
+
+NUMERIC_TYPES = ("MONEY", "INTEGER", "FLOAT", "PERCENT", "NUMBER")
+
+
+def _parse_cell(value: Any, data_type: Optional[str]) -> Any:
+    """ShopifyQL returns every cell as a string; coerce numeric columns"""
+    if value is None or not data_type or data_type.upper() not in NUMERIC_TYPES:
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if data_type.upper() == "INTEGER" else number
+
+
+def _retry_after(response: httpx.Response, payload: Any) -> Optional[float]:
+    """Seconds to back off if Shopify throttled the request, else None"""
+    if response.status_code == 429:
+        return float(response.headers.get("Retry-After") or 2.0)
+    errors = payload.get("errors") if isinstance(payload, dict) else None
+    if not isinstance(errors, list) or not any(
+        (e.get("extensions") or {}).get("code") == "THROTTLED" for e in errors if isinstance(e, dict)
+    ):
+        return None
+    # Time for the bucket to restore what the query asked for
+    cost = (payload.get("extensions") or {}).get("cost", {})
+    status = cost.get("throttleStatus") or {}
+    missing = (cost.get("requestedQueryCost") or 0) - status.get("currentlyAvailable", 0)
+    return max(missing / (status.get("restoreRate") or 50.0), 1.0)
+
+
+def _bucket_report(response: httpx.Response, payload: Any, api: str) -> Tuple[Optional[float], Optional[Dict[str, Any]]]:
+    """
+    What a response says about the shop's bucket: the request's actual
+    cost and the bucket level (REST X-Shopify-Shop-Api-Call-Limit "used/size",
+    GraphQL extensions.cost.throttleStatus)
+    """
+    if api == "rest":
+        actual = 0.0 if response.status_code == 429 else 1.0
+        header = response.headers.get("X-Shopify-Shop-Api-Call-Limit")
+        try:
+            used, size = (float(part) for part in header.split("/"))
+        except (AttributeError, ValueError):
+            return actual, None
+        return actual, {"maximumAvailable": size, "currentlyAvailable": size - used}
+    
+    cost = ((payload.get("extensions") or {}).get("cost") or {}) if isinstance(payload, dict) else {}
+    if not cost:
+        return None, None
+    # Throttled queries aren't charged
+    return cost.get("actualQueryCost") or 0.0, cost.get("throttleStatus")
+
+
+def _next_page_url(response: httpx.Response) -> Optional[str]:
+    """URL of the next page from a REST Link header (cursor-based pagination)"""
+    match = re.search(r'<([^>]+)>;\s*rel="next"', response.headers.get("Link") or "")
+    return match.group(1) if match else None
+
+
+def _record_truncated(stats: Optional[Dict[str, int]]):
+    """Count a fetch that stopped at the page cap with more pages left"""
+    if stats is not None:
+        stats["truncated"] = stats.get("truncated", 0) + 1
+
+
+def _record_transfer(stats: Optional[Dict[str, int]], response: httpx.Response):
+    """Accumulate request count and response size into a caller's stats dict"""
+    if stats is not None:
+        stats["requests"] = stats.get("requests", 0) + 1
+        stats["bytes"] = stats.get("bytes", 0) + len(response.content)
 
 
 class ShopifyAPIClient:
@@ -12,32 +118,100 @@ class ShopifyAPIClient:
     Client for interacting with Shopify Admin API (REST and GraphQL)
     """
     
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.api_version = os.getenv("SHOPIFY_API_VERSION", "2024-01")
         self.timeout = 30.0
+        # Override to point at a local fake, e.g. "http://localhost:9000/{store_id}"
+        self.base_url = os.getenv("SHOPIFY_API_BASE_URL", "https://{store_id}")
+        self.transport = transport
+        # Per-shop leaky buckets (None = send without waiting)
+        self.rate_limiter = get_rate_limiter()
+        self.throttle_retries = int(os.getenv("SHOPIFY_THROTTLE_RETRIES", "3"))
+        # Pages followed per resource before a fetch is cut short (and counted
+        # as truncated in the caller's stats)
+        self.max_pages = int(os.getenv("SHOPIFY_MAX_PAGES", "1000"))
+
+    def _api_url(self, store_id: str) -> str:
+        """Admin API root for a store"""
+        return f"{self.base_url.format(store_id=store_id)}/admin/api/{self.api_version}"
+
+    async def _send(
+        self,
+        store_id: str,
+        api: str,
+        kind: str,
+        cost: float,
+        request
+    ) -> Tuple[httpx.Response, Any]:
+        """
+        Send a request within the shop's rate limit, retrying throttled ones
+        
+        `request` is a no-argument coroutine function making the HTTP call.
+        Returns the last response, throttled or not, and its JSON body
+        (None if it has none).
+        """
+        limiter = self.rate_limiter
+        backoff = 0.0
+        for attempt in range(self.throttle_retries + 1):
+            wait = time.perf_counter()
+            if limiter:
+                await limiter.acquire(store_id, api, cost)
+            elif backoff:
+                await asyncio.sleep(backoff)
+            wait = time.perf_counter() - wait
+            
+            start = time.perf_counter()
+            try:
+                response = await request()
+            except httpx.RequestError:
+                record_shopify_request(kind, time.perf_counter() - start, wait_seconds=wait)
+                if limiter:
+                    limiter.settle(store_id, api, cost)
+                raise
+            record_shopify_request(kind, time.perf_counter() - start, wait_seconds=wait, status=response.status_code)
+            
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = None
+            backoff = _retry_after(response, payload)
+            if limiter:
+                limiter.settle(store_id, api, cost, *_bucket_report(response, payload, api))
+                if backoff is not None:
+                    limiter.throttled(store_id, api, backoff)
+            if backoff is None or attempt == self.throttle_retries:
+                return response, payload
+            logger.info("Shopify throttled %s, retrying in %.1fs", api, backoff, extra={"store_id": store_id})
+        return response, payload
 
     async def fetch(
         self,
         store_id: str,
         access_token: str,
         resource: str,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        stats: Optional[Dict[str, int]] = None
     ) -> List[Dict[str, Any]]:
         """
         Fetch data from Shopify Admin API
         
+        Follows the Link header's next page until the resource is exhausted
+        or max_pages pages were read; a fetch cut short by the cap adds 1 to
+        stats["truncated"].
+        
         Args:
             store_id: Store domain (e.g., "example.myshopify.com")
             access_token: Shopify access token
             resource: Resource type (orders, products, etc.)
             filters: Optional filters to apply
+            stats: Optional counters ("requests", "bytes", "truncated") to accumulate into
             
         Returns:
             List of resource objects
         """
         
         # Build API URL
-        base_url = f"https://{store_id}/admin/api/{self.api_version}"
+        base_url = self._api_url(store_id)
         
         # Map resource to endpoint
         endpoint_map = {
@@ -54,7 +228,7 @@ class ShopifyAPIClient:
         url = base_url + endpoint
         
         # Build query parameters
-        params = self._build_params(filters or {})
+        params = self._build_params(resource, filters or {})
         
         # Make request
         headers = {
@@ -62,40 +236,47 @@ class ShopifyAPIClient:
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(url, headers=headers, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                # Extract resource array from response
-                # Shopify wraps responses like {"orders": [...]}
-                resource_key = resource
-                return data.get(resource_key, [])
-                
-            except httpx.HTTPStatusError as e:
-                print(f"Shopify API error: {e.response.status_code}")
-                raise Exception(f"Shopify API returned {e.response.status_code}")
-            except httpx.RequestError as e:
-                print(f"Request error: {e}")
-                raise Exception("Failed to connect to Shopify API")
-
-    def _build_params(self, filters: Dict[str, Any]) -> Dict[str, str]:
+        with span("shopify.rest", store_id=store_id, resource=resource) as request_span:
+            async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+                try:
+                    records: List[Dict[str, Any]] = []
+                    pages = size = 0
+                    while url:
+                        response, data = await self._send(
+                            store_id, "rest", "rest", 1,
+                            lambda: client.get(url, headers=headers, params=params)
+                        )
+                        _record_transfer(stats, response)
+                        pages += 1
+                        size += len(response.content)
+                        request_span.set_attribute("status", response.status_code)
+                        response.raise_for_status()
+                        
+                        # Extract resource array from response
+                        # Shopify wraps responses like {"orders": [...]}
+                        records.extend(data.get(resource, []))
+                        
+                        # Next-page URLs carry the cursor and every filter
+                        url, params = _next_page_url(response), None
+                        if url and pages >= self.max_pages:
+                            logger.warning("Stopped %s after %d pages; more remain", resource, pages)
+                            _record_truncated(stats)
+                            request_span.set_attribute("truncated", True)
+                            break
+                    
+                    request_span.set_attributes({"pages": pages, "bytes": size, "records": len(records)})
+                    return records
+                    
+                except httpx.HTTPStatusError as e:
+                    logger.warning("Shopify API error: %s", e.response.status_code)
+                    raise Exception(f"Shopify API returned {e.response.status_code}")
+                except httpx.RequestError as e:
+                    logger.warning("Shopify request error: %s", e)
+                    raise Exception("Failed to connect to Shopify API")
+
+    def _build_params(self, resource: str, filters: Dict[str, Any]) -> Dict[str, str]:
         """Build query parameters from filters"""
-        params = {}
-        
-        # Time filter
-        if "time_filter" in filters:
-            time_str = filters["time_filter"]
-            # Convert to Shopify's created_at_min/max format
-            # This is simplified - production would parse the time string properly
-            params["limit"] = "250"
-        
-        # Product filter
-        if "products" in filters and filters["products"] != "all":
-            # This would filter by product IDs
-            pass
+        params = rest_params(resource, filters)
         
         # Default limit
         params.setdefault("limit", "250")
@@ -114,7 +295,166 @@ class ShopifyAPIClient:
         
         This is more powerful than REST for complex queries
         """
-        url = f"https://{store_id}/admin/api/{self.api_version}/graphql.json"
+        payload = await self._post_graphql(store_id, access_token, query, variables)
+        return payload.get("data", {})
+
+    async def fetch_plan(
+        self,
+        store_id: str,
+        access_token: str,
+        api_calls: List[Dict[str, Any]],
+        filters: Optional[Dict[str, Any]] = None,
+        stats: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch every resource of a query plan with GraphQL
+        
+        The first round trip reads a page of every resource; each top-level
+        connection with more pages is then read on its own, with the whole
+        query cost budget per page, until exhausted or max_pages queries
+        were sent. Resources cut short (by the cap, or in nested connections
+        that aren't paged) are listed in "truncated".
+        
+        Returns:
+            {
+                "data": {resource: List[Dict]},
+                "pages": int,
+                "truncated": List[str],
+                "cost": {
+                    "estimated": int,
+                    "requested": int,
+                    "actual": int,
+                    "throttle_status": Dict
+                }
+            }
+        """
+        resources = [call.get("resource", "") for call in api_calls]
+        payload = await self._post_graphql(
+            store_id,
+            access_token,
+            build_plan_query(api_calls, filters),
+            stats=stats,
+            resources=resources,
+            cost=estimate_query_cost(api_calls)
+        )
+        data = payload.get("data") or {}
+        records = normalize_plan_response(data)
+        truncated = set(truncated_resources(data))
+        costs = [(payload.get("extensions") or {}).get("cost", {})]
+        
+        pages = 1
+        for call in api_calls:
+            resource = call.get("resource")
+            cursor = next_page(data, resource)
+            while cursor:
+                # Once anything is cut short the caller won't use the data
+                if truncated or resource not in PAGINATED or pages >= self.max_pages:
+                    truncated.add(resource)
+                    break
+                page = await self._post_graphql(
+                    store_id,
+                    access_token,
+                    build_plan_query([call], filters, after={resource: cursor}),
+                    stats=stats,
+                    resources=[resource],
+                    cost=estimate_query_cost([call])
+                )
+                page_data = page.get("data") or {}
+                records.setdefault(resource, []).extend(normalize_plan_response(page_data).get(resource, []))
+                truncated.update(truncated_resources(page_data))
+                costs.append((page.get("extensions") or {}).get("cost", {}))
+                cursor = next_page(page_data, resource)
+                pages += 1
+        
+        return {
+            "data": records,
+            "pages": pages,
+            "truncated": sorted(truncated),
+            "cost": {
+                "estimated": estimate_query_cost(api_calls),
+                "requested": sum(cost.get("requestedQueryCost") or 0 for cost in costs),
+                "actual": sum(cost.get("actualQueryCost") or 0 for cost in costs),
+                "throttle_status": costs[-1].get("throttleStatus", {})
+            }
+        }
+
+    async def fetch_shopifyql(
+        self,
+        store_id: str,
+        access_token: str,
+        shopifyql: str,
+        stats: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a ShopifyQL query server-side via the Admin API shopifyqlQuery field
+        
+        Aggregation happens at Shopify, so only result rows are transferred.
+        
+        Returns:
+            {
+                "columns": List[Dict],   # name, dataType
+                "rows": List[Dict],      # one dict per result row, keyed by column name
+                "cost": Dict
+            }
+        """
+        payload = await self._post_graphql(
+            store_id,
+            access_token,
+            SHOPIFYQL_QUERY,
+            {"query": shopifyql},
+            stats=stats,
+            kind="shopifyql"
+        )
+        
+        response = (payload.get("data") or {}).get("shopifyqlQuery") or {}
+        
+        parse_errors = response.get("parseErrors") or []
+        if parse_errors:
+            messages = "; ".join(e.get("message", "") for e in parse_errors)
+            raise ValueError(f"ShopifyQL parse errors: {messages}")
+        
+        table = response.get("tableData")
+        if table is None:
+            raise ValueError("ShopifyQL query returned no table data")
+        
+        columns = table.get("columns", [])
+        names = [column["name"] for column in columns]
+        rows = [
+            {name: _parse_cell(value, column.get("dataType"))
+             for name, value, column in zip(names, row, columns)}
+            for row in table.get("rowData", [])
+        ]
+        
+        cost = (payload.get("extensions") or {}).get("cost", {})
+        
+        return {
+            "columns": columns,
+            "rows": rows,
+            "cost": {
+                "requested": cost.get("requestedQueryCost"),
+                "actual": cost.get("actualQueryCost"),
+                "throttle_status": cost.get("throttleStatus", {})
+            }
+        }
+
+    async def _post_graphql(
+        self,
+        store_id: str,
+        access_token: str,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        stats: Optional[Dict[str, int]] = None,
+        kind: str = "graphql",
+        resources: Optional[List[str]] = None,
+        cost: float = 10
+    ) -> Dict[str, Any]:
+        """
+        POST a GraphQL document and return the full payload (data + extensions)
+        
+        `cost` is the points reserved from the shop's bucket up front; the
+        bucket then follows the throttle status Shopify reports.
+        """
+        url = f"{self._api_url(store_id)}/graphql.json"
         
         headers = {
             "X-Shopify-Access-Token": access_token,
@@ -126,17 +466,27 @@ class ShopifyAPIClient:
             "variables": variables or {}
         }
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if "errors" in data:
-                    raise Exception(f"GraphQL errors: {data['errors']}")
-                
-                return data.get("data", {})
-                
-            except httpx.HTTPStatusError as e:
-                raise Exception(f"Shopify GraphQL error: {e.response.status_code}")
+        with span(f"shopify.{kind}", store_id=store_id, resource=",".join(resources or []), pages=1) as request_span:
+            async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+                try:
+                    response, data = await self._send(
+                        store_id, "graphql", kind, cost,
+                        lambda: client.post(url, json=payload, headers=headers)
+                    )
+                    _record_transfer(stats, response)
+                    request_span.set_attributes({
+                        "status": response.status_code,
+                        "bytes": len(response.content)
+                    })
+                    response.raise_for_status()
+                    
+                    if "errors" in data:
+                        raise Exception(f"GraphQL errors: {data['errors']}")
+                    
+                    return data
+                    
+                except httpx.HTTPStatusError as e:
+                    raise Exception(f"Shopify GraphQL error: {e.response.status_code}")
+                except httpx.RequestError as e:
+                    logger.warning("Shopify request error: %s", e)
+                    raise Exception("Failed to connect to Shopify API")
@@ -0,0 +1,104 @@
+"""
+Filter helpers shared by the Shopify API client and mock data provider
+"""
+
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta
+
+
+def period_to_days(period_str: Optional[str], default: int = 30) -> int:
+    """Extract number of days from a period string like "last 2 weeks" """
+    if not period_str:
+        return default
+
+    period_lower = period_str.lower()
+    number = int(''.join(filter(str.isdigit, period_str)) or 0)
+
+    # Before "day", which both contain
+    if "yesterday" in period_lower or "today" in period_lower:
+        return 1
+    elif "year" in period_lower:
+        return (number or 1) * 365
+    elif "month" in period_lower:
+        return (number or 1) * 30
+    elif "week" in period_lower:
+        return (number or 1) * 7
+    elif "day" in period_lower:
+        return number or default
+    return default
+
+
+def period_to_date_range(
+    period_str: Optional[str],
+    now: Optional[datetime] = None
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Convert a time period into a (created_at_min, created_at_max) range
+
+    Future periods ("next week") describe a projection horizon, not a data
+    window, and "recent" names none, so both get the default 30-day
+    history window. "yesterday" is the calendar day, up to midnight, and
+    "today" runs from midnight to now. Only a missing period or "all" /
+    "all time" / "any" return (None, None) - no filter.
+    """
+    if not period_str:
+        return None, None
+
+    period_lower = period_str.lower().strip()
+    if period_lower in ("all", "all time", "any"):
+        return None, None
+
+    now = now or datetime.now()
+
+    if "next" in period_lower or period_lower == "recent":
+        return now - timedelta(days=30), now
+
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if "yesterday" in period_lower:
+        return today - timedelta(days=1), today
+    if "today" in period_lower:
+        return today, now
+
+    days = period_to_days(period_lower)
+    return now - timedelta(days=days), now
+
+
+# REST list parameters passed through unchanged when a filter dict already uses them
+REST_PARAMS = ("ids", "created_at_min", "created_at_max", "limit", "status")
+
+# Resources whose list endpoints filter on created_at
+TIME_FILTERED_RESOURCES = ("orders", "customers")
+
+
+def rest_params(resource: str, filters: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Translate plan filters into Admin API list parameters for a resource
+
+    The period ("time_filter" on an API call, "time_period" on the plan)
+    becomes created_at_min/created_at_max for orders and customers; product
+    names are answered from the fetched data, not filtered upstream. Orders
+    of every status are listed unless the filters name one (REST lists only
+    open orders by default).
+    """
+    filters = filters or {}
+    params = {}
+
+    if resource in TIME_FILTERED_RESOURCES:
+        period = filters.get("time_filter") or filters.get("time_period")
+        created_min, created_max = period_to_date_range(period)
+        if created_min:
+            params["created_at_min"] = created_min.isoformat(timespec="seconds")
+        if created_max:
+            params["created_at_max"] = created_max.isoformat(timespec="seconds")
+
+    for key in REST_PARAMS:
+        value = filters.get(key)
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(v) for v in value)
+        params[key] = str(value)
+
+    if resource == "orders":
+        params.setdefault("status", "any")
+    return params
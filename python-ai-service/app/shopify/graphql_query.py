@@ -0,0 +1,375 @@
+"""
+GraphQL Query Builder - Compiles a query plan into one Admin API GraphQL document
+
+Fetching every resource of a plan in a single document costs one round trip
+and one rate-limit charge instead of one REST call per resource. Top-level
+connections (orders, products, customers) are paged with cursors; nested
+ones (line items per order, locations and their inventory levels) are read
+as one page, and a response that cut them short is reported as truncated.
+"""
+
+from typing import Dict, Any, List, Optional
+
+from app.shopify.filters import period_to_date_range
+
+
+PAGE_SIZE = 250
+LINE_ITEMS_PAGE_SIZE = 10
+LOCATIONS_PAGE_SIZE = 5
+
+# Shopify rejects any single query whose requested cost exceeds this
+MAX_QUERY_COST = 1000
+
+# REST-style field names (as used by the planner) -> GraphQL selections.
+# Aliases let loosely named plan fields ("quantity") pull the right selection.
+FIELD_SELECTIONS = {
+    "orders": {
+        "created_at": "createdAt",
+        "total_price": "totalPriceSet { shopMoney { amount } }",
+        "customer_id": "customer { id }",
+        "line_items": (
+            f"lineItems(first: {LINE_ITEMS_PAGE_SIZE}) {{ edges {{ node {{ "
+            "title quantity product { id } variant { id } "
+            "originalUnitPriceSet { shopMoney { amount } } "
+            "} } pageInfo { hasNextPage } }"
+        ),
+    },
+    "products": {
+        "title": "title",
+        "price": "variants(first: 1) { edges { node { price sku } } }",
+    },
+    "customers": {
+        "first_name": "firstName",
+        "last_name": "lastName",
+        "email": "email",
+        "orders_count": "numberOfOrders",
+    },
+}
+
+FIELD_ALIASES = {
+    "orders": {
+        "quantity": "line_items",
+        "product_id": "line_items",
+        "price": "line_items",
+        "customer": "customer_id",
+        "date": "created_at",
+        "revenue": "total_price",
+    },
+    "products": {
+        "sku": "price",
+        "name": "title",
+        "variants": "price",
+    },
+    "customers": {
+        "name": "first_name",
+    },
+}
+
+INVENTORY_SELECTION = (
+    f"locations(first: {LOCATIONS_PAGE_SIZE}) {{{{ edges {{{{ node {{{{ id "
+    "inventoryLevels(first: {levels}) {{ edges {{ node {{ "
+    'quantities(names: ["available"]) {{ name quantity }} '
+    "item {{ variant {{ id product {{ id }} }} }} "
+    "}} }} pageInfo {{ hasNextPage }} }} }} }} pageInfo {{ hasNextPage }} }}"
+)
+
+PAGE_INFO = "pageInfo { hasNextPage endCursor }"
+
+# Per-level cost inside a location: level + item + variant + product
+INVENTORY_LEVEL_COST = 4
+
+# Top-level connection each resource is read from
+ROOT_FIELDS = {
+    "orders": "orders",
+    "products": "products",
+    "customers": "customers",
+    "inventory_levels": "locations",
+}
+
+# Resources whose top-level connection is paged with cursors
+PAGINATED = ("orders", "products", "customers")
+
+
+def build_plan_query(
+    api_calls: List[Dict[str, Any]],
+    filters: Optional[Dict[str, Any]] = None,
+    after: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Build one GraphQL document covering every resource in the plan
+
+    Args:
+        api_calls: query_spec["api_calls"] from ShopifyQLGenerator
+        filters: query_spec["filters"] (time period, products)
+        after: End cursor per resource, to read its next page
+
+    Returns:
+        GraphQL query string
+    """
+    after = after or {}
+    filters = filters or {}
+    page_sizes = plan_page_sizes(api_calls)
+    sections = []
+
+    for call in api_calls:
+        resource = call.get("resource")
+        if resource not in ROOT_FIELDS:
+            continue
+
+        if resource == "inventory_levels":
+            sections.append(INVENTORY_SELECTION.format(levels=page_sizes[resource]))
+            continue
+
+        selection = " ".join(_select_fields(resource, call.get("fields", [])))
+        args = f"first: {page_sizes[resource]}"
+        if after.get(resource):
+            args += f', after: "{after[resource]}"'
+        search = _search_query(resource, call.get("filters", {}), filters)
+        if search:
+            args += f', query: "{search}"'
+
+        sections.append(
+            f"{resource}({args}) {{ edges {{ node {{ id {selection} }} }} {PAGE_INFO} }}"
+        )
+
+    return "query PlanData { " + " ".join(sections) + " }"
+
+
+def node_cost(resource: str, fields: List[str]) -> int:
+    """Calculated cost of one node of a resource connection (objects cost 1)"""
+    keys = _select_keys(resource, fields)
+    if resource == "orders":
+        cost = 1
+        if "line_items" in keys:
+            # lineItems connection: 2 + per item (line item + product + variant)
+            cost += 2 + LINE_ITEMS_PAGE_SIZE * 3
+        if "customer_id" in keys:
+            cost += 1
+        return cost
+    if resource == "products":
+        # variants(first: 1) connection
+        return 1 + (3 if "price" in keys else 0)
+    return 1
+
+
+def plan_page_sizes(api_calls: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Split the single-query cost limit evenly across the plan's connections
+    and size each page to fit its share.
+
+    For inventory_levels the size is per location.
+    """
+    calls = [call for call in api_calls if call.get("resource") in ROOT_FIELDS]
+    share = MAX_QUERY_COST // max(1, len(calls))
+
+    sizes = {}
+    for call in calls:
+        resource = call["resource"]
+        if resource == "inventory_levels":
+            per_location = (share - 2) // LOCATIONS_PAGE_SIZE - 3
+            sizes[resource] = max(1, min(PAGE_SIZE, per_location // INVENTORY_LEVEL_COST))
+        else:
+            per_node = node_cost(resource, call.get("fields", []))
+            sizes[resource] = max(1, min(PAGE_SIZE, (share - 2) // per_node))
+    return sizes
+
+
+def estimate_query_cost(api_calls: List[Dict[str, Any]]) -> int:
+    """
+    Estimate the requested cost of a plan query using Shopify's
+    calculated cost model: each connection costs 2 points plus its page
+    size times the cost of its children; scalar fields are free.
+    """
+    page_sizes = plan_page_sizes(api_calls)
+    cost = 0
+    for call in api_calls:
+        resource = call.get("resource")
+        if resource not in page_sizes:
+            continue
+        if resource == "inventory_levels":
+            levels = 2 + page_sizes[resource] * INVENTORY_LEVEL_COST
+            cost += 2 + LOCATIONS_PAGE_SIZE * (1 + levels)
+        else:
+            cost += 2 + page_sizes[resource] * node_cost(resource, call.get("fields", []))
+    return cost
+
+
+def normalize_plan_response(data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Convert a GraphQL plan response into the REST-shaped records the
+    ResultProcessor consumes (numeric ids, snake_case fields).
+    """
+    result = {}
+
+    if "orders" in data:
+        result["orders"] = [_normalize_order(node) for node in _nodes(data["orders"])]
+
+    if "products" in data:
+        result["products"] = [_normalize_product(node) for node in _nodes(data["products"])]
+
+    if "customers" in data:
+        result["customers"] = [
+            {
+                "id": _legacy_id(node.get("id")),
+                "first_name": node.get("firstName"),
+                "last_name": node.get("lastName"),
+                "email": node.get("email"),
+                "orders_count": _to_int(node.get("numberOfOrders")),
+            }
+            for node in _nodes(data["customers"])
+        ]
+
+    if "locations" in data:
+        inventory = []
+        for location in _nodes(data["locations"]):
+            location_id = _legacy_id(location.get("id"))
+            for level in _nodes(location.get("inventoryLevels")):
+                available = 0
+                for quantity in level.get("quantities") or []:
+                    if quantity.get("name") == "available":
+                        available = quantity.get("quantity", 0)
+                variant = (level.get("item") or {}).get("variant") or {}
+                inventory.append({
+                    "product_id": _legacy_id((variant.get("product") or {}).get("id")),
+                    "variant_id": _legacy_id(variant.get("id")),
+                    "location_id": location_id,
+                    "available": available,
+                })
+        result["inventory_levels"] = inventory
+
+    return result
+
+
+def next_page(data: Dict[str, Any], resource: str) -> Optional[str]:
+    """End cursor of a resource's top-level connection if it has more pages"""
+    info = (data.get(ROOT_FIELDS.get(resource, resource)) or {}).get("pageInfo") or {}
+    return info.get("endCursor") if info.get("hasNextPage") else None
+
+
+def truncated_resources(data: Dict[str, Any]) -> List[str]:
+    """
+    Resources a plan response cut short where it can't be paged: orders
+    with more line items than LINE_ITEMS_PAGE_SIZE, more locations than
+    LOCATIONS_PAGE_SIZE or more inventory levels than a location's page
+    """
+    truncated = []
+    if any(_has_next(order.get("lineItems")) for order in _nodes(data.get("orders"))):
+        truncated.append("orders")
+    locations = data.get("locations")
+    if locations and (
+        _has_next(locations)
+        or any(_has_next(location.get("inventoryLevels")) for location in _nodes(locations))
+    ):
+        truncated.append("inventory_levels")
+    return truncated
+
+
+def _has_next(connection: Optional[Dict[str, Any]]) -> bool:
+    return bool(((connection or {}).get("pageInfo") or {}).get("hasNextPage"))
+
+
+def _select_keys(resource: str, fields: List[str]) -> List[str]:
+    """Resolve plan field names to known selection keys for a resource"""
+    selections = FIELD_SELECTIONS.get(resource, {})
+    aliases = FIELD_ALIASES.get(resource, {})
+
+    keys = []
+    for field in fields or []:
+        key = aliases.get(field, field)
+        if key in selections and key not in keys:
+            keys.append(key)
+
+    # Unknown or empty field lists mean "everything"
+    return keys or list(selections.keys())
+
+
+def _select_fields(resource: str, fields: List[str]) -> List[str]:
+    selections = FIELD_SELECTIONS[resource]
+    return [selections[key] for key in _select_keys(resource, fields)]
+
+
+def _search_query(
+    resource: str,
+    call_filters: Dict[str, Any],
+    filters: Dict[str, Any]
+) -> str:
+    """Build the Shopify search syntax string for a connection"""
+    if resource not in ("orders", "customers"):
+        return ""
+
+    period = call_filters.get("time_filter") or filters.get("time_period")
+    created_min, created_max = period_to_date_range(period)
+    if not created_min:
+        return ""
+
+    terms = [f"created_at:>={created_min.date().isoformat()}"]
+    if created_max:
+        terms.append(f"created_at:<={created_max.date().isoformat()}")
+    return " ".join(terms)
+
+
+def _nodes(connection: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not connection:
+        return []
+    return [edge.get("node", {}) for edge in connection.get("edges", [])]
+
+
+def _normalize_order(node: Dict[str, Any]) -> Dict[str, Any]:
+    line_items = []
+    for item in _nodes(node.get("lineItems")):
+        line_items.append({
+            "product_id": _legacy_id((item.get("product") or {}).get("id")),
+            "variant_id": _legacy_id((item.get("variant") or {}).get("id")),
+            "title": item.get("title"),
+            "quantity": _to_int(item.get("quantity")),
+            "price": _money(item.get("originalUnitPriceSet")),
+        })
+
+    return {
+        "id": _legacy_id(node.get("id")),
+        "created_at": node.get("createdAt"),
+        "total_price": _money(node.get("totalPriceSet")),
+        "customer_id": _legacy_id((node.get("customer") or {}).get("id")),
+        "line_items": line_items,
+    }
+
+
+def _normalize_product(node: Dict[str, Any]) -> Dict[str, Any]:
+    variants = _nodes(node.get("variants"))
+    first_variant = variants[0] if variants else {}
+    return {
+        "id": _legacy_id(node.get("id")),
+        "title": node.get("title"),
+        "price": _to_float(first_variant.get("price")),
+        "sku": first_variant.get("sku"),
+    }
+
+
+def _legacy_id(gid: Optional[str]) -> Optional[int]:
+    """gid://shopify/Order/123 -> 123"""
+    if gid is None:
+        return None
+    try:
+        return int(str(gid).rsplit("/", 1)[-1])
+    except ValueError:
+        return None
+
+
+def _money(money_set: Optional[Dict[str, Any]]) -> float:
+    if not money_set:
+        return 0.0
+    return _to_float((money_set.get("shopMoney") or {}).get("amount"))
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
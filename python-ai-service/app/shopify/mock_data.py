@@ -1,147 +1,362 @@
 """
 Mock Data Provider - Generates realistic test data for development
+
+Data comes from the seeded synthetic shop generator, so the same config
+always yields the same shop. Sizes default to a small demo store and can be
+scaled to millions of orders via MOCK_* environment variables or a config
+dict; set MOCK_DATA_PATH to reuse a generated shop across runs.
 """
 
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
-import random
+import logging
+import os
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+
+import numpy as np
+
+from app.shopify.filters import rest_params
+from app.shopify.synthetic import shop_config, generate_shop, save_shop, load_shop
+from app.shopifyql.columnar import ColumnarShopData
+
+
+logger = logging.getLogger(__name__)
 
 
 class MockDataProvider:
     """
     Provides mock Shopify data for testing without a real store
+
+    The shop is held as column arrays; REST-shaped records are only
+    materialized for the rows a query selects. Filters follow the Admin
+    API list endpoints (see filters.rest_params): orders and customers
+    narrow by created_at, any resource by ids. Orders are stored sorted by
+    created_at, so a time window is a binary search; customer and product
+    indexes resolve customer_id / product_ids without scanning.
     """
-    
-    def __init__(self):
-        self.products = self._generate_products()
-        self.orders = self._generate_orders()
-        self.inventory = self._generate_inventory()
-        self.customers = self._generate_customers()
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, path: Optional[str] = None):
+        self.config = shop_config(config)
+        self.path = path or os.getenv("MOCK_DATA_PATH")
+        self.tables = self._load_or_generate()
+
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+        self._build_indexes()
+
+    @property
+    def products(self) -> List[Dict[str, Any]]:
+        return self.get_products()
+
+    @property
+    def orders(self) -> List[Dict[str, Any]]:
+        return self.get_orders()
+
+    @property
+    def inventory(self) -> List[Dict[str, Any]]:
+        return self.get_inventory()
+
+    @property
+    def customers(self) -> List[Dict[str, Any]]:
+        return self.get_customers()
 
     def get_orders(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Get mock orders"""
-        return self.orders
+        """
+        Get mock orders
+
+        Supports created_at_min/max (or a plan time period), ids,
+        customer_id, product_ids (orders containing any of them) and limit.
+        """
+        params = self._params("orders", filters)
+        orders = self.tables["orders"]
+
+        # Orders are sorted by created_at: the window is one contiguous range
+        created = orders["created_at"]
+        start = np.searchsorted(created, _epoch(params.get("created_at_min")), side="left") \
+            if "created_at_min" in params else 0
+        stop = np.searchsorted(created, _epoch(params.get("created_at_max")), side="right") \
+            if "created_at_max" in params else len(created)
+
+        rows = None
+        if "ids" in params:
+            rows = _lookup(orders["id"], _id_list(params["ids"]))
+        if "customer_id" in params:
+            customers = _lookup(self.tables["customers"]["id"], _id_list(params["customer_id"]))
+            rows = _intersect(rows, self._rows_for(self._customer_orders, customers))
+        if "product_ids" in params:
+            products = _lookup(self.tables["products"]["id"], _id_list(params["product_ids"]))
+            rows = _intersect(rows, np.unique(self._rows_for(self._product_orders, products)))
+
+        if rows is None:
+            rows = np.arange(start, stop)
+        else:
+            rows = rows[(rows >= start) & (rows < stop)]
+
+        return self._select("orders", rows, params, self._build_orders)
 
     def get_products(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Get mock products"""
-        return self.products
+        """Get mock products (supports ids / product_ids and limit)"""
+        params = self._params("products", filters)
+        ids = params.get("ids") or params.get("product_ids")
+        rows = _lookup(self.tables["products"]["id"], _id_list(ids)) if ids else \
+            np.arange(len(self.tables["products"]["id"]))
+        return self._select("products", rows, params, self._build_products)
 
     def get_inventory(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Get mock inventory levels"""
-        return self.inventory
+        """Get mock inventory levels (supports product_ids, location_ids and limit)"""
+        params = self._params("inventory_levels", filters)
+        inventory = self.tables["inventory"]
+        mask = np.ones(len(inventory["available"]), dtype=bool)
+
+        if "product_ids" in params:
+            products = _lookup(self.tables["products"]["id"], _id_list(params["product_ids"]))
+            mask &= np.isin(inventory["product_index"], products)
+        if "location_ids" in params:
+            mask &= np.isin(inventory["location_id"], _id_list(params["location_ids"]))
+
+        return self._select("inventory", np.flatnonzero(mask), params, self._build_inventory)
 
     def get_customers(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Get mock customers"""
-        return self.customers
+        """Get mock customers (supports created_at_min/max, ids and limit)"""
+        params = self._params("customers", filters)
+        customers = self.tables["customers"]
+        mask = np.ones(len(customers["id"]), dtype=bool)
 
-    def _generate_products(self) -> List[Dict[str, Any]]:
-        """Generate realistic product data"""
-        products = [
-            {
-                "id": 1001,
-                "title": "Premium Organic Coffee Beans",
-                "price": 24.99,
-                "sku": "COFFEE-001"
+        if "created_at_min" in params:
+            mask &= customers["created_at"] >= _epoch(params["created_at_min"])
+        if "created_at_max" in params:
+            mask &= customers["created_at"] <= _epoch(params["created_at_max"])
+        if "ids" in params:
+            mask &= np.isin(customers["id"], _id_list(params["ids"]))
+
+        return self._select("customers", np.flatnonzero(mask), params, self._build_customers)
+
+    def to_columnar(self) -> ColumnarShopData:
+        """Columnar view for the local ShopifyQL engine, built straight from the arrays"""
+        products = self.tables["products"]
+        orders = self.tables["orders"]
+        items = self.tables["line_items"]
+        inventory = self.tables["inventory"]
+        customers = self.tables["customers"]
+
+        item_order = items["order_index"]
+        return ColumnarShopData({
+            "sales": {
+                "created_at": orders["created_at"][item_order],
+                "order_id": orders["id"][item_order],
+                "customer_id": orders["customer_id"][item_order],
+                "product_id": products["id"][items["product_index"]],
+                "quantity": items["quantity"],
+                "price": items["price"],
+                "gross": items["quantity"] * items["price"]
             },
-            {
-                "id": 1002,
-                "title": "Stainless Steel Travel Mug",
-                "price": 19.99,
-                "sku": "MUG-002"
+            "orders": {
+                "created_at": orders["created_at"],
+                "order_id": orders["id"],
+                "customer_id": orders["customer_id"],
+                "total_price": orders["total_price"]
             },
-            {
-                "id": 1003,
-                "title": "Artisan Dark Chocolate Bar",
-                "price": 8.99,
-                "sku": "CHOC-003"
+            "products": {
+                "product_id": products["id"],
+                "title": products["title"],
+                "price": products["price"]
             },
-            {
-                "id": 1004,
-                "title": "Organic Green Tea Set",
-                "price": 32.99,
-                "sku": "TEA-004"
+            "inventory": {
+                "product_id": products["id"][inventory["product_index"]],
+                "location_id": inventory["location_id"],
+                "available": inventory["available"]
             },
+            "customers": {
+                "customer_id": customers["id"],
+                "orders_count": customers["orders_count"]
+            }
+        })
+
+    def save(self, path: str):
+        """Write the generated shop to disk for reuse"""
+        save_shop(path, self.config, self.tables)
+
+    def _load_or_generate(self) -> Dict[str, Dict[str, np.ndarray]]:
+        if self.path:
+            tables = load_shop(self.path, self.config)
+            if tables is not None:
+                logger.info("Loaded mock shop from %s", self.path)
+                return tables
+
+        tables = generate_shop(self.config)
+
+        if self.path:
+            save_shop(self.path, self.config, tables)
+            logger.info("Saved mock shop to %s", self.path)
+        return tables
+
+    def _build_indexes(self):
+        """Customer -> orders and product -> orders indexes (CSR: sorted rows + offsets)"""
+        orders = self.tables["orders"]
+        items = self.tables["line_items"]
+        customers = self.tables["customers"]
+
+        customer_rows = _lookup(customers["id"], orders["customer_id"])
+        self._customer_orders = _csr(customer_rows, len(customers["id"]))
+
+        self._product_orders = _csr(
+            items["product_index"], len(self.tables["products"]["id"]),
+            values=items["order_index"]
+        )
+
+    def _rows_for(self, index, keys: np.ndarray) -> np.ndarray:
+        values, offsets = index
+        if not len(keys):
+            return np.array([], dtype=np.int64)
+        return np.concatenate([values[offsets[k]:offsets[k + 1]] for k in keys])
+
+    def _params(self, resource: str, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Plan filters -> REST params, keeping mock-only keys (customer_id etc.)"""
+        filters = filters or {}
+        params = rest_params(resource, filters)
+        for key in ("customer_id", "product_ids", "location_ids"):
+            if filters.get(key) is not None:
+                params[key] = filters[key]
+        return params
+
+    def _select(self, name: str, rows: np.ndarray, params: Dict[str, Any], build) -> List[Dict[str, Any]]:
+        """Materialize the selected rows; the unfiltered full table is cached"""
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+
+        total = len(next(iter(self.tables[name].values())))
+        if len(rows) == total:
+            if name not in self._records:
+                self._records[name] = build(rows)
+            return self._records[name]
+        return build(rows)
+
+    def _build_products(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        products = self.tables["products"]
+        return [
+            {"id": pid, "title": title, "price": price, "sku": sku}
+            for pid, title, price, sku in zip(
+                products["id"][rows].tolist(),
+                products["title"][rows].tolist(),
+                products["price"][rows].tolist(),
+                products["sku"][rows].tolist()
+            )
+        ]
+
+    def _build_orders(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        products = self.tables["products"]
+        orders = self.tables["orders"]
+        items = self.tables["line_items"]
+
+        # Gather the selected orders' line items (each order's items are contiguous)
+        counts = orders["line_item_count"][rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        item_rows = np.repeat(orders["line_item_start"][rows] - offsets[:-1], counts) + \
+            np.arange(offsets[-1])
+
+        product_index = items["product_index"][item_rows]
+        line_items = [
+            {"product_id": pid, "title": title, "quantity": quantity, "price": price}
+            for pid, title, quantity, price in zip(
+                products["id"][product_index].tolist(),
+                products["title"][product_index].tolist(),
+                items["quantity"][item_rows].tolist(),
+                items["price"][item_rows].tolist()
+            )
+        ]
+
+        return [
             {
-                "id": 1005,
-                "title": "Ceramic Coffee Grinder",
-                "price": 45.99,
-                "sku": "GRIND-005"
+                "id": oid,
+                "created_at": created,
+                "total_price": total,
+                "customer_id": customer_id,
+                "line_items": line_items[start:stop]
             }
+            for oid, created, total, customer_id, start, stop in zip(
+                orders["id"][rows].tolist(),
+                _iso(orders["created_at"][rows]),
+                orders["total_price"][rows].tolist(),
+                orders["customer_id"][rows].tolist(),
+                offsets[:-1].tolist(),
+                offsets[1:].tolist()
+            )
+        ]
+
+    def _build_inventory(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        products = self.tables["products"]
+        inventory = self.tables["inventory"]
+        return [
+            {"product_id": pid, "location_id": location_id, "available": available}
+            for pid, location_id, available in zip(
+                products["id"][inventory["product_index"][rows]].tolist(),
+                inventory["location_id"][rows].tolist(),
+                inventory["available"][rows].tolist()
+            )
         ]
-        return products
-
-    def _generate_orders(self) -> List[Dict[str, Any]]:
-        """Generate realistic order data for last 30 days"""
-        orders = []
-        base_date = datetime.now()
-        
-        # Generate 30-50 orders over last 30 days
-        for i in range(45):
-            days_ago = random.randint(0, 30)
-            order_date = base_date - timedelta(days=days_ago)
-            
-            # Random products in order
-            num_items = random.randint(1, 3)
-            line_items = []
-            total_price = 0
-            
-            for _ in range(num_items):
-                product = random.choice(self.products)
-                quantity = random.randint(1, 5)
-                price = product["price"]
-                
-                line_items.append({
-                    "product_id": product["id"],
-                    "title": product["title"],
-                    "quantity": quantity,
-                    "price": price
-                })
-                
-                total_price += price * quantity
-            
-            orders.append({
-                "id": 2000 + i,
-                "created_at": order_date.isoformat(),
-                "total_price": round(total_price, 2),
-                "customer_id": random.randint(3000, 3020),  # 20 different customers
-                "line_items": line_items
-            })
-        
-        return orders
-
-    def _generate_inventory(self) -> List[Dict[str, Any]]:
-        """Generate inventory levels"""
-        inventory = []
-        
-        for product in self.products:
-            # Random current stock (some low, some high)
-            available = random.choice([5, 12, 25, 45, 100, 15, 8, 30])
-            
-            inventory.append({
-                "product_id": product["id"],
-                "location_id": 5000,
-                "available": available
-            })
-        
-        return inventory
-
-    def _generate_customers(self) -> List[Dict[str, Any]]:
-        """Generate customer data"""
-        customers = []
-        
-        first_names = ["Alice", "Bob", "Carol", "David", "Emma", "Frank", "Grace", "Henry"]
-        last_names = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller"]
-        
-        for i in range(20):
-            customers.append({
-                "id": 3000 + i,
-                "first_name": random.choice(first_names),
-                "last_name": random.choice(last_names),
-                "email": f"customer{i}@example.com",
-                "orders_count": random.randint(1, 5)
-            })
-        
-        return customers
+
+    def _build_customers(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        customers = self.tables["customers"]
+        return [
+            {
+                "id": cid,
+                "first_name": first,
+                "last_name": last,
+                "email": email,
+                "orders_count": orders_count,
+                "created_at": created
+            }
+            for cid, first, last, email, orders_count, created in zip(
+                customers["id"][rows].tolist(),
+                customers["first_name"][rows].tolist(),
+                customers["last_name"][rows].tolist(),
+                customers["email"][rows].tolist(),
+                customers["orders_count"][rows].tolist(),
+                _iso(customers["created_at"][rows])
+            )
+        ]
+
+
+def _iso(epoch_seconds: np.ndarray) -> List[str]:
+    return np.datetime_as_string(epoch_seconds.astype("datetime64[s]"), timezone="UTC").tolist()
+
+
+def _epoch(value: Any) -> int:
+    """created_at_min/max value (ISO string or datetime) -> epoch seconds"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+
+
+def _id_list(value: Any) -> np.ndarray:
+    """Comma-separated string, scalar or list of ids -> int array"""
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v.strip()]
+    elif not isinstance(value, (list, tuple, np.ndarray)):
+        value = [value]
+    return np.array([int(v) for v in value], dtype=np.int64)
+
+
+def _lookup(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Row positions of ids in an ascending id column (missing ids dropped)"""
+    if not len(sorted_ids):
+        return np.array([], dtype=np.int64)
+    positions = np.clip(np.searchsorted(sorted_ids, ids), 0, len(sorted_ids) - 1)
+    return positions[sorted_ids[positions] == ids]
+
+
+def _csr(keys: np.ndarray, num_keys: int, values: Optional[np.ndarray] = None):
+    """Group row numbers (or values) by key: values sorted by key plus key offsets"""
+    order = np.argsort(keys, kind="stable")
+    grouped = order if values is None else values[order]
+    offsets = np.zeros(num_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=num_keys), out=offsets[1:])
+    return grouped, offsets
+
+
+def _intersect(rows: Optional[np.ndarray], other: np.ndarray) -> np.ndarray:
+    if rows is None:
+        return np.sort(other)
+    return np.intersect1d(rows, other)
 
 
 # Singleton instance
@@ -0,0 +1,160 @@
+"""
+Rate Limits - Per-shop leaky buckets for the Admin API
+
+Shopify throttles every shop on its own: REST requests fill a leaky bucket
+(40 requests, leaking 2 per second on standard plans) and GraphQL queries
+spend cost points from a bucket (1000 points, restoring 50 per second).
+Requests wait until their shop's bucket has room for them before they are
+sent, so fanning out over many shops - or many requests for one shop -
+stays under each shop's limit instead of collecting 429s.
+
+Buckets adopt the level each response reports - X-Shopify-Shop-Api-Call-Limit
+for REST, extensions.cost.throttleStatus (with size and restore rate, larger
+on Plus shops) for GraphQL - since a request counts when it reaches the shop,
+not when it was sent.
+SHOPIFY_RATE_LIMIT=off sends requests without waiting.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Any, Optional, Tuple
+
+
+class LeakyBucket:
+    """
+    Capacity units refilling at rate units per second
+
+    A request's cost (GraphQL: its requested cost) is taken when it is
+    sent; once answered, what it didn't actually cost is given back, as
+    Shopify refunds it.
+    """
+
+    # Extra wait, so requests don't arrive the instant the shop's bucket
+    # has room again (network jitter would get them throttled)
+    margin = 0.05
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.available = float(capacity)
+        # Reserved by requests not answered yet
+        self.in_flight = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float = 1.0) -> float:
+        """Seconds until cost fits in the bucket (0 = now)"""
+        self._refill()
+        missing = min(cost, self.capacity) - self.available
+        return missing / self.rate + self.margin if missing > 0 else 0.0
+
+    def take(self, cost: float = 1.0):
+        self.available -= min(cost, self.capacity)
+        self.in_flight += min(cost, self.capacity)
+
+    def settle(self, cost: float, actual: Optional[float] = None, level: Optional[Dict[str, Any]] = None):
+        """
+        A request was answered: refund what it didn't cost, or
+        adopt the level the shop reported (size, restore rate and points
+        available, as in GraphQL throttleStatus)
+        """
+        self._refill()
+        cost = min(cost, self.capacity)
+        self.in_flight = max(0.0, self.in_flight - cost)
+        if level and level.get("currentlyAvailable") is not None:
+            self.capacity = float(level.get("maximumAvailable") or self.capacity)
+            self.rate = float(level.get("restoreRate") or self.rate)
+            # Requests still in flight may not have reached the shop yet
+            self.available = min(self.capacity, float(level["currentlyAvailable"])) - self.in_flight
+        elif actual is not None:
+            self.available += cost - min(actual, cost)
+
+    def penalize(self, seconds: float):
+        """Server says we're throttled: nothing is available for `seconds`"""
+        self._refill()
+        self.available = min(self.available, -seconds * self.rate)
+
+
+class ShopRateLimiter:
+    """Leaky buckets per (shop, API), created on first use"""
+
+    # Longest sleep before re-checking a bucket, which answered requests
+    # may have refilled early
+    poll = 0.5
+
+    def __init__(
+        self,
+        rest_bucket: float = 40,
+        rest_leak_rate: float = 2,
+        graphql_bucket: float = 1000,
+        graphql_restore_rate: float = 50
+    ):
+        self.limits = {
+            "rest": (rest_bucket, rest_leak_rate),
+            "graphql": (graphql_bucket, graphql_restore_rate),
+        }
+        self._buckets: Dict[Tuple[str, str], LeakyBucket] = {}
+        self.stats = {"requests": 0, "waits": 0, "wait_s": 0.0, "throttled": 0}
+
+    def bucket(self, store_id: str, api: str) -> LeakyBucket:
+        key = (store_id, api)
+        if key not in self._buckets:
+            self._buckets[key] = LeakyBucket(*self.limits[api])
+        return self._buckets[key]
+
+    async def acquire(self, store_id: str, api: str, cost: float = 1.0) -> float:
+        """Wait until the shop's bucket has room for a request and take it; seconds waited"""
+        bucket = self.bucket(store_id, api)
+        waited = 0.0
+        delay = bucket.wait_time(cost)
+        while delay:
+            delay = min(delay, self.poll)
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = bucket.wait_time(cost)
+        bucket.take(cost)
+        self.stats["requests"] += 1
+        if waited:
+            self.stats["waits"] += 1
+            self.stats["wait_s"] += waited
+        return waited
+
+    def settle(
+        self,
+        store_id: str,
+        api: str,
+        cost: float,
+        actual: Optional[float] = None,
+        level: Optional[Dict[str, Any]] = None
+    ):
+        """Account for an answered request (see LeakyBucket.settle)"""
+        self.bucket(store_id, api).settle(cost, actual, level)
+
+    def throttled(self, store_id: str, api: str, retry_after: float):
+        """Record a 429 / THROTTLED response"""
+        self.stats["throttled"] += 1
+        self.bucket(store_id, api).penalize(retry_after)
+
+
+# Singleton instance
+_limiter = None
+
+
+def get_rate_limiter() -> Optional[ShopRateLimiter]:
+    """Get singleton rate limiter (None with SHOPIFY_RATE_LIMIT=off)"""
+    global _limiter
+    if os.getenv("SHOPIFY_RATE_LIMIT", "on").lower() == "off":
+        return None
+    if _limiter is None:
+        _limiter = ShopRateLimiter(
+            rest_bucket=float(os.getenv("SHOPIFY_REST_BUCKET", "40")),
+            rest_leak_rate=float(os.getenv("SHOPIFY_REST_LEAK_RATE", "2")),
+            graphql_bucket=float(os.getenv("SHOPIFY_GRAPHQL_BUCKET", "1000")),
+            graphql_restore_rate=float(os.getenv("SHOPIFY_GRAPHQL_RESTORE_RATE", "50"))
+        )
+    return _limiter
@@ -0,0 +1,319 @@
+"""
+Synthetic Shop Generator - Seeded, vectorized shop data for mocks and benchmarks
+
+Generates products, customers, orders, line items and inventory as numpy
+column arrays, so millions of orders take seconds. The same config and seed
+always produce the same shop, and generated shops can be saved to / loaded
+from an .npz file for reuse.
+"""
+
+import json
+import os
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+DEFAULT_CONFIG = {
+    "seed": 42,
+    "products": 5,
+    "customers": 20,
+    "orders": 45,
+    "locations": 1,
+    "days": 30,
+    # Last day of data (YYYY-MM-DD, UTC); defaults to yesterday so a day's
+    # snapshot is identical however many times it is generated
+    "end_date": None,
+    # Zipf exponent for product popularity and customer activity
+    "product_popularity_alpha": 1.1,
+    "customer_activity_alpha": 0.8,
+    # Relative amplitude of the weekly and yearly demand cycles, and
+    # overall growth across the date span
+    "weekly_seasonality": 0.25,
+    "yearly_seasonality": 0.35,
+    "trend": 0.2,
+    "mean_line_items": 2.0,
+    "max_line_items": 5,
+    "mean_quantity": 2.0,
+    "max_quantity": 5
+}
+
+BASE_PRODUCTS = [
+    ("Premium Organic Coffee Beans", 24.99, "COFFEE-001"),
+    ("Stainless Steel Travel Mug", 19.99, "MUG-002"),
+    ("Artisan Dark Chocolate Bar", 8.99, "CHOC-003"),
+    ("Organic Green Tea Set", 32.99, "TEA-004"),
+    ("Ceramic Coffee Grinder", 45.99, "GRIND-005"),
+]
+
+ADJECTIVES = [
+    "Premium", "Organic", "Artisan", "Classic", "Deluxe", "Handmade",
+    "Vintage", "Essential", "Signature", "Limited"
+]
+
+NOUNS = [
+    "Coffee Beans", "Travel Mug", "Chocolate Bar", "Tea Set", "Coffee Grinder",
+    "French Press", "Pour-Over Kit", "Espresso Cups", "Matcha Whisk", "Honey Jar",
+    "Cold Brew Bottle", "Tea Infuser", "Milk Frother", "Biscotti Tin", "Syrup Set"
+]
+
+FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Emma", "Frank", "Grace", "Henry"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller"]
+
+PRODUCT_ID_START = 1001
+ORDER_ID_START = 2000
+CUSTOMER_ID_START = 3000
+LOCATION_ID_START = 5000
+
+SECONDS_PER_DAY = 86400
+
+# Bumped when generated columns change, so stale saved shops are regenerated
+SCHEMA_VERSION = 2
+
+
+def shop_config(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge overrides onto the defaults, reading MOCK_* environment variables"""
+    config = dict(DEFAULT_CONFIG)
+    env_keys = {
+        "seed": "MOCK_SEED",
+        "products": "MOCK_PRODUCTS",
+        "customers": "MOCK_CUSTOMERS",
+        "orders": "MOCK_ORDERS",
+        "locations": "MOCK_LOCATIONS",
+        "days": "MOCK_DAYS",
+    }
+    for key, env in env_keys.items():
+        if os.getenv(env):
+            config[key] = int(os.getenv(env))
+    if os.getenv("MOCK_END_DATE"):
+        config["end_date"] = os.getenv("MOCK_END_DATE")
+
+    config.update(overrides or {})
+
+    if config["end_date"] is None:
+        today = datetime.now(timezone.utc).date()
+        config["end_date"] = datetime.fromordinal(today.toordinal() - 1).strftime("%Y-%m-%d")
+    return config
+
+
+def generate_shop(config: Dict[str, Any]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Generate a shop as column arrays
+
+    Returns:
+        {
+            "products":  {id, title, price, sku},
+            "customers": {id, first_name, last_name, email, orders_count, created_at},
+            "orders":    {id, created_at, customer_id, total_price, line_item_start, line_item_count},
+            "line_items": {order_index, product_index, quantity, price},
+            "inventory": {product_index, location_id, available}
+        }
+
+    created_at is epoch seconds (UTC), sorted ascending.
+    """
+    rng = np.random.default_rng(config["seed"])
+
+    products = _generate_products(rng, config)
+    customers = _generate_customers(rng, config)
+
+    num_products = len(products["id"])
+    num_customers = len(customers["id"])
+    num_orders = config["orders"]
+
+    created_at = _order_timestamps(rng, config, num_orders)
+
+    # Power-law customer activity: a few loyal customers place many orders
+    activity = _zipf_weights(num_customers, config["customer_activity_alpha"], rng)
+    order_customer = rng.choice(num_customers, size=num_orders, p=activity)
+
+    # Line items per order: 1 + Poisson, capped
+    counts = 1 + rng.poisson(config["mean_line_items"] - 1, size=num_orders)
+    counts = np.minimum(counts, config["max_line_items"]).astype(np.int64)
+    starts = np.zeros(num_orders, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    num_items = int(counts.sum())
+
+    popularity = _zipf_weights(num_products, config["product_popularity_alpha"], rng)
+    item_order = np.repeat(np.arange(num_orders, dtype=np.int64), counts)
+    item_product = rng.choice(num_products, size=num_items, p=popularity)
+    quantity = 1 + rng.poisson(config["mean_quantity"] - 1, size=num_items)
+    quantity = np.minimum(quantity, config["max_quantity"]).astype(np.int64)
+    item_price = products["price"][item_product]
+
+    total_price = np.round(
+        np.bincount(item_order, weights=quantity * item_price, minlength=num_orders), 2
+    )
+
+    customers["orders_count"] = np.bincount(order_customer, minlength=num_customers).astype(np.int64)
+    # Customers sign up with their first order; the rest at the start of the span
+    first_seen = np.full(num_customers, created_at[0] if num_orders else 0, dtype=np.int64)
+    first_seen[order_customer[::-1]] = created_at[::-1]
+    customers["created_at"] = first_seen
+
+    return {
+        "products": products,
+        "customers": customers,
+        "orders": {
+            "id": np.arange(ORDER_ID_START, ORDER_ID_START + num_orders, dtype=np.int64),
+            "created_at": created_at,
+            "customer_id": customers["id"][order_customer],
+            "total_price": total_price,
+            "line_item_start": starts,
+            "line_item_count": counts,
+        },
+        "line_items": {
+            "order_index": item_order,
+            "product_index": item_product.astype(np.int64),
+            "quantity": quantity,
+            "price": item_price,
+        },
+        "inventory": _generate_inventory(rng, config, num_products, popularity),
+    }
+
+
+def save_shop(path: str, config: Dict[str, Any], tables: Dict[str, Dict[str, np.ndarray]]):
+    """Persist a generated shop (and the config that produced it) to .npz"""
+    # Strings are stored as fixed-width unicode so loading never unpickles
+    arrays = {
+        f"{table}.{column}": values.astype(str) if values.dtype == object else values
+        for table, columns in tables.items()
+        for column, values in columns.items()
+    }
+    arrays["__config__"] = np.array(_config_key(config))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_shop(
+    path: str,
+    config: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+    """
+    Load a saved shop; returns None if the file is missing or was
+    generated from a different config
+    """
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path) as archive:
+        if config is not None and str(archive["__config__"]) != _config_key(config):
+            return None
+
+        tables: Dict[str, Dict[str, np.ndarray]] = {}
+        for key in archive.files:
+            if key == "__config__":
+                continue
+            table, column = key.split(".", 1)
+            values = archive[key]
+            tables.setdefault(table, {})[column] = values.astype(object) if values.dtype.kind == "U" else values
+    return tables
+
+
+def _config_key(config: Dict[str, Any]) -> str:
+    return json.dumps({"schema": SCHEMA_VERSION, "config": config}, sort_keys=True)
+
+
+def _zipf_weights(n: int, alpha: float, rng: np.random.Generator) -> np.ndarray:
+    """Power-law weights over n items, randomly assigned to items"""
+    weights = 1.0 / np.arange(1, n + 1) ** alpha
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _order_timestamps(rng: np.random.Generator, config: Dict[str, Any], n: int) -> np.ndarray:
+    """Order times with weekly and yearly seasonality plus a growth trend"""
+    days = config["days"]
+    end_day = datetime.strptime(config["end_date"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    end = int(end_day.timestamp()) + SECONDS_PER_DAY
+    first_day = end - days * SECONDS_PER_DAY
+
+    day_index = np.arange(days)
+    day_start = first_day + day_index * SECONDS_PER_DAY
+    weekday = ((day_start // SECONDS_PER_DAY) + 3) % 7          # 0 = Monday
+    day_of_year = (day_start // SECONDS_PER_DAY) % 365.25
+
+    weights = (
+        1.0
+        + config["weekly_seasonality"] * np.where(weekday >= 5, 1.0, -0.4)
+        # Peak demand around late November (day ~330)
+        + config["yearly_seasonality"] * np.cos(2 * np.pi * (day_of_year - 330) / 365.25)
+        + config["trend"] * day_index / max(days - 1, 1)
+    )
+    weights = np.clip(weights, 0.05, None)
+
+    order_day = rng.choice(days, size=n, p=weights / weights.sum())
+    seconds = rng.integers(0, SECONDS_PER_DAY, size=n)
+    return np.sort(day_start[order_day] + seconds).astype(np.int64)
+
+
+def _generate_products(rng: np.random.Generator, config: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    n = config["products"]
+
+    titles, prices, skus = [], [], []
+    for i in range(min(n, len(BASE_PRODUCTS))):
+        title, price, sku = BASE_PRODUCTS[i]
+        titles.append(title)
+        prices.append(price)
+        skus.append(sku)
+
+    extra = n - len(titles)
+    if extra > 0:
+        index = np.arange(len(titles), n)
+        adjectives = np.array(ADJECTIVES, dtype=object)[index % len(ADJECTIVES)]
+        nouns = np.array(NOUNS, dtype=object)[(index // len(ADJECTIVES)) % len(NOUNS)]
+        editions = index // (len(ADJECTIVES) * len(NOUNS))
+        titles.extend(
+            f"{a} {b}" if e == 0 else f"{a} {b} No. {e + 1}"
+            for a, b, e in zip(adjectives, nouns, editions)
+        )
+        prices.extend(np.round(np.exp(rng.normal(3.2, 0.6, extra)), 2) - 0.01)
+        skus.extend(f"SKU-{i + 1:06d}" for i in index)
+
+    return {
+        "id": np.arange(PRODUCT_ID_START, PRODUCT_ID_START + n, dtype=np.int64),
+        "title": np.array(titles, dtype=object),
+        "price": np.maximum(np.array(prices, dtype=np.float64), 0.99),
+        "sku": np.array(skus, dtype=object),
+    }
+
+
+def _generate_customers(rng: np.random.Generator, config: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    n = config["customers"]
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n)]
+    return {
+        "id": np.arange(CUSTOMER_ID_START, CUSTOMER_ID_START + n, dtype=np.int64),
+        "first_name": first,
+        "last_name": last,
+        "email": np.array([f"customer{i}@example.com" for i in range(n)], dtype=object),
+    }
+
+
+def _generate_inventory(
+    rng: np.random.Generator,
+    config: Dict[str, Any],
+    num_products: int,
+    popularity: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Stock per product per location, loosely tracking popularity"""
+    locations = config["locations"]
+    product_index = np.tile(np.arange(num_products, dtype=np.int64), locations)
+    location_id = np.repeat(
+        np.arange(LOCATION_ID_START, LOCATION_ID_START + locations, dtype=np.int64), num_products
+    )
+
+    # Expected daily demand per product, spread over locations
+    daily_units = config["orders"] / max(config["days"], 1) * config["mean_line_items"] * \
+        config["mean_quantity"] * popularity / locations
+    days_of_cover = rng.uniform(2, 45, size=num_products * locations)
+    available = np.rint(np.tile(daily_units, locations) * days_of_cover).astype(np.int64)
+
+    return {
+        "product_index": product_index,
+        "location_id": location_id,
+        "available": np.maximum(available, rng.integers(0, 5, size=len(available))),
+    }
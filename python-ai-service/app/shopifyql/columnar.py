@@ -0,0 +1,244 @@
+"""
+Columnar Shop Data - Numpy column store of a shop's records for local queries
+
+Time-series tables (sales, orders) are kept sorted by created_at so SINCE/UNTIL
+resolve to a contiguous slice via binary search. String dimensions are
+dictionary-encoded: product titles live once in the products table and
+are joined in by product_id only when a query asks for them.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+
+import numpy as np
+
+
+MISSING_ID = -1
+
+# Integer keys are direct-addressed (O(n), no sort) while their range is at
+# most this many times the number of keys, or small in absolute terms
+DENSE_SPAN_FACTOR = 4
+DENSE_SPAN_MIN = 1 << 20
+
+
+class ColumnarShopData:
+    """
+    Column arrays for each ShopifyQL table of one shop
+
+    Tables:
+        sales     - one row per line item (created_at, order_id, product_id,
+                    customer_id, quantity, price, gross; variant_id when known)
+        orders    - one row per order (created_at, order_id, customer_id, total_price)
+        products  - product_id, title, price
+        inventory - product_id, location_id, available (variant_id when known)
+        customers - customer_id, orders_count
+    """
+
+    TIME_TABLES = ("sales", "orders")
+
+    def __init__(self, tables: Dict[str, Dict[str, np.ndarray]]):
+        self.tables = {}
+        for name, columns in tables.items():
+            if name in self.TIME_TABLES and len(columns.get("created_at", [])):
+                order = np.argsort(columns["created_at"], kind="stable")
+                if not np.all(order[:-1] < order[1:]):
+                    columns = {col: values[order] for col, values in columns.items()}
+            self.tables[name] = columns
+
+        self.built_at = datetime.now()
+        self._title_lookup = None
+
+    @classmethod
+    def from_raw(cls, data: Dict[str, List[Dict[str, Any]]]) -> "ColumnarShopData":
+        """Build from REST-shaped records (as returned by QueryExecutor)"""
+        orders = data.get("orders", [])
+        products = data.get("products", [])
+        tables = {}
+
+        if orders:
+            created = np.array(
+                [_epoch_seconds(o.get("created_at")) for o in orders], dtype=np.int64
+            )
+            order_ids = np.array([_int_id(o.get("id")) for o in orders], dtype=np.int64)
+            customer_ids = np.array([_int_id(o.get("customer_id")) for o in orders], dtype=np.int64)
+
+            tables["orders"] = {
+                "created_at": created,
+                "order_id": order_ids,
+                "customer_id": customer_ids,
+                "total_price": np.array(
+                    [float(o.get("total_price") or 0) for o in orders], dtype=np.float64
+                )
+            }
+
+            counts = np.array([len(o.get("line_items", [])) for o in orders], dtype=np.int64)
+            items = [item for o in orders for item in o.get("line_items", [])]
+            quantity = np.array([int(i.get("quantity") or 0) for i in items], dtype=np.int64)
+            price = np.array([float(i.get("price") or 0) for i in items], dtype=np.float64)
+
+            tables["sales"] = {
+                "created_at": np.repeat(created, counts),
+                "order_id": np.repeat(order_ids, counts),
+                "customer_id": np.repeat(customer_ids, counts),
+                "product_id": np.array([_int_id(i.get("product_id")) for i in items], dtype=np.int64),
+                "quantity": quantity,
+                "price": price,
+                "gross": quantity * price
+            }
+            if any(i.get("variant_id") is not None for i in items):
+                tables["sales"]["variant_id"] = np.array(
+                    [_int_id(i.get("variant_id")) for i in items], dtype=np.int64
+                )
+
+            # Line items carry titles too - use them when products weren't fetched
+            if not products:
+                seen = {}
+                for item in items:
+                    seen.setdefault(item.get("product_id"), item.get("title"))
+                products = [{"id": pid, "title": title} for pid, title in seen.items()]
+
+        if products:
+            tables["products"] = {
+                "product_id": np.array([_int_id(p.get("id")) for p in products], dtype=np.int64),
+                "title": np.array([p.get("title") or "Unknown" for p in products], dtype=object),
+                "price": np.array([float(p.get("price") or 0) for p in products], dtype=np.float64)
+            }
+
+        inventory = data.get("inventory_levels", [])
+        if inventory:
+            tables["inventory"] = {
+                "product_id": np.array([_int_id(i.get("product_id")) for i in inventory], dtype=np.int64),
+                "location_id": np.array([_int_id(i.get("location_id")) for i in inventory], dtype=np.int64),
+                "available": np.array([int(i.get("available") or 0) for i in inventory], dtype=np.int64)
+            }
+            if any(i.get("variant_id") is not None for i in inventory):
+                tables["inventory"]["variant_id"] = np.array(
+                    [_int_id(i.get("variant_id")) for i in inventory], dtype=np.int64
+                )
+
+        customers = data.get("customers", [])
+        if customers:
+            tables["customers"] = {
+                "customer_id": np.array([_int_id(c.get("id")) for c in customers], dtype=np.int64),
+                "orders_count": np.array([int(c.get("orders_count") or 0) for c in customers], dtype=np.int64)
+            }
+
+        return cls(tables)
+
+    def has(self, table: str) -> bool:
+        return table in self.tables
+
+    def row_count(self, table: str) -> int:
+        columns = self.tables.get(table, {})
+        return len(next(iter(columns.values()))) if columns else 0
+
+    def time_slice(self, table: str, since: Optional[datetime], until: Optional[datetime]) -> slice:
+        """Binary-search the sorted created_at column for a [since, until] window"""
+        if table not in self.TIME_TABLES or (since is None and until is None):
+            return slice(0, self.row_count(table))
+
+        created = self.tables[table]["created_at"]
+        start = np.searchsorted(created, int(since.timestamp()), side="left") if since else 0
+        stop = np.searchsorted(created, int(until.timestamp()), side="right") if until else len(created)
+        return slice(int(start), int(stop))
+
+    def product_titles(self, product_ids: np.ndarray) -> np.ndarray:
+        """Map product ids to titles (hash-free: sorted ids + searchsorted)"""
+        if self._title_lookup is None:
+            products = self.tables.get("products")
+            if not products:
+                self._title_lookup = (np.array([], dtype=np.int64), np.array([], dtype=object))
+            else:
+                order = np.argsort(products["product_id"])
+                self._title_lookup = (products["product_id"][order], products["title"][order])
+
+        ids, titles = self._title_lookup
+        if not len(ids):
+            return np.array([f"Product {pid}" for pid in product_ids], dtype=object)
+
+        positions = np.clip(np.searchsorted(ids, product_ids), 0, len(ids) - 1)
+        found = ids[positions] == product_ids
+        result = titles[positions].copy()
+        if not np.all(found):
+            result[~found] = [f"Product {pid}" for pid in product_ids[~found]]
+        return result
+
+
+def encode_keys(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dictionary-encode a column: (sorted distinct values, code of each row)
+
+    Integer columns with a compact range use an O(n) remap through a
+    presence table instead of the O(n log n) sort behind np.unique.
+    """
+    keys = np.asarray(keys)
+    if keys.dtype.kind in "iu" and len(keys):
+        low = int(keys.min())
+        span = int(keys.max()) - low + 1
+        if _dense(span, len(keys)):
+            offsets = keys - low
+            present = np.zeros(span, dtype=bool)
+            present[offsets] = True
+            return np.flatnonzero(present) + low, (np.cumsum(present) - 1)[offsets]
+    unique, codes = np.unique(keys, return_inverse=True)
+    return unique, codes.reshape(-1)
+
+
+def _dense(span: int, count: int) -> bool:
+    return span <= max(DENSE_SPAN_FACTOR * count, DENSE_SPAN_MIN)
+
+
+class KeyTable:
+    """
+    Hash-style lookup from int64 id to its row, for joining columns by id
+
+    Args:
+        keys: Sorted distinct ids; row i holds keys[i]
+    """
+
+    def __init__(self, keys: np.ndarray):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self._slots = None
+        self._low = int(self.keys[0]) if len(self.keys) else 0
+        if len(self.keys):
+            span = int(self.keys[-1]) - self._low + 1
+            if _dense(span, len(self.keys)):
+                self._slots = np.full(span, -1, dtype=np.int64)
+                self._slots[self.keys - self._low] = np.arange(len(self.keys))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, probe: np.ndarray) -> np.ndarray:
+        """Row of each probed id, -1 where the id is unknown"""
+        probe = np.asarray(probe, dtype=np.int64)
+        rows = np.full(len(probe), -1, dtype=np.int64)
+        if not len(self.keys):
+            return rows
+        if self._slots is not None:
+            offsets = probe - self._low
+            inside = (offsets >= 0) & (offsets < len(self._slots))
+            rows[inside] = self._slots[offsets[inside]]
+            return rows
+        positions = np.minimum(np.searchsorted(self.keys, probe), len(self.keys) - 1)
+        found = self.keys[positions] == probe
+        rows[found] = positions[found]
+        return rows
+
+
+def _epoch_seconds(value: Any) -> int:
+    if not value:
+        return 0
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    try:
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return 0
+
+
+def _int_id(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return MISSING_ID
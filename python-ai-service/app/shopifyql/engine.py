@@ -0,0 +1,463 @@
+"""
+ShopifyQL Engine - Executes parsed ShopifyQL against ColumnarShopData
+
+Execution order:
+1. SINCE/UNTIL -> binary search on sorted created_at (contiguous slice)
+2. WHERE -> boolean mask built only from the columns the predicates touch
+3. GROUP BY -> dense integer group codes combined into one key
+4. SHOW -> vectorized aggregates (bincount / reduceat) over group codes
+
+Columns are materialized lazily, so a query never touches columns it
+doesn't reference (projection pushdown).
+"""
+
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+import numpy as np
+
+from app.shopifyql.parser import parse_shopifyql, ShopifyQLError
+from app.shopifyql.columnar import ColumnarShopData, MISSING_ID, encode_keys
+
+
+# Implicit metrics: name -> (function, column), or ("ratio", numerator, denominator)
+METRICS = {
+    "sales": {
+        "total_sales": ("sum", "gross"),
+        "gross_sales": ("sum", "gross"),
+        # No net_sales: line items carry no discounts or returns to subtract,
+        # so queries for it fall back to raw data
+        "net_quantity": ("sum", "quantity"),
+        "ordered_item_quantity": ("sum", "quantity"),
+        "orders": ("count_distinct", "order_id"),
+        "customers": ("count_distinct", "customer_id"),
+        "average_order_value": ("ratio", "total_sales", "orders"),
+    },
+    "orders": {
+        "orders": ("count", "*"),
+        "total_sales": ("sum", "total_price"),
+        "customers": ("count_distinct", "customer_id"),
+        "average_order_value": ("avg", "total_price"),
+    },
+    "inventory": {
+        "available": ("sum", "available"),
+        "locations": ("count_distinct", "location_id"),
+        "products": ("count_distinct", "product_id"),
+    },
+    "products": {
+        "products": ("count", "*"),
+    },
+    "customers": {
+        "customers": ("count", "*"),
+        "total_orders": ("sum", "orders_count"),
+    },
+}
+
+# Column aliases accepted for readability
+COLUMN_ALIASES = {
+    "products": {"product_title": "title"},
+}
+
+TIME_DIMENSIONS = ("day", "week", "month", "year")
+
+MONEY_COLUMNS = ("gross", "total_price", "price")
+
+SECONDS_PER_DAY = 86400
+
+
+def execute_shopifyql(
+    query: str,
+    shop_data: ColumnarShopData,
+    now=None
+) -> Dict[str, Any]:
+    """
+    Parse and run a ShopifyQL query locally
+
+    Returns the same table shape as ShopifyAPIClient.fetch_shopifyql:
+        {"columns": [{"name", "dataType"}], "rows": [Dict], "stats": Dict}
+    """
+    parsed = parse_shopifyql(query, now=now)
+    return QueryRun(parsed, shop_data).execute()
+
+
+class QueryRun:
+    """Execution state for one parsed query"""
+
+    def __init__(self, parsed: Dict[str, Any], shop_data: ColumnarShopData):
+        self.query = parsed
+        self.shop = shop_data
+        self.table = parsed["table"]
+
+        if not shop_data.has(self.table):
+            raise ShopifyQLError(f"No cached data for table: {self.table}")
+
+        self.base = shop_data.tables[self.table]
+        self.metrics = METRICS.get(self.table, {})
+        self.aliases = COLUMN_ALIASES.get(self.table, {})
+
+        self.rows = shop_data.time_slice(self.table, parsed["since"], parsed["until"])
+        self.mask = None
+        self._columns = {}
+
+    def execute(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        scanned = self.rows.stop - self.rows.start
+
+        for condition in self.query["where"]:
+            self._apply_condition(condition)
+
+        show = self.query["show"]
+        group_by = list(self.query["group_by"])
+
+        # Bare dimension columns in SHOW are grouped implicitly
+        aggregated = [item for item in show if item["function"] or item["column"] in self.metrics]
+        for item in show:
+            if item not in aggregated and item["column"] not in group_by and aggregated:
+                group_by.append(item["column"])
+
+        if aggregated or group_by:
+            columns, outputs = self._aggregate(show, group_by)
+        else:
+            columns, outputs = self._project(show)
+
+        order = self._order(outputs)
+        if self.query["limit"] is not None:
+            order = order[:self.query["limit"]]
+
+        names = [c["name"] for c in columns]
+        rows = [
+            {name: _python_value(outputs[name][i]) for name in names}
+            for i in order
+        ]
+
+        return {
+            "columns": columns,
+            "rows": rows,
+            "stats": {
+                "rows_scanned": int(scanned),
+                "rows_matched": int(self._row_count()),
+                "columns_read": sorted(self._columns.keys()),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+        }
+
+    # Column access
+
+    def _row_count(self) -> int:
+        if self.mask is not None:
+            return int(self.mask.sum())
+        return self.rows.stop - self.rows.start
+
+    def _column(self, name: str) -> np.ndarray:
+        """Materialize a base column for the current slice + mask"""
+        name = self.aliases.get(name, name)
+        if name not in self.base:
+            raise ShopifyQLError(f"Unknown column '{name}' for table {self.table}")
+
+        if name not in self._columns:
+            self._columns[name] = self.base[name][self.rows]
+
+        values = self._columns[name]
+        return values if self.mask is None else values[self.mask]
+
+    def _dimension(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (codes, labels) for a grouping dimension"""
+        if name in TIME_DIMENSIONS and "created_at" in self.base:
+            return _time_codes(self._column("created_at"), name)
+
+        if name == "product_title" and "product_id" in self.base:
+            inverse, ids = _dense_codes(self._column("product_id"))
+            titles, title_codes = np.unique(
+                self.shop.product_titles(ids).astype(str), return_inverse=True
+            )
+            return title_codes[inverse], titles.astype(object)
+
+        return _dense_codes(self._column(name))
+
+    # WHERE
+
+    def _apply_condition(self, condition: Dict[str, Any]):
+        column, op, value = condition["column"], condition["op"], condition["value"]
+
+        if column in self.metrics:
+            raise ShopifyQLError(f"Cannot filter on metric '{column}' in WHERE")
+
+        if column in TIME_DIMENSIONS or column == "product_title" or \
+                self.base.get(self.aliases.get(column, column), np.empty(0)).dtype == object:
+            codes, labels = self._dimension(column)
+            allowed = np.flatnonzero(_compare(labels.astype(str), op, str(value)))
+            condition_mask = np.isin(codes, allowed)
+        else:
+            condition_mask = _compare(self._column(column), op, value)
+
+        if self.mask is None:
+            self.mask = condition_mask
+        else:
+            full = np.zeros_like(self.mask)
+            full[np.flatnonzero(self.mask)[condition_mask]] = True
+            self.mask = full
+
+    # SHOW
+
+    def _aggregate(self, show: List[Dict], group_by: List[str]):
+        n = self._row_count()
+
+        if group_by:
+            dims = [self._dimension(name) for name in group_by]
+            key = np.zeros(n, dtype=np.int64)
+            for codes, labels in dims:
+                key = key * len(labels) + codes
+            groups, group_keys = _dense_codes(key)
+            num_groups = len(group_keys)
+        else:
+            dims = []
+            groups = np.zeros(n, dtype=np.int64)
+            num_groups = 1
+
+        columns, outputs = [], {}
+
+        remaining = group_keys if group_by else None
+        decoded = []
+        for codes, labels in reversed(dims):
+            decoded.append(labels[remaining % len(labels)])
+            remaining = remaining // len(labels)
+        for name, labels in zip(group_by, reversed(decoded)):
+            outputs[name] = labels
+
+        for name in group_by:
+            if not any(item["column"] == name and not item["function"] for item in show):
+                columns.append({"name": name, "dataType": "STRING"})
+
+        for item in show:
+            name = item["name"]
+            if not item["function"] and item["column"] in group_by:
+                columns.append({"name": name, "dataType": "STRING"})
+                outputs[name] = outputs[item["column"]]
+                continue
+
+            if item["function"]:
+                spec = (item["function"], item["column"])
+            elif item["column"] in self.metrics:
+                spec = self.metrics[item["column"]]
+            else:
+                raise ShopifyQLError(f"Unknown metric '{item['column']}' for table {self.table}")
+
+            values, data_type = self._metric(spec, groups, num_groups)
+            columns.append({"name": name, "dataType": data_type})
+            outputs[name] = values
+
+        return columns, outputs
+
+    def _metric(self, spec: Tuple, groups: np.ndarray, num_groups: int):
+        function = spec[0]
+
+        if function == "ratio":
+            numerator, _ = self._metric(self.metrics[spec[1]], groups, num_groups)
+            denominator, _ = self._metric(self.metrics[spec[2]], groups, num_groups)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(denominator > 0, numerator / np.maximum(denominator, 1), 0.0)
+            return ratio, "MONEY"
+
+        column = spec[1]
+        if function == "count":
+            if column != "*":
+                self._column(column)
+            return np.bincount(groups, minlength=num_groups), "INTEGER"
+
+        values = self._column(column)
+        data_type = "MONEY" if self.aliases.get(column, column) in MONEY_COLUMNS else (
+            "INTEGER" if values.dtype.kind in "iu" else "FLOAT"
+        )
+
+        if function == "sum":
+            sums = np.bincount(groups, weights=values, minlength=num_groups)
+            return (np.rint(sums).astype(np.int64) if data_type == "INTEGER" else sums), data_type
+
+        if function == "avg":
+            sums = np.bincount(groups, weights=values, minlength=num_groups)
+            counts = np.bincount(groups, minlength=num_groups)
+            return sums / np.maximum(counts, 1), "MONEY" if data_type == "MONEY" else "FLOAT"
+
+        if function == "count_distinct":
+            valid = values != MISSING_ID if values.dtype.kind in "iu" else np.ones(len(values), bool)
+            g, v = groups[valid], values[valid]
+            if v.dtype.kind in "iu" and len(v):
+                low = int(v.min())
+                span = int(v.max()) - low + 1
+                if span * num_groups <= max(1 << 20, 2 * len(v)):
+                    # Dense (group, value) bitmap: O(n) instead of a sort
+                    seen = np.bincount(g * span + (v - low), minlength=span * num_groups)
+                    return np.bincount(np.flatnonzero(seen) // span, minlength=num_groups), "INTEGER"
+            order = np.lexsort((v, g))
+            g, v = g[order], v[order]
+            first = np.ones(len(g), dtype=bool)
+            first[1:] = (g[1:] != g[:-1]) | (v[1:] != v[:-1])
+            return np.bincount(g[first], minlength=num_groups), "INTEGER"
+
+        if function in ("min", "max"):
+            if not len(values):
+                return np.zeros(num_groups, dtype=values.dtype), data_type
+            order = np.argsort(groups, kind="stable")
+            sorted_groups = groups[order]
+            starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+            reducer = np.minimum if function == "min" else np.maximum
+            return reducer.reduceat(values[order], starts), data_type
+
+        raise ShopifyQLError(f"Unsupported function: {function}")
+
+    def _project(self, show: List[Dict]):
+        """Plain column listing (no aggregates, no grouping)"""
+        columns, outputs = [], {}
+        for item in show:
+            if item["column"] in TIME_DIMENSIONS or item["column"] == "product_title":
+                codes, labels = self._dimension(item["column"])
+                values = labels[codes]
+            else:
+                values = self._column(item["column"])
+            columns.append({
+                "name": item["name"],
+                "dataType": "STRING" if values.dtype == object else (
+                    "INTEGER" if values.dtype.kind in "iu" else "FLOAT"
+                )
+            })
+            outputs[item["name"]] = values
+        return columns, outputs
+
+    # ORDER BY
+
+    def _order(self, outputs: Dict[str, np.ndarray]) -> np.ndarray:
+        count = len(next(iter(outputs.values()))) if outputs else 0
+        order_by = self.query["order_by"]
+        if not order_by:
+            return np.arange(count)
+
+        keys = []
+        for spec in reversed(order_by):
+            if spec["column"] not in outputs:
+                raise ShopifyQLError(f"ORDER BY column '{spec['column']}' is not in SHOW")
+            values = outputs[spec["column"]]
+            if values.dtype == object or values.dtype.kind in "US":
+                _, values = np.unique(values.astype(str), return_inverse=True)
+            keys.append(-values if spec["descending"] else values)
+
+        limit = self.query["limit"]
+        if len(keys) == 1 and limit is not None and limit < count:
+            # Top-N: partial selection instead of a full sort
+            top = np.argpartition(keys[0], limit)[:limit]
+            return top[np.argsort(keys[0][top], kind="stable")]
+
+        return np.lexsort(keys)
+
+
+def _time_codes(created_at: np.ndarray, unit: str) -> Tuple[np.ndarray, np.ndarray]:
+    day_codes, days = _dense_codes(created_at // SECONDS_PER_DAY)
+
+    # Bucket the (few) distinct days, then map rows through them
+    if unit == "day":
+        buckets = days
+    elif unit == "week":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        buckets = days - (days + 3) % 7
+    else:
+        precision = "M" if unit == "month" else "Y"
+        buckets = days.astype("datetime64[D]").astype(f"datetime64[{precision}]").astype(np.int64)
+
+    bucket_codes, unique = _dense_codes(buckets)
+    if unit in ("day", "week"):
+        labels = unique.astype("datetime64[D]").astype(str)
+    elif unit == "month":
+        labels = unique.astype("datetime64[M]").astype(str)
+    else:
+        labels = unique.astype("datetime64[Y]").astype(str)
+    return bucket_codes[day_codes], labels.astype(object)
+
+
+def _dense_codes(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Map values to dense 0..k-1 codes, returning (codes, sorted unique values)"""
+    unique, codes = encode_keys(values)
+    return codes, unique
+
+
+def _compare(values: np.ndarray, op: str, value: Any) -> np.ndarray:
+    if op == "=":
+        return values == value
+    if op == "!=":
+        return values != value
+    if op == ">":
+        return values > value
+    if op == ">=":
+        return values >= value
+    if op == "<":
+        return values < value
+    if op == "<=":
+        return values <= value
+    raise ShopifyQLError(f"Unsupported operator: {op}")
+
+
+def _python_value(value: Any) -> Any:
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return round(float(value), 2)
+    return value
+
+
+class ShopDataCache:
+    """
+    Per-store cache of ColumnarShopData with a TTL
+
+    Fetched resources are merged into the store's entry so later questions
+    can be answered locally without new Shopify calls.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("SHOPIFYQL_CACHE_TTL", "900")
+        )
+        self._entries: Dict[str, Tuple[float, Dict[str, List[Dict]], ColumnarShopData]] = {}
+
+    def get(self, store_id: str) -> Optional[ColumnarShopData]:
+        entry = self._entries.get(store_id)
+        if not entry:
+            return None
+        stored_at, _, shop_data = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[store_id]
+            return None
+        return shop_data
+
+    def put(self, store_id: str, data: Dict[str, List[Dict]]) -> ColumnarShopData:
+        """Merge freshly fetched resources into the store's cached data"""
+        entry = self._entries.get(store_id)
+        raw = dict(entry[1]) if entry and self.get(store_id) else {}
+        raw.update({resource: records for resource, records in data.items() if records})
+        shop_data = ColumnarShopData.from_raw(raw)
+        self._entries[store_id] = (time.time(), raw, shop_data)
+        return shop_data
+
+    def get_or_build(
+        self,
+        store_id: str,
+        build: Callable[[], ColumnarShopData]
+    ) -> ColumnarShopData:
+        shop_data = self.get(store_id)
+        if shop_data is None:
+            shop_data = build()
+            self._entries[store_id] = (time.time(), {}, shop_data)
+        return shop_data
+
+    def invalidate(self, store_id: str):
+        self._entries.pop(store_id, None)
+
+
+# Singleton instance
+_shop_cache = None
+
+
+def get_shop_cache() -> ShopDataCache:
+    """Get singleton shop data cache"""
+    global _shop_cache
+    if _shop_cache is None:
+        _shop_cache = ShopDataCache()
+    return _shop_cache
@@ -0,0 +1,232 @@
+"""
+ShopifyQL Parser - Turns a ShopifyQL string into a query dict
+
+Supported grammar:
+    FROM <table>
+    SHOW <expr> [AS alias], ... [BY <column>]   expr: column | func(column)
+    [WHERE <column> <op> <value> [AND ...]]
+    [GROUP BY <column>, ...]
+    [SINCE <date>] [UNTIL <date>]      date: -30d | -4w | -3m | -1y | today | yesterday | YYYY-MM-DD
+    [ORDER BY <column> [ASC|DESC], ...]
+    [LIMIT <n>]
+"""
+
+import re
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+
+
+class ShopifyQLError(ValueError):
+    """Raised when a ShopifyQL query can't be parsed or executed"""
+
+
+CLAUSES = ["FROM", "SHOW", "WHERE", "GROUP BY", "SINCE", "UNTIL", "ORDER BY", "LIMIT"]
+
+AGGREGATE_FUNCTIONS = ["sum", "avg", "min", "max", "count", "count_distinct"]
+
+COMPARISON_OPERATORS = ["!=", "<>", ">=", "<=", "=", ">", "<"]
+
+_CLAUSE_RE = re.compile(
+    r"\b(" + "|".join(c.replace(" ", r"\s+") for c in CLAUSES) + r")\b",
+    re.IGNORECASE
+)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_FUNCTION_RE = re.compile(r"^(\w+)\s*\(\s*(\w+|\*)\s*\)$")
+_RELATIVE_DATE_RE = re.compile(r"^-(\d+)([dwmqy])$", re.IGNORECASE)
+
+
+def parse_shopifyql(query: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Parse a ShopifyQL query
+
+    Returns:
+        {
+            "table": str,
+            "show": List[{"name", "function", "column"}],
+            "where": List[{"column", "op", "value"}],
+            "group_by": List[str],
+            "since": Optional[datetime],
+            "until": Optional[datetime],
+            "order_by": List[{"column", "descending"}],
+            "limit": Optional[int]
+        }
+    """
+    if not query or not query.strip():
+        raise ShopifyQLError("Empty query")
+
+    clauses = _split_clauses(" ".join(query.split()))
+
+    if "FROM" not in clauses:
+        raise ShopifyQLError("Query must start with FROM")
+    if "SHOW" not in clauses:
+        raise ShopifyQLError("Query must have a SHOW clause")
+
+    table = clauses["FROM"].strip()
+    if not re.match(r"^\w+$", table):
+        raise ShopifyQLError(f"Invalid table name: {table}")
+
+    # Legacy shorthand: "SHOW total_sales BY month" == "GROUP BY month"
+    show_body, group_body = clauses["SHOW"], clauses.get("GROUP BY", "")
+    shorthand = re.split(r"\s+BY\s+", show_body, maxsplit=1, flags=re.IGNORECASE)
+    if len(shorthand) == 2:
+        if group_body:
+            raise ShopifyQLError("Use either SHOW ... BY or GROUP BY, not both")
+        show_body, group_body = shorthand
+
+    now = now or datetime.now()
+
+    return {
+        "table": table.lower(),
+        "show": [_parse_show_item(item) for item in _split_list(show_body)],
+        "where": _parse_where(clauses.get("WHERE", "")),
+        "group_by": [_identifier(c) for c in _split_list(group_body)],
+        "since": _parse_date(clauses["SINCE"], now) if "SINCE" in clauses else None,
+        "until": _parse_date(clauses["UNTIL"], now, end_of_day=True) if "UNTIL" in clauses else None,
+        "order_by": _parse_order_by(clauses.get("ORDER BY", "")),
+        "limit": _parse_limit(clauses["LIMIT"]) if "LIMIT" in clauses else None
+    }
+
+
+def _split_clauses(query: str) -> Dict[str, str]:
+    """Split a query into {clause keyword: body}, ignoring keywords inside strings"""
+    masked = _STRING_RE.sub(lambda m: "_" * len(m.group(0)), query)
+
+    matches = list(_CLAUSE_RE.finditer(masked))
+    if not matches or matches[0].start() != 0:
+        raise ShopifyQLError("Query must start with FROM")
+
+    clauses = {}
+    for i, match in enumerate(matches):
+        keyword = " ".join(match.group(1).upper().split())
+        if keyword in clauses:
+            raise ShopifyQLError(f"Duplicate {keyword} clause")
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(query)
+        body = query[match.end():end].strip()
+        if not body:
+            raise ShopifyQLError(f"Empty {keyword} clause")
+        clauses[keyword] = body
+
+    return clauses
+
+
+def _split_list(body: str) -> List[str]:
+    return [part.strip() for part in body.split(",") if part.strip()]
+
+
+def _identifier(text: str) -> str:
+    text = text.strip()
+    if not re.match(r"^\w+$", text):
+        raise ShopifyQLError(f"Invalid column name: {text}")
+    return text.lower()
+
+
+def _parse_show_item(item: str) -> Dict[str, Any]:
+    """Parse "sum(quantity) AS units" / "total_sales" """
+    alias = None
+    parts = re.split(r"\s+AS\s+", item, flags=re.IGNORECASE)
+    if len(parts) == 2:
+        item, alias = parts[0].strip(), _identifier(parts[1])
+    elif len(parts) > 2:
+        raise ShopifyQLError(f"Invalid SHOW expression: {item}")
+
+    match = _FUNCTION_RE.match(item)
+    if match:
+        function = match.group(1).lower()
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ShopifyQLError(f"Unknown function: {function}")
+        column = match.group(2).lower()
+        return {
+            "name": alias or f"{function}_{'all' if column == '*' else column}",
+            "function": function,
+            "column": column
+        }
+
+    column = _identifier(item)
+    return {"name": alias or column, "function": None, "column": column}
+
+
+def _parse_where(body: str) -> List[Dict[str, Any]]:
+    if not body:
+        return []
+
+    masked = _STRING_RE.sub(lambda m: "_" * len(m.group(0)), body)
+    if re.search(r"\bOR\b", masked, re.IGNORECASE):
+        raise ShopifyQLError("OR conditions are not supported")
+
+    conditions = []
+    position = 0
+    for match in list(re.finditer(r"\s+AND\s+", masked, re.IGNORECASE)) + [None]:
+        end = match.start() if match else len(body)
+        conditions.append(_parse_condition(body[position:end].strip()))
+        if match:
+            position = match.end()
+    return conditions
+
+
+def _parse_condition(text: str) -> Dict[str, Any]:
+    for op in COMPARISON_OPERATORS:
+        masked = _STRING_RE.sub(lambda m: "_" * len(m.group(0)), text)
+        index = masked.find(op)
+        if index > 0:
+            column = _identifier(text[:index])
+            value = _parse_value(text[index + len(op):].strip())
+            return {"column": column, "op": "!=" if op == "<>" else op, "value": value}
+    raise ShopifyQLError(f"Invalid condition: {text}")
+
+
+def _parse_value(text: str) -> Any:
+    if _STRING_RE.fullmatch(text):
+        return text[1:-1].replace("\\'", "'")
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        raise ShopifyQLError(f"Invalid value: {text}")
+
+
+def _parse_date(text: str, now: datetime, end_of_day: bool = False) -> datetime:
+    text = text.strip().strip("'")
+    lower = text.lower()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if lower == "today":
+        day = today
+    elif lower == "yesterday":
+        day = today - timedelta(days=1)
+    else:
+        match = _RELATIVE_DATE_RE.match(text)
+        if match:
+            amount, unit = int(match.group(1)), match.group(2).lower()
+            days = amount * {"d": 1, "w": 7, "m": 30, "q": 91, "y": 365}[unit]
+            day = today - timedelta(days=days)
+        else:
+            try:
+                day = datetime.strptime(text, "%Y-%m-%d")
+            except ValueError:
+                raise ShopifyQLError(f"Invalid date: {text}")
+
+    if end_of_day:
+        return day + timedelta(days=1) - timedelta(microseconds=1)
+    return day
+
+
+def _parse_order_by(body: str) -> List[Dict[str, Any]]:
+    order_by = []
+    for item in _split_list(body):
+        parts = item.split()
+        if len(parts) > 2 or (len(parts) == 2 and parts[1].upper() not in ("ASC", "DESC")):
+            raise ShopifyQLError(f"Invalid ORDER BY: {item}")
+        order_by.append({
+            "column": _identifier(parts[0]),
+            "descending": len(parts) == 2 and parts[1].upper() == "DESC"
+        })
+    return order_by
+
+
+def _parse_limit(body: str) -> int:
+    if not body.strip().isdigit():
+        raise ShopifyQLError(f"Invalid LIMIT: {body}")
+    return int(body)
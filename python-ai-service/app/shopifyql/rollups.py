@@ -0,0 +1,277 @@
+"""
+Daily Rollups - Per-store daily aggregates, maintained as orders are synced
+
+Long-range questions don't need line items, only per-day totals. Each store
+keeps two rollup tables, updated incrementally from every batch of orders
+synced for it:
+
+    product_days - one row per (day, product): units and revenue (gross),
+                   sorted by day then product
+    daily        - one row per day: orders, revenue (order totals), units,
+                   new and returning customers
+
+Days are whole UTC days. Ingesting is idempotent: orders already folded in
+(by id) are skipped, so overlapping syncs are safe. A customer is new on
+the day of their first synced order and returning on any later day they
+order; a backfill that finds an earlier first order moves them. Orders are
+rolled up as first synced - later edits and refunds are not tracked.
+
+Only numpy is imported, so rollup tables can go to processing pool workers.
+"""
+
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.shopifyql.columnar import KeyTable, encode_keys
+
+
+SECONDS_PER_DAY = 86400
+
+# (customer, day) pairs pack the day number into the low bits of one int64
+DAY_BITS = 16
+DAY_MASK = (1 << DAY_BITS) - 1
+
+DAILY_COLUMNS = ("orders", "revenue", "units", "new_customers", "returning_customers")
+
+Table = Dict[str, np.ndarray]
+
+
+class DailyRollups:
+    """
+    Daily rollups of one store
+
+    Attributes:
+        product_days: Columns day, product_id, units, revenue
+        synced_since / synced_until: Epoch seconds every order in between
+            has been ingested for (None before the first sync)
+        updated_at: When orders were last ingested
+    """
+
+    def __init__(self):
+        self.product_days: Table = {
+            "day": np.array([], dtype=np.int64),
+            "product_id": np.array([], dtype=np.int64),
+            "units": np.array([], dtype=np.int64),
+            "revenue": np.array([], dtype=np.float64),
+        }
+        # Dense per-day arrays; index 0 is day number self._first_day
+        self._first_day = 0
+        self._daily: Table = {
+            column: np.array([], dtype=np.float64 if column == "revenue" else np.int64)
+            for column in DAILY_COLUMNS
+        }
+        # Sorted ids of ingested orders, and sorted (customer, day) pairs
+        self._order_ids = np.array([], dtype=np.int64)
+        self._customer_days = np.array([], dtype=np.int64)
+        self.synced_since: Optional[int] = None
+        self.synced_until: Optional[int] = None
+        self.updated_at: Optional[float] = None
+
+    @property
+    def row_count(self) -> int:
+        return len(self.product_days["day"]) + len(self._daily["orders"])
+
+    def missing(self, since: int, until: int) -> Tuple[Tuple[int, int], ...]:
+        """Ranges (epoch seconds) still to sync before [since, until] can be read"""
+        since = since // SECONDS_PER_DAY * SECONDS_PER_DAY
+        if self.synced_since is None:
+            return ((since, until),)
+        ranges = []
+        if since < self.synced_since:
+            ranges.append((since, self.synced_since))
+        if until > self.synced_until:
+            ranges.append((self.synced_until, until))
+        return tuple(ranges)
+
+    def ingest(self, orders: Optional[Table], sales: Optional[Table], since: int, until: int) -> int:
+        """
+        Fold a synced batch into the rollups
+
+        Args:
+            orders: Columnar orders (created_at, order_id, customer_id, total_price)
+            sales: Their line items (created_at, order_id, product_id, quantity, gross)
+            since / until: Epoch seconds the batch covers completely; must
+                overlap or adjoin what is already synced
+
+        Returns:
+            Number of orders not seen before
+        """
+        orders = orders or {}
+        sales = sales or {}
+        empty = np.array([], dtype=np.int64)
+
+        # Orders already rolled up (an overlapping sync) are skipped
+        order_ids, first_rows = np.unique(orders.get("order_id", empty), return_index=True)
+        fresh = KeyTable(self._order_ids).lookup(order_ids) < 0
+        new_ids, rows = order_ids[fresh], first_rows[fresh]
+        sale_rows = KeyTable(new_ids).lookup(sales.get("order_id", empty)) >= 0
+
+        self._extend_coverage(since, until)
+        if len(new_ids):
+            order_day = orders["created_at"][rows] // SECONDS_PER_DAY
+            sale_day = sales["created_at"][sale_rows] // SECONDS_PER_DAY
+            self._cover_days(np.concatenate([order_day, sale_day]))
+            self._add_orders(order_day, orders["total_price"][rows], orders["customer_id"][rows])
+            self._add_sales(
+                sale_day,
+                sales["product_id"][sale_rows],
+                sales["quantity"][sale_rows],
+                sales["gross"][sale_rows]
+            )
+            self._order_ids = _merge_sorted(self._order_ids, new_ids)
+        self.updated_at = time.time()
+        return len(new_ids)
+
+    def window(self, since: int, until: int) -> Dict[str, Table]:
+        """
+        Rollup rows for the days of [since, until], as columnar tables:
+        "sales" (one row per product and day; created_at is the day start)
+        and "daily"
+        """
+        low, high = since // SECONDS_PER_DAY, until // SECONDS_PER_DAY
+        days = self.product_days["day"]
+        rows = slice(int(np.searchsorted(days, low, side="left")),
+                     int(np.searchsorted(days, high, side="right")))
+        span = len(self._daily["orders"])
+        start = min(max(low - self._first_day, 0), span)
+        stop = min(max(high + 1 - self._first_day, 0), span)
+
+        daily = {column: values[start:stop] for column, values in self._daily.items()}
+        daily["created_at"] = (self._first_day + np.arange(start, stop)) * SECONDS_PER_DAY
+        return {
+            "sales": {
+                "created_at": days[rows] * SECONDS_PER_DAY,
+                "product_id": self.product_days["product_id"][rows],
+                "quantity": self.product_days["units"][rows],
+                "gross": self.product_days["revenue"][rows],
+            },
+            "daily": daily,
+        }
+
+    def _extend_coverage(self, since: int, until: int):
+        since = since // SECONDS_PER_DAY * SECONDS_PER_DAY
+        if self.synced_since is None:
+            self.synced_since, self.synced_until = since, until
+            return
+        if since > self.synced_until or until < self.synced_since:
+            raise ValueError("Rollup sync would leave a gap in the synced range")
+        self.synced_since = min(self.synced_since, since)
+        self.synced_until = max(self.synced_until, until)
+
+    def _cover_days(self, days: np.ndarray):
+        """Grow the dense per-day arrays to include these day numbers"""
+        span = len(self._daily["orders"])
+        low = min(int(days.min()), self._first_day) if span else int(days.min())
+        high = max(int(days.max()) + 1, self._first_day + span) if span else int(days.max()) + 1
+        before = self._first_day - low if span else 0
+        for column, values in self._daily.items():
+            grown = np.zeros(high - low, dtype=values.dtype)
+            grown[before:before + span] = values
+            self._daily[column] = grown
+        self._first_day = low
+
+    def _add_orders(self, day: np.ndarray, total_price: np.ndarray, customer_ids: np.ndarray):
+        span = len(self._daily["orders"])
+        index = day - self._first_day
+        self._daily["orders"] += np.bincount(index, minlength=span)
+        self._daily["revenue"] += np.bincount(index, weights=total_price, minlength=span)
+
+        # Distinct customers per day; guest orders have no customer
+        known = customer_ids > 0
+        pairs = np.unique((customer_ids[known] << DAY_BITS) | day[known])
+        positions = np.minimum(np.searchsorted(self._customer_days, pairs), max(len(self._customer_days) - 1, 0))
+        if len(self._customer_days):
+            pairs = pairs[self._customer_days[positions] != pairs]
+        if not len(pairs):
+            return
+
+        # Every new (customer, day) counts as returning, except a customer's
+        # first day: new customers, or an earlier first order found by a
+        # backfill - which makes the old first day a returning one
+        pair_customer, pair_day = pairs >> DAY_BITS, pairs & DAY_MASK
+        returning = np.bincount(pair_day - self._first_day, minlength=span)
+        first = np.ones(len(pairs), dtype=bool)
+        first[1:] = pair_customer[1:] != pair_customer[:-1]
+        customers, first_day = pair_customer[first], pair_day[first]
+
+        known_at = np.searchsorted(self._customer_days, customers << DAY_BITS)
+        inside = known_at < len(self._customer_days)
+        previous = np.full(len(customers), -1, dtype=np.int64)
+        previous[inside] = self._customer_days[known_at[inside]]
+        seen = inside & (previous >> DAY_BITS == customers)
+        old_day = previous & DAY_MASK
+        moved = ~seen | (first_day < old_day)
+        moved_back = moved & seen
+
+        new = np.bincount(first_day[moved] - self._first_day, minlength=span)
+        back = np.bincount(old_day[moved_back] - self._first_day, minlength=span)
+        self._daily["new_customers"] += new - back
+        self._daily["returning_customers"] += returning - new + back
+        self._customer_days = _merge_sorted(self._customer_days, pairs)
+
+    def _add_sales(self, day: np.ndarray, product_ids: np.ndarray, quantity: np.ndarray, gross: np.ndarray):
+        self._daily["units"] += np.bincount(
+            day - self._first_day, weights=quantity, minlength=len(self._daily["units"])
+        ).astype(np.int64)
+        if not len(day):
+            return
+
+        # Only rows from the batch's first day on are regrouped; product_days
+        # is sorted by day, so they are a suffix (all of it for a backfill)
+        table = self.product_days
+        keep = int(np.searchsorted(table["day"], day.min(), side="left"))
+        day = np.concatenate([table["day"][keep:], day])
+        product_ids = np.concatenate([table["product_id"][keep:], product_ids])
+        units = np.concatenate([table["units"][keep:], quantity])
+        revenue = np.concatenate([table["revenue"][keep:], gross])
+
+        # One (day, product) key per row, grouped in (day, product id) order
+        products, product_codes = encode_keys(product_ids)
+        low = int(day.min())
+        cells, codes = encode_keys((day - low) * len(products) + product_codes)
+        num_cells = len(cells)
+        self.product_days = {
+            "day": np.concatenate([table["day"][:keep], cells // len(products) + low]),
+            "product_id": np.concatenate([table["product_id"][:keep], products[cells % len(products)]]),
+            "units": np.concatenate([
+                table["units"][:keep],
+                np.bincount(codes, weights=units, minlength=num_cells).astype(np.int64)
+            ]),
+            "revenue": np.concatenate([
+                table["revenue"][:keep], np.bincount(codes, weights=revenue, minlength=num_cells)
+            ]),
+        }
+
+
+def _merge_sorted(existing: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Insert sorted values into a sorted array (one pass, no re-sort)"""
+    return np.insert(existing, np.searchsorted(existing, new), new)
+
+
+class RollupStore:
+    """Daily rollups per store, kept in process memory"""
+
+    def __init__(self):
+        self._stores: Dict[str, DailyRollups] = {}
+
+    def get(self, store_id: str) -> DailyRollups:
+        if store_id not in self._stores:
+            self._stores[store_id] = DailyRollups()
+        return self._stores[store_id]
+
+    def invalidate(self, store_id: str):
+        self._stores.pop(store_id, None)
+
+
+# Singleton instance
+_rollup_store = None
+
+
+def get_rollup_store() -> RollupStore:
+    """Get singleton rollup store"""
+    global _rollup_store
+    if _rollup_store is None:
+        _rollup_store = RollupStore()
+    return _rollup_store
@@ -0,0 +1,169 @@
+"""
+Logging - Structured, non-blocking logging for the request path
+
+Records go through a QueueHandler, so a log call on the event loop is one
+queue put; a QueueListener thread formats and writes them. Every record
+carries the current request ID, trace ID and store, and hot-path DEBUG
+lines are sampled per request (all or none of a request's debug lines are
+kept).
+
+Configuration:
+    LOG_LEVEL=INFO               # DEBUG, INFO, WARNING, ERROR, OFF
+    LOG_FORMAT=json              # json or text
+    LOG_DEBUG_SAMPLE_RATE=0.1    # share of requests whose DEBUG lines are kept
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.telemetry.tracing import current_trace_id
+
+
+_request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
+_store_id: contextvars.ContextVar = contextvars.ContextVar("store_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_request(request_id: Optional[str] = None) -> str:
+    """Attach a request ID (generated if not given) to this context's logs"""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    _request_id.set(request_id)
+    return request_id
+
+
+def bind_store(store_id: str):
+    """Attach the store being analyzed to this context's logs"""
+    _store_id.set(store_id)
+
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request ID, trace ID and store of the current context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        record.trace_id = current_trace_id() or "-"
+        record.store_id = _store_id.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep DEBUG records for a deterministic sample of request IDs"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 0xFFFFFFFF)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG:
+            return True
+        request_id = getattr(record, "request_id", "-")
+        return zlib.crc32(request_id.encode()) <= self.threshold
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra= fields are included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "trace_id": getattr(record, "trace_id", "-"),
+            "store_id": getattr(record, "store_id", "-"),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with request ID and extra= fields as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = [
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and key not in ("request_id", "trace_id", "store_id")
+        ]
+        return f"{line} {' '.join(extras)}" if extras else line
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    debug_sample_rate: Optional[float] = None,
+    stream=None
+):
+    """
+    Route the "app" logger through a background queue listener
+
+    Safe to call more than once; later calls replace the configuration.
+    """
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
+    shutdown_logging()
+
+    logger = logging.getLogger("app")
+    logger.handlers.clear()
+    logger.propagate = False
+
+    if level == "OFF":
+        logger.setLevel(logging.CRITICAL + 1)
+        return
+
+    logger.setLevel(getattr(logging, level, logging.INFO))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    # Context is read on the calling thread, before the record is queued
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,218 @@
+"""
+Request Timing - High-resolution timings for one /analyze request
+
+AgentOrchestrator starts a RequestTimings per request and stores it in a
+context variable, so shared components (LLMClient, ShopifyAPIClient,
+ResultProcessor) can attribute their calls to the current request and
+agent step without threading a timer through every signature. Each
+observation also feeds the Prometheus histograms, and each step is traced
+as an "agent.<step>" span.
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from app.llm.pricing import estimate_cost
+from app.telemetry.metrics import get_registry
+from app.telemetry.tracing import span
+
+
+_registry = get_registry()
+
+REQUEST_SECONDS = _registry.histogram(
+    "agent_request_duration_seconds",
+    "End-to-end /analyze processing time",
+    ("intent", "provider", "status")
+)
+STEP_SECONDS = _registry.histogram(
+    "agent_step_duration_seconds",
+    "Time spent in each of the six agent steps",
+    ("step", "intent", "provider")
+)
+LLM_SECONDS = _registry.histogram(
+    "llm_call_duration_seconds",
+    "LLM completion latency",
+    ("provider", "step")
+)
+SHOPIFY_SECONDS = _registry.histogram(
+    "shopify_request_duration_seconds",
+    "Shopify Admin API request latency (excluding wait)",
+    ("kind",)
+)
+SHOPIFY_WAIT_SECONDS = _registry.histogram(
+    "shopify_request_wait_seconds",
+    "Time a Shopify request spent queued or backing off before being sent",
+    ("kind",)
+)
+LLM_TOKENS = _registry.counter(
+    "llm_tokens_total",
+    "LLM tokens consumed, by prompt/completion",
+    ("provider", "model", "step", "type")
+)
+LLM_COST = _registry.counter(
+    "llm_cost_usd_total",
+    "Estimated LLM spend in USD",
+    ("provider", "model", "step")
+)
+PROCESSOR_SECONDS = _registry.histogram(
+    "result_processor_duration_seconds",
+    "ResultProcessor handler time",
+    ("handler", "intent")
+)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+# The step is per task, not per RequestTimings: requests that answer
+# several stores run the same step in concurrent tasks
+_step: contextvars.ContextVar = contextvars.ContextVar("agent_step", default="")
+
+
+class RequestTimings:
+    """Timings collected while one request is processed"""
+
+    def __init__(self, provider: str = "", store_id: str = ""):
+        self.provider = provider
+        self.store_id = store_id
+        # Budget tier chosen for this request; see app.llm.budget
+        self.tier = "standard"
+        self.intent = ""
+        self.started = time.perf_counter()
+        # perf_counter() time by which the request should answer; None = no budget
+        self.deadline: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.shopify_requests: List[Dict[str, Any]] = []
+        self.processors: Dict[str, float] = {}
+
+    @property
+    def current_step(self) -> str:
+        """Step the calling task is in"""
+        return _step.get()
+
+    @contextmanager
+    def step(self, name: str):
+        """
+        Time one agent step; LLM and Shopify calls inside (in this task, or
+        tasks it starts) are attributed to it. Concurrent tasks in the same
+        step add up their times.
+        """
+        token = _step.set(name)
+        start = time.perf_counter()
+        try:
+            with span(f"agent.{name}", step=name):
+                yield
+        finally:
+            self.steps[name] = self.steps.get(name, 0.0) + time.perf_counter() - start
+            _step.reset(token)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def finish(self, status: str = "ok"):
+        """Observe the request and its steps, now that the intent label is known"""
+        intent = self.intent or "unknown"
+        REQUEST_SECONDS.observe(self.elapsed(), intent=intent, provider=self.provider, status=status)
+        for name, seconds in self.steps.items():
+            STEP_SECONDS.observe(seconds, step=name, intent=intent, provider=self.provider)
+        for handler, seconds in self.processors.items():
+            PROCESSOR_SECONDS.observe(seconds, handler=handler, intent=intent)
+
+    def usage(self) -> Dict[str, Any]:
+        """LLM token and cost totals for the request, overall and per step"""
+        totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        by_step: Dict[str, Dict[str, Any]] = {}
+        for call in self.llm_calls:
+            step = by_step.setdefault(call["step"], {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+            for usage in (totals, step):
+                usage["prompt_tokens"] += call["prompt_tokens"]
+                usage["completion_tokens"] += call["completion_tokens"]
+                usage["cost_usd"] += call["cost_usd"]
+            totals["calls"] += 1
+        for usage in [totals, *by_step.values()]:
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            usage["cost_usd"] = round(usage["cost_usd"], 6)
+        return {**totals, "tier": self.tier, "by_step": by_step}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Millisecond breakdown for response metadata"""
+        return {
+            "total_ms": _ms(self.elapsed()),
+            "steps_ms": {name: _ms(seconds) for name, seconds in self.steps.items()},
+            "llm_calls": self.llm_calls,
+            "shopify_requests": self.shopify_requests,
+            "processors_ms": {name: _ms(seconds) for name, seconds in self.processors.items()},
+        }
+
+
+def start_request(provider: str = "", store_id: str = "", budget: Optional[float] = None) -> RequestTimings:
+    timings = RequestTimings(provider, store_id)
+    if budget:
+        timings.deadline = timings.started + budget
+    _current.set(timings)
+    _step.set("")
+    return timings
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record_llm_call(
+    provider: str,
+    model: str,
+    seconds: float,
+    error: bool = False,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0
+):
+    timings = current_timings()
+    step = timings.current_step if timings else ""
+    LLM_SECONDS.observe(seconds, provider=provider, step=step or "none")
+
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    labels = {"provider": provider, "model": model, "step": step or "none"}
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, type="prompt", **labels)
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, type="completion", **labels)
+    if cost:
+        LLM_COST.inc(cost, **labels)
+
+    if timings is not None:
+        timings.llm_calls.append({
+            "step": step,
+            "provider": provider,
+            "model": model,
+            "ms": _ms(seconds),
+            "error": error,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": round(cost, 6)
+        })
+
+
+def record_shopify_request(kind: str, seconds: float, wait_seconds: float = 0.0, status: int = 0):
+    SHOPIFY_SECONDS.observe(seconds, kind=kind)
+    SHOPIFY_WAIT_SECONDS.observe(wait_seconds, kind=kind)
+    timings = current_timings()
+    if timings is not None:
+        timings.shopify_requests.append({
+            "step": timings.current_step,
+            "kind": kind,
+            "status": status,
+            "ms": _ms(seconds),
+            "wait_ms": _ms(wait_seconds)
+        })
+
+
+def record_processor(handler: str, seconds: float):
+    timings = current_timings()
+    if timings is not None:
+        timings.processors[handler] = timings.processors.get(handler, 0.0) + seconds
+    else:
+        PROCESSOR_SECONDS.observe(seconds, handler=handler, intent="unknown")
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
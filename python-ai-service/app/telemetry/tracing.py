@@ -0,0 +1,320 @@
+"""
+Tracing - Lightweight request spans for the agent, LLM and Shopify calls
+
+A span is opened per HTTP request, per agent step, per LLM completion and
+per Shopify request. The active span lives in a context variable, so
+nested calls become children without passing span objects around. The
+trace ID is taken from an incoming W3C `traceparent` header when present.
+
+Finished spans are handed to an exporter on a background thread:
+
+    TRACE_EXPORTER=none          # none, file or otlp
+    TRACE_FILE=./traces.jsonl    # file exporter: one JSON span per line
+    OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318   # OTLP/HTTP (JSON)
+    OTEL_SERVICE_NAME=python-ai-service
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+_exporter = None
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+        "attributes", "status", "error", "_token"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = "ok"
+        self.error = ""
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        """Close the span, restore its parent as current and export it"""
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended from a different context than it was started in
+                _current_span.set(None)
+            self._token = None
+        if _exporter is not None:
+            _exporter.submit(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": datetime.fromtimestamp(self.start_ns / 1e9, timezone.utc).isoformat(timespec="microseconds"),
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error or None,
+            "attributes": self.attributes,
+        }
+
+
+def start_trace(traceparent: Optional[str] = None) -> str:
+    """
+    Begin a trace for this context, continuing the caller's if a valid
+    W3C traceparent header is given; returns the trace ID
+    """
+    match = TRACEPARENT_RE.match((traceparent or "").strip().lower())
+    if match and match.group(1) != "0" * 32:
+        trace_id, parent_id = match.group(1), match.group(2)
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+    _trace.set((trace_id, parent_id))
+    _current_span.set(None)
+    return trace_id
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    if span is not None:
+        return span.trace_id
+    trace = _trace.get()
+    return trace[0] if trace else None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traceparent() -> Optional[str]:
+    """W3C traceparent for the current span, for responses and outgoing calls"""
+    span = _current_span.get()
+    if span is None:
+        return None
+    return f"00-{span.trace_id}-{span.span_id}-01"
+
+
+def start_span(name: str, **attributes) -> Span:
+    """Open a child of the current span (or a root span) and make it current"""
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace = _trace.get()
+        if trace is None:
+            trace = (secrets.token_hex(16), None)
+            _trace.set(trace)
+        trace_id, parent_id = trace
+    span = Span(name, trace_id, parent_id, attributes)
+    span._token = _current_span.set(span)
+    return span
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Context manager form of start_span; exceptions mark the span as failed"""
+    active = start_span(name, **attributes)
+    try:
+        yield active
+    except BaseException as e:
+        active.record_error(e)
+        raise
+    finally:
+        active.end()
+
+
+class FileExporter:
+    """Append spans to a JSON-lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s.to_dict(), default=str) + "\n")
+
+
+class OTLPExporter:
+    """POST spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding"""
+
+    def __init__(self, endpoint: str, service_name: str):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+
+    def export(self, spans: List[Span]):
+        import httpx
+
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [_otlp_span(s) for s in spans]
+                }]
+            }]
+        }
+        httpx.post(self.url, json=body, timeout=5.0).raise_for_status()
+
+
+class MemoryExporter:
+    """Keep spans in a list; for inspecting traces in scripts and benchmarks"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+
+class BatchExporter:
+    """Hand finished spans to a background thread that exports them in batches"""
+
+    def __init__(self, exporter, max_batch: int = 512, interval: float = 1.0):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.interval = interval
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        self.queue.put(span)
+
+    def _run(self):
+        while True:
+            batch, stopping = [], False
+            try:
+                item = self.queue.get(timeout=self.interval)
+                while item is not self._stop:
+                    batch.append(item)
+                    if len(batch) >= self.max_batch:
+                        break
+                    item = self.queue.get_nowait()
+                stopping = item is self._stop
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning("Span export failed, dropped %d spans: %s", len(batch), e)
+            if stopping:
+                return
+
+    def shutdown(self):
+        """Export whatever is queued and stop the thread"""
+        self.queue.put(self._stop)
+        self._thread.join(timeout=5.0)
+
+
+def configure_tracing(exporter=None):
+    """
+    Install a span exporter; with no argument it is chosen from TRACE_EXPORTER
+
+    Safe to call more than once; the previous exporter is flushed first.
+    """
+    global _exporter
+
+    shutdown_tracing()
+
+    if exporter is None:
+        kind = os.getenv("TRACE_EXPORTER", "none").lower()
+        if kind == "file":
+            exporter = FileExporter(os.getenv("TRACE_FILE", "./traces.jsonl"))
+        elif kind == "otlp":
+            exporter = OTLPExporter(
+                os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"),
+                os.getenv("OTEL_SERVICE_NAME", "python-ai-service")
+            )
+        elif kind != "none":
+            logger.warning("Unknown TRACE_EXPORTER %r, tracing export disabled", kind)
+
+    if exporter is not None:
+        _exporter = BatchExporter(exporter)
+
+
+def shutdown_tracing():
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+def _otlp_span(s: Span) -> Dict[str, Any]:
+    entry = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": _otlp_attributes(s.attributes),
+        # 1 = OK, 2 = ERROR
+        "status": {"code": 2, "message": s.error} if s.status == "error" else {"code": 1},
+    }
+    if s.parent_id:
+        entry["parentSpanId"] = s.parent_id
+    return entry
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+        result.append({"key": key, "value": typed})
+    return result
+
+
+atexit.register(shutdown_tracing)
@@ -0,0 +1 @@
+# Benchmark harnesses for the AI service (run with: python -m benchmarks.<name>)
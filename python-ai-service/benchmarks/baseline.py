@@ -0,0 +1,49 @@
+"""
+Benchmark baselines - Store results as JSON and compare later runs against them
+
+Baselines live in benchmarks/baselines/<name>.json. Comparisons report the
+relative change of every numeric metric present in both runs.
+"""
+
+import json
+import os
+import platform
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def save_baseline(name: str, results: Dict[str, Any]) -> str:
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    payload = {
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_baseline(name: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any], prefix: str = ""):
+    """Print metric, baseline, current and relative change for shared numeric metrics"""
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        old = baseline.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            compare(old, value, prefix=f"{name}.")
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            change = (value - old) / old
+            print(f"  {name:<40} {old:>12.2f} -> {value:>12.2f}  {change:+.1%}")
@@ -0,0 +1,146 @@
+"""
+Benchmark: one /analyze/batch call vs separate /analyze calls
+
+Answers a 10-question dashboard for one store twice per run: as ten
+concurrent AgentOrchestrator.process() calls (what the dashboard sends
+today) and as one process_batch() call. Both use the deterministic stub LLM
+and the in-process fake Shopify API with simulated latency. Reports wall
+time, LLM calls and tokens, Shopify requests and bytes. A first pass
+without latency checks both paths give the same answers (mock windows end
+"now", so runs seconds apart see slightly different orders). Both start from
+the store's known size profile: otherwise the separate calls that finish
+first would teach the cost estimator the shop's size mid-run and the later
+ones would narrow their windows.
+
+    python -m benchmarks.bench_batch [--orders 5000] [--latency 0.05]
+        [--ttft 0.25] [--runs 5] [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, Any
+
+from app.agent.orchestrator import AgentOrchestrator
+from app.agent.query_executor import QueryExecutor
+from app.shopify.api_client import ShopifyAPIClient
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.baseline import save_baseline, load_baseline, compare
+from benchmarks.bench_shopifyql_server import CountingTransport
+from benchmarks.fake_shopify import create_fake_shopify
+from benchmarks.stub_llm import StubLLMClient
+
+
+STORE = "bench.myshopify.com"
+DAYS = 90
+PRODUCTS = 200
+
+DASHBOARD = [
+    "What were my top selling products in the last 30 days?",
+    "Which products were the best sellers last week?",
+    "How did sales and revenue trend over the last 30 days?",
+    "What was my revenue over the last 2 weeks?",
+    "How many repeat customers did I have in the last 30 days?",
+    "Are loyal customers coming back more than last month?",
+    "How much inventory will I need next month?",
+    "Which items should I reorder or restock?",
+    "What are the most popular products in the last 2 weeks?",
+    "What is my stock outlook for next week?",
+]
+
+
+def build(provider: MockDataProvider, latency: float, ttft: float, orders: int):
+    fake = create_fake_shopify(provider, latency=latency)
+    transport = CountingTransport(fake)
+    client = ShopifyAPIClient(transport=transport)
+    client.base_url = "http://fake-shopify"
+    # The fake doesn't throttle (bench_portfolio covers rate limits)
+    client.rate_limiter = None
+    llm = StubLLMClient(ttft=ttft)
+    orchestrator = AgentOrchestrator(llm)
+    orchestrator.query_executor = QueryExecutor(shopify_client=client)
+    orchestrator.cost_estimator.set_profile(
+        STORE, orders_per_day=orders / DAYS, products=PRODUCTS, customers=orders // 4
+    )
+    return orchestrator, llm, fake, transport
+
+
+async def run(mode: str, provider: MockDataProvider, latency: float, ttft: float, orders: int) -> Dict[str, Any]:
+    orchestrator, llm, fake, transport = build(provider, latency, ttft, orders)
+    request = {"store_id": STORE, "access_token": "token"}
+    start = time.perf_counter()
+    if mode == "separate":
+        results = await asyncio.gather(*[
+            orchestrator.process({**request, "question": question}) for question in DASHBOARD
+        ])
+        usage = [result["metadata"]["llm_usage"] for result in results]
+    else:
+        batch = await orchestrator.process_batch({**request, "questions": DASHBOARD})
+        results, usage = batch["results"], [batch["metadata"]["llm_usage"]]
+    return {
+        "ms": (time.perf_counter() - start) * 1000,
+        "llm_calls": llm.calls,
+        "prompt_tokens": sum(u["prompt_tokens"] for u in usage),
+        "completion_tokens": sum(u["completion_tokens"] for u in usage),
+        "shopify_requests": fake.state.stats["requests"],
+        "kb": transport.bytes_received / 1024,
+        "answers": [result["answer"] for result in results],
+    }
+
+
+async def main(args):
+    provider = MockDataProvider({
+        "orders": args.orders, "products": PRODUCTS, "customers": args.orders // 4, "days": DAYS
+    })
+    print(f"{len(DASHBOARD)} questions, {args.orders:,} orders, Shopify {args.latency * 1000:.0f} ms/request, "
+          f"LLM time to first token {args.ttft * 1000:.0f} ms; median of {args.runs} runs\n")
+
+    separate, batch = [(await run(mode, provider, 0.0, 0.0, args.orders))["answers"] for mode in ("separate", "batch")]
+    same = sum(a == b for a, b in zip(separate, batch))
+
+    results: Dict[str, Any] = {"same_answers": same}
+    for mode in ("separate", "batch"):
+        runs = [await run(mode, provider, args.latency, args.ttft, args.orders) for _ in range(args.runs)]
+        results[mode] = {
+            "ms": round(statistics.median(r["ms"] for r in runs), 1),
+            **{key: runs[-1][key] for key in ("llm_calls", "prompt_tokens", "completion_tokens", "shopify_requests")},
+            "kb": round(runs[-1]["kb"], 1),
+        }
+
+    print(f"  {'':<9} {'wall ms':>8} {'LLM calls':>10} {'prompt tok':>11} {'output tok':>11} "
+          f"{'Shopify reqs':>13} {'KB':>8}")
+    for mode in ("separate", "batch"):
+        r = results[mode]
+        print(f"  {mode:<9} {r['ms']:>8.0f} {r['llm_calls']:>10} {r['prompt_tokens']:>11,} "
+              f"{r['completion_tokens']:>11,} {r['shopify_requests']:>13} {r['kb']:>8.0f}")
+    separate, batch = results["separate"], results["batch"]
+    print(f"\n  batch: {separate['ms'] / batch['ms']:.1f}x faster, "
+          f"{separate['shopify_requests'] / max(batch['shopify_requests'], 1):.1f}x fewer Shopify requests, "
+          f"{separate['llm_calls'] - batch['llm_calls']} fewer LLM calls, "
+          f"{1 - batch['prompt_tokens'] / separate['prompt_tokens']:.0%} fewer prompt tokens; "
+          f"{same}/{len(DASHBOARD)} answers identical")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--ttft", type=float, default=0.25)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
@@ -0,0 +1,188 @@
+"""
+Benchmark: cohort retention over millions of orders
+
+Generates a synthetic shop (default 2M orders over two years) and times
+cohort_retention (monthly and weekly cohorts) and the customer_retention
+aggregate against a straightforward per-customer Python implementation.
+With --check, every cohort cell, the repeat intervals, the retention curve
+and rate, and the CLV are compared with that implementation, and the run fails on
+any mismatch.
+
+    python -m benchmarks.bench_cohorts [--orders 2000000] [--days 730]
+        [--repeat 3] [--check] [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import math
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any
+
+import numpy as np
+
+from app.agent.cohorts import cohort_retention
+from app.agent.columnar_aggregates import aggregate_customer_retention
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def naive_cohorts(orders, period: str, clv_periods: int) -> Dict[str, Any]:
+    """Per-customer loops over order records, for comparison"""
+    def bucket(created: int) -> int:
+        day = datetime.fromtimestamp(created, timezone.utc).date()
+        if period == "month":
+            return day.year * 12 + day.month - 1
+        return (day - timedelta(days=day.weekday())).toordinal() // 7
+
+    history = defaultdict(list)
+    for created, customer, total in zip(
+        orders["created_at"].tolist(), orders["customer_id"].tolist(), orders["total_price"].tolist()
+    ):
+        if customer > 0:
+            history[customer].append((created, bucket(created), total))
+
+    first = min(entry[1] for entries in history.values() for entry in entries)
+    last = max(entry[1] for entries in history.values() for entry in entries)
+    cells = defaultdict(lambda: {"active": set(), "orders": 0, "revenue": 0.0})
+    sizes = defaultdict(int)
+    intervals, to_second = [], []
+    for customer, entries in history.items():
+        entries.sort()
+        cohort = min(entry[1] for entry in entries)
+        sizes[cohort] += 1
+        for created, index, total in entries:
+            cell = cells[(cohort, index - cohort)]
+            cell["active"].add(customer)
+            cell["orders"] += 1
+            cell["revenue"] += total
+        gaps = [(b[0] - a[0]) / 86400 for a, b in zip(entries, entries[1:])]
+        intervals.extend(gaps)
+        to_second.extend(gaps[:1])
+
+    # Retention curve over complete periods (the latest is left out),
+    # extended by the decay among returning customers
+    def active(cohort, offset):
+        return len(cells[(cohort, offset)]["active"]) if (cohort, offset) in cells else 0
+
+    curve = []
+    for offset in range(last - first):
+        exposed = [cohort for cohort in sizes if cohort + offset < last]
+        if exposed:
+            curve.append(sum(active(c, offset) for c in exposed) / sum(sizes[c] for c in exposed))
+    curve = curve or [1.0]
+    kept = carried = 0
+    for cohort in sizes:
+        for offset in range(2, last - cohort):
+            kept += active(cohort, offset)
+            carried += active(cohort, offset - 1)
+    retention = min(kept / carried, 1.0) if carried else 0.0
+    expected = sum(curve[:clv_periods])
+    level = curve[-1]
+    for _ in range(clv_periods - len(curve)):
+        level *= retention
+        expected += level
+    active_periods = sum(len(cell["active"]) for cell in cells.values())
+    revenue = sum(cell["revenue"] for cell in cells.values())
+    return {
+        "first": first, "sizes": sizes, "cells": cells,
+        "intervals": sorted(intervals), "to_second": sorted(to_second),
+        "curve": curve, "retention": retention, "clv": revenue / active_periods * expected,
+    }
+
+
+def check(result: Dict[str, Any], naive: Dict[str, Any]):
+    """Compare every cohort cell and statistic; raises AssertionError on a mismatch"""
+    assert sum(naive["sizes"].values()) == int(result["customers"].sum())
+    for row, size in enumerate(result["customers"].tolist()):
+        cohort = naive["first"] + row
+        assert naive["sizes"].get(cohort, 0) == size, ("cohort size", row)
+        for offset in np.flatnonzero(result["observed"][row]).tolist():
+            cell = naive["cells"].get((cohort, offset))
+            active = len(cell["active"]) if cell else 0
+            assert result["active"][row, offset] == active, ("active", row, offset)
+            assert result["orders"][row, offset] == (cell["orders"] if cell else 0), ("orders", row, offset)
+            assert math.isclose(result["revenue"][row, offset], cell["revenue"] if cell else 0.0,
+                                rel_tol=1e-9, abs_tol=1e-6), ("revenue", row, offset)
+    assert np.allclose(np.sort(result["intervals"]), naive["intervals"]), "intervals"
+    assert np.allclose(np.sort(result["to_second"]), naive["to_second"]), "to_second"
+    assert np.allclose(result["curve"], naive["curve"]), "curve"
+    assert math.isclose(result["retention"], naive["retention"], rel_tol=1e-9), "retention"
+    assert math.isclose(result["clv"], naive["clv"], rel_tol=1e-9), "clv"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=2000000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="compare with the per-customer implementation")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = MockDataProvider({
+        "orders": args.orders,
+        "products": 500,
+        "customers": max(20, args.orders // 5),
+        "days": args.days,
+        "seed": 11
+    }).to_columnar().tables
+    orders = tables["orders"]
+    print(f"Generated {len(orders['order_id']):,} orders from "
+          f"{len(np.unique(orders['customer_id'])):,} customers over {args.days} days "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    results: Dict[str, Any] = {"orders": len(orders["order_id"])}
+    for period, clv_periods in (("month", 36), ("week", 156)):
+        cohort_ms = timed(lambda: cohort_retention(orders, period, clv_periods), args.repeat)
+        aggregate_ms = timed(
+            lambda: aggregate_customer_retention(tables, period=period, clv_periods=clv_periods), args.repeat
+        )
+        start = time.perf_counter()
+        naive = naive_cohorts(orders, period, clv_periods)
+        naive_ms = (time.perf_counter() - start) * 1000
+        result = cohort_retention(orders, period, clv_periods)
+
+        results[period] = {
+            "cohorts": len(result["periods"]),
+            "cohort_ms": round(cohort_ms, 1),
+            "aggregate_ms": round(aggregate_ms, 1),
+            "orders_per_s": round(len(orders["order_id"]) / (cohort_ms / 1000)),
+            "naive_ms": round(naive_ms, 1),
+            "speedup": round(naive_ms / cohort_ms, 1),
+            "retention": round(result["retention"], 4),
+            "clv": round(result["clv"], 2),
+        }
+        print(f"  {period:<5}  {results[period]['cohorts']:>3} cohorts  vectorized {cohort_ms:>7.1f} ms "
+              f"({results[period]['orders_per_s']:,} orders/s)  aggregate {aggregate_ms:>7.1f} ms  "
+              f"naive {naive_ms:>8.1f} ms ({results[period]['speedup']}x)  "
+              f"retention {result['retention']:.1%}  CLV ${result['clv']:,.2f}")
+        if args.check:
+            check(result, naive)
+            print(f"  {period:<5}  matches the per-customer implementation")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
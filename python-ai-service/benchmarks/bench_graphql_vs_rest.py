@@ -0,0 +1,75 @@
+"""
+Benchmark: batched GraphQL plan query vs per-resource REST calls
+
+Runs QueryExecutor against the in-process fake Shopify API and reports
+latency, round trips and cost points for each fetch mode.
+
+    python -m benchmarks.bench_graphql_vs_rest [--latency 0.05] [--runs 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.agent.query_executor import QueryExecutor
+from app.shopify.api_client import ShopifyAPIClient
+from benchmarks.fake_shopify import create_fake_shopify
+
+
+QUERY_SPEC = {
+    "api_calls": [
+        {"resource": "orders", "fields": ["created_at", "line_items", "total_price"], "filters": {}},
+        {"resource": "products", "fields": ["title", "id"], "filters": {}},
+        {"resource": "inventory_levels", "fields": ["available", "product_id"], "filters": {}},
+    ],
+    "filters": {"time_period": "last 30 days"},
+}
+
+
+async def run_mode(mode: str, latency: float, runs: int) -> dict:
+    fake = create_fake_shopify(latency=latency)
+    client = ShopifyAPIClient(transport=httpx.ASGITransport(app=fake))
+    client.base_url = "http://fake-shopify"
+    # The fake doesn't throttle (bench_portfolio covers rate limits)
+    client.rate_limiter = None
+
+    executor = QueryExecutor(shopify_client=client)
+    executor.fetch_mode = mode
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await executor.execute(QUERY_SPEC, "bench.myshopify.com", "token")
+        timings.append(time.perf_counter() - start)
+
+    stats = fake.state.stats
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "round_trips": stats["requests"] / runs,
+        "cost_points": stats["cost_points"] / runs,
+        "records": result["record_count"],
+    }
+
+
+async def main(latency: float, runs: int):
+    print(f"Fake Shopify latency: {latency * 1000:.0f}ms/request, {runs} runs per mode\n")
+    print(f"{'mode':<8} {'p50 ms':>8} {'max ms':>8} {'trips':>6} {'cost':>8} {'records':>8}")
+    for mode in ("rest", "graphql"):
+        r = await run_mode(mode, latency, runs)
+        print(
+            f"{r['mode']:<8} {r['p50_ms']:>8.1f} {r['max_ms']:>8.1f} "
+            f"{r['round_trips']:>6.1f} {r['cost_points']:>8.1f} {r['records']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.runs))
@@ -0,0 +1,129 @@
+"""
+Benchmark: hedged and failover LLM calls across stub providers
+
+Sends the same stream of completions through a single degraded provider and
+through MultiProviderLLMClient over two providers with independent latency
+distributions (lognormal time-to-first-token plus occasional stalls), and
+compares latency percentiles and the extra calls hedging costs. A second
+scenario injects errors into the primary to show failover.
+
+    python -m benchmarks.bench_hedging [--calls 600] [--concurrency 40]
+        [--ttft 0.05] [--stall-rate 0.05] [--failure-rate 0.1]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Any, List
+
+from app.llm.multi_client import MultiProviderLLMClient
+from app.llm.prompts import INTENT_CLASSIFIER_SYSTEM, INTENT_CLASSIFIER_PROMPT
+from app.telemetry.log import configure_logging
+from app.telemetry.timing import start_request
+from benchmarks.baseline import save_baseline, load_baseline, compare
+from benchmarks.load_test import QUESTIONS, _percentiles
+from benchmarks.stub_llm import StubLLMClient
+
+
+async def drive(client, calls: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            timings = start_request(provider=client.provider)
+            prompt = INTENT_CLASSIFIER_PROMPT.format(question=QUESTIONS[i % len(QUESTIONS)])
+            start = time.perf_counter()
+            try:
+                with timings.step("intent"):
+                    await client.generate(prompt, system_prompt=INTENT_CLASSIFIER_SYSTEM)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return {"latency_ms": _percentiles(latencies), "errors": errors}
+
+
+def providers(args, failure_rate: float = 0.0):
+    primary = StubLLMClient(
+        ttft=args.ttft, tokens_per_second=0, jitter=0.3,
+        stall_rate=args.stall_rate, stall_factor=20,
+        failure_rate=failure_rate, provider="primary", seed=1
+    )
+    secondary = StubLLMClient(
+        ttft=args.ttft * 1.3, tokens_per_second=0, jitter=0.3,
+        stall_rate=args.stall_rate, stall_factor=20,
+        provider="secondary", seed=2
+    )
+    return primary, secondary
+
+
+async def run(args) -> Dict[str, Any]:
+    results = {}
+
+    primary, _ = providers(args)
+    results["single"] = await drive(primary, args.calls, args.concurrency)
+    results["single"]["backend_calls"] = primary.calls
+
+    primary, secondary = providers(args)
+    hedged = MultiProviderLLMClient([primary, secondary], hedge_percentile=args.percentile)
+    # Warm the latency tracker so hedges use measured percentiles, not the default delay
+    await drive(hedged, 100, args.concurrency)
+    primary.calls = secondary.calls = 0
+    results["hedged"] = await drive(hedged, args.calls, args.concurrency)
+    results["hedged"]["backend_calls"] = primary.calls + secondary.calls
+
+    primary, _ = providers(args, args.failure_rate)
+    results["single_failing"] = await drive(primary, args.calls, args.concurrency)
+
+    primary, secondary = providers(args, args.failure_rate)
+    failover = MultiProviderLLMClient([primary, secondary], hedge=False)
+    results["failover"] = await drive(failover, args.calls, args.concurrency)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--percentile", type=float, default=95.0)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    # Failover warnings would swamp the report
+    configure_logging(level="OFF")
+
+    print(f"Hedging: calls={args.calls} concurrency={args.concurrency} ttft={args.ttft}s "
+          f"stall_rate={args.stall_rate} failure_rate={args.failure_rate}")
+    results = asyncio.run(run(args))
+
+    for name, result in results.items():
+        stats = result["latency_ms"]
+        extra = ""
+        if "backend_calls" in result:
+            extra = f"  backend calls {result['backend_calls'] / args.calls:.2f}x"
+        print(f"  {name:<15} p50={stats['p50']:>8.1f}  p95={stats['p95']:>8.1f}  "
+              f"p99={stats['p99']:>8.1f} ms  errors={result['errors']}{extra}")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: per-SKU inventory forecasting across a large catalog
+
+Generates a synthetic shop (default 100k SKUs, a year of orders), then times
+forecast_skus over the whole catalog in one vectorized pass, and the full
+inventory_projection aggregate (forecast plus formatting of the most urgent
+SKUs). For reference, a per-SKU Python loop (daily series, smoothing,
+cover, reorder) is timed once over the same catalog.
+
+    python -m benchmarks.bench_inventory_forecast [--skus 100000] [--orders 1000000]
+        [--history-days 365] [--repeat 3]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, Any
+
+import numpy as np
+
+from app.agent.columnar_aggregates import aggregate_inventory_projection
+from app.agent.inventory_forecast import forecast_skus, SECONDS_PER_DAY
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def loop_forecast(sales, inventory, skus, history_days: int, horizon_days: int, end: int):
+    """Straightforward per-SKU version, for comparison"""
+    start_day = end // SECONDS_PER_DAY + 1 - history_days
+    wanted = set(skus.tolist())
+    daily = defaultdict(lambda: [0.0] * history_days)
+    for created, product_id, quantity in zip(
+        sales["created_at"].tolist(), sales["product_id"].tolist(), sales["quantity"].tolist()
+    ):
+        day = created // SECONDS_PER_DAY - start_day
+        if product_id in wanted and 0 <= day < history_days:
+            daily[product_id][day] += quantity
+    stock = defaultdict(float)
+    for product_id, available in zip(inventory["product_id"].tolist(), inventory["available"].tolist()):
+        if product_id in wanted:
+            stock[product_id] += available
+
+    result = {}
+    for sku in wanted:
+        series = daily[sku]
+        mean = sum(series) / history_days
+        level = mean
+        for units in series:
+            level = 0.1 * units + 0.9 * level
+        std = (sum((units - mean) ** 2 for units in series) / history_days) ** 0.5
+        need = level * (horizon_days + 7) + 1.65 * std * (horizon_days + 7) ** 0.5
+        result[sku] = max(0.0, need - stock[sku])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--horizon-days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    shop = MockDataProvider({
+        "orders": args.orders,
+        "products": args.skus,
+        "customers": max(20, args.orders // 5),
+        "locations": 3,
+        "days": args.history_days,
+        "seed": 7
+    }).to_columnar()
+    tables = shop.tables
+    sales, inventory = tables["sales"], tables["inventory"]
+    print(f"Generated {args.skus:,} SKUs, {args.orders:,} orders, {len(sales['quantity']):,} line items "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    params = {"history_days": args.history_days, "horizon_days": args.horizon_days}
+    forecast_ms = timed(lambda: forecast_skus(sales, inventory, **params), args.repeat)
+    aggregate_ms = timed(lambda: aggregate_inventory_projection(tables, **params), args.repeat)
+
+    end = int(sales["created_at"].max())
+    catalog = np.unique(inventory["product_id"])
+    loop_ms = timed(
+        lambda: loop_forecast(sales, inventory, catalog, args.history_days, args.horizon_days, end), 1
+    )
+
+    forecast = forecast_skus(sales, inventory, **params)
+    results: Dict[str, Any] = {
+        "forecast_ms": round(forecast_ms, 1),
+        "aggregate_ms": round(aggregate_ms, 1),
+        "skus_per_s": round(len(forecast["sku_id"]) / (forecast_ms / 1000)),
+        "loop_ms": round(loop_ms, 1),
+        "speedup": round(loop_ms / forecast_ms, 1),
+        "skus_to_reorder": int((forecast["reorder_quantity"] > 0).sum()),
+    }
+
+    print(f"  vectorized forecast  {forecast_ms:>9.1f} ms  ({results['skus_per_s']:,} SKUs/s)")
+    print(f"  full aggregate       {aggregate_ms:>9.1f} ms")
+    print(f"  per-SKU loop         {loop_ms:>9.1f} ms  ({results['speedup']}x slower)")
+    print(f"  {results['skus_to_reorder']:,} of {len(forecast['sku_id']):,} SKUs need a reorder")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: product-by-location inventory index and joins
+
+Generates a synthetic shop (default 100k SKUs stocked at 50 locations, so
+5M inventory levels) and times building the InventoryIndex, batched and
+single-SKU lookups, joining per-product sales totals onto the index, the
+location shortage report and transfer matching, and the full
+inventory_projection aggregate. For reference, the same join is timed as a
+Python dict join, and as a nested scan (one pass over the inventory per
+SKU) on a sample of SKUs, scaled to the catalog since every SKU costs one
+full pass.
+
+    python -m benchmarks.bench_inventory_index [--skus 100000] [--locations 50]
+        [--orders 1000000] [--repeat 3] [--scan-sample 20]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, Any
+
+import numpy as np
+
+from app.agent.columnar_aggregates import aggregate_inventory_projection
+from app.agent.inventory_index import InventoryIndex
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def dict_join(inventory, product_ids, units):
+    """Python hash join: stock per product, then one probe per sales row"""
+    stock = defaultdict(int)
+    for product_id, available in zip(inventory["product_id"].tolist(), inventory["available"].tolist()):
+        stock[product_id] += available
+    return {product_id: (stock[product_id], sold)
+            for product_id, sold in zip(product_ids.tolist(), units.tolist()) if product_id in stock}
+
+
+def nested_scan(inventory, product_ids):
+    """One pass over the inventory per SKU"""
+    inventory_ids = inventory["product_id"].tolist()
+    available = inventory["available"].tolist()
+    return [sum(a for pid, a in zip(inventory_ids, available) if pid == product_id)
+            for product_id in product_ids.tolist()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=100000)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scan-sample", type=int, default=20)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = MockDataProvider({
+        "orders": args.orders,
+        "products": args.skus,
+        "customers": max(20, args.orders // 5),
+        "locations": args.locations,
+        "days": 90,
+        "seed": 7
+    }).to_columnar().tables
+    sales, inventory = tables["sales"], tables["inventory"]
+    print(f"Generated {args.skus:,} SKUs x {args.locations} locations "
+          f"({len(inventory['available']):,} inventory levels), {len(sales['quantity']):,} line items "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    build_ms = timed(lambda: InventoryIndex(inventory), args.repeat)
+    index = InventoryIndex(inventory)
+
+    # Per-product sales totals, as a sales aggregate would produce them
+    product_ids, codes = np.unique(sales["product_id"], return_inverse=True)
+    units = np.bincount(codes, weights=sales["quantity"])
+    join_ms = timed(lambda: index.join(product_ids, units), args.repeat)
+    joined = index.join(product_ids, units)
+
+    rng = np.random.default_rng(1)
+    probes = rng.choice(index.sku_ids, 1000000)
+    probe_ms = timed(lambda: index.lookup(probes), args.repeat)
+    location = int(index.locations[0])
+    at_location_ms = timed(lambda: index.available_at(probes, location), args.repeat)
+    single = probes[:10000].tolist()
+    levels_ms = timed(lambda: [index.levels(sku) for sku in single], 1)
+
+    need = index.allocate(joined / 90, 37)
+    report_ms = timed(lambda: index.location_shortages(need), args.repeat)
+    transfer_ms = timed(lambda: index.transfers(need), args.repeat)
+    moves = index.transfers(need)
+    aggregate_ms = timed(
+        lambda: aggregate_inventory_projection(tables, history_days=90, horizon_days=30), args.repeat
+    )
+
+    dict_ms = timed(lambda: dict_join(inventory, product_ids, units), 1)
+    sample = product_ids[:args.scan_sample]
+    scan_ms = timed(lambda: nested_scan(inventory, sample), 1) / len(sample) * len(product_ids)
+
+    results: Dict[str, Any] = {
+        "inventory_levels": len(inventory["available"]),
+        "build_ms": round(build_ms, 1),
+        "join_ms": round(join_ms, 1),
+        "lookups_per_s": round(len(probes) / (probe_ms / 1000)),
+        "available_at_ms": round(at_location_ms, 1),
+        "levels_us": round(levels_ms / len(single) * 1000, 1),
+        "location_report_ms": round(report_ms, 1),
+        "transfers_ms": round(transfer_ms, 1),
+        "transfers": len(moves["units"]),
+        "transfer_units": int(moves["units"].sum()),
+        "aggregate_ms": round(aggregate_ms, 1),
+        "dict_join_ms": round(dict_ms, 1),
+        "nested_scan_estimate_s": round(scan_ms / 1000),
+    }
+
+    print(f"  build index          {build_ms:>9.1f} ms")
+    print(f"  join sales totals    {join_ms:>9.1f} ms   (dict join {dict_ms:,.0f} ms, "
+          f"nested scan ~{results['nested_scan_estimate_s']:,} s from {len(sample)} SKUs)")
+    print(f"  1M SKU lookups       {probe_ms:>9.1f} ms   ({results['lookups_per_s']:,}/s); "
+          f"at one location {at_location_ms:.1f} ms")
+    print(f"  levels() per SKU     {results['levels_us']:>9.1f} us")
+    print(f"  location report      {report_ms:>9.1f} ms")
+    print(f"  transfers            {transfer_ms:>9.1f} ms   "
+          f"({results['transfers']:,} moves, {results['transfer_units']:,} units)")
+    print(f"  full aggregate       {aggregate_ms:>9.1f} ms")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
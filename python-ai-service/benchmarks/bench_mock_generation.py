@@ -0,0 +1,76 @@
+"""
+Benchmark: synthetic mock shop generation, persistence and materialization
+
+Times vectorized generation of a large seeded shop, saving/loading it as
+.npz, building the columnar view, and materializing REST-shaped orders.
+
+    python -m benchmarks.bench_mock_generation [--orders 1000000] [--products 5000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.shopify.mock_data import MockDataProvider
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<28} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--locations", type=int, default=3)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = {
+        "seed": args.seed,
+        "orders": args.orders,
+        "products": args.products,
+        "customers": args.customers,
+        "locations": args.locations,
+        "days": args.days,
+        "end_date": "2024-12-31",
+    }
+    print(f"Synthetic shop: {args.orders:,} orders, {args.products:,} products, "
+          f"{args.customers:,} customers, {args.locations} locations, {args.days} days")
+
+    provider = timed("generate", lambda: MockDataProvider(config))
+    items = len(provider.tables["line_items"]["quantity"])
+    print(f"  ({items:,} line items)")
+
+    again = MockDataProvider(config)
+    same = all(
+        np.array_equal(provider.tables[t][c], again.tables[t][c])
+        for t in provider.tables for c in provider.tables[t]
+    )
+    print(f"  same seed reproduces shop: {same}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shop.npz")
+        timed("save .npz", lambda: provider.save(path))
+        print(f"  ({os.path.getsize(path) / 1e6:.1f} MB on disk)")
+        timed("load .npz", lambda: MockDataProvider(config, path=path))
+
+    timed("columnar view", provider.to_columnar)
+    timed("materialize orders (dicts)", provider.get_orders)
+
+    top = np.bincount(provider.tables["line_items"]["product_index"], minlength=args.products)
+    top = np.sort(top)[::-1]
+    share = top[: max(1, args.products // 100)].sum() / top.sum()
+    print(f"  top 1% of products = {share:.0%} of line items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: event-loop latency while a large shop is being processed
+
+Runs a stream of large ResultProcessor.process calls (one big shop) next to
+a 1 ms ticker and a stream of small-shop requests, for each
+PROCESSING_EXECUTOR mode. Reports how late the ticker fires (event-loop
+lag) and how long the small requests take, alongside the large request time.
+
+    python -m benchmarks.bench_offload [--large-orders 200000] [--small-orders 200]
+        [--large-runs 3] [--modes inline thread process]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Any, List
+
+from app.agent.processing_pool import ProcessingPool
+from app.agent.result_processor import ResultProcessor
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.baseline import save_baseline, load_baseline, compare
+from benchmarks.load_test import _percentiles
+
+
+INTENTS = ["inventory_projection", "top_products", "customer_behavior"]
+
+
+def shop(orders: int, seed: int) -> Dict[str, Any]:
+    provider = MockDataProvider({
+        "orders": orders,
+        "products": max(5, orders // 50),
+        "customers": max(20, orders // 5),
+        "locations": 3,
+        "days": 365,
+        "seed": seed
+    })
+    return {
+        "orders": provider.get_orders(),
+        "products": provider.get_products(),
+        "inventory_levels": provider.get_inventory(),
+    }
+
+
+async def run_mode(mode: str, large, small, large_runs: int) -> Dict[str, Any]:
+    processor = ResultProcessor(ProcessingPool(mode=mode))
+    lags: List[float] = []
+    small_latencies: List[float] = []
+    large_latencies: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+    async def small_requests():
+        i = 0
+        while not done.is_set():
+            intent = {"intent": INTENTS[i % len(INTENTS)], "time_period": "next 30 days"}
+            start = time.perf_counter()
+            await processor.process({"data": small}, intent, {})
+            small_latencies.append((time.perf_counter() - start) * 1000)
+            i += 1
+            await asyncio.sleep(0.005)
+
+    async def large_requests():
+        try:
+            for i in range(large_runs):
+                intent = {"intent": INTENTS[i % len(INTENTS)], "time_period": "next 30 days"}
+                start = time.perf_counter()
+                await processor.process({"data": large}, intent, {})
+                large_latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            done.set()
+
+    # Warm the pools so worker start-up is not charged to the first request
+    if processor.pool.accepts(INTENTS[0], large):
+        await processor.pool.aggregate(INTENTS[0], small)
+
+    try:
+        await asyncio.gather(ticker(), small_requests(), large_requests())
+    finally:
+        processor.pool.shutdown()
+
+    return {
+        "loop_lag_ms": _percentiles(lags),
+        "small_request_ms": _percentiles(small_latencies),
+        "large_request_ms": _percentiles(large_latencies),
+        "max_loop_lag_ms": round(max(lags), 3) if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--large-orders", type=int, default=200000)
+    parser.add_argument("--small-orders", type=int, default=200)
+    parser.add_argument("--large-runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    print(f"Generating shops: large={args.large_orders:,} orders, small={args.small_orders:,} orders")
+    large = shop(args.large_orders, seed=7)
+    small = shop(args.small_orders, seed=8)
+
+    results = {}
+    for mode in args.modes:
+        result = asyncio.run(run_mode(mode, large, small, args.large_runs))
+        results[mode] = result
+        lag, small_ms = result["loop_lag_ms"], result["small_request_ms"]
+        print(f"  {mode:<8} loop lag p50={lag['p50']:>7.2f} p99={lag['p99']:>8.2f} "
+              f"max={result['max_loop_lag_ms']:>8.1f} ms  "
+              f"small p50={small_ms['p50']:>7.2f} p99={small_ms['p99']:>8.2f} ms  "
+              f"large p50={result['large_request_ms']['p50']:>8.1f} ms")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark: one /analyze/portfolio call vs a separate /analyze call per store
+
+Asks one question ("Which stores will stock out next week?") of --stores
+local fake shops, each its own seeded MockDataProvider behind its own fake
+Admin API (routed by host, with the shop's own leaky buckets). Compares
+firing one AgentOrchestrator.process() per store at once, with no client
+rate limiting, against process_portfolio(): one classification and plan,
+then at most --concurrency stores in flight, each within its shop's rate
+limit - and, to isolate the rate limiter, the same without it. All use the
+deterministic stub LLM.
+
+Two scenarios: GraphQL plan queries against standard buckets, and REST
+(three resources per store, read page by page) against shops with a
+tight bucket of 2 requests leaking 1/s, which a store's third request
+overflows unless it waits. Stores whose orders straddle a window edge
+while the runs progress can analyze a few different records. Reports total time, time to the first store's answer, LLM calls,
+Shopify requests, throttled responses (each retried after Retry-After),
+requests the rate limiter held back, and on how many stores the separate
+calls and the portfolio analyzed the same data.
+
+    python -m benchmarks.bench_portfolio [--stores 200] [--orders 2000]
+        [--latency 0.05] [--ttft 0.25] [--concurrency 32]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from app.agent.orchestrator import AgentOrchestrator
+from app.agent.query_executor import QueryExecutor
+from app.shopify.api_client import ShopifyAPIClient
+from app.shopify.mock_data import MockDataProvider
+from app.shopify.rate_limit import ShopRateLimiter
+from benchmarks.baseline import save_baseline, load_baseline, compare
+from benchmarks.fake_shopify import create_fake_shopify
+from benchmarks.stub_llm import StubLLMClient
+
+
+QUESTION = "Which stores will stock out next week?"
+
+# (fetch mode, REST bucket and leak rate of every shop)
+SCENARIOS = {
+    "graphql": ("graphql", (40, 2)),
+    "rest_tight": ("rest", (2, 1)),
+}
+
+
+# Rows per scenario: (label, use process_portfolio, client rate limiting)
+MODES = [
+    ("separate", False, False),
+    ("portfolio, no limiter", True, False),
+    ("portfolio", True, True),
+]
+
+
+class ShopRouter(httpx.AsyncBaseTransport):
+    """Sends each request to its shop's fake Admin API, by host"""
+
+    def __init__(self, shops: Dict[str, Any]):
+        self.transports = {host: httpx.ASGITransport(app=app) for host, app in shops.items()}
+
+    async def handle_async_request(self, request):
+        response = await self.transports[request.url.host].handle_async_request(request)
+        body = await response.aread()
+        return httpx.Response(response.status_code, headers=response.headers, content=body)
+
+
+def store_id(i: int) -> str:
+    return f"shop-{i:04d}.myshopify.com"
+
+
+def build(providers: List[MockDataProvider], args, scenario: str, limited: bool):
+    fetch_mode, rest_limits = SCENARIOS[scenario]
+    shops = {
+        store_id(i): create_fake_shopify(provider, latency=args.latency, rate_limits={
+            "rest": rest_limits, "graphql": (1000, 50)
+        })
+        for i, provider in enumerate(providers)
+    }
+    router = ShopRouter(shops)
+    client = ShopifyAPIClient(transport=router)
+    client.base_url = "http://{store_id}"
+    client.rate_limiter = ShopRateLimiter(*rest_limits) if limited else None
+    llm = StubLLMClient(ttft=args.ttft)
+    orchestrator = AgentOrchestrator(llm)
+    orchestrator.query_executor = QueryExecutor(shopify_client=client)
+    orchestrator.query_executor.fetch_mode = fetch_mode
+    orchestrator.cost_estimator.fetch_mode = fetch_mode
+    orchestrator.portfolio_concurrency = args.concurrency
+    return orchestrator, llm, shops, client
+
+
+async def run(portfolio: bool, limited: bool, scenario: str, providers: List[MockDataProvider], args) -> Dict[str, Any]:
+    orchestrator, llm, shops, client = build(providers, args, scenario, limited)
+    stores = [{"store_id": store_id(i), "access_token": "token"} for i in range(len(providers))]
+    data_points: Dict[str, int] = {}
+    first: Optional[float] = None
+
+    start = time.perf_counter()
+    if not portfolio:
+        async def one(store):
+            nonlocal first
+            result = await orchestrator.process({**store, "question": QUESTION})
+            first = first or time.perf_counter() - start
+            data_points[store["store_id"]] = result["metadata"].get("data_points_analyzed")
+        await asyncio.gather(*[one(store) for store in stores])
+    else:
+        async for event in orchestrator.process_portfolio({"question": QUESTION, "stores": stores}):
+            if event["event"] == "store":
+                first = first or time.perf_counter() - start
+                data_points[event["store_id"]] = event["metadata"].get("data_points_analyzed")
+    elapsed = time.perf_counter() - start
+
+    stats = [shop.state.stats for shop in shops.values()]
+    return {
+        "ms": round(elapsed * 1000, 1),
+        "first_ms": round((first or elapsed) * 1000, 1),
+        "llm_calls": llm.calls,
+        "shopify_requests": sum(s["requests"] for s in stats),
+        "throttled": sum(s["throttled"] for s in stats),
+        "limiter_waits": client.rate_limiter.stats["waits"] if client.rate_limiter else 0,
+        "data_points": data_points,
+    }
+
+
+async def main(args):
+    start = time.perf_counter()
+    providers = [
+        MockDataProvider({"seed": i, "orders": args.orders, "products": 50, "customers": args.orders // 4, "days": 60})
+        for i in range(args.stores)
+    ]
+    print(f"{args.stores} shops of {args.orders:,} orders (generated in {time.perf_counter() - start:.1f}s), "
+          f"Shopify {args.latency * 1000:.0f} ms/request, LLM time to first token {args.ttft * 1000:.0f} ms, "
+          f"portfolio concurrency {args.concurrency}\n")
+
+    results: Dict[str, Any] = {}
+    for scenario in SCENARIOS:
+        print(f"  {scenario:<22} {'total ms':>9} {'first ms':>9} {'LLM calls':>10} {'Shopify reqs':>13} "
+              f"{'throttled':>10} {'held back':>10}")
+        runs = {label: await run(portfolio, limited, scenario, providers, args) for label, portfolio, limited in MODES}
+        same = sum(
+            runs["separate"]["data_points"].get(store) == points
+            for store, points in runs["portfolio"]["data_points"].items()
+        )
+        results[scenario] = {"same_data": same}
+        for label, r in runs.items():
+            r.pop("data_points")
+            results[scenario][label.replace(", ", "_").replace(" ", "_")] = r
+            print(f"  {label:<22} {r['ms']:>9.0f} {r['first_ms']:>9.0f} {r['llm_calls']:>10} "
+                  f"{r['shopify_requests']:>13} {r['throttled']:>10} {r['limiter_waits']:>10}")
+        print(f"  same data on {same}/{args.stores} stores\n")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--ttft", type=float, default=0.25)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
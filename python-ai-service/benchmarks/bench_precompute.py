@@ -0,0 +1,171 @@
+"""
+Benchmark: dashboard questions answered cold vs from precomputed answers
+
+Simulates two days of traffic on --stores local fake shops (each its own
+seeded MockDataProvider behind its own rate-limited fake Admin API, as in
+bench_portfolio). Day 1: every merchant opens the dashboard twice, asking
+the ten questions of bench_batch's dashboard, all answered by the agent.
+Overnight: one PrecomputeScheduler run warms each store's questions asked
+at least twice. Day 2: every merchant opens the dashboard once more and
+also asks --adhoc questions of their own, never seen before. Reports
+latency percentiles per day, LLM calls, Shopify requests and throttled
+responses, the warming run's duration, and day 2's warm-hit ratio. Uses the
+deterministic stub LLM and an in-memory shared cache.
+
+    python -m benchmarks.bench_precompute [--stores 20] [--orders 2000]
+        [--latency 0.05] [--ttft 0.25] [--adhoc 2] [--warm-concurrency 8]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, Any, List
+
+from app.agent.orchestrator import AgentOrchestrator
+from app.agent.precompute import PrecomputeScheduler
+from app.agent.query_executor import QueryExecutor
+from app.cache.shared_cache import MemoryCache
+from app.shopify.api_client import ShopifyAPIClient
+from app.shopify.mock_data import MockDataProvider
+from app.shopify.rate_limit import ShopRateLimiter
+from benchmarks.baseline import save_baseline, load_baseline, compare
+from benchmarks.bench_batch import DASHBOARD
+from benchmarks.bench_portfolio import ShopRouter, store_id
+from benchmarks.fake_shopify import create_fake_shopify
+from benchmarks.stub_llm import StubLLMClient
+
+
+# Questions merchants ask once (day 2 only)
+ADHOC = [
+    "Which customers bought more than once in the last 2 weeks?",
+    "What was my revenue over the last 7 days?",
+    "Which products should I restock before next week?",
+    "How did sales trend over the last 2 weeks?",
+]
+
+
+def build(providers: List[MockDataProvider], args):
+    shops = {
+        store_id(i): create_fake_shopify(provider, latency=args.latency, rate_limits={
+            "rest": (40, 2), "graphql": (1000, 50)
+        })
+        for i, provider in enumerate(providers)
+    }
+    client = ShopifyAPIClient(transport=ShopRouter(shops))
+    client.base_url = "http://{store_id}"
+    client.rate_limiter = ShopRateLimiter()
+    llm = StubLLMClient(ttft=args.ttft)
+    orchestrator = AgentOrchestrator(llm)
+    orchestrator.query_executor = QueryExecutor(shopify_client=client)
+    scheduler = PrecomputeScheduler(orchestrator, cache=MemoryCache())
+    scheduler.enabled = True
+    scheduler.concurrency = args.warm_concurrency
+    orchestrator.precompute = scheduler
+    return orchestrator, llm, shops
+
+
+async def day(orchestrator, llm, shops, questions: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Each store asks its questions in turn; stores in parallel"""
+    calls, requests = llm.calls, _shop_stats(shops)
+    latencies: List[float] = []
+
+    async def merchant(store: str):
+        for question in questions[store]:
+            start = time.perf_counter()
+            await orchestrator.process({"store_id": store, "access_token": "token", "question": question})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*[merchant(store) for store in questions])
+    latencies.sort()
+    stats = _shop_stats(shops)
+    return {
+        "questions": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        "llm_calls": llm.calls - calls,
+        "shopify_requests": stats["requests"] - requests["requests"],
+        "throttled": stats["throttled"] - requests["throttled"],
+    }
+
+
+def _shop_stats(shops) -> Dict[str, int]:
+    return {
+        key: sum(shop.state.stats[key] for shop in shops.values())
+        for key in ("requests", "throttled")
+    }
+
+
+async def main(args):
+    providers = [
+        MockDataProvider({"seed": i, "orders": args.orders, "products": 50, "customers": args.orders // 4, "days": 60})
+        for i in range(args.stores)
+    ]
+    print(f"{args.stores} shops of {args.orders:,} orders, {len(DASHBOARD)} dashboard questions, "
+          f"{args.adhoc} ad-hoc questions per store on day 2, Shopify {args.latency * 1000:.0f} ms/request, "
+          f"LLM time to first token {args.ttft * 1000:.0f} ms\n")
+
+    orchestrator, llm, shops = build(providers, args)
+    stores = [store_id(i) for i in range(args.stores)]
+
+    day1 = await day(orchestrator, llm, shops, {store: DASHBOARD * 2 for store in stores})
+
+    calls, requests = llm.calls, _shop_stats(shops)
+    start = time.perf_counter()
+    outcomes = await orchestrator.precompute.run_once()
+    stats = _shop_stats(shops)
+    warming = {
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+        "warmed": outcomes.get("warmed", 0),
+        "llm_calls": llm.calls - calls,
+        "shopify_requests": stats["requests"] - requests["requests"],
+        "throttled": stats["throttled"] - requests["throttled"],
+    }
+
+    scheduler = orchestrator.precompute
+    hits, misses = scheduler.stats["warm_hits"], scheduler.stats["cold_misses"]
+    day2 = await day(orchestrator, llm, shops, {
+        store: DASHBOARD + [ADHOC[(i + n) % len(ADHOC)] for n in range(args.adhoc)]
+        for i, store in enumerate(stores)
+    })
+    hits, misses = scheduler.stats["warm_hits"] - hits, scheduler.stats["cold_misses"] - misses
+    day2["warm_hit_ratio"] = round(hits / max(hits + misses, 1), 3)
+
+    results = {"day1": day1, "warming": warming, "day2": day2}
+    print(f"  {'':<8} {'questions':>10} {'p50 ms':>8} {'p95 ms':>8} {'LLM calls':>10} "
+          f"{'Shopify reqs':>13} {'throttled':>10}")
+    for label in ("day1", "day2"):
+        r = results[label]
+        print(f"  {label:<8} {r['questions']:>10} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['llm_calls']:>10} "
+              f"{r['shopify_requests']:>13} {r['throttled']:>10}")
+    print(f"\n  overnight warming: {warming['warmed']} answers in {warming['ms']:.0f} ms, "
+          f"{warming['llm_calls']} LLM calls, {warming['shopify_requests']} Shopify requests, "
+          f"{warming['throttled']} throttled")
+    print(f"  day 2 warm-hit ratio: {day2['warm_hit_ratio']:.0%}")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--ttft", type=float, default=0.25)
+    parser.add_argument("--adhoc", type=int, default=2)
+    parser.add_argument("--warm-concurrency", type=int, default=8)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
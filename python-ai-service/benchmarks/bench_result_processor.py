@@ -0,0 +1,95 @@
+"""
+Microbenchmark: ResultProcessor handlers at scale
+
+Times ResultProcessor.process for each intent route over synthetic shops of
+increasing size (orders are fetched unfiltered, as one large page).
+
+    python -m benchmarks.bench_result_processor [--sizes 1000 10000 100000] [--repeat 5]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, Any
+
+from app.agent.result_processor import ResultProcessor
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+INTENTS = {
+    "inventory_projection": ["orders", "inventory_levels"],
+    "top_products": ["orders", "products"],
+    "customer_behavior": ["orders", "customers"],
+}
+
+
+async def time_handler(processor, raw_data, intent, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await processor.process(raw_data=raw_data, intent=intent, plan={})
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def run(sizes, repeat: int) -> Dict[str, Any]:
+    processor = ResultProcessor()
+    results = {}
+
+    for orders in sizes:
+        provider = MockDataProvider({
+            "orders": orders,
+            "products": max(5, orders // 50),
+            "customers": max(20, orders // 5),
+            "locations": 3,
+            "days": 365,
+            "seed": 7
+        })
+        data = {
+            "orders": provider.get_orders(),
+            "products": provider.get_products(),
+            "inventory_levels": provider.get_inventory(),
+            "customers": provider.get_customers(),
+        }
+
+        print(f"{orders:,} orders")
+        for intent_name, resources in INTENTS.items():
+            raw_data = {
+                "data": {resource: data[resource] for resource in resources},
+                "is_mock": True
+            }
+            intent = {"intent": intent_name, "time_period": "last 365 days"}
+            ms = await time_handler(processor, raw_data, intent, repeat)
+            results.setdefault(intent_name, {})[str(orders)] = round(ms, 3)
+            rate = orders / (ms / 1000) if ms else float("inf")
+            print(f"  {intent_name:<22} {ms:>10.2f} ms  {rate:>12,.0f} orders/s")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.repeat))
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
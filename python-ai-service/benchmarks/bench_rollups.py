@@ -0,0 +1,158 @@
+"""
+Benchmark: year-long sales questions from daily rollups vs line items
+
+Generates a synthetic shop (default 2M orders over two years), syncs it into
+DailyRollups in monthly batches as a store would be synced, then answers a
+year-long sales_analysis and inventory_projection twice: from the raw
+line items and from the rollup rows of the same (whole-day) window. Also
+times a one-day delta sync. Results of both paths are compared, and the run
+fails on any mismatch.
+
+    python -m benchmarks.bench_rollups [--orders 2000000] [--products 1000]
+        [--days 730] [--window 365] [--repeat 3]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import math
+import statistics
+import time
+from typing import Dict, Any
+
+import numpy as np
+
+from app.agent.columnar_aggregates import aggregate_sales_analysis, aggregate_inventory_projection
+from app.shopify.mock_data import MockDataProvider
+from app.shopifyql.rollups import DailyRollups, SECONDS_PER_DAY
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def between(table, since: int, until: int):
+    """Rows of a created_at-sorted table in [since, until]"""
+    created = table["created_at"]
+    rows = slice(np.searchsorted(created, since, side="left"), np.searchsorted(created, until, side="right"))
+    return {column: values[rows] for column, values in table.items()}
+
+
+def sync(tables, since: int, until: int, batch_days: int) -> DailyRollups:
+    rollups = DailyRollups()
+    for start in range(since, until, batch_days * SECONDS_PER_DAY):
+        stop = min(start + batch_days * SECONDS_PER_DAY, until)
+        rollups.ingest(between(tables["orders"], start, stop), between(tables["sales"], start, stop), start, stop)
+    return rollups
+
+
+def check(raw: Any, rolled: Any, path: str = ""):
+    """
+    Same answer from both paths, up to float summation order; raises
+    AssertionError on a mismatch
+    """
+    if isinstance(raw, dict):
+        assert set(raw) == set(rolled), path
+        for key in raw:
+            check(raw[key], rolled[key], f"{path}.{key}")
+    elif isinstance(raw, list):
+        assert len(raw) == len(rolled), path
+        for index, (a, b) in enumerate(zip(raw, rolled)):
+            check(a, b, f"{path}[{index}]")
+    elif isinstance(raw, float):
+        assert math.isclose(raw, rolled, rel_tol=1e-9, abs_tol=1e-6) or raw == rolled, path
+    else:
+        assert raw == rolled, path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=2000000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--window", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = MockDataProvider({
+        "orders": args.orders,
+        "products": args.products,
+        "customers": max(20, args.orders // 5),
+        "days": args.days,
+        "seed": 5
+    }).to_columnar().tables
+    orders, sales = tables["orders"], tables["sales"]
+    print(f"Generated {len(orders['order_id']):,} orders, {len(sales['quantity']):,} line items "
+          f"over {args.days} days in {time.perf_counter() - start:.1f}s")
+
+    first = int(orders["created_at"].min()) // SECONDS_PER_DAY * SECONDS_PER_DAY
+    last = int(orders["created_at"].max())
+    start = time.perf_counter()
+    rollups = sync(tables, first, last - SECONDS_PER_DAY, 30)
+    sync_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    rollups.ingest(between(orders, last - SECONDS_PER_DAY, last), between(sales, last - SECONDS_PER_DAY, last),
+                   last - SECONDS_PER_DAY, last)
+    delta_ms = (time.perf_counter() - start) * 1000
+
+    # The question's window: the last `window` whole days
+    since = (last // SECONDS_PER_DAY + 1 - args.window) * SECONDS_PER_DAY
+    raw = {"orders": between(orders, since, last), "sales": between(sales, since, last),
+           "products": tables["products"], "inventory": tables["inventory"]}
+    rolled = {**rollups.window(since, last), "products": tables["products"], "inventory": tables["inventory"]}
+    line_items = len(raw["sales"]["quantity"])
+    rollup_rows = sum(len(table["created_at"]) for table in rollups.window(since, last).values())
+
+    forecast = {"history_days": args.window, "horizon_days": 30}
+    results: Dict[str, Any] = {
+        "line_items": line_items,
+        "rollup_rows": rollup_rows,
+        "initial_sync_ms": round(sync_ms, 1),
+        "delta_sync_ms": round(delta_ms, 1),
+        "window_ms": round(timed(lambda: rollups.window(since, last), args.repeat), 3),
+    }
+    for name, aggregate, params in (
+        ("sales_analysis", aggregate_sales_analysis, {}),
+        ("inventory_projection", aggregate_inventory_projection, forecast),
+    ):
+        raw_ms = timed(lambda: aggregate(raw, **params), args.repeat)
+        rollup_ms = timed(lambda: aggregate(rolled, **params), args.repeat)
+        result = aggregate(rolled, **params)
+        result.pop("new_customers", None)
+        check(aggregate(raw, **params), result)
+        results[name] = {
+            "line_items_ms": round(raw_ms, 1),
+            "rollups_ms": round(rollup_ms, 1),
+            "speedup": round(raw_ms / rollup_ms, 1),
+        }
+
+    print(f"  {args.window}-day window: {line_items:,} line items vs {rollup_rows:,} rollup rows "
+          f"({line_items / max(rollup_rows, 1):.1f}x fewer)")
+    print(f"  initial sync {sync_ms:,.0f} ms in 30-day batches, one-day delta {delta_ms:.1f} ms, "
+          f"window read {results['window_ms']} ms")
+    for name in ("sales_analysis", "inventory_projection"):
+        timing = results[name]
+        print(f"  {name:<21} line items {timing['line_items_ms']:>8.1f} ms   rollups {timing['rollups_ms']:>7.1f} ms "
+              f"({timing['speedup']}x)   same result")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: approximate answers from sampled time slices - accuracy vs data fetched
+
+Generates a large synthetic shop (default 2M orders over a year), computes
+the exact sales_analysis over the whole window, then for each sampling
+rate draws --trials random samples of page-sized time slices (as
+QueryExecutor does in approximate mode) and reports the share of orders
+fetched, request count, median and 95th percentile relative error of
+the order count, revenue and top product units, how often the 95%
+interval held the exact value, and how often the exact top product
+ranked first.
+
+    python -m benchmarks.bench_sampling [--orders 2000000] [--days 365]
+        [--rates 0.005,0.01,0.02,0.05,0.1] [--trials 100]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import time
+from typing import Dict, Any
+
+import numpy as np
+
+from app.agent.columnar_aggregates import aggregate_sales_analysis
+from app.agent.sampling import plan_sample, slice_ranges
+from app.shopify.graphql_query import PAGE_SIZE
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+def sampled_tables(tables, sample):
+    """Rows of the sampled slices, as the executor would fetch them"""
+    out = {}
+    for name in ("orders", "sales"):
+        table = tables[name]
+        index = (table["created_at"] - sample["since"]) // sample["slice_seconds"]
+        rows = np.isin(index, sample["sampled"])
+        out[name] = {column: values[rows] for column, values in table.items()}
+    out["products"] = tables["products"]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=2000000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rates", default="0.005,0.01,0.02,0.05,0.1")
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = MockDataProvider({
+        "orders": args.orders,
+        "products": 500,
+        "customers": max(20, args.orders // 5),
+        "days": args.days,
+        "seed": 13
+    }).to_columnar().tables
+    orders = tables["orders"]
+    print(f"Generated {len(orders['order_id']):,} orders over {args.days} days "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    since = int(orders["created_at"].min())
+    until = int(orders["created_at"].max()) + 1
+    exact = aggregate_sales_analysis(tables)
+    top = exact["top_products"][0]
+    # Slices of about one page of orders, as the cost estimator sizes them
+    slice_seconds = PAGE_SIZE / (len(orders["order_id"]) / (until - since))
+    print(f"Exact: {exact['total_orders']:,} orders, ${exact['total_revenue']:,.0f}, "
+          f"top product {top['product']} ({top['quantity']:,} units); "
+          f"{int(slice_seconds)}s slices")
+
+    results: Dict[str, Any] = {"orders": exact["total_orders"]}
+    print(f"  {'rate':>6} {'fetched':>8} {'requests':>8}   {'orders err':>17} {'revenue err':>17} "
+          f"{'top units err':>17}   {'coverage':>8} {'top #1':>6}")
+    for rate in [float(r) for r in args.rates.split(",")]:
+        errors = {"orders": [], "revenue": [], "top": []}
+        covered, top_first, fetched, requests = 0, 0, [], []
+        for trial in range(args.trials):
+            sample = plan_sample(since, until, slice_seconds, rate, min_slices=2, seed=trial)
+            estimate = aggregate_sales_analysis(sampled_tables(tables, sample), sample=sample)
+            errors["orders"].append(abs(estimate["total_orders"] / exact["total_orders"] - 1))
+            errors["revenue"].append(abs(estimate["total_revenue"] / exact["total_revenue"] - 1))
+            units = next((p["quantity"] for p in estimate["top_products"] if p["product"] == top["product"]), 0)
+            errors["top"].append(abs(units / top["quantity"] - 1))
+            covered += abs(estimate["total_revenue"] - exact["total_revenue"]) <= estimate["margins"]["total_revenue"]
+            top_first += estimate["top_products"][0]["product"] == top["product"]
+            fetched.append(estimate["sampling"]["orders_sampled"] / exact["total_orders"])
+            requests.append(len(slice_ranges(sample)))
+
+        row = {
+            "fetched": round(float(np.mean(fetched)), 4),
+            "requests": round(float(np.mean(requests)), 1),
+            **{f"{name}_error_p50": round(float(np.median(values)), 4) for name, values in errors.items()},
+            **{f"{name}_error_p95": round(float(np.percentile(values, 95)), 4) for name, values in errors.items()},
+            "interval_coverage": round(covered / args.trials, 3),
+            "top_product_first": round(top_first / args.trials, 3),
+        }
+        results[f"rate_{rate}"] = row
+        print(f"  {rate:>6.1%} {row['fetched']:>8.2%} {row['requests']:>8.0f}   "
+              + "   ".join(f"{row[f'{name}_error_p50']:>7.2%} /{row[f'{name}_error_p95']:>7.2%}" for name in errors)
+              + f"   {row['interval_coverage']:>8.1%} {row['top_product_first']:>6.0%}")
+    print("  (errors are median / 95th percentile of |estimate / exact - 1|)")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: cache hit rates across uvicorn-style worker processes
+
+Starts several worker processes, each with its own event loop issuing
+concurrent get_or_compute lookups over a skewed (Zipf) key set, where a
+miss costs a simulated LLM call. Compares per-worker in-process caches
+(memory backend) with one SQLite cache shared by all workers, reporting
+hit rate, how many computations ran in total (ideally one per distinct key)
+and lookup latency.
+
+    python -m benchmarks.bench_shared_cache [--workers 4] [--lookups 2000]
+        [--keys 500] [--compute-ms 20] [--concurrency 20]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+
+from app.cache.shared_cache import MemoryCache, SQLiteCache
+from benchmarks.baseline import save_baseline, load_baseline, compare
+from benchmarks.load_test import _percentiles
+
+
+def worker(backend: str, path: str, seed: int, args: Dict[str, Any]) -> Dict[str, Any]:
+    cache = SQLiteCache(path) if backend == "sqlite" else MemoryCache()
+    rng = np.random.default_rng(seed)
+    keys = np.minimum(rng.zipf(1.3, args["lookups"]), args["keys"])
+    computed: List[int] = []
+    latencies: List[float] = []
+
+    async def compute(key: int):
+        await asyncio.sleep(args["compute_ms"] / 1000)
+        computed.append(key)
+        return {"key": key, "answer": "x" * 200}
+
+    async def run():
+        semaphore = asyncio.Semaphore(args["concurrency"])
+
+        async def one(key: int):
+            async with semaphore:
+                start = time.perf_counter()
+                value = await cache.get_or_compute(f"bench:{key}", lambda: compute(key), ttl=600)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert value["key"] == key
+
+        await asyncio.gather(*(one(int(key)) for key in keys))
+
+    asyncio.run(run())
+    return {"lookups": len(keys), "computed": computed, "latencies": latencies}
+
+
+def run_backend(backend: str, args) -> Dict[str, Any]:
+    options = {
+        "lookups": args.lookups, "keys": args.keys,
+        "compute_ms": args.compute_ms, "concurrency": args.concurrency
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.db")
+        # Create the schema once, as the first worker to start would
+        if backend == "sqlite":
+            SQLiteCache(path)
+        start = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            results = pool.starmap(worker, [(backend, path, seed, options) for seed in range(args.workers)])
+        elapsed = time.perf_counter() - start
+
+    lookups = sum(result["lookups"] for result in results)
+    computed = [key for result in results for key in result["computed"]]
+    return {
+        "hit_rate": round(1 - len(computed) / lookups, 4),
+        "computations": len(computed),
+        "distinct_keys": len(set(computed)),
+        "duplicate_computations": len(computed) - len(set(computed)),
+        "lookup_ms": _percentiles([ms for result in results for ms in result["latencies"]]),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=2000, help="per worker")
+    parser.add_argument("--keys", type=int, default=500)
+    parser.add_argument("--compute-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    print(f"Shared cache: workers={args.workers} lookups/worker={args.lookups} "
+          f"keys={args.keys} compute={args.compute_ms}ms")
+    results = {}
+    for backend in ("memory", "sqlite"):
+        result = results[backend] = run_backend(backend, args)
+        stats = result["lookup_ms"]
+        print(f"  {backend:<7} hit rate {result['hit_rate']:.1%}  computations={result['computations']} "
+              f"(duplicates {result['duplicate_computations']})  "
+              f"lookup p50={stats['p50']:.2f} p99={stats['p99']:.2f} ms  wall={result['wall_s']}s")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: local ShopifyQL engine over 1M cached line items
+
+Builds a synthetic year of sales directly as column arrays and times common
+planner queries, plus a pure-Python dict scan of the top-products query
+for reference.
+
+    python -m benchmarks.bench_shopifyql_local [--line-items 1000000] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from app.shopifyql.columnar import ColumnarShopData
+from app.shopifyql.engine import execute_shopifyql
+
+
+QUERIES = [
+    "FROM sales SHOW net_quantity, total_sales GROUP BY product_title "
+    "SINCE -30d ORDER BY net_quantity DESC LIMIT 5",
+    "FROM sales SHOW total_sales, orders, average_order_value SINCE -30d",
+    "FROM sales SHOW total_sales, orders GROUP BY month SINCE -1y",
+    "FROM sales SHOW customers, net_quantity GROUP BY week SINCE -12w",
+    "FROM sales SHOW total_sales WHERE product_title = 'Product 7' SINCE -90d",
+    "FROM sales SHOW net_quantity GROUP BY product_title SINCE -1y "
+    "ORDER BY net_quantity DESC LIMIT 20",
+]
+
+
+def build_shop(line_items: int, products: int = 5000, seed: int = 7) -> ColumnarShopData:
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    orders = line_items // 2
+
+    order_created = np.sort(now - rng.integers(0, 365 * 86400, orders))
+    items_per_order = rng.integers(1, 4, orders)
+    items_per_order[-1] += line_items - items_per_order.sum() if items_per_order.sum() < line_items else 0
+    order_index = np.repeat(np.arange(orders), items_per_order)[:line_items]
+
+    popularity = 1.0 / np.arange(1, products + 1) ** 1.1
+    product_ids = rng.choice(products, size=line_items, p=popularity / popularity.sum()) + 1
+    prices = np.round(rng.uniform(5, 120, products), 2)
+    quantity = rng.integers(1, 5, line_items)
+
+    return ColumnarShopData({
+        "sales": {
+            "created_at": order_created[order_index],
+            "order_id": order_index.astype(np.int64),
+            "customer_id": (order_index % (orders // 3)).astype(np.int64),
+            "product_id": product_ids.astype(np.int64),
+            "quantity": quantity,
+            "price": prices[product_ids - 1],
+            "gross": quantity * prices[product_ids - 1],
+        },
+        "products": {
+            "product_id": np.arange(1, products + 1, dtype=np.int64),
+            "title": np.array([f"Product {i}" for i in range(1, products + 1)], dtype=object),
+            "price": prices,
+        },
+    })
+
+
+def naive_top_products(shop: ColumnarShopData, days: int = 30):
+    """Reference: what ResultProcessor does today, over list-of-dict line items"""
+    sales = shop.tables["sales"]
+    cutoff = int(time.time()) - days * 86400
+    keep = sales["created_at"] >= cutoff
+    items = [
+        {"product_id": int(p), "quantity": int(q), "price": float(pr)}
+        for p, q, pr in zip(sales["product_id"][keep], sales["quantity"][keep], sales["price"][keep])
+    ]
+    start = time.perf_counter()
+    totals = defaultdict(lambda: {"quantity": 0, "revenue": 0})
+    for item in items:
+        totals[item["product_id"]]["quantity"] += item["quantity"]
+        totals[item["product_id"]]["revenue"] += item["quantity"] * item["price"]
+    sorted(totals.items(), key=lambda x: x[1]["quantity"], reverse=True)[:5]
+    return time.perf_counter() - start, len(items)
+
+
+def main(line_items: int, repeat: int):
+    start = time.perf_counter()
+    shop = build_shop(line_items)
+    print(f"Built {shop.row_count('sales'):,} line items in {time.perf_counter() - start:.2f}s\n")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            result = execute_shopifyql(query, shop)
+            timings.append(time.perf_counter() - t)
+        stats = result["stats"]
+        print(query)
+        print(
+            f"  p50 {statistics.median(timings) * 1000:8.1f} ms | "
+            f"scanned {stats['rows_scanned']:>9,} | matched {stats['rows_matched']:>9,} | "
+            f"columns {stats['columns_read']} | rows out {len(result['rows'])}"
+        )
+
+    elapsed, scanned = naive_top_products(shop)
+    print(f"\nPython dict scan, top products last 30 days: {elapsed * 1000:.1f} ms over {scanned:,} items")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--line-items", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.line_items, args.repeat)
@@ -0,0 +1,111 @@
+"""
+Benchmark: server-side ShopifyQL execution vs raw-data download
+
+Runs the same top-products question through QueryExecutor + ResultProcessor
+with SHOPIFYQL_EXECUTION=server and =off against the in-process fake
+Shopify API, and checks that an unparseable query falls back to raw data.
+
+    python -m benchmarks.bench_shopifyql_server [--latency 0.05] [--runs 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.agent.query_executor import QueryExecutor
+from app.agent.result_processor import ResultProcessor
+from app.shopify.api_client import ShopifyAPIClient
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.fake_shopify import create_fake_shopify
+
+
+INTENT = {"intent": "top_products", "time_period": "last 30 days"}
+
+QUERY_SPEC = {
+    "shopifyql": (
+        "FROM sales SHOW net_quantity, total_sales GROUP BY product_title "
+        "SINCE -30d ORDER BY net_quantity DESC LIMIT 5"
+    ),
+    "shopifyql_valid": True,
+    "shopifyql_executable": True,
+    "api_calls": [
+        {"resource": "orders", "fields": ["line_items", "created_at"], "filters": {}},
+        {"resource": "products", "fields": ["title", "id"], "filters": {}},
+    ],
+    "filters": {"time_period": "last 30 days"},
+}
+
+
+class CountingTransport(httpx.ASGITransport):
+    """ASGI transport that tallies response bytes"""
+
+    def __init__(self, app):
+        super().__init__(app=app)
+        self.bytes_received = 0
+
+    async def handle_async_request(self, request):
+        response = await super().handle_async_request(request)
+        body = await response.aread()
+        self.bytes_received += len(body)
+        return httpx.Response(response.status_code, headers=response.headers, content=body)
+
+
+def build_executor(mode: str, provider: MockDataProvider, latency: float):
+    transport = CountingTransport(create_fake_shopify(provider, latency=latency))
+    client = ShopifyAPIClient(transport=transport)
+    client.base_url = "http://fake-shopify"
+    # The fake doesn't throttle (bench_portfolio covers rate limits)
+    client.rate_limiter = None
+    executor = QueryExecutor(shopify_client=client)
+    executor.shopifyql_mode = mode
+    return executor, transport
+
+
+async def run_mode(
+    mode: str,
+    provider: MockDataProvider,
+    latency: float,
+    runs: int,
+    query_spec=QUERY_SPEC
+) -> dict:
+    executor, transport = build_executor(mode, provider, latency)
+    processor = ResultProcessor()
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        raw = await executor.execute(query_spec, "bench.myshopify.com", "token")
+        processed = await processor.process(raw, INTENT, {})
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "mode": mode,
+        "fetch_mode": raw.get("fetch_mode"),
+        "p50_ms": statistics.median(timings) * 1000,
+        "kb": transport.bytes_received / runs / 1024,
+        "top": [p["product"] for p in processed["summary"].get("top_products", [])][:3],
+    }
+
+
+async def main(latency: float, runs: int):
+    print(f"Fake Shopify latency: {latency * 1000:.0f}ms/request, {runs} runs per mode\n")
+    provider = MockDataProvider()
+    print(f"{'mode':<8} {'fetched via':<12} {'p50 ms':>8} {'KB/req':>8}  top products")
+    for mode in ("off", "server"):
+        r = await run_mode(mode, provider, latency, runs)
+        print(f"{r['mode']:<8} {r['fetch_mode']:<12} {r['p50_ms']:>8.1f} {r['kb']:>8.1f}  {r['top']}")
+
+    broken = dict(QUERY_SPEC, shopifyql="FROM sales SHOW bogus_column")
+    r = await run_mode("server", provider, latency, 1, broken)
+    print(f"\nParse error fallback -> fetched via {r['fetch_mode']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.runs))
@@ -0,0 +1,152 @@
+"""
+Benchmark: sketch vs exact aggregation - memory and accuracy
+
+For each payload size, generates synthetic orders (a long tail of customers,
+Zipf-distributed products with two line items per order) and aggregates them
+twice: exactly, with the per-customer and per-product dicts the record
+handlers keep, and in sketch mode, streamed --chunk orders at a time. Reports
+the memory of the exact state vs the sketches (and the traced peak of the
+streaming pass, chunk included), and the sketch errors: distinct and repeat
+customers, recall of the exact top products, and the worst top-product unit
+and revenue overcount.
+
+    python -m benchmarks.bench_sketches [--orders 100000,1000000,4000000]
+        [--products 200000] [--chunk 50000]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, Any
+
+import numpy as np
+
+from app.agent.sketches import stream_sales_analysis, stream_customer_behavior
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+TOP = 10
+
+
+def synthetic(orders: int, products: int, seed: int) -> Dict[str, Dict[str, np.ndarray]]:
+    rng = np.random.default_rng(seed)
+    customers = rng.integers(1, max(orders // 3, 2), orders)
+    # Guest checkouts have no customer
+    customers[rng.random(orders) < 0.05] = 0
+    order_ids = np.arange(1, orders + 1)
+    items = np.repeat(order_ids, 2)
+    product_ids = (rng.zipf(1.1, len(items)) - 1) % products + 1
+    quantity = rng.integers(1, 4, len(items))
+    gross = quantity * (5 + product_ids % 95).astype(np.float64)
+    total = np.bincount(items, weights=gross, minlength=orders + 1)[1:]
+    return {
+        "orders": {"order_id": order_ids, "customer_id": customers, "total_price": total},
+        "sales": {"order_id": items, "product_id": product_ids, "quantity": quantity, "gross": gross},
+    }
+
+
+def chunks(tables, size: int):
+    orders, sales = tables["orders"], tables["sales"]
+    for start in range(0, len(orders["order_id"]), size):
+        # Two line items per order
+        yield {
+            "orders": {column: values[start:start + size] for column, values in orders.items()},
+            "sales": {column: values[2 * start:2 * (start + size)] for column, values in sales.items()},
+        }
+
+
+def exact(tables) -> Dict[str, Any]:
+    """The record handlers' state: a dict entry per customer and per product"""
+    customer_ids = tables["orders"]["customer_id"].tolist()
+    sales = tables["sales"]
+    lines = list(zip(sales["product_id"].tolist(), sales["quantity"].tolist(), sales["gross"].tolist()))
+
+    tracemalloc.start()
+    customer_order_counts = defaultdict(int)
+    for customer_id in customer_ids:
+        if customer_id:
+            customer_order_counts[customer_id] += 1
+    product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0})
+    for product_id, quantity, gross in lines:
+        product_sales[product_id]["quantity"] += quantity
+        product_sales[product_id]["revenue"] += gross
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    top = sorted(product_sales.items(), key=lambda item: item[1]["quantity"], reverse=True)[:TOP]
+    return {
+        "memory_bytes": memory,
+        "total_customers": len(customer_order_counts),
+        "repeat_customers": sum(1 for count in customer_order_counts.values() if count > 1),
+        "top": {product_id: totals for product_id, totals in top},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", default="100000,1000000,4000000")
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--chunk", type=int, default=50000)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    print(f"  {'orders':>9} {'exact state':>12} {'sketches':>9} {'stream peak':>11}   "
+          f"{'customers err':>13} {'repeat err':>10} {'top-10 recall':>13} "
+          f"{'units over':>10} {'revenue over':>12}")
+    for orders in [int(n) for n in args.orders.split(",")]:
+        tables = synthetic(orders, args.products, seed=orders)
+        truth = exact(tables)
+
+        start = time.perf_counter()
+        tracemalloc.start()
+        sales = stream_sales_analysis(chunks(tables, args.chunk), {}, top=TOP)
+        customers = stream_customer_behavior(chunks(tables, args.chunk))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        sketch_ms = (time.perf_counter() - start) * 1000
+
+        reported = {int(p["product"].split()[-1]): p for p in sales["top_products"]}
+        recall = len(set(reported) & set(truth["top"])) / TOP
+        units_over = max(
+            (p["quantity"] - truth["top"][pid]["quantity"]) / truth["top"][pid]["quantity"]
+            for pid, p in reported.items() if pid in truth["top"]
+        )
+        revenue_over = max(
+            (p["revenue"] - truth["top"][pid]["revenue"]) / truth["top"][pid]["revenue"]
+            for pid, p in reported.items() if pid in truth["top"]
+        )
+        row = {
+            "exact_memory_bytes": truth["memory_bytes"],
+            "sketch_memory_bytes": sales["sketch"]["memory_bytes"] + customers["sketch"]["memory_bytes"],
+            "stream_peak_bytes": peak,
+            "sketch_ms": round(sketch_ms, 1),
+            "customers_error": round(abs(customers["total_customers"] / truth["total_customers"] - 1), 4),
+            "repeat_error": round(abs(customers["repeat_customers"] / truth["repeat_customers"] - 1), 4),
+            "top_recall": recall,
+            "top_units_overcount": round(units_over, 5),
+            "top_revenue_overcount": round(revenue_over, 5),
+        }
+        results[f"orders_{orders}"] = row
+        print(f"  {orders:>9,} {row['exact_memory_bytes'] / 2 ** 20:>9.1f} MB {row['sketch_memory_bytes'] / 2 ** 10:>6.0f} KB "
+              f"{row['stream_peak_bytes'] / 2 ** 20:>8.1f} MB   {row['customers_error']:>13.2%} "
+              f"{row['repeat_error']:>10.2%} {row['top_recall']:>13.0%} {row['top_units_overcount']:>10.3%} "
+              f"{row['top_revenue_overcount']:>12.3%}")
+    print("  (errors are |sketch / exact - 1|; overcounts are the worst among the exact top products)")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
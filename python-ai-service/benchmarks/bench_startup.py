@@ -0,0 +1,126 @@
+"""
+Benchmark: import time and time to first request
+
+Starts the service in fresh interpreters and measures, from process start:
+importing app.main, finishing the FastAPI lifespan (warm-up), and answering
+the first and second /analyze requests (mock data; LLM calls fail fast
+against a closed local port, so the agent uses its fallbacks). Runs with
+STARTUP_WARMUP on and off.
+
+    python -m benchmarks.bench_startup [--runs 5] [--mock-orders 50000]
+        [--save-baseline NAME] [--baseline NAME]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List
+
+from benchmarks.baseline import save_baseline, load_baseline, compare
+
+
+CHILD = r"""
+import time
+started = time.perf_counter()
+import asyncio, json
+
+from app import main
+imported = time.perf_counter()
+
+async def run():
+    import httpx
+    marks = {}
+    async with main.app.router.lifespan_context(main.app):
+        marks["ready"] = time.perf_counter()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in ("first_request", "second_request"):
+                response = await client.post("/analyze", json={
+                    "store_id": "bench.myshopify.com",
+                    "question": "What were my top selling products last month?",
+                    "use_mock": True
+                })
+                assert response.status_code == 200, response.text
+                marks[name] = time.perf_counter()
+    return marks
+
+marks = asyncio.run(run())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "ready_ms": (marks["ready"] - started) * 1000,
+    "first_request_ms": (marks["first_request"] - started) * 1000,
+    "first_request_latency_ms": (marks["first_request"] - marks["ready"]) * 1000,
+    "second_request_ms": (marks["second_request"] - marks["first_request"]) * 1000,
+}))
+"""
+
+
+def start_once(env: Dict[str, str]) -> Dict[str, float]:
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mock-orders", type=int, default=50000)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    base_env = dict(
+        os.environ,
+        PYTHONPATH=os.getcwd(),
+        # A configured provider, but calls are refused locally instead of going out
+        OPENAI_API_KEY="benchmark",
+        OPENAI_BASE_URL="http://127.0.0.1:9",
+        LLM_PROVIDER="openai",
+        LLM_PROVIDERS="",
+        USE_MOCK_DATA="true",
+        LLM_MAX_RETRIES="0",
+        MOCK_ORDERS=str(args.mock_orders),
+        MOCK_PRODUCTS=str(max(5, args.mock_orders // 50)),
+        MOCK_CUSTOMERS=str(max(20, args.mock_orders // 5)),
+        MOCK_DAYS="365",
+        SHARED_CACHE_BACKEND="memory",
+        LOG_LEVEL="WARNING",
+        TRACE_EXPORTER="none",
+    )
+    base_env.pop("MOCK_DATA_PATH", None)
+
+    print(f"Startup: runs={args.runs} mock_orders={args.mock_orders:,}")
+    results = {}
+    for warmup in ("off", "on"):
+        env = dict(base_env, STARTUP_WARMUP=warmup)
+        samples: List[Dict[str, float]] = [start_once(env) for _ in range(args.runs)]
+        result = results[f"warmup_{warmup}"] = {
+            name: round(statistics.median(sample[name] for sample in samples), 1)
+            for name in samples[0]
+        }
+        print(f"  warmup={warmup:<3}  import={result['import_ms']:>7.1f}  ready={result['ready_ms']:>7.1f}  "
+              f"first request done={result['first_request_ms']:>7.1f} "
+              f"(took {result['first_request_latency_ms']:>6.1f})  "
+              f"second request={result['second_request_ms']:>6.1f}  process={result['process_ms']:>7.1f} ms")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
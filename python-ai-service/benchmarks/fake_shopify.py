@@ -0,0 +1,377 @@
+"""
+Fake Shopify Admin API - Local stand-in for benchmarks
+
+Serves the REST list endpoints and the GraphQL endpoint (including a tabular
+shopifyqlQuery stand-in) from MockDataProvider data, with injectable
+per-request latency and, optionally, Shopify's per-shop leaky buckets
+(429 for REST, a THROTTLED error for GraphQL). Lists are paged like
+Shopify's: REST with a Link rel="next" page_info cursor, GraphQL with
+first/after and pageInfo on every connection. Given an access token, it
+answers 401 to requests presenting any other; given closed_every, REST
+order lists default to open orders like Shopify's. Mount it in-process with
+httpx.ASGITransport or run it standalone with uvicorn.
+"""
+
+import asyncio
+import math
+import re
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.shopify.mock_data import MockDataProvider
+
+
+def create_fake_shopify(
+    provider: Optional[MockDataProvider] = None,
+    latency: float = 0.05,
+    rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+    access_token: Optional[str] = None,
+    closed_every: Optional[int] = None
+) -> FastAPI:
+    """
+    Build a fake Admin API app
+
+    Args:
+        provider: Data source (defaults to a fresh MockDataProvider)
+        latency: Seconds of simulated network + server time per request
+        rate_limits: {"rest": (bucket, leak rate), "graphql": (points,
+            restore rate)} to throttle like a shop; None = never throttle
+        access_token: The shop's token; None = accept any
+        closed_every: Every nth order (by id) is closed, and REST order
+            lists leave closed orders out unless asked for status=any or
+            closed, as Shopify's default status=open does; None = all open
+    """
+    provider = provider or MockDataProvider()
+    app = FastAPI()
+    app.state.stats = {"requests": 0, "rest_calls": 0, "graphql_calls": 0, "cost_points": 0, "throttled": 0}
+    buckets = {api: _Bucket(*limits) for api, limits in (rate_limits or {}).items()}
+    # REST page_info token -> (remaining records, page size)
+    cursors: Dict[str, Tuple[List[Dict[str, Any]], int]] = {}
+
+    rest_sources = {
+        "orders": provider.get_orders,
+        "products": provider.get_products,
+        "inventory_levels": provider.get_inventory,
+        "customers": provider.get_customers,
+    }
+
+    @app.middleware("http")
+    async def authenticate(request: Request, call_next):
+        if access_token and request.headers.get("X-Shopify-Access-Token") != access_token:
+            return JSONResponse({"errors": "[API] Invalid API key or access token (unrecognized login or wrong password)"},
+                                status_code=401)
+        return await call_next(request)
+
+    @app.get("/admin/api/{version}/{resource}.json")
+    async def rest_list(resource: str, request: Request):
+        await asyncio.sleep(latency)
+        if "rest" in buckets and not buckets["rest"].take(1):
+            app.state.stats["throttled"] += 1
+            return JSONResponse(
+                {"errors": "Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service."},
+                status_code=429,
+                headers={"Retry-After": f"{1 / buckets['rest'].rate:.1f}", **buckets["rest"].call_limit()}
+            )
+        app.state.stats["requests"] += 1
+        app.state.stats["rest_calls"] += 1
+        # REST calls are charged per request against the leaky bucket
+        app.state.stats["cost_points"] += 1
+        params = dict(request.query_params)
+        if "page_info" in params:
+            records, limit = cursors.pop(params["page_info"], ([], 250))
+        else:
+            limit = int(params.pop("limit", "250"))
+            status = params.pop("status", "open")
+            source = rest_sources.get(resource)
+            records = source(params) if source else []
+            if resource == "orders" and closed_every and status != "any":
+                closed = status == "closed"
+                records = [order for order in records if (order["id"] % closed_every == 0) == closed]
+        headers = buckets["rest"].call_limit() if "rest" in buckets else {}
+        if len(records) > limit:
+            token = uuid.uuid4().hex
+            cursors[token] = (records[limit:], limit)
+            headers["Link"] = f'<{request.url.replace(query=f"limit={limit}&page_info={token}")}>; rel="next"'
+        return JSONResponse({resource: records[:limit]}, headers=headers)
+
+    @app.post("/admin/api/{version}/graphql.json")
+    async def graphql(request: Request):
+        await asyncio.sleep(latency)
+        body = await request.json()
+        query = body.get("query", "")
+
+        if "shopifyqlQuery" in query:
+            app.state.stats["requests"] += 1
+            app.state.stats["graphql_calls"] += 1
+            app.state.stats["cost_points"] += 10
+            shopifyql = (body.get("variables") or {}).get("query", "")
+            return {
+                "data": {"shopifyqlQuery": _shopifyql_table(shopifyql, provider.get_orders())},
+                "extensions": {"cost": {"requestedQueryCost": 10, "actualQueryCost": 10}}
+            }
+
+        data = {}
+        nodes = 0
+        if "orders(" in query:
+            orders = provider.get_orders(_search_filters(query, "orders"))
+            line_items = _first(query, "lineItems")
+            data["orders"] = _page(query, "orders", orders, lambda o: _order_node(o, line_items))
+            nodes += len(data["orders"]["edges"])
+        if "products(" in query:
+            data["products"] = _page(query, "products", provider.get_products(), _product_node)
+            nodes += len(data["products"]["edges"])
+        if "customers(" in query:
+            customers = provider.get_customers(_search_filters(query, "customers"))
+            data["customers"] = _page(query, "customers", customers, _customer_node)
+            nodes += len(data["customers"]["edges"])
+        if "locations(" in query:
+            data["locations"] = _locations(
+                provider.get_inventory(), _first(query, "locations"), _first(query, "inventoryLevels")
+            )
+            nodes += sum(len(l["node"]["inventoryLevels"]["edges"]) for l in data["locations"]["edges"])
+
+        actual = 2 * len(data) + nodes
+        requested = actual * 2
+        bucket = buckets.get("graphql")
+        if bucket and not bucket.take(requested):
+            app.state.stats["throttled"] += 1
+            return {
+                "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                "extensions": {"cost": {"requestedQueryCost": requested, "actualQueryCost": None,
+                                        "throttleStatus": bucket.status()}}
+            }
+        if bucket:
+            # The unused part of the requested cost is refunded
+            bucket.take(actual - requested)
+        app.state.stats["requests"] += 1
+        app.state.stats["graphql_calls"] += 1
+        app.state.stats["cost_points"] += actual
+
+        return {
+            "data": data,
+            "extensions": {
+                "cost": {
+                    "requestedQueryCost": requested,
+                    "actualQueryCost": actual,
+                    "throttleStatus": bucket.status() if bucket else {
+                        "maximumAvailable": 1000.0,
+                        "currentlyAvailable": max(0, 1000 - actual),
+                        "restoreRate": 50.0
+                    }
+                }
+            }
+        }
+
+    return app
+
+
+class _Bucket:
+    """Server side of a leaky bucket: requests that don't fit are refused"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity, self.rate = float(capacity), float(rate)
+        self.available, self.updated = self.capacity, time.monotonic()
+
+    def take(self, cost: float) -> bool:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+        if cost > self.available:
+            return False
+        self.available -= cost
+        return True
+
+    def call_limit(self) -> Dict[str, str]:
+        """REST X-Shopify-Shop-Api-Call-Limit header: requests in the bucket / size"""
+        used = math.ceil(self.capacity - self.available)
+        return {"X-Shopify-Shop-Api-Call-Limit": f"{used}/{self.capacity:g}"}
+
+    def status(self) -> Dict[str, float]:
+        return {"maximumAvailable": self.capacity, "currentlyAvailable": self.available, "restoreRate": self.rate}
+
+
+def _first(query: str, connection: str, default: int = 250) -> int:
+    """Page size requested for a connection, e.g. orders(first: 14)"""
+    match = re.search(rf"\b{connection}\(first:\s*(\d+)", query)
+    return int(match.group(1)) if match else default
+
+
+def _page(query: str, connection: str, records: List[Dict[str, Any]], node) -> Dict[str, Any]:
+    """One first/after page of a top-level connection; cursors are offsets"""
+    match = re.search(rf'\b{connection}\([^)]*after:\s*"(\d+)"', query)
+    start = int(match.group(1)) if match else 0
+    stop = start + _first(query, connection)
+    return _connection((node(r) for r in records[start:stop]), stop < len(records), str(stop))
+
+
+def _search_filters(query: str, connection: str) -> Dict[str, str]:
+    """created_at terms of a connection's search query -> REST-style params"""
+    match = re.search(rf'\b{connection}\([^)]*query:\s*"([^"]*)"', query)
+    if not match:
+        return {}
+    filters = {}
+    for op, day in re.findall(r"created_at:(>=|<=)(\d{4}-\d{2}-\d{2})", match.group(1)):
+        if op == ">=":
+            filters["created_at_min"] = f"{day}T00:00:00"
+        else:
+            filters["created_at_max"] = f"{day}T23:59:59"
+    return filters
+
+
+def _connection(nodes, has_next: bool = False, cursor: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "edges": [{"node": node} for node in nodes],
+        "pageInfo": {"hasNextPage": has_next, "endCursor": cursor},
+    }
+
+
+def _gid(kind: str, legacy_id: Any) -> Optional[str]:
+    return f"gid://shopify/{kind}/{legacy_id}" if legacy_id is not None else None
+
+
+def _money(amount: Any) -> Dict[str, Any]:
+    return {"shopMoney": {"amount": str(amount)}}
+
+
+def _order_node(order: Dict[str, Any], line_items: int = 250) -> Dict[str, Any]:
+    items = order.get("line_items", [])
+    return {
+        "id": _gid("Order", order["id"]),
+        "createdAt": order["created_at"],
+        "totalPriceSet": _money(order["total_price"]),
+        "customer": {"id": _gid("Customer", order.get("customer_id"))},
+        "lineItems": _connection(
+            [
+                {
+                    "title": item.get("title"),
+                    "quantity": item["quantity"],
+                    "product": {"id": _gid("Product", item["product_id"])},
+                    "originalUnitPriceSet": _money(item["price"]),
+                }
+                for item in items[:line_items]
+            ],
+            len(items) > line_items
+        ),
+    }
+
+
+def _product_node(product: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": _gid("Product", product["id"]),
+        "title": product["title"],
+        "variants": _connection([{"price": str(product["price"]), "sku": product.get("sku")}]),
+    }
+
+
+def _customer_node(customer: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": _gid("Customer", customer["id"]),
+        "firstName": customer.get("first_name"),
+        "lastName": customer.get("last_name"),
+        "email": customer.get("email"),
+        "numberOfOrders": str(customer.get("orders_count", 0)),
+    }
+
+
+def _locations(inventory: List[Dict[str, Any]], first: int, per_location: int) -> Dict[str, Any]:
+    by_location: Dict[Any, List[Dict[str, Any]]] = {}
+    for level in inventory:
+        by_location.setdefault(level["location_id"], []).append(level)
+
+    return _connection(
+        [
+            {
+                "id": _gid("Location", location_id),
+                "inventoryLevels": _connection(
+                    [
+                        {
+                            "quantities": [{"name": "available", "quantity": level["available"]}],
+                            "item": {"variant": {"product": {"id": _gid("Product", level["product_id"])}}},
+                        }
+                        for level in levels[:per_location]
+                    ],
+                    len(levels) > per_location
+                ),
+            }
+            for location_id, levels in list(by_location.items())[:first]
+        ],
+        len(by_location) > first
+    )
+
+
+SHOPIFYQL_COLUMN_TYPES = {
+    "product_title": "STRING",
+    "total_sales": "MONEY",
+    "net_quantity": "INTEGER",
+    "orders": "INTEGER",
+}
+
+
+def _shopifyql_table(shopifyql: str, orders: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Answer a small subset of ShopifyQL over the sales dataset:
+    SHOW total_sales/net_quantity/orders [GROUP BY product_title]
+    [ORDER BY <col> DESC] [LIMIT n]
+    """
+    match = re.match(
+        r"^\s*FROM\s+sales\s+SHOW\s+(.+?)(\s+(GROUP BY|WHERE|SINCE|UNTIL|ORDER BY|LIMIT)\b|$)",
+        shopifyql,
+        re.IGNORECASE
+    )
+    if not match:
+        return {
+            "__typename": "TableResponse",
+            "parseErrors": [{"code": "SYNTAX_NOT_RECOGNIZED", "message": "Unsupported query"}],
+            "tableData": None
+        }
+
+    show = [c.strip() for c in match.group(1).split(",")]
+    unknown = [c for c in show if c not in SHOPIFYQL_COLUMN_TYPES]
+    if unknown:
+        return {
+            "__typename": "TableResponse",
+            "parseErrors": [{"code": "UNKNOWN_COLUMN", "message": f"Unknown column {unknown[0]}"}],
+            "tableData": None
+        }
+
+    grouped = re.search(r"GROUP BY\s+product_title", shopifyql, re.IGNORECASE) is not None
+    groups: Dict[str, Dict[str, Any]] = {}
+    for order in orders:
+        seen = set()
+        for item in order.get("line_items", []):
+            key = item.get("title") if grouped else "all"
+            row = groups.setdefault(key, {"product_title": key, "total_sales": 0.0, "net_quantity": 0, "orders": 0})
+            row["total_sales"] += item["quantity"] * item["price"]
+            row["net_quantity"] += item["quantity"]
+            if key not in seen:
+                row["orders"] += 1
+                seen.add(key)
+
+    columns = (["product_title"] if grouped and "product_title" not in show else []) + show
+    rows = list(groups.values())
+
+    order_by = re.search(r"ORDER BY\s+(\w+)(\s+DESC)?", shopifyql, re.IGNORECASE)
+    if order_by and order_by.group(1) in SHOPIFYQL_COLUMN_TYPES:
+        rows.sort(key=lambda r: r[order_by.group(1)], reverse=bool(order_by.group(2)))
+    limit = re.search(r"LIMIT\s+(\d+)", shopifyql, re.IGNORECASE)
+    if limit:
+        rows = rows[:int(limit.group(1))]
+
+    return {
+        "__typename": "TableResponse",
+        "parseErrors": [],
+        "tableData": {
+            "columns": [
+                {"name": c, "dataType": SHOPIFYQL_COLUMN_TYPES[c], "displayName": c}
+                for c in columns
+            ],
+            "rowData": [
+                [str(round(r[c], 2)) if isinstance(r[c], float) else str(r[c]) for c in columns]
+                for r in rows
+            ]
+        }
+    }
@@ -0,0 +1,189 @@
+"""
+Load test: drive /analyze end to end, in process
+
+Boots the FastAPI app with a deterministic StubLLMClient and (in shopify
+mode) the fake Admin API mounted through httpx.ASGITransport, then sends a
+question mix at fixed concurrency. Reports throughput, p50/p95/p99 latency
+and a per-step breakdown taken from each response's metadata timings.
+
+    python -m benchmarks.load_test [--mode mock|shopify] [--requests 200]
+        [--concurrency 10] [--orders 5000] [--ttft 0.25] [--tokens-per-second 80]
+        [--logging off|info|debug] [--save-baseline NAME] [--baseline NAME]
+
+--logging debug keeps every request's DEBUG lines (sample rate 1), so
+comparing it with --logging off shows what structured logging costs.
+"""
+
+import argparse
+import asyncio
+import io
+import time
+from collections import defaultdict
+from typing import Dict, Any, List
+
+import httpx
+import numpy as np
+
+from benchmarks.baseline import save_baseline, load_baseline, compare
+from benchmarks.fake_shopify import create_fake_shopify
+from benchmarks.stub_llm import StubLLMClient
+
+
+QUESTIONS = [
+    "What were my top 5 selling products last week?",
+    "How much inventory should I reorder for next month?",
+    "How are my sales trending over the last 30 days?",
+    "How many repeat customers did I have in the last 90 days?",
+    "Which products are the best sellers this month?",
+    "Do I need to restock anything for next week?",
+]
+
+# Agent steps as reported in metadata["timings"]["steps_ms"]
+STEPS = ["intent", "plan", "generate", "cost_estimate", "execute", "process", "explain"]
+
+
+def build_app(args):
+    """Import the service with the stub LLM and benchmark-sized data wired in"""
+    from app import main
+    from app.telemetry.log import configure_logging
+    from app.agent.orchestrator import AgentOrchestrator
+    from app.shopify.api_client import ShopifyAPIClient
+    from app.shopify.mock_data import MockDataProvider
+
+    # Log records are formatted off the event loop and written to a sink
+    configure_logging(
+        level=args.logging,
+        fmt="json",
+        debug_sample_rate=1.0,
+        stream=None if args.verbose else io.StringIO()
+    )
+
+    llm = StubLLMClient(ttft=args.ttft, tokens_per_second=args.tokens_per_second)
+    orchestrator = AgentOrchestrator(llm)
+
+    provider = MockDataProvider({
+        "orders": args.orders,
+        "products": max(5, args.orders // 50),
+        "customers": max(20, args.orders // 5),
+        "days": 365,
+        "seed": 7
+    })
+    orchestrator.query_executor.mock_provider = provider
+
+    fake = create_fake_shopify(provider, latency=args.shopify_latency)
+    orchestrator.query_executor.shopify_client = ShopifyAPIClient(
+        transport=httpx.ASGITransport(app=fake)
+    )
+    # The fake doesn't throttle (bench_portfolio covers rate limits)
+    orchestrator.query_executor.shopify_client.rate_limiter = None
+
+    main.orchestrator = orchestrator
+    return main.app, orchestrator, llm
+
+
+async def run_load(app, args) -> Dict[str, Any]:
+    latencies = []
+    steps = defaultdict(list)
+    statuses = defaultdict(int)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+        async def one(i: int):
+            body = {
+                "store_id": f"bench-{i % args.stores}.myshopify.com",
+                "question": QUESTIONS[i % len(QUESTIONS)],
+                "use_mock": args.mode == "mock",
+            }
+            if args.mode == "shopify":
+                body["access_token"] = "shpat_benchmark"
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/analyze", json=body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    timings = response.json()["metadata"].get("timings") or {}
+                    for step, ms in (timings.get("steps_ms") or {}).items():
+                        steps[step].append(ms)
+
+        for i in range(args.warmup):
+            await one(i)
+        latencies.clear()
+        statuses.clear()
+        steps.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 2),
+        "latency_ms": _percentiles(latencies),
+        "status_codes": {str(code): count for code, count in statuses.items()},
+        "steps_ms": {step: _percentiles(steps[step]) for step in STEPS},
+    }
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    data = np.array(values)
+    return {
+        "mean": round(float(data.mean()), 2),
+        "p50": round(float(np.percentile(data, 50)), 2),
+        "p95": round(float(np.percentile(data, 95)), 2),
+        "p99": round(float(np.percentile(data, 99)), 2),
+        "max": round(float(data.max()), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["mock", "shopify"], default="mock")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=6)
+    parser.add_argument("--stores", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--ttft", type=float, default=0.25)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--shopify-latency", type=float, default=0.05)
+    parser.add_argument("--logging", choices=["off", "info", "debug"], default="info")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--baseline")
+    parser.add_argument("--verbose", action="store_true", help="Write service logs to stdout")
+    args = parser.parse_args()
+
+    app, orchestrator, llm = build_app(args)
+
+    print(f"Load test: mode={args.mode} requests={args.requests} concurrency={args.concurrency} "
+          f"orders={args.orders:,} ttft={args.ttft}s tokens/s={args.tokens_per_second} "
+          f"logging={args.logging}")
+
+    results = asyncio.run(run_load(app, args))
+    results["llm"] = {"calls": llm.calls, "tokens": llm.tokens}
+
+    print(f"  throughput   {results['throughput_rps']} req/s  ({results['elapsed_s']}s)")
+    print(f"  status codes {results['status_codes']}")
+    print("  latency ms   " + "  ".join(f"{k}={v}" for k, v in results["latency_ms"].items()))
+    print("  per step (p50 / p95 ms)")
+    for step, stats in results["steps_ms"].items():
+        if stats:
+            print(f"    {step:<14} {stats['p50']:>9.2f} {stats['p95']:>9.2f}")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline:
+            print(f"Compared with baseline '{args.baseline}':")
+            compare(baseline, results)
+        else:
+            print(f"No baseline named '{args.baseline}'")
+    if args.save_baseline:
+        print(f"Saved baseline to {save_baseline(args.save_baseline, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Stub LLM client - Deterministic stand-in for LLMClient in benchmarks
+
+Answers each agent step with well-formed JSON chosen from the question's
+keywords, and simulates provider latency as a time-to-first-token plus
+generation time at a configurable token rate. The time-to-first-token can
+be drawn from a lognormal distribution with occasional stalls, and calls
+can fail at a given rate, to model a degraded provider.
+"""
+
+import asyncio
+import json
+import random
+import re
+import time
+from typing import Dict, Any, Optional
+
+from app.llm.prompts import (
+    INTENT_CLASSIFIER_SYSTEM,
+    QUERY_GENERATOR_SYSTEM,
+    EXPLAINER_SYSTEM
+)
+from app.llm.budget import BudgetExceededError
+from app.telemetry.timing import record_llm_call, current_timings
+from app.telemetry.tracing import span
+
+
+# Keyword -> (intent, metrics), first match wins
+INTENT_RULES = [
+    (("reorder", "restock"), "reorder_recommendations", ["units"]),
+    (("inventory", "stock", "need"), "inventory_projection", ["units"]),
+    (("retention", "cohort", "come back"), "customer_retention", ["customers"]),
+    (("customer", "repeat", "loyal"), "customer_behavior", ["customers"]),
+    (("top", "best", "selling", "popular"), "top_products", ["units", "revenue"]),
+    (("sales", "revenue", "trend"), "sales_analysis", ["revenue"]),
+]
+
+PERIOD_RE = re.compile(
+    r"\b(last|past|next)\s+(\d+\s+)?(day|week|month|year)s?\b|\b(yesterday|today)\b",
+    re.IGNORECASE
+)
+
+BATCH_QUESTION_RE = re.compile(r'^\d+\.\s*"(.*)"\s*$', re.MULTILINE)
+
+PLANS = {
+    "top_products": {
+        "shopifyql": (
+            "FROM sales SHOW net_quantity, total_sales GROUP BY product_title "
+            "SINCE -30d ORDER BY net_quantity DESC LIMIT 5"
+        ),
+        "resources_needed": ["orders", "products"],
+        "fields_required": {"orders": ["line_items", "created_at"], "products": ["title", "id"]},
+        "post_processing": "Sum quantities and rank products"
+    },
+    "sales_analysis": {
+        "shopifyql": "FROM sales SHOW total_sales, orders GROUP BY day SINCE -30d",
+        "resources_needed": ["orders"],
+        "fields_required": {"orders": ["created_at", "total_price", "line_items"]},
+        "post_processing": "Aggregate sales by time period"
+    },
+    "inventory_projection": {
+        "shopifyql": "FROM sales SHOW net_quantity GROUP BY product_title SINCE -30d",
+        "resources_needed": ["orders", "products", "inventory_levels"],
+        "fields_required": {
+            "orders": ["created_at", "line_items", "quantity"],
+            "inventory_levels": ["available", "product_id"]
+        },
+        "post_processing": "Calculate daily sales rate and project future needs"
+    },
+    "customer_behavior": {
+        "shopifyql": "FROM sales SHOW customers, orders SINCE -90d",
+        "resources_needed": ["orders", "customers"],
+        "fields_required": {
+            "orders": ["customer_id", "created_at", "total_price"],
+            "customers": ["orders_count"]
+        },
+        "post_processing": "Count repeat customers"
+    },
+}
+PLANS["reorder_recommendations"] = PLANS["inventory_projection"]
+PLANS["customer_retention"] = PLANS["customer_behavior"]
+
+
+class StubLLMClient:
+    """
+    Drop-in replacement for LLMClient with deterministic output
+
+    Args:
+        ttft: Median seconds before the first token (network + queueing + prefill)
+        tokens_per_second: Generation speed; 0 disables generation delay
+        jitter: Lognormal sigma applied to ttft; 0 keeps it fixed
+        stall_rate: Share of calls whose ttft is multiplied by stall_factor
+        stall_factor: Slowdown of a stalled call
+        failure_rate: Share of calls that raise instead of answering
+        provider: Provider label, to tell several stubs apart
+        seed: Seed for the latency and failure draws
+    """
+
+    def __init__(
+        self,
+        ttft: float = 0.25,
+        tokens_per_second: float = 80.0,
+        jitter: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_factor: float = 10.0,
+        failure_rate: float = 0.0,
+        provider: str = "stub",
+        seed: Optional[int] = None
+    ):
+        self.provider = provider
+        self.model = "stub-1"
+        self.economy_model = "stub-1-mini"
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall_factor = stall_factor
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.tokens = 0
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        timings = current_timings()
+        tier = timings.tier if timings else "standard"
+        if tier == "local":
+            raise BudgetExceededError("Store is over its daily LLM token limit")
+        model = self.economy_model if tier == "economy" else self.model
+
+        if system_prompt == INTENT_CLASSIFIER_SYSTEM:
+            response = self._classify(prompt)
+        elif system_prompt == QUERY_GENERATOR_SYSTEM:
+            response = self._plan(prompt)
+        elif system_prompt == EXPLAINER_SYSTEM:
+            response = self._explain(prompt)
+        else:
+            response = json.dumps({"answer": "OK"})
+
+        # ~4 characters per token
+        prompt_tokens = (len(prompt) + len(system_prompt or "")) // 4
+        tokens = max(1, len(response) // 4)
+        self.calls += 1
+        self.tokens += tokens
+
+        delay = self.ttft
+        if self.jitter:
+            delay *= self.random.lognormvariate(0.0, self.jitter)
+        if self.stall_rate and self.random.random() < self.stall_rate:
+            delay *= self.stall_factor
+        fail = self.failure_rate and self.random.random() < self.failure_rate
+        if self.tokens_per_second:
+            delay += tokens / self.tokens_per_second
+        with span(
+            "llm.generate",
+            provider=self.provider,
+            model=model,
+            step=timings.current_step if timings else "",
+            prompt_chars=len(prompt) + len(system_prompt or ""),
+            response_chars=len(response),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=tokens
+        ):
+            start = time.perf_counter()
+            if delay:
+                await asyncio.sleep(delay)
+            if fail:
+                record_llm_call(self.provider, model, time.perf_counter() - start, error=True)
+                raise RuntimeError(f"{self.provider}: injected failure")
+            record_llm_call(
+                self.provider, model, time.perf_counter() - start,
+                prompt_tokens=prompt_tokens, completion_tokens=tokens
+            )
+        return response
+
+    def is_available(self) -> bool:
+        return True
+
+    def _classify(self, prompt: str) -> str:
+        # Batch prompts number their questions: answer with one object each
+        batch = BATCH_QUESTION_RE.findall(prompt)
+        if batch:
+            return json.dumps([_classification(question.lower()) for question in batch])
+        return json.dumps(_classification(_quoted(prompt, "Question").lower()))
+
+    def _plan(self, prompt: str) -> str:
+        match = re.search(r"^Intent:\s*(\w+)", prompt, re.MULTILINE)
+        intent = match.group(1) if match else "sales_analysis"
+        return "```json\n" + json.dumps(PLANS.get(intent, PLANS["sales_analysis"])) + "\n```"
+
+    def _explain(self, prompt: str) -> str:
+        summary = _json_block(prompt, "Data Summary:", "Calculations:")
+        facts = ", ".join(
+            f"{key} {value}" for key, value in summary.items()
+            if isinstance(value, (int, float))
+        )
+        return json.dumps({
+            "answer": f"Here is what the data shows: {facts or 'no matching records'}.",
+            "insights": [f"{key}: {value}" for key, value in list(summary.items())[:3]],
+            "confidence": "high" if summary else "low",
+            "confidence_reason": "Deterministic benchmark response"
+        })
+
+
+def _classification(question: str) -> Dict[str, Any]:
+    intent, metrics = "general_query", ["general"]
+    for keywords, rule_intent, rule_metrics in INTENT_RULES:
+        if any(keyword in question for keyword in keywords):
+            intent, metrics = rule_intent, rule_metrics
+            break
+
+    period = PERIOD_RE.search(question)
+    return {
+        "intent": intent,
+        "time_period": period.group(0) if period else "last 30 days",
+        "products": "all",
+        "metrics": metrics,
+        "confidence": "low" if intent == "general_query" else "high"
+    }
+
+
+def _quoted(prompt: str, label: str) -> str:
+    match = re.search(rf'{label}:\s*"(.*)"', prompt)
+    return match.group(1) if match else ""
+
+
+def _json_block(prompt: str, start: str, end: str) -> Dict[str, Any]:
+    try:
+        body = prompt.split(start, 1)[1].split(end, 1)[0]
+        return json.loads(body)
+    except (IndexError, ValueError):
+        return {}
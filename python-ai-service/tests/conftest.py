@@ -0,0 +1,25 @@
+"""
+Shared fixtures: shops served by the in-process fake Admin API
+"""
+
+import httpx
+import pytest
+
+from app.shopify.api_client import ShopifyAPIClient
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.fake_shopify import create_fake_shopify
+
+
+def fake_client(provider: MockDataProvider, **fake_options) -> ShopifyAPIClient:
+    """ShopifyAPIClient whose requests go to a fake Admin API over provider"""
+    app = create_fake_shopify(provider, latency=0, **fake_options)
+    client = ShopifyAPIClient(transport=httpx.ASGITransport(app=app))
+    client.base_url = "http://{store_id}"
+    client.rate_limiter = None
+    return client
+
+
+@pytest.fixture
+def busy_shop() -> MockDataProvider:
+    """About 800 orders a day, so every day spans several 250-order pages"""
+    return MockDataProvider({"seed": 7, "orders": 8000, "products": 40, "customers": 2000, "days": 10})
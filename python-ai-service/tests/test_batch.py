@@ -0,0 +1,86 @@
+"""
+Batches sharing one fetch: processed once per distinct question, truncation
+reported to every question that reads the cut-short resource, and the shop's
+size profile measured as a single request would
+"""
+
+import pytest
+
+from app.agent.orchestrator import AgentOrchestrator
+from app.agent.query_executor import QueryExecutor
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.stub_llm import StubLLMClient
+from conftest import fake_client
+
+
+async def _processed(raw_data, intent, plan, aggregation):
+    return {"products": intent["products"]}
+
+
+@pytest.mark.asyncio
+async def test_shared_data_is_processed_once_per_distinct_question(mocker):
+    orchestrator = AgentOrchestrator(StubLLMClient(ttft=0, tokens_per_second=1e6))
+    process = mocker.patch.object(orchestrator.result_processor, "process", side_effect=_processed)
+    raw_data = {"fetch_mode": "shared", "window_days": 30, "data": {}}
+    intents = [
+        {"intent": "sales_analysis", "time_period": "last month", "products": "Hat", "confidence": "high"},
+        # Same question, classified less confidently
+        {"intent": "sales_analysis", "time_period": "last month", "products": "Hat", "confidence": "medium"},
+        {"intent": "sales_analysis", "time_period": "last month", "products": "Scarf", "confidence": "high"},
+        {"intent": "sales_analysis", "time_period": "last month", "products": "Hat", "metrics": ["units"],
+         "confidence": "high"},
+    ]
+
+    futures = orchestrator._process_shared(
+        list(range(4)), {i: raw_data for i in range(4)}, intents, {i: {} for i in range(4)}, None
+    )
+    results = [await future for future in futures]
+
+    assert process.call_count == 3
+    assert results[0] is results[1]
+    assert [result["products"] for result in results] == ["Hat", "Hat", "Scarf", "Hat"]
+
+
+@pytest.mark.asyncio
+async def test_shared_fetch_reports_truncation_to_each_plan(busy_shop):
+    executor = QueryExecutor(shopify_client=fake_client(busy_shop))
+    executor.shopify_client.max_pages = 2
+    orders = {"resource": "orders", "fields": ["created_at", "total_price"]}
+    specs = [
+        {"api_calls": [dict(orders)], "filters": {"time_period": "last 7 days"}},
+        {"api_calls": [dict(orders), {"resource": "products", "fields": ["title"]}],
+         "filters": {"time_period": "last 7 days"}},
+        {"api_calls": [{"resource": "products", "fields": ["title"]}], "filters": {}},
+    ]
+
+    results, shared = await executor.execute_batch(specs, "busy.myshopify.com", access_token="token")
+
+    assert len(shared) == 1
+    assert [result["fetch_mode"] for result in results] == ["shared"] * 3
+    assert [result["truncated"] for result in results] == [["orders"], ["orders"], []]
+    assert all(result["record_count"] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_shared_fetch_measures_the_shop_like_a_single_request():
+    shop = MockDataProvider({"seed": 4, "orders": 3000, "products": 20, "customers": 400, "days": 30})
+    store = "profile.myshopify.com"
+
+    def orchestrator():
+        orchestrator = AgentOrchestrator(StubLLMClient(ttft=0, tokens_per_second=1e6))
+        orchestrator.query_executor = QueryExecutor(shopify_client=fake_client(shop))
+        return orchestrator
+
+    single = orchestrator()
+    await single.process({"store_id": store, "access_token": "token", "question": "What were my sales last week?"})
+    batch = orchestrator()
+    result = await batch.process_batch({"store_id": store, "access_token": "token", "questions": [
+        "What were my sales last week?", "What were my top selling products last week?"
+    ]})
+
+    assert result["metadata"]["shared_fetches"][0]["questions"] == 2
+    expected = single.cost_estimator.profile(store)
+    measured = batch.cost_estimator.profile(store)
+    assert measured["known"]
+    assert measured["orders_per_day"] == pytest.approx(expected["orders_per_day"])
+    assert measured["line_items_per_order"] == pytest.approx(expected["line_items_per_order"])
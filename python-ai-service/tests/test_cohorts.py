@@ -0,0 +1,124 @@
+"""
+Cohort retention against a brute-force count over each customer's orders
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.agent.cohorts import cohort_retention
+from app.shopify.mock_data import MockDataProvider
+
+
+def shop_orders(shuffle: bool):
+    """About seven months of orders, a tenth of them guest checkouts"""
+    orders = MockDataProvider({
+        "orders": 4000, "products": 20, "customers": 600, "days": 200, "seed": 11
+    }).to_columnar().tables["orders"]
+    orders = {name: column.copy() for name, column in orders.items()}
+    rng = np.random.default_rng(5)
+    orders["customer_id"][rng.random(len(orders["customer_id"])) < 0.1] = 0
+    if shuffle:
+        order = rng.permutation(len(orders["created_at"]))
+        orders = {name: column[order] for name, column in orders.items()}
+    return orders
+
+
+def period_of(timestamp: int, period: str):
+    day = datetime.fromtimestamp(timestamp, tz=timezone.utc).date()
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def periods_between(start, end, period: str) -> int:
+    if period == "week":
+        return (end - start).days // 7
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def brute_force(orders, period: str):
+    """Walk each customer's orders in time order and count cohort cells"""
+    by_customer = defaultdict(list)
+    for created, customer_id, total in zip(
+        orders["created_at"].tolist(), orders["customer_id"].tolist(), orders["total_price"].tolist()
+    ):
+        if customer_id > 0:
+            by_customer[customer_id].append((created, total))
+
+    first = min(period_of(created, period) for history in by_customer.values() for created, _ in history)
+    last = max(period_of(created, period) for history in by_customer.values() for created, _ in history)
+    size = periods_between(first, last, period) + 1
+
+    customers = [0] * size
+    active = [[set() for _ in range(size)] for _ in range(size)]
+    order_counts = [[0] * size for _ in range(size)]
+    revenue = [[0.0] * size for _ in range(size)]
+    intervals, to_second = [], []
+    for customer_id, history in by_customer.items():
+        history.sort()
+        cohort = periods_between(first, period_of(history[0][0], period), period)
+        customers[cohort] += 1
+        for created, total in history:
+            offset = periods_between(first, period_of(created, period), period) - cohort
+            active[cohort][offset].add(customer_id)
+            order_counts[cohort][offset] += 1
+            revenue[cohort][offset] += total
+        gaps = [(later[0] - earlier[0]) / 86400 for earlier, later in zip(history, history[1:])]
+        intervals.extend(gaps)
+        to_second.extend(gaps[:1])
+
+    active = [[len(cell) for cell in row] for row in active]
+    # Share of each cohort active k periods on, over cells before the latest (partial) period
+    curve = []
+    for offset in range(size):
+        exposed = sum(customers[cohort] for cohort in range(size) if cohort + offset < size - 1)
+        if not exposed:
+            break
+        curve.append(sum(active[cohort][offset] for cohort in range(size) if cohort + offset < size - 1) / exposed)
+
+    return {
+        "first": first,
+        "customers": customers,
+        "active": active,
+        "orders": order_counts,
+        "revenue": revenue,
+        "intervals": sorted(intervals),
+        "to_second": sorted(to_second),
+        "curve": curve,
+        "revenue_per_active": sum(map(sum, revenue)) / sum(map(sum, active)),
+    }
+
+
+@pytest.mark.parametrize("period", ["month", "week"])
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_cohorts_match_brute_force(period, shuffle):
+    orders = shop_orders(shuffle)
+    result = cohort_retention(orders, period=period)
+    expected = brute_force(orders, period)
+
+    assert len(expected["customers"]) > 3
+    assert result["periods"][0].astype(object) == expected["first"]
+    assert result["customers"].tolist() == expected["customers"]
+    assert result["active"].tolist() == expected["active"]
+    assert result["orders"].tolist() == expected["orders"]
+    assert result["revenue"].tolist() == [pytest.approx(row) for row in expected["revenue"]]
+    assert sorted(result["intervals"].tolist()) == pytest.approx(expected["intervals"])
+    assert sorted(result["to_second"].tolist()) == pytest.approx(expected["to_second"])
+    assert result["curve"].tolist() == pytest.approx(expected["curve"])
+    assert result["revenue_per_active"] == pytest.approx(expected["revenue_per_active"])
+
+    # Cells past the end of the data are never counted
+    assert not result["active"][~result["observed"]].any()
+
+
+def test_no_known_customers_is_empty():
+    orders = shop_orders(False)
+    orders["customer_id"][:] = 0
+
+    result = cohort_retention(orders)
+
+    assert result["active"].shape == (0, 0)
+    assert result["clv"] == 0.0
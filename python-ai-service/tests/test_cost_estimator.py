@@ -0,0 +1,105 @@
+"""
+Guardrails only report what execution does, and page estimates match the fetch
+"""
+
+import pytest
+
+from app.agent.cost_estimator import QueryCostEstimator
+from app.agent.query_executor import QueryExecutor
+from app.shopify.mock_data import MockDataProvider
+from conftest import fake_client
+
+STORE = "big.myshopify.com"
+
+
+def orders_spec(period=None, products=False):
+    spec = {
+        "api_calls": [{"resource": "orders", "fields": ["created_at", "total_price"], "filters": {}}],
+        "filters": {},
+        "aggregations": ["sum", "count"],
+    }
+    if period:
+        spec["filters"]["time_period"] = period
+        spec["api_calls"][0]["filters"]["time_filter"] = period
+    if products:
+        spec["api_calls"].append({"resource": "products", "fields": ["title"], "filters": {}})
+    return spec
+
+
+def estimator(**profile) -> QueryCostEstimator:
+    estimator = QueryCostEstimator()
+    estimator.fetch_mode = "rest"
+    estimator.set_profile(STORE, **profile)
+    return estimator
+
+
+def guard(estimator, spec, intent="sales_analysis", approximate=False):
+    return estimator.apply_guardrails(
+        spec, estimator.estimate(spec, STORE), STORE, {"intent": intent}, approximate=approximate
+    )
+
+
+def test_over_budget_plan_proceeds_unchanged_when_it_cannot_be_narrowed():
+    costs = estimator(orders_per_day=2000)
+    spec = orders_spec("last 90 days")
+
+    guardrail = guard(costs, spec, intent="customer_retention")
+
+    assert guardrail["action"] == "proceed"
+    assert "over budget" in guardrail["reason"]
+    assert spec == orders_spec("last 90 days")
+
+
+def test_failed_narrowing_restores_the_original_filters():
+    # A window that fits the page budget is still far over the byte budget
+    costs = estimator(orders_per_day=100, line_items_per_order=100)
+    spec = orders_spec()
+
+    guardrail = guard(costs, spec)
+
+    assert guardrail["action"] == "proceed"
+    assert spec == orders_spec()
+
+
+def test_narrowing_a_plan_without_period_filters_the_fetch():
+    costs = estimator(orders_per_day=500)
+    spec = orders_spec()
+
+    guardrail = guard(costs, spec)
+
+    assert guardrail["action"] == "narrow_window"
+    period = f"last {guardrail['estimate']['window_days']} days"
+    assert spec["filters"]["time_period"] == period
+    assert spec["api_calls"][0]["filters"]["time_filter"] == period
+
+
+def test_sampling_only_when_approximate_and_reported_only_if_used():
+    costs = estimator(orders_per_day=2000)
+
+    assert "sampling" not in orders_spec("last 90 days")
+    spec = dict(orders_spec("last 90 days"), approximable=True)
+    assert guard(costs, spec)["action"] == "proceed"
+    assert "sampling" not in spec
+
+    guardrail = guard(costs, spec, approximate=True)
+    assert guardrail["action"] == "sample" and spec["approximate"]
+    assert costs.as_applied(guardrail, {"fetch_mode": "sampled"})["action"] == "sample"
+    assert costs.as_applied(guardrail, {"fetch_mode": "rollups"})["action"] == "proceed"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fetch_mode", ["rest", "graphql"])
+async def test_page_estimate_matches_the_pages_fetched(fetch_mode):
+    shop = MockDataProvider({"seed": 5, "orders": 3000, "products": 600, "customers": 500, "days": 30})
+    spec = orders_spec(products=True)
+    executor = QueryExecutor(shopify_client=fake_client(shop))
+    executor.fetch_mode = fetch_mode
+
+    result = await executor._execute_shopify(spec, STORE, "token")
+
+    costs = estimator(products=len(shop.get_products()))
+    costs.fetch_mode = fetch_mode
+    costs.history_days = 1
+    costs.set_profile(STORE, orders_per_day=len(result["data"]["orders"]))
+    assert result["fetch_mode"] == fetch_mode
+    assert costs.estimate(spec, STORE)["pages"] == result["round_trips"]
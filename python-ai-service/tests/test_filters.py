@@ -0,0 +1,31 @@
+"""
+Periods map to the created_at ranges the executor fetches
+"""
+
+from datetime import datetime
+
+from app.agent.query_planner import QueryPlanner
+from app.shopify.filters import period_to_date_range
+
+NOW = datetime(2026, 3, 12, 15, 30)
+
+
+def test_yesterday_is_the_calendar_day():
+    assert period_to_date_range("yesterday", NOW) == (datetime(2026, 3, 11), datetime(2026, 3, 12))
+
+
+def test_today_runs_from_midnight_to_now():
+    assert period_to_date_range("today", NOW) == (datetime(2026, 3, 12), NOW)
+
+
+def test_rolling_periods_end_now():
+    assert period_to_date_range("last 7 days", NOW) == (datetime(2026, 3, 5, 15, 30), NOW)
+
+
+def test_planner_since_follows_the_fetched_window():
+    planner = QueryPlanner(llm_client=None)
+
+    assert planner._since({"time_period": "yesterday"}) == " SINCE -1d UNTIL yesterday"
+    assert planner._since({"time_period": "today"}) == " SINCE today"
+    assert planner._since({"time_period": "last 7 days"}) == " SINCE -7d"
+    assert planner._since({"time_period": "all time"}) == ""
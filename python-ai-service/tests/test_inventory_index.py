@@ -0,0 +1,185 @@
+"""
+Inventory forecast and location index against day-by-day, per-SKU references
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from app.agent.columnar_aggregates import aggregate_inventory_projection
+from app.agent.inventory_forecast import SECONDS_PER_DAY, forecast_skus
+from app.agent.inventory_index import InventoryIndex
+from app.shopify.mock_data import MockDataProvider
+
+
+HISTORY_DAYS = 28
+HORIZON_DAYS = 30
+LEAD_TIME_DAYS = 7.0
+SMOOTHING = 0.1
+
+
+def shop_tables(id_scale: int):
+    """A small multi-location shop; id_scale > 1 spreads product ids out (sparse keys)"""
+    tables = MockDataProvider({
+        "orders": 3000, "products": 60, "customers": 300, "locations": 4, "days": 60, "seed": 3
+    }).to_columnar().tables
+    for table in ("sales", "inventory", "products"):
+        tables[table]["product_id"] = tables[table]["product_id"] * id_scale
+    return tables
+
+
+def naive_forecast(sales, inventory):
+    """Per product: walk the daily series, smoothing one day at a time"""
+    end_day = int(sales["created_at"].max()) // SECONDS_PER_DAY
+    start_day = end_day + 1 - HISTORY_DAYS
+    daily = defaultdict(lambda: [0.0] * HISTORY_DAYS)
+    for created, product_id, quantity in zip(
+        sales["created_at"].tolist(), sales["product_id"].tolist(), sales["quantity"].tolist()
+    ):
+        day = created // SECONDS_PER_DAY - start_day
+        if 0 <= day < HISTORY_DAYS:
+            daily[product_id][day] += quantity
+
+    stock = defaultdict(float)
+    for product_id, available in zip(inventory["product_id"].tolist(), inventory["available"].tolist()):
+        stock[product_id] += available
+
+    covered = HORIZON_DAYS + LEAD_TIME_DAYS
+    forecasts = {}
+    for product_id in set(sales["product_id"].tolist()) | set(stock):
+        series = daily[product_id]
+        mean = sum(series) / HISTORY_DAYS
+        level = mean
+        for units in series:
+            level = SMOOTHING * units + (1 - SMOOTHING) * level
+        std = math.sqrt(max(sum(units ** 2 for units in series) / HISTORY_DAYS - mean ** 2, 0.0))
+        safety = 1.65 * std * math.sqrt(covered)
+        forecasts[product_id] = {
+            "velocity": level,
+            "moving_average": sum(series[-7:]) / 7,
+            "daily_std": std,
+            "current_stock": stock[product_id],
+            "reorder_quantity": math.ceil(max(level * covered + safety - stock[product_id], 0.0)),
+        }
+    return forecasts
+
+
+def naive_locations(inventory, velocity):
+    """Per product: split its need over its locations, then match surplus to shortages greedily"""
+    levels = defaultdict(dict)
+    for product_id, location_id, available in zip(
+        inventory["product_id"].tolist(), inventory["location_id"].tolist(), inventory["available"].tolist()
+    ):
+        levels[product_id][location_id] = levels[product_id].get(location_id, 0) + available
+
+    covered = HORIZON_DAYS + LEAD_TIME_DAYS
+    by_location = defaultdict(lambda: {"stock": 0.0, "need": 0.0, "skus_short": 0, "units_short": 0.0})
+    transfers = {}
+    for product_id, stocked in levels.items():
+        need = velocity.get(product_id, 0.0) / len(stocked) * covered
+        surplus, short = [], []
+        for location_id in sorted(stocked):
+            available = stocked[location_id]
+            report = by_location[location_id]
+            report["stock"] += available
+            report["need"] += need
+            report["skus_short"] += need > available
+            report["units_short"] += max(need - available, 0.0)
+            if math.floor(available - need) > 0:
+                surplus.append([location_id, math.floor(available - need)])
+            if math.ceil(need - available) > 0:
+                short.append([location_id, math.ceil(need - available)])
+
+        # Largest first; sorted() keeps location order between equal amounts
+        surplus = sorted(surplus, key=lambda entry: -entry[1])
+        short = sorted(short, key=lambda entry: -entry[1])
+        while surplus and short:
+            units = min(surplus[0][1], short[0][1])
+            transfers[(product_id, surplus[0][0], short[0][0])] = units
+            surplus[0][1] -= units
+            short[0][1] -= units
+            if not surplus[0][1]:
+                surplus.pop(0)
+            if not short[0][1]:
+                short.pop(0)
+    return by_location, transfers
+
+
+@pytest.mark.parametrize("id_scale", [1, 1_000_003])
+def test_forecast_matches_day_by_day_smoothing(id_scale):
+    tables = shop_tables(id_scale)
+    result = forecast_skus(tables["sales"], tables["inventory"], HISTORY_DAYS, HORIZON_DAYS,
+                           lead_time_days=LEAD_TIME_DAYS, smoothing=SMOOTHING)
+    expected = naive_forecast(tables["sales"], tables["inventory"])
+
+    assert sorted(result["sku_id"].tolist()) == sorted(expected)
+    for i, sku_id in enumerate(result["sku_id"].tolist()):
+        for name, value in expected[sku_id].items():
+            assert result[name][i] == pytest.approx(value, abs=1e-9), (sku_id, name)
+
+
+@pytest.mark.parametrize("id_scale", [1, 1_000_003])
+def test_location_index_matches_per_sku_reference(id_scale):
+    tables = shop_tables(id_scale)
+    inventory = tables["inventory"]
+    result = forecast_skus(tables["sales"], inventory, HISTORY_DAYS, HORIZON_DAYS,
+                           lead_time_days=LEAD_TIME_DAYS, smoothing=SMOOTHING)
+    velocity = dict(zip(result["sku_id"].tolist(), result["velocity"].tolist()))
+    expected_locations, expected_transfers = naive_locations(inventory, velocity)
+
+    index = InventoryIndex(inventory)
+    joined = index.join(result["sku_id"], result["velocity"])
+    assert joined.tolist() == pytest.approx([velocity.get(sku, 0.0) for sku in index.sku_ids.tolist()])
+
+    product_id = int(index.sku_ids[5])
+    assert index.levels(product_id) == {
+        location: available
+        for pid, location, available in zip(
+            inventory["product_id"].tolist(), inventory["location_id"].tolist(), inventory["available"].tolist()
+        )
+        if pid == product_id
+    }
+
+    need = index.allocate(joined, HORIZON_DAYS + LEAD_TIME_DAYS)
+    report = index.location_shortages(need)
+    for i, location_id in enumerate(report["location_id"].tolist()):
+        expected = expected_locations[location_id]
+        assert report["stock"][i] == expected["stock"]
+        assert report["need"][i] == pytest.approx(expected["need"])
+        assert report["skus_short"][i] == expected["skus_short"]
+        assert report["units_short"][i] == pytest.approx(expected["units_short"])
+
+    moves = index.transfers(need)
+    transfers = {
+        (int(index.sku_ids[sku]),
+         int(index.locations[index.cell_location[source]]),
+         int(index.locations[index.cell_location[target]])): int(units)
+        for sku, source, target, units in zip(
+            moves["sku"].tolist(), moves["source"].tolist(), moves["target"].tolist(), moves["units"].tolist()
+        )
+    }
+    assert expected_transfers
+    assert transfers == expected_transfers
+
+
+def test_inventory_projection_totals_match_reference():
+    tables = shop_tables(1)
+    projection = aggregate_inventory_projection(
+        tables, history_days=HISTORY_DAYS, horizon_days=HORIZON_DAYS,
+        lead_time_days=LEAD_TIME_DAYS, smoothing=SMOOTHING
+    )
+    expected = naive_forecast(tables["sales"], tables["inventory"])
+    velocity = {sku: forecast["velocity"] for sku, forecast in expected.items()}
+    expected_locations, expected_transfers = naive_locations(tables["inventory"], velocity)
+
+    assert projection["skus_analyzed"] == len(expected)
+    assert projection["current_stock"] == sum(forecast["current_stock"] for forecast in expected.values())
+    assert projection["daily_velocity"] == pytest.approx(sum(velocity.values()))
+    assert projection["reorder_units"] == sum(forecast["reorder_quantity"] for forecast in expected.values())
+    assert projection["location_count"] == len(expected_locations)
+    assert projection["locations_short"] == sum(
+        1 for report in expected_locations.values() if report["units_short"] > 0
+    )
+    assert projection["transfer_units"] == sum(expected_transfers.values())
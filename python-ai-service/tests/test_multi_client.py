@@ -0,0 +1,119 @@
+"""
+Hedged and failover completions across stub providers
+"""
+
+import time
+
+import pytest
+
+from app.cache.shared_cache import MemoryCache
+from app.llm.budget import BudgetExceededError
+from app.llm.multi_client import MultiProviderLLMClient
+from app.llm.prompts import INTENT_CLASSIFIER_SYSTEM, INTENT_CLASSIFIER_PROMPT
+from app.llm.response_cache import CachedLLMClient
+from app.telemetry.timing import start_request
+from benchmarks.stub_llm import StubLLMClient
+
+PROMPT = INTENT_CLASSIFIER_PROMPT.format(question="What were my top selling products last week?")
+
+
+def stub(provider: str, ttft: float, **options) -> StubLLMClient:
+    return StubLLMClient(ttft=ttft, tokens_per_second=0, provider=provider, seed=1, **options)
+
+
+class OverBudget(StubLLMClient):
+    async def generate(self, prompt, system_prompt=None, temperature=None):
+        self.calls += 1
+        raise BudgetExceededError("Store is over its daily LLM token limit")
+
+
+async def generate(client) -> float:
+    start = time.perf_counter()
+    response = await client.generate(PROMPT, system_prompt=INTENT_CLASSIFIER_SYSTEM)
+    assert '"top_products"' in response
+    return time.perf_counter() - start
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_to_the_next_backend():
+    primary, secondary = stub("primary", 1.0), stub("secondary", 0.01)
+    client = MultiProviderLLMClient([primary, secondary], hedge_delay=0.05)
+
+    elapsed = await generate(client)
+
+    assert elapsed < 0.5
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    primary, secondary = stub("primary", 0.01), stub("secondary", 0.01)
+    client = MultiProviderLLMClient([primary, secondary], hedge_delay=0.2)
+
+    for _ in range(5):
+        await generate(client)
+
+    assert (primary.calls, secondary.calls) == (5, 0)
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_follows_the_measured_percentile_per_step():
+    primary, secondary = stub("primary", 0.01), stub("secondary", 0.01)
+    client = MultiProviderLLMClient([primary, secondary], hedge_percentile=95, hedge_delay=10.0)
+
+    timings = start_request(provider="primary")
+    with timings.step("intent"):
+        for _ in range(client.latencies.min_samples):
+            await generate(client)
+        # A stall ten times the usual latency is hedged well before the 10 s default
+        primary.ttft = 1.0
+        elapsed = await generate(client)
+
+    assert elapsed < 0.5
+    assert secondary.calls == 1
+    assert client.latencies.percentile((0, "intent"), 95) < 0.1
+    assert client.latencies.percentile((0, "plan"), 95) is None
+
+
+@pytest.mark.asyncio
+async def test_errors_fail_over_without_hedging():
+    primary, secondary = stub("primary", 0.01, failure_rate=1.0), stub("secondary", 0.01)
+    client = MultiProviderLLMClient([primary, secondary], hedge=False)
+
+    await generate(client)
+
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_all_backends_failing_raises_the_last_error():
+    client = MultiProviderLLMClient([
+        stub("primary", 0.01, failure_rate=1.0), stub("secondary", 0.01, failure_rate=1.0)
+    ])
+
+    with pytest.raises(RuntimeError, match="secondary: injected failure"):
+        await generate(client)
+
+
+@pytest.mark.asyncio
+async def test_budget_errors_are_not_failed_over():
+    primary, secondary = OverBudget(provider="primary"), stub("secondary", 0.01)
+    client = MultiProviderLLMClient([primary, secondary])
+
+    with pytest.raises(BudgetExceededError):
+        await generate(client)
+    assert secondary.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_economy_tier_calls_are_cached_apart():
+    backend = MultiProviderLLMClient([stub("primary", 0.01), stub("secondary", 0.01)])
+    client = CachedLLMClient(backend, cache=MemoryCache())
+
+    timings = start_request(provider="primary")
+    standard = client._key(PROMPT, INTENT_CLASSIFIER_SYSTEM, 0.1)
+    timings.tier = "economy"
+    economy = client._key(PROMPT, INTENT_CLASSIFIER_SYSTEM, 0.1)
+
+    assert client.economy_model == "stub-1-mini"
+    assert economy != standard
@@ -0,0 +1,110 @@
+"""
+/analyze/portfolio: NDJSON event order, and each shop's requests within its own rate limit
+"""
+
+import json
+import time
+
+import httpx
+import pytest
+
+from app import main
+from app.agent.orchestrator import AgentOrchestrator
+from app.agent.query_executor import QueryExecutor
+from app.shopify.api_client import ShopifyAPIClient
+from app.shopify.mock_data import MockDataProvider
+from app.shopify.rate_limit import ShopRateLimiter
+from benchmarks.bench_portfolio import ShopRouter
+from benchmarks.fake_shopify import create_fake_shopify
+from benchmarks.stub_llm import StubLLMClient
+
+QUESTION = "Which stores will stock out next week?"
+SLOW_STORE = "shop-0.myshopify.com"
+# A shop's third request overflows this bucket unless it waits
+TIGHT_BUCKET = (2, 1)
+
+
+def build(stores: int, fetch_mode: str, rate_limits=None, limiter=None, slow_latency: float = 0.0):
+    """Orchestrator over one fake Admin API per store; SLOW_STORE answers every request late"""
+    shops = {
+        f"shop-{i}.myshopify.com": create_fake_shopify(
+            MockDataProvider({"seed": i, "orders": 300, "products": 10, "customers": 60, "days": 30}),
+            latency=slow_latency if i == 0 else 0,
+            rate_limits=rate_limits
+        )
+        for i in range(stores)
+    }
+    client = ShopifyAPIClient(transport=ShopRouter(shops))
+    client.base_url = "http://{store_id}"
+    client.rate_limiter = limiter
+    orchestrator = AgentOrchestrator(StubLLMClient(ttft=0, tokens_per_second=1e6))
+    orchestrator.query_executor = QueryExecutor(shopify_client=client)
+    orchestrator.query_executor.fetch_mode = fetch_mode
+    orchestrator.cost_estimator.fetch_mode = fetch_mode
+    return orchestrator, shops
+
+
+async def post_portfolio(monkeypatch, orchestrator, stores):
+    monkeypatch.setattr(main, "orchestrator", orchestrator)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/analyze/portfolio", json={
+            "question": QUESTION,
+            "stores": [{"store_id": store, "access_token": "token"} for store in stores],
+        })
+    return response, [json.loads(line) for line in response.text.splitlines() if line]
+
+
+@pytest.mark.asyncio
+async def test_events_stream_plan_then_stores_as_they_finish_then_done(monkeypatch):
+    orchestrator, shops = build(6, "graphql", slow_latency=0.3)
+
+    response, events = await post_portfolio(monkeypatch, orchestrator, list(shops))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    kinds = [event["event"] for event in events]
+    assert kinds == ["plan"] + ["store"] * 6 + ["done"]
+    assert events[0]["stores"] == 6
+
+    stores = events[1:-1]
+    assert sorted(event["store_id"] for event in stores) == sorted(shops)
+    assert all(event["status"] == "ok" for event in stores)
+    # Completion order: the slow shop finishes last
+    assert stores[-1]["store_id"] == SLOW_STORE
+
+    done = events[-1]
+    assert done["metadata"]["ok"] == 6
+    assert done["metadata"]["stores"] == 6
+    assert {entry["store_id"] for entry in done["ranking"]["stores"]} <= set(shops)
+    # Classified and planned once for the whole portfolio
+    assert orchestrator.llm.calls <= 2
+
+
+@pytest.mark.asyncio
+async def test_each_shop_waits_on_its_own_bucket():
+    limiter = ShopRateLimiter(*TIGHT_BUCKET)
+    orchestrator, shops = build(4, "rest", rate_limits={"rest": TIGHT_BUCKET}, limiter=limiter)
+    stores = [{"store_id": store, "access_token": "token"} for store in shops]
+
+    start = time.perf_counter()
+    events = [event async for event in orchestrator.process_portfolio({"question": QUESTION, "stores": stores})]
+    elapsed = time.perf_counter() - start
+
+    assert [event["status"] for event in events if event["event"] == "store"] == ["ok"] * 4
+    assert sum(shop.state.stats["throttled"] for shop in shops.values()) == 0
+    assert {key for key in limiter._buckets} == {(store, "rest") for store in shops}
+    assert limiter.stats["waits"] >= len(shops)
+    # Shops wait at the same time, each for its own bucket, not one after another
+    assert elapsed < limiter.stats["wait_s"]
+
+
+@pytest.mark.asyncio
+async def test_without_the_limiter_tight_shops_throttle():
+    orchestrator, shops = build(4, "rest", rate_limits={"rest": TIGHT_BUCKET})
+    stores = [{"store_id": store, "access_token": "token"} for store in shops]
+
+    events = [event async for event in orchestrator.process_portfolio({"question": QUESTION, "stores": stores})]
+
+    assert events[-1]["event"] == "done"
+    assert sum(shop.state.stats["throttled"] for shop in shops.values()) > 0
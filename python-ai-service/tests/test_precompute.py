@@ -0,0 +1,100 @@
+"""
+Warmed answers are only served to callers presenting the token they were computed with
+"""
+
+import pytest
+
+from app.agent.orchestrator import AgentOrchestrator
+from app.agent.precompute import PrecomputeScheduler
+from app.agent.query_executor import QueryExecutor
+from app.cache.shared_cache import MemoryCache
+from app.shopify.mock_data import MockDataProvider
+from benchmarks.stub_llm import StubLLMClient
+from conftest import fake_client
+
+STORE = "warm.myshopify.com"
+QUESTION = "What were my top selling products in the last 30 days?"
+
+
+@pytest.fixture
+def orchestrator():
+    shop = MockDataProvider({"seed": 3, "orders": 500, "products": 20, "customers": 100, "days": 40})
+    orchestrator = AgentOrchestrator(StubLLMClient(ttft=0, tokens_per_second=1e6))
+    orchestrator.query_executor = QueryExecutor(shopify_client=fake_client(shop, access_token="good"))
+    orchestrator.precompute = PrecomputeScheduler(orchestrator, cache=MemoryCache())
+    orchestrator.precompute.enabled = True
+    return orchestrator
+
+
+def ask(orchestrator, token=None):
+    request = {"store_id": STORE, "question": QUESTION}
+    if token:
+        request["access_token"] = token
+    return orchestrator.process(request)
+
+
+async def warm(orchestrator):
+    for _ in range(orchestrator.precompute.min_asks):
+        await ask(orchestrator, "good")
+    outcomes = await orchestrator.precompute.run_once()
+    assert outcomes == {"warmed": 1}
+
+
+@pytest.mark.asyncio
+async def test_warm_answer_needs_the_token_it_was_computed_with(orchestrator):
+    await warm(orchestrator)
+
+    assert "precomputed" in (await ask(orchestrator, "good"))["metadata"]
+    for token in (None, "bad"):
+        result = await ask(orchestrator, token)
+        assert "precomputed" not in result["metadata"]
+
+
+@pytest.mark.asyncio
+async def test_rejected_or_missing_token_is_not_kept_for_warming(orchestrator):
+    await warm(orchestrator)
+
+    await ask(orchestrator, "bad")
+    await ask(orchestrator)
+
+    store = orchestrator.precompute._stores[STORE]
+    assert store["request"]["access_token"] == "good"
+
+
+@pytest.mark.asyncio
+async def test_unanswered_token_never_warms(orchestrator):
+    for _ in range(orchestrator.precompute.min_asks):
+        await ask(orchestrator, "bad")
+
+    assert await orchestrator.precompute.run_once() == {}
+
+
+
+class ObjectCache(MemoryCache):
+    """Hands out the stored objects themselves, as an unpickled cache would"""
+
+    def __init__(self):
+        super().__init__()
+        self.objects = {}
+
+    def get(self, key, default=None):
+        return self.objects.get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.objects[key] = value
+
+
+@pytest.mark.asyncio
+async def test_serving_a_warm_answer_leaves_the_cached_one_alone(orchestrator):
+    orchestrator.precompute.cache = ObjectCache()
+    await warm(orchestrator)
+    (entry,) = orchestrator.precompute.cache.objects.values()
+    reasoning = list(entry["result"]["reasoning"])
+
+    first = await ask(orchestrator, "good")
+    second = await ask(orchestrator, "good")
+
+    assert first is not second
+    assert "precomputed" in second["metadata"]
+    assert "precomputed" not in entry["result"]["metadata"]
+    assert entry["result"]["reasoning"] == reasoning
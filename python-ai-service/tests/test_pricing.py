@@ -0,0 +1,26 @@
+"""
+Price overrides only reprice the model they name
+"""
+
+from app.llm.pricing import PRICES_PER_1K, model_price
+
+
+def test_override_applies_to_the_named_model_only(monkeypatch):
+    monkeypatch.setenv("LLM_PRICE_MODEL", "gpt-4o-2024-11-20")
+    monkeypatch.setenv("LLM_PRICE_PROMPT_PER_1K", "0.002")
+    monkeypatch.setenv("LLM_PRICE_COMPLETION_PER_1K", "0.008")
+
+    assert model_price("gpt-4o-2024-11-20") == (0.002, 0.008)
+    assert model_price("gpt-4o-2024-08-06") == PRICES_PER_1K["gpt-4o"]
+    assert model_price("gpt-4o-mini") == PRICES_PER_1K["gpt-4o-mini"]
+    assert model_price("gemini-pro") == PRICES_PER_1K["gemini-pro"]
+    assert model_price("claude-3-sonnet") == (0.0, 0.0)
+
+
+def test_unnamed_override_prices_unlisted_models_only(monkeypatch):
+    monkeypatch.delenv("LLM_PRICE_MODEL", raising=False)
+    monkeypatch.setenv("LLM_PRICE_PROMPT_PER_1K", "0.003")
+    monkeypatch.setenv("LLM_PRICE_COMPLETION_PER_1K", "0.015")
+
+    assert model_price("claude-3-sonnet") == (0.003, 0.015)
+    assert model_price("gpt-4") == PRICES_PER_1K["gpt-4"]
@@ -0,0 +1,49 @@
+"""
+Forecast and cohort windows follow the days the executor actually fetched
+"""
+
+import pytest
+
+from app.agent.query_executor import QueryExecutor
+from app.agent.result_processor import ResultProcessor
+from app.agent.shopifyql_generator import ShopifyQLGenerator
+
+
+@pytest.fixture
+def processor():
+    return ResultProcessor()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("period, window_days, horizon_days", [
+    ("last 2 weeks", 14, 7),
+    ("last year", 365, 7),
+    # Future periods are a horizon; the history fetched is the default window
+    ("next week", 30, 7),
+    ("next month", 30, 30),
+    ("yesterday", 1, 7),
+])
+async def test_inventory_forecast_uses_the_fetched_window(processor, period, window_days, horizon_days):
+    intent = {"intent": "inventory_projection", "time_period": period}
+    spec = await ShopifyQLGenerator(None).generate(
+        {"resources_needed": ["orders", "inventory_levels"], "fields_required": {}}, intent
+    )
+
+    raw_data = await QueryExecutor().execute(spec, "window.myshopify.com", use_mock=True)
+    assert raw_data["window_days"] == window_days
+
+    params = processor._aggregate_params("inventory_projection", dict(intent, history_days=raw_data["window_days"]))
+    assert params["history_days"] == window_days
+    assert params["horizon_days"] == horizon_days
+    result = await processor.process(raw_data=raw_data, intent=intent, plan={})
+    assert result["calculations"]["projection_period_days"] == horizon_days
+
+
+@pytest.mark.parametrize("period, cohort_period", [
+    ("last 30 days", "week"),
+    ("last year", "month"),
+    ("last 2 years", "month"),
+])
+def test_cohort_period_follows_the_window(processor, period, cohort_period):
+    params = processor._aggregate_params("customer_retention", {"intent": "customer_retention", "time_period": period})
+    assert params["period"] == cohort_period
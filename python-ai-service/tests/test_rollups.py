@@ -0,0 +1,80 @@
+"""
+Daily rollups synced from a real (fake) shop match the orders it holds
+"""
+
+import numpy as np
+import pytest
+
+from app.agent.query_executor import QueryExecutor
+from app.shopifyql.rollups import SECONDS_PER_DAY, RollupStore
+from conftest import fake_client
+
+
+def rollup_spec(period: str):
+    return {
+        "rollups": True,
+        "api_calls": [{"resource": "orders", "fields": [], "filters": {}}],
+        "filters": {"time_period": period},
+    }
+
+
+def executor_for(client) -> QueryExecutor:
+    executor = QueryExecutor(shopify_client=client)
+    executor.rollup_store = RollupStore()
+    return executor
+
+
+@pytest.mark.asyncio
+async def test_rollups_count_every_order_of_busy_days(busy_shop):
+    executor = executor_for(fake_client(busy_shop))
+
+    result = await executor.execute(rollup_spec("last 7 days"), "busy.myshopify.com", "token")
+
+    assert result["fetch_mode"] == "rollups"
+    since, until = executor._window(rollup_spec("last 7 days"))
+    created = busy_shop.tables["orders"]["created_at"]
+    in_window = (created >= since // SECONDS_PER_DAY * SECONDS_PER_DAY) & (created <= until)
+    daily = result["tables"]["daily"]
+    assert daily["orders"].max() > 250
+    assert int(daily["orders"].sum()) == int(in_window.sum())
+    assert np.isclose(daily["revenue"].sum(), busy_shop.tables["orders"]["total_price"][in_window].sum())
+
+
+@pytest.mark.asyncio
+async def test_truncated_fetch_is_not_marked_synced(busy_shop):
+    client = fake_client(busy_shop)
+    client.max_pages = 1
+    executor = executor_for(client)
+
+    result = await executor.execute(rollup_spec("last 7 days"), "busy.myshopify.com", "token")
+
+    assert result["fetch_mode"] != "rollups"
+    assert executor.rollup_store.get("busy.myshopify.com").synced_since is None
+
+
+@pytest.mark.asyncio
+async def test_rollups_count_closed_orders(busy_shop):
+    # REST lists closed orders only when asked for status=any
+    executor = executor_for(fake_client(busy_shop, closed_every=3))
+
+    result = await executor.execute(rollup_spec("last 7 days"), "busy.myshopify.com", "token")
+
+    assert result["fetch_mode"] == "rollups"
+    since, until = executor._window(rollup_spec("last 7 days"))
+    orders = busy_shop.tables["orders"]
+    in_window = (orders["created_at"] >= since // SECONDS_PER_DAY * SECONDS_PER_DAY) & (orders["created_at"] <= until)
+    assert (orders["id"][in_window] % 3 == 0).any()
+    assert int(result["tables"]["daily"]["orders"].sum()) == int(in_window.sum())
+
+
+@pytest.mark.asyncio
+async def test_raw_fetch_counts_closed_orders(busy_shop):
+    # Short windows are answered from raw orders: they must count the same orders as rollups
+    spec = dict(rollup_spec("last 7 days"), rollups=False)
+
+    raw = await executor_for(fake_client(busy_shop, closed_every=3)).execute(spec, "busy.myshopify.com", "token")
+    all_open = await executor_for(fake_client(busy_shop)).execute(spec, "busy.myshopify.com", "token")
+
+    assert raw["fetch_mode"] == "rest"
+    assert any(order["id"] % 3 == 0 for order in raw["data"]["orders"])
+    assert len(raw["data"]["orders"]) == len(all_open["data"]["orders"])
@@ -0,0 +1,131 @@
+"""
+Approximate (sampled) answers against the exact aggregate of the same shop
+"""
+
+import numpy as np
+import pytest
+
+from app.agent.columnar_aggregates import aggregate_sales_analysis
+from app.agent.explainer import Explainer
+from app.agent.query_executor import QueryExecutor
+from app.agent.sampling import slice_ranges
+from conftest import fake_client
+
+# ~400 orders per slice: every sampled slice needs more than one page
+BUSY_SLICE = 12 * 3600
+# 56 slices over the week, so half of them is a real sample
+SMALL_SLICE = 3 * 3600
+
+
+def sampled_spec(rate: float, seed: int = 1, slice_seconds: int = BUSY_SLICE):
+    return {
+        "approximate": True,
+        "sampling": {"rate": rate, "slice_seconds": slice_seconds, "seed": seed},
+        "api_calls": [{"resource": "orders", "fields": [], "filters": {}}],
+        "filters": {"time_period": "last 7 days"},
+    }
+
+
+def exact_totals(shop, since: int, until: int):
+    orders = shop.tables["orders"]
+    in_window = (orders["created_at"] >= since) & (orders["created_at"] <= until)
+    return int(in_window.sum()), float(orders["total_price"][in_window].sum())
+
+
+async def run_sampled(shop, spec):
+    executor = QueryExecutor(shopify_client=fake_client(shop))
+    result = await executor.execute(spec, "busy.myshopify.com", "token")
+    assert result["fetch_mode"] == "sampled"
+    return executor, result
+
+
+@pytest.mark.asyncio
+async def test_sampled_slices_are_read_in_full(busy_shop):
+    _, result = await run_sampled(busy_shop, sampled_spec(0.5))
+
+    created = busy_shop.tables["orders"]["created_at"]
+    expected = sum(
+        int(((created >= start) & (created < stop)).sum())
+        for start, stop in slice_ranges(result["sample"])
+    )
+    fetched = len(result["tables"]["orders"]["order_id"])
+    assert fetched > 250 * len(result["sample"]["sampled"])
+    assert fetched == expected
+
+
+@pytest.mark.asyncio
+async def test_full_sample_matches_exact_aggregate(busy_shop):
+    spec = sampled_spec(1.0)
+    executor, result = await run_sampled(busy_shop, spec)
+
+    estimate = aggregate_sales_analysis(result["tables"], result["sample"])
+    exact = aggregate_sales_analysis(result["tables"])
+    orders, revenue = exact_totals(busy_shop, *executor._window(spec))
+
+    assert estimate["total_orders"] == exact["total_orders"] == orders
+    assert estimate["total_revenue"] == pytest.approx(revenue)
+    assert estimate["margins"]["total_orders"] == 0
+    assert [p["product"] for p in estimate["top_products"]] == [p["product"] for p in exact["top_products"]]
+
+
+@pytest.mark.asyncio
+async def test_sampled_totals_count_closed_orders(busy_shop):
+    # REST lists closed orders only when asked for status=any
+    spec = sampled_spec(1.0)
+    executor = QueryExecutor(shopify_client=fake_client(busy_shop, closed_every=3))
+    result = await executor.execute(spec, "busy.myshopify.com", "token")
+
+    assert result["fetch_mode"] == "sampled"
+    estimate = aggregate_sales_analysis(result["tables"], result["sample"])
+    orders, revenue = exact_totals(busy_shop, *executor._window(spec))
+    assert (result["tables"]["orders"]["order_id"] % 3 == 0).any()
+    assert estimate["total_orders"] == orders
+    assert estimate["total_revenue"] == pytest.approx(revenue)
+
+
+@pytest.mark.asyncio
+async def test_estimates_are_unbiased_and_margins_cover(busy_shop):
+    """Over many samples: mean estimate ~ exact total, and ~95% of margins cover it"""
+    spec = sampled_spec(0.5, slice_seconds=SMALL_SLICE)
+    executor = QueryExecutor(shopify_client=fake_client(busy_shop))
+    orders, revenue = exact_totals(busy_shop, *executor._window(spec))
+
+    estimates, covered = [], 0
+    for seed in range(40):
+        result = await executor.execute(dict(spec, sampling=dict(spec["sampling"], seed=seed)),
+                                        "busy.myshopify.com", "token")
+        estimate = aggregate_sales_analysis(result["tables"], result["sample"])
+        assert estimate["sampling"]["slices_sampled"] < estimate["sampling"]["slices"]
+        estimates.append(estimate["total_revenue"])
+        covered += (
+            abs(estimate["total_orders"] - orders) <= estimate["margins"]["total_orders"]
+            and abs(estimate["total_revenue"] - revenue) <= estimate["margins"]["total_revenue"]
+        )
+
+    assert np.mean(estimates) == pytest.approx(revenue, rel=0.02)
+    assert covered >= 34
+
+
+@pytest.mark.asyncio
+async def test_slice_cut_short_falls_back_to_exact_fetch(busy_shop):
+    client = fake_client(busy_shop)
+    client.max_pages = 1
+    result = await QueryExecutor(shopify_client=client).execute(
+        sampled_spec(0.5), "busy.myshopify.com", "token"
+    )
+
+    assert result["fetch_mode"] != "sampled"
+    assert "sample" not in result
+
+
+@pytest.mark.parametrize("confidence, expected", [
+    ("high", "medium"), ("High", "medium"), (" LOW ", "low"), ("moderate", "medium"), (None, "medium"),
+])
+def test_sampling_caps_any_llm_confidence(confidence, expected):
+    sampling = {"rate": 0.5, "slices_sampled": 7, "slices": 14, "relative_error": 0.05}
+    result = Explainer(llm_client=None)._apply_sampling_error(
+        {"confidence": confidence, "confidence_reason": "LLM"}, {"sampling": sampling}
+    )
+
+    assert result["confidence"] == expected
+    assert "±5.0%" in result["confidence_reason"]
@@ -0,0 +1,80 @@
+"""
+SQLiteCache shared by separate worker processes through one WAL file
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import time
+
+from app.cache.shared_cache import SQLiteCache
+
+
+def _spawn():
+    # Fresh interpreters, like uvicorn workers: no connection is inherited
+    return multiprocessing.get_context("spawn")
+
+
+def _set(path: str, key: str, value, ttl):
+    SQLiteCache(path).set(key, value, ttl)
+
+
+def _get(path: str, key: str):
+    return SQLiteCache(path).get(key, "missing")
+
+
+def _compute_once(args):
+    path, log_path = args
+
+    async def compute():
+        with open(log_path, "a") as log:
+            log.write(f"{os.getpid()}\n")
+        # Long enough for every other worker to miss and wait on the lease
+        await asyncio.sleep(0.5)
+        return {"computed_by": os.getpid()}
+
+    return asyncio.run(SQLiteCache(path).get_or_compute("report", compute, ttl=60))
+
+
+def run_in_process(target, *args):
+    with _spawn().Pool(1) as pool:
+        return pool.apply(target, args)
+
+
+def test_value_set_in_one_process_is_read_in_another(tmp_path):
+    path = str(tmp_path / "cache.db")
+    run_in_process(_set, path, "orders:shop-1", {"total": 42.5, "rows": [1, 2, 3]}, 60)
+
+    assert run_in_process(_get, path, "orders:shop-1") == {"total": 42.5, "rows": [1, 2, 3]}
+    assert run_in_process(_get, path, "orders:shop-2") == "missing"
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_expired_entry_is_a_miss_in_another_process(tmp_path):
+    path = str(tmp_path / "cache.db")
+    run_in_process(_set, path, "short", "value", 1.0)
+    run_in_process(_set, path, "long", "value", 60)
+
+    assert run_in_process(_get, path, "short") == "value"
+    time.sleep(1.2)
+    assert run_in_process(_get, path, "short") == "missing"
+    assert run_in_process(_get, path, "long") == "value"
+
+
+def test_get_or_compute_runs_once_across_processes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    log_path = str(tmp_path / "computes.log")
+    # Create the schema up front so workers only race on the lease
+    SQLiteCache(path)
+
+    with _spawn().Pool(4) as pool:
+        results = pool.map(_compute_once, [(path, log_path)] * 4)
+
+    with open(log_path) as log:
+        computed_by = [int(line) for line in log]
+    assert len(computed_by) == 1
+    assert results == [{"computed_by": computed_by[0]}] * 4
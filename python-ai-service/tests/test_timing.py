@@ -0,0 +1,43 @@
+"""
+Step attribution when one request runs agent steps in concurrent tasks
+"""
+
+import asyncio
+
+import pytest
+
+from app.telemetry.timing import current_timings, record_llm_call, record_shopify_request, start_request
+
+
+async def in_step(step: str, delay: float):
+    timings = current_timings()
+    with timings.step(step):
+        await asyncio.sleep(delay)
+        record_llm_call("stub", "stub-model", 0.001, prompt_tokens=10, completion_tokens=5)
+        record_shopify_request("rest", 0.001)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_attribute_calls_to_their_own_step():
+    timings = start_request(provider="stub")
+
+    # "execute" is entered first but records while "process" is still open
+    await asyncio.gather(in_step("execute", 0.01), in_step("process", 0.03), in_step("execute", 0.05))
+
+    assert [call["step"] for call in timings.llm_calls] == ["execute", "process", "execute"]
+    assert [request["step"] for request in timings.shopify_requests] == ["execute", "process", "execute"]
+    by_step = timings.usage()["by_step"]
+    assert by_step["execute"]["prompt_tokens"] == 20
+    assert by_step["process"]["prompt_tokens"] == 10
+    assert timings.current_step == ""
+
+
+@pytest.mark.asyncio
+async def test_nested_steps_restore_the_outer_step():
+    timings = start_request()
+
+    with timings.step("execute"):
+        with timings.step("process"):
+            assert timings.current_step == "process"
+        assert timings.current_step == "execute"
+    assert timings.current_step == ""
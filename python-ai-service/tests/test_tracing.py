@@ -0,0 +1,133 @@
+"""
+Span tree of /analyze requests: http.request -> agent.analyze -> agent steps
+-> LLM and Shopify calls, with the caller's W3C traceparent continued
+"""
+
+import httpx
+import pytest
+
+from app import main
+from app.agent.orchestrator import AgentOrchestrator
+from app.agent.query_executor import QueryExecutor
+from app.llm.client import LLMClient
+from app.shopify.mock_data import MockDataProvider
+from app.telemetry import tracing
+from conftest import fake_client
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+CALLER_SPAN = "00f067aa0ba902b7"
+QUESTION = "What were my top 5 selling products last week?"
+
+
+@pytest.fixture
+def spans():
+    """Finished spans of the requests a test makes"""
+    exporter = tracing.MemoryExporter()
+    tracing.configure_tracing(exporter)
+    yield exporter.spans
+    tracing.shutdown_tracing()
+
+
+@pytest.fixture
+def client(monkeypatch, mocker):
+    """The service, with an OpenAI client that never leaves the process"""
+    mocker.patch.object(
+        LLMClient, "_generate_openai",
+        # Classifies the question; the later steps fall back to their defaults
+        return_value=(
+            '{"intent": "sales_analysis", "confidence": "high", "time_period": "last week"}',
+            {"prompt_tokens": 12, "completion_tokens": 3}
+        )
+    )
+    orchestrator = AgentOrchestrator(LLMClient("openai", "gpt-4"))
+    shop = MockDataProvider({"seed": 2, "orders": 300, "products": 10, "customers": 50, "days": 20})
+    orchestrator.query_executor = QueryExecutor(shopify_client=fake_client(shop))
+    monkeypatch.setattr(main, "orchestrator", orchestrator)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+async def analyze(client, headers=None, **body):
+    async with client:
+        return await client.post(
+            "/analyze",
+            json={"store_id": "trace.myshopify.com", "question": QUESTION, **body},
+            headers=headers or {}
+        )
+
+
+def finished(spans):
+    """Flush the background exporter and index spans by name"""
+    tracing.shutdown_tracing()
+    by_name = {}
+    for s in spans:
+        by_name.setdefault(s.name, []).append(s)
+    return by_name
+
+
+def ancestors(span, by_id):
+    chain = []
+    while span.parent_id in by_id:
+        span = by_id[span.parent_id]
+        chain.append(span.name)
+    return chain
+
+
+@pytest.mark.asyncio
+async def test_span_tree_of_a_mock_request(client, spans):
+    response = await analyze(client, use_mock=True)
+    assert response.status_code == 200
+    by_name = finished(spans)
+    by_id = {s.span_id: s for s in spans}
+
+    (http,) = by_name["http.request"]
+    (agent,) = by_name["agent.analyze"]
+    assert http.parent_id is None
+    assert agent.parent_id == http.span_id
+    for step in ("intent", "plan", "generate", "execute", "process", "explain"):
+        (step_span,) = by_name[f"agent.{step}"]
+        assert step_span.parent_id == agent.span_id
+    assert by_name["llm.generate"]
+    for llm in by_name["llm.generate"]:
+        step = by_id[llm.parent_id]
+        assert step.name == f"agent.{llm.attributes['step']}"
+        assert llm.attributes["model"] == "gpt-4"
+        assert llm.attributes["prompt_tokens"] == 12
+    assert {s.trace_id for s in spans} == {http.trace_id}
+    assert response.headers["traceparent"] == f"00-{http.trace_id}-{http.span_id}-01"
+
+
+@pytest.mark.asyncio
+async def test_shopify_requests_are_children_of_the_execute_step(client, spans):
+    response = await analyze(client, access_token="token")
+    assert response.status_code == 200
+    by_name = finished(spans)
+    by_id = {s.span_id: s for s in spans}
+
+    assert by_name["shopify.rest"]
+    for request in by_name["shopify.rest"]:
+        assert ancestors(request, by_id)[:3] == ["agent.execute", "agent.analyze", "http.request"]
+        assert request.attributes["status"] == 200
+        assert request.attributes["records"] >= 0
+        assert request.attributes["bytes"] > 0
+
+
+@pytest.mark.asyncio
+async def test_incoming_traceparent_is_continued(client, spans):
+    response = await analyze(client, headers={"traceparent": f"00-{TRACE_ID}-{CALLER_SPAN}-01"}, use_mock=True)
+    by_name = finished(spans)
+
+    (http,) = by_name["http.request"]
+    assert http.parent_id == CALLER_SPAN
+    assert {s.trace_id for s in spans} == {TRACE_ID}
+    assert response.headers["traceparent"] == f"00-{TRACE_ID}-{http.span_id}-01"
+
+
+@pytest.mark.asyncio
+async def test_invalid_traceparent_starts_a_new_trace(client, spans):
+    response = await analyze(client, headers={"traceparent": f"00-{'0' * 32}-{CALLER_SPAN}-01"}, use_mock=True)
+    by_name = finished(spans)
+
+    (http,) = by_name["http.request"]
+    assert http.parent_id is None
+    assert http.trace_id != "0" * 32
+    assert response.headers["traceparent"].startswith(f"00-{http.trace_id}-")